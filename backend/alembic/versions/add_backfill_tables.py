@@ -0,0 +1,71 @@
+"""Add backfill job tables
+
+Revision ID: add_backfill_tables
+Revises: add_race_type
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_backfill_tables'
+down_revision: Union[str, None] = 'add_race_type'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('backfill_jobs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('include_training', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_backfill_jobs_status'), 'backfill_jobs', ['status'], unique=False)
+
+    op.create_table('backfill_dates',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('target_date', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('races_total', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['backfill_jobs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'target_date', name='uq_backfill_dates_job_date')
+    )
+    op.create_index(op.f('ix_backfill_dates_job_id'), 'backfill_dates', ['job_id'], unique=False)
+
+    op.create_table('backfill_races',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('target_date', sa.Date(), nullable=False),
+        sa.Column('race_id', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['backfill_jobs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id', 'race_id', name='uq_backfill_races_job_race')
+    )
+    op.create_index('ix_backfill_races_job_date', 'backfill_races', ['job_id', 'target_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_backfill_races_job_date', table_name='backfill_races')
+    op.drop_table('backfill_races')
+    op.drop_index(op.f('ix_backfill_dates_job_id'), table_name='backfill_dates')
+    op.drop_table('backfill_dates')
+    op.drop_index(op.f('ix_backfill_jobs_status'), table_name='backfill_jobs')
+    op.drop_table('backfill_jobs')
@@ -0,0 +1,41 @@
+"""Add change log and sync cursor tables
+
+Revision ID: add_change_log
+Revises: add_odds_snapshots
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_change_log'
+down_revision: Union[str, None] = 'add_odds_snapshots'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('change_log',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('table_name', sa.String(length=30), nullable=False),
+        sa.Column('record_id', sa.String(length=50), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True
+    )
+    op.create_table('sync_cursors',
+        sa.Column('consumer', sa.String(length=50), nullable=False),
+        sa.Column('last_change_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('consumer')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sync_cursors')
+    op.drop_table('change_log')
@@ -0,0 +1,66 @@
+"""Add denormalized entry history table
+
+Revision ID: add_entry_history
+Revises: add_feature_query_indexes
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_entry_history'
+down_revision: Union[str, None] = 'add_feature_query_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 行の投入は entry_history_service.refresh_entry_history（POST /api/v1/data/entry-history/rebuild）で行う
+    op.create_table('entry_history',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('race_id', sa.String(length=20), nullable=False),
+        sa.Column('horse_id', sa.String(length=20), nullable=False),
+        sa.Column('jockey_id', sa.String(length=20), nullable=True),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('race_type', sa.String(length=10), nullable=False),
+        sa.Column('course', sa.String(length=10), nullable=False),
+        sa.Column('distance', sa.Integer(), nullable=False),
+        sa.Column('track_type', sa.String(length=10), nullable=False),
+        sa.Column('condition', sa.String(length=10), nullable=True),
+        sa.Column('grade', sa.String(length=10), nullable=True),
+        sa.Column('frame_number', sa.Integer(), nullable=True),
+        sa.Column('horse_number', sa.Integer(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('horse_weight', sa.Integer(), nullable=True),
+        sa.Column('weight_diff', sa.Integer(), nullable=True),
+        sa.Column('odds', sa.Float(), nullable=True),
+        sa.Column('popularity', sa.Integer(), nullable=True),
+        sa.Column('result', sa.Integer(), nullable=False),
+        sa.Column('finish_time', sa.String(length=10), nullable=True),
+        sa.Column('margin', sa.String(length=20), nullable=True),
+        sa.Column('corner_position', sa.String(length=20), nullable=True),
+        sa.Column('last_3f', sa.Float(), nullable=True),
+        sa.Column('pace', sa.String(length=20), nullable=True),
+        sa.Column('prize_money', sa.Integer(), nullable=True),
+        sa.Column('first_corner', sa.Integer(), nullable=True),
+        sa.Column('last_corner', sa.Integer(), nullable=True),
+        sa.Column('pace_first', sa.Float(), nullable=True),
+        sa.Column('pace_second', sa.Float(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['id'], ['entries.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_entry_history_horse_date', 'entry_history', ['horse_id', 'date'], unique=False)
+    op.create_index('ix_entry_history_jockey_date', 'entry_history', ['jockey_id', 'date'], unique=False)
+    op.create_index(op.f('ix_entry_history_race_id'), 'entry_history', ['race_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_entry_history_race_id'), table_name='entry_history')
+    op.drop_index('ix_entry_history_jockey_date', table_name='entry_history')
+    op.drop_index('ix_entry_history_horse_date', table_name='entry_history')
+    op.drop_table('entry_history')
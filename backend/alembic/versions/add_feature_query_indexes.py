@@ -0,0 +1,67 @@
+"""Add composite indexes for feature extraction queries
+
+Revision ID: add_feature_query_indexes
+Revises: add_prediction_outcomes
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_feature_query_indexes'
+down_revision: Union[str, None] = 'add_prediction_outcomes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FINISHED = sa.text('result IS NOT NULL')
+
+
+def upgrade() -> None:
+    # PostgreSQLでは書き込みを止めないよう CONCURRENTLY で作成する（トランザクション外）
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_entries_horse_race_finished', 'entries', ['horse_id', 'race_id'], unique=False,
+            postgresql_include=['result'], postgresql_where=FINISHED, sqlite_where=FINISHED,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_entries_jockey_race_finished', 'entries', ['jockey_id', 'race_id'], unique=False,
+            postgresql_include=['result'], postgresql_where=FINISHED, sqlite_where=FINISHED,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_entries_jockey_id'), 'entries', ['jockey_id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_races_race_id_date', 'races', ['race_id', 'date'], unique=False,
+            postgresql_include=['course', 'distance', 'condition', 'track_type'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_trainings_race_horse', 'trainings', ['race_id', 'horse_id'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_trainers_name'), 'trainers', ['name'], unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_sires_name'), 'sires', ['name'], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sires_name'), table_name='sires')
+    op.drop_index(op.f('ix_trainers_name'), table_name='trainers')
+    op.drop_index('ix_trainings_race_horse', table_name='trainings')
+    op.drop_index('ix_races_race_id_date', table_name='races')
+    op.drop_index(op.f('ix_entries_jockey_id'), table_name='entries')
+    op.drop_index('ix_entries_jockey_race_finished', table_name='entries')
+    op.drop_index('ix_entries_horse_race_finished', table_name='entries')
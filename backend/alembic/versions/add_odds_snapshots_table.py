@@ -0,0 +1,47 @@
+"""Add odds snapshots and odds latest tables
+
+Revision ID: add_odds_snapshots
+Revises: add_backfill_tables
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_odds_snapshots'
+down_revision: Union[str, None] = 'add_backfill_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('odds_snapshots',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('race_id', sa.String(length=20), nullable=False),
+        sa.Column('bet_type', sa.String(length=20), nullable=False),
+        sa.Column('combination', sa.String(length=20), nullable=False),
+        sa.Column('odds', sa.Float(), nullable=True),
+        sa.Column('odds_max', sa.Float(), nullable=True),
+        sa.Column('captured_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_odds_snapshots_race_captured', 'odds_snapshots', ['race_id', 'captured_at'], unique=False)
+    op.create_table('odds_latest',
+        sa.Column('race_id', sa.String(length=20), nullable=False),
+        sa.Column('bet_type', sa.String(length=20), nullable=False),
+        sa.Column('combination', sa.String(length=20), nullable=False),
+        sa.Column('odds', sa.Float(), nullable=True),
+        sa.Column('odds_max', sa.Float(), nullable=True),
+        sa.Column('captured_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('race_id', 'bet_type', 'combination')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('odds_latest')
+    op.drop_index('ix_odds_snapshots_race_captured', table_name='odds_snapshots')
+    op.drop_table('odds_snapshots')
@@ -0,0 +1,46 @@
+"""Add prediction outcomes table
+
+Revision ID: add_prediction_outcomes
+Revises: add_summary_tables
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_prediction_outcomes'
+down_revision: Union[str, None] = 'add_summary_tables'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('prediction_outcomes',
+        sa.Column('prediction_id', sa.Integer(), nullable=False),
+        sa.Column('race_id', sa.String(length=20), nullable=False),
+        sa.Column('model_version', sa.String(length=50), nullable=False),
+        sa.Column('grade', sa.String(length=10), nullable=True),
+        sa.Column('track_type', sa.String(length=10), nullable=True),
+        sa.Column('top1_hit', sa.Boolean(), nullable=False),
+        sa.Column('top3_hit', sa.Boolean(), nullable=False),
+        sa.Column('top5_hit', sa.Boolean(), nullable=False),
+        sa.Column('predicted_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('evaluated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['prediction_id'], ['predictions.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['race_id'], ['races.race_id'], ),
+        sa.PrimaryKeyConstraint('prediction_id')
+    )
+    op.create_index(op.f('ix_prediction_outcomes_race_id'), 'prediction_outcomes', ['race_id'], unique=False)
+    op.create_index(op.f('ix_prediction_outcomes_model_version'), 'prediction_outcomes', ['model_version'], unique=False)
+    op.create_index(op.f('ix_prediction_outcomes_predicted_at'), 'prediction_outcomes', ['predicted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_prediction_outcomes_predicted_at'), table_name='prediction_outcomes')
+    op.drop_index(op.f('ix_prediction_outcomes_model_version'), table_name='prediction_outcomes')
+    op.drop_index(op.f('ix_prediction_outcomes_race_id'), table_name='prediction_outcomes')
+    op.drop_table('prediction_outcomes')
@@ -0,0 +1,46 @@
+"""Add jockey stats and history daily summary tables
+
+Revision ID: add_summary_tables
+Revises: add_change_log
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_summary_tables'
+down_revision: Union[str, None] = 'add_change_log'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('jockey_stats',
+        sa.Column('jockey_id', sa.String(length=20), nullable=False),
+        sa.Column('total_entries', sa.Integer(), nullable=False),
+        sa.Column('wins', sa.Integer(), nullable=False),
+        sa.Column('places', sa.Integer(), nullable=False),
+        sa.Column('shows', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['jockey_id'], ['jockeys.jockey_id'], ),
+        sa.PrimaryKeyConstraint('jockey_id')
+    )
+    op.create_table('history_daily_summary',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('total_records', sa.Integer(), nullable=False),
+        sa.Column('total_bets', sa.Integer(), nullable=False),
+        sa.Column('total_hits', sa.Integer(), nullable=False),
+        sa.Column('total_bet_amount', sa.Integer(), nullable=False),
+        sa.Column('total_payout', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('history_daily_summary')
+    op.drop_table('jockey_stats')
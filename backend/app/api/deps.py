@@ -0,0 +1,28 @@
+"""
+ルート共通の依存関係
+
+ルートハンドラは同期関数（def）で書き、FastAPIのスレッドプールで実行する。
+外部サイトへアクセスするスクレイピング系のハンドラは scrape_slot で同時実行数を
+SCRAPE_MAX_CONCURRENT_REQUESTS に制限し、長いスクレイピングがスレッドプールを
+使い切って一覧・詳細APIを待たせないようにする。
+"""
+from typing import AsyncIterator, Optional
+
+import anyio
+
+from app.config import settings
+
+_scrape_semaphore: Optional[anyio.Semaphore] = None
+
+
+def _get_scrape_semaphore() -> anyio.Semaphore:
+    global _scrape_semaphore
+    if _scrape_semaphore is None:
+        _scrape_semaphore = anyio.Semaphore(settings.SCRAPE_MAX_CONCURRENT_REQUESTS)
+    return _scrape_semaphore
+
+
+async def scrape_slot() -> AsyncIterator[None]:
+    """スクレイピングの実行枠を確保（空くまでイベントループ上で待つ）"""
+    async with _get_scrape_semaphore():
+        yield
@@ -1,3 +1,3 @@
-from app.api.routes import races, predictions, history, data, stats, model, horses, jockeys
+from app.api.routes import races, predictions, history, data, stats, model, horses, jockeys, sync, jobs
 
-__all__ = ["races", "predictions", "history", "data", "stats", "model", "horses", "jockeys"]
+__all__ = ["races", "predictions", "history", "data", "stats", "model", "horses", "jockeys", "sync", "jobs"]
@@ -1,8 +1,11 @@
 from datetime import date, datetime
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.api.deps import scrape_slot
+from app.db.session import get_db, BatchSessionLocal
 from app.logging_config import get_logger
 from app.services.scraper import (
     HorseScraper,
@@ -11,14 +14,27 @@ from app.services.scraper import (
     TrainingScraper,
     OddsScraper,
 )
-from app.services import training_service, scraper_service
+from app.services import (
+    training_service, scraper_service, odds_service, race_scheduler, entry_history_service,
+    job_service,
+)
 
 logger = get_logger(__name__)
 router = APIRouter()
 
+# 出走履歴の全件再作成の進捗（ワーカープロセスから反映される）
+_entry_history_status = job_service.SharedStatus("entry_history_rebuild", {
+    "is_running": False,
+    "progress": 0,
+    "total": 0,
+    "message": None,
+    "rows": None,
+    "error": None,
+})
+
 
-@router.get("/horse/{horse_id}")
-async def get_horse_data(horse_id: str):
+@router.get("/horse/{horse_id}", dependencies=[Depends(scrape_slot)])
+def get_horse_data(horse_id: str):
     """Get horse detail data including course aptitude"""
     scraper = HorseScraper()
     try:
@@ -28,8 +44,8 @@ async def get_horse_data(horse_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/horse/{horse_id}/past-results")
-async def get_horse_past_results(horse_id: str):
+@router.get("/horse/{horse_id}/past-results", dependencies=[Depends(scrape_slot)])
+def get_horse_past_results(horse_id: str):
     """Get horse's past race results"""
     scraper = HorseScraper()
     try:
@@ -39,8 +55,8 @@ async def get_horse_past_results(horse_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/jockey/{jockey_id}")
-async def get_jockey_data(jockey_id: str):
+@router.get("/jockey/{jockey_id}", dependencies=[Depends(scrape_slot)])
+def get_jockey_data(jockey_id: str):
     """Get jockey detail data including win rate"""
     scraper = JockeyScraper()
     try:
@@ -50,8 +66,8 @@ async def get_jockey_data(jockey_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/trainer/{trainer_id}")
-async def get_trainer_data(trainer_id: str):
+@router.get("/trainer/{trainer_id}", dependencies=[Depends(scrape_slot)])
+def get_trainer_data(trainer_id: str):
     """Get trainer detail data"""
     scraper = TrainerScraper()
     try:
@@ -61,8 +77,8 @@ async def get_trainer_data(trainer_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/training/{race_id}")
-async def get_training_data(
+@router.get("/training/{race_id}", dependencies=[Depends(scrape_slot)])
+def get_training_data(
     race_id: str,
     save_to_db: bool = Query(False, description="Save to database"),
     db: Session = Depends(get_db),
@@ -100,7 +116,7 @@ async def get_training_data(
 
 
 @router.get("/training/{race_id}/db")
-async def get_training_from_db(
+def get_training_from_db(
     race_id: str,
     db: Session = Depends(get_db),
 ):
@@ -126,8 +142,8 @@ async def get_training_from_db(
     }
 
 
-@router.post("/training/{race_id}/scrape")
-async def scrape_and_save_training(
+@router.post("/training/{race_id}/scrape", dependencies=[Depends(scrape_slot)])
+def scrape_and_save_training(
     race_id: str,
     db: Session = Depends(get_db),
 ):
@@ -154,10 +170,45 @@ async def scrape_and_save_training(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/odds/{race_id}")
-async def get_odds_data(
+@router.get("/scheduler/status")
+def get_scheduler_status():
+    """発走前スケジューラーのキュー長・遅延などのメトリクスを取得"""
+    return race_scheduler.scheduler.get_status()
+
+
+@router.get("/odds/{race_id}/history")
+def get_odds_history(
+    race_id: str,
+    bet_type: Optional[str] = Query(None, description="Bet type (win, place, quinella, ...)"),
+    combination: Optional[str] = Query(None, description="Combination key (e.g. 1-2-3)"),
+    db: Session = Depends(get_db),
+):
+    """保存済みオッズの変化履歴を取得"""
+    snapshots = odds_service.get_odds_history(
+        db, race_id, bet_type=bet_type, combination=combination
+    )
+    return {
+        "race_id": race_id,
+        "count": len(snapshots),
+        "history": [
+            {
+                "bet_type": s.bet_type,
+                "combination": s.combination,
+                "odds": s.odds,
+                "odds_max": s.odds_max,
+                "captured_at": s.captured_at.isoformat(),
+            }
+            for s in snapshots
+        ],
+    }
+
+
+@router.get("/odds/{race_id}", dependencies=[Depends(scrape_slot)])
+def get_odds_data(
     race_id: str,
     all_types: bool = Query(False, description="Get all odds types"),
+    save_snapshot: bool = Query(False, description="Save changed odds as a snapshot"),
+    db: Session = Depends(get_db),
 ):
     """Get odds data for a race"""
     scraper = OddsScraper()
@@ -166,7 +217,10 @@ async def get_odds_data(
             data = scraper.scrape_all(race_id)
         else:
             data = scraper.scrape(race_id)
-        return {"status": "success", "data": data}
+        response = {"status": "success", "data": data}
+        if save_snapshot:
+            response["snapshot_rows"] = odds_service.save_snapshot(db, race_id, data)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -174,8 +228,8 @@ async def get_odds_data(
 # ==================== 一括スクレイピングAPI ====================
 
 
-@router.post("/scrape/races")
-async def scrape_races(
+@router.post("/scrape/races", dependencies=[Depends(scrape_slot)])
+def scrape_races(
     target_date: str = Query(..., description="Target date (YYYY-MM-DD)"),
     skip_existing: bool = Query(True, description="Skip existing races"),
     force: bool = Query(False, description="Force overwrite existing races (overrides skip_existing)"),
@@ -217,8 +271,8 @@ async def scrape_races(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/scrape/results")
-async def scrape_results(
+@router.post("/scrape/results", dependencies=[Depends(scrape_slot)])
+def scrape_results(
     target_date: str = Query(..., description="Target date (YYYY-MM-DD)"),
     db: Session = Depends(get_db),
 ):
@@ -251,8 +305,8 @@ async def scrape_results(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/scrape/training")
-async def scrape_training_bulk(
+@router.post("/scrape/training", dependencies=[Depends(scrape_slot)])
+def scrape_training_bulk(
     target_date: str = Query(..., description="Target date (YYYY-MM-DD)"),
     db: Session = Depends(get_db),
 ):
@@ -282,3 +336,59 @@ async def scrape_training_bulk(
     except Exception as e:
         logger.error(f"Training scraping failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _run_entry_history_rebuild():
+    """ワーカープロセスで entry_history を全件作り直す"""
+    def on_progress(current: int, total: int, message: str) -> None:
+        _entry_history_status.update(progress=current, total=total, message=message)
+
+    db = BatchSessionLocal()
+    try:
+        _entry_history_status.update(
+            is_running=True, progress=0, total=0, message=None, rows=None, error=None
+        )
+        rows = entry_history_service.refresh_entry_history(db, progress_callback=on_progress)
+        _entry_history_status["rows"] = rows
+        return {"rows": rows}
+    except Exception as e:
+        logger.error(f"Entry history rebuild failed: {e}")
+        _entry_history_status["error"] = str(e)
+        raise
+    finally:
+        _entry_history_status["is_running"] = False
+        db.close()
+
+
+@router.post("/entry-history/rebuild")
+def rebuild_entry_history(
+    db: Session = Depends(get_db),
+):
+    """
+    特徴量抽出用の出走履歴テーブル（entry_history）を全件作り直す
+
+    FEATURE_HISTORY_TABLE を有効にする前に一度実行してください。
+    以降は結果の取り込み時に該当レース分だけ更新されます。
+    ワーカープロセスで実行され、進捗は GET /api/v1/data/entry-history/rebuild/status で確認できます。
+    """
+    job = None
+    if not _entry_history_status["is_running"]:
+        job = job_service.submit_job(db, "entry_history_rebuild", _run_entry_history_rebuild)
+    if job is None:
+        raise HTTPException(status_code=409, detail="出走履歴の再作成は既に実行中です")
+    _entry_history_status["is_running"] = True
+
+    return {
+        "status": "success",
+        "message": "出走履歴の再作成を開始しました",
+        "job_id": job.id,
+    }
+
+
+@router.get("/entry-history/rebuild/status")
+def get_entry_history_rebuild_status():
+    """出走履歴の再作成の進捗状況を取得"""
+    return {
+        "status": "success",
+        "entry_history_rebuild": _entry_history_status,
+    }
@@ -11,7 +11,7 @@ router = APIRouter()
 
 
 @router.get("")
-async def get_history(
+def get_history(
     from_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     to_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     limit: int = Query(50, ge=1, le=100),
@@ -58,7 +58,7 @@ async def get_history(
 
 
 @router.post("")
-async def create_history(
+def create_history(
     prediction_id: int = Query(..., description="Prediction ID"),
     bet_type: str = Query(..., description="Bet type (単勝, 馬連, etc.)"),
     bet_detail: str = Query(..., description="Bet detail (e.g., '5' or '1-3')"),
@@ -88,7 +88,7 @@ async def create_history(
 
 
 @router.put("/{history_id}/result")
-async def update_history_result(
+def update_history_result(
     history_id: int,
     is_hit: bool = Query(..., description="Whether the bet hit"),
     payout: Optional[int] = Query(None, description="Payout amount if hit"),
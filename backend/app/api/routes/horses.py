@@ -1,64 +1,92 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
-
-from app.db.session import get_db, SessionLocal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload, with_expression
+
+from app.db.pagination import count_rows, paginate
+from app.api.deps import scrape_slot
+from app.api.sse import event_stream
+from app.db.session import get_db, BatchSessionLocal
 from app.models.horse import Horse
 from app.models.jockey import Jockey
 from app.models.race import Entry, Race
+from app.services import job_service
 from app.services.scraper.horse import HorseScraper
 from app.logging_config import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter()
 
-# 一括補完の進捗管理
-_bulk_rescrape_status = {
+# 一覧の並び順（名前・馬ID）
+HORSE_LIST_ORDER = [(Horse.name, False), (Horse.horse_id, False)]
+
+# 一覧の出走数（相関サブクエリで1クエリにまとめる）
+HORSE_ENTRIES_COUNT = (
+    select(func.count(Entry.id))
+    .where(Entry.horse_id == Horse.horse_id)
+    .correlate(Horse)
+    .scalar_subquery()
+)
+
+# 一括補完の進捗管理（ワーカーでの変更がAPIプロセスに反映される）
+_bulk_rescrape_status = job_service.SharedStatus("bulk_rescrape", {
     "is_running": False,
     "progress": 0,
     "total": 0,
     "current_horse": None,
     "results": None,
     "error": None,
-}
+})
 
 
 @router.get("")
-async def get_horses(
+def get_horses(
     search: Optional[str] = Query(None, description="Search by name"),
     sex: Optional[str] = Query(None, description="Filter by sex (牡/牝/セ)"),
     race_type: Optional[str] = Query(None, description="Filter by race type (central/local/banei)"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (takes precedence over offset)"),
     db: Session = Depends(get_db),
 ):
     """Get horse list with search and filter"""
-    query = db.query(Horse)
+    query = select(Horse)
 
     if search:
-        query = query.filter(Horse.name.contains(search))
+        query = query.where(Horse.name.contains(search))
     if sex:
-        query = query.filter(Horse.sex == sex)
+        query = query.where(Horse.sex == sex)
 
     # Filter by race_type: only horses that have entries in races of this type
     if race_type:
-        query = query.filter(
+        query = query.where(
             Horse.horse_id.in_(
-                db.query(Entry.horse_id)
+                select(Entry.horse_id)
                 .join(Race, Entry.race_id == Race.race_id)
-                .filter(Race.race_type == race_type)
+                .where(Race.race_type == race_type)
                 .distinct()
             )
         )
 
-    total = query.count()
-    horses = query.order_by(Horse.name).offset(offset).limit(limit).all()
+    total = count_rows(db, query, cache_key=("horses", search, sex, race_type))
+    try:
+        horses, next_cursor = paginate(
+            db,
+            query.options(with_expression(Horse.entries_count, HORSE_ENTRIES_COUNT))
+            .execution_options(populate_existing=True),
+            HORSE_LIST_ORDER,
+            limit,
+            offset=offset,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "horses": [
             {
                 "horse_id": h.horse_id,
@@ -68,7 +96,7 @@ async def get_horses(
                 "father": h.father,
                 "mother": h.mother,
                 "trainer": h.trainer,
-                "entries_count": len(h.entries) if h.entries else 0,
+                "entries_count": h.entries_count or 0,
             }
             for h in horses
         ],
@@ -76,7 +104,7 @@ async def get_horses(
 
 
 @router.get("/stats")
-async def get_horse_stats(
+def get_horse_stats(
     db: Session = Depends(get_db),
 ):
     """Get horse statistics"""
@@ -106,7 +134,7 @@ async def get_horse_stats(
 
 
 @router.get("/{horse_id}")
-async def get_horse(
+def get_horse(
     horse_id: str,
     db: Session = Depends(get_db),
 ):
@@ -118,6 +146,7 @@ async def get_horse(
     # Get race history from entries
     entries = (
         db.query(Entry)
+        .options(joinedload(Entry.race), joinedload(Entry.jockey))
         .filter(Entry.horse_id == horse_id)
         .order_by(Entry.race_id.desc())
         .limit(20)
@@ -193,8 +222,8 @@ def _get_course_from_race_id(race_id: str) -> str:
     return "不明"
 
 
-@router.post("/{horse_id}/rescrape")
-async def rescrape_horse_data(
+@router.post("/{horse_id}/rescrape", dependencies=[Depends(scrape_slot)])
+def rescrape_horse_data(
     horse_id: str,
     db: Session = Depends(get_db),
 ):
@@ -369,10 +398,10 @@ async def rescrape_horse_data(
 # ================== 一括補完機能 ==================
 
 def _run_bulk_rescrape():
-    """バックグラウンドで全馬の一括補完を実行"""
+    """ワーカープロセスで全馬の一括補完を実行"""
     global _bulk_rescrape_status
 
-    db = SessionLocal()
+    db = BatchSessionLocal()
     try:
         _bulk_rescrape_status["is_running"] = True
         _bulk_rescrape_status["progress"] = 0
@@ -561,30 +590,37 @@ def _run_bulk_rescrape():
 
 
 @router.post("/bulk-rescrape")
-async def start_bulk_rescrape(background_tasks: BackgroundTasks):
+def start_bulk_rescrape(db: Session = Depends(get_db)):
     """
     全競走馬の一括データ補完を開始
 
-    バックグラウンドで実行され、進捗は GET /api/v1/horses/bulk-rescrape/status で確認できます。
+    ワーカープロセスで実行され、進捗は GET /api/v1/horses/bulk-rescrape/status で確認できます。
     """
-    global _bulk_rescrape_status
-
-    if _bulk_rescrape_status["is_running"]:
+    job = None
+    if not _bulk_rescrape_status["is_running"]:
+        job = job_service.submit_job(db, "bulk_rescrape", _run_bulk_rescrape)
+    if job is None:
         raise HTTPException(
             status_code=409,
             detail="一括補完は既に実行中です"
         )
-
-    background_tasks.add_task(_run_bulk_rescrape)
+    _bulk_rescrape_status["is_running"] = True
 
     return {
         "status": "success",
         "message": "一括補完を開始しました",
+        "job_id": job.id,
     }
 
 
+@router.get("/bulk-rescrape/stream")
+async def stream_bulk_rescrape_status(last_event_id: Optional[str] = Header(None)):
+    """一括補完の進捗をSSEでストリーミング"""
+    return event_stream("bulk_rescrape", lambda: _bulk_rescrape_status["is_running"], last_event_id)
+
+
 @router.get("/bulk-rescrape/status")
-async def get_bulk_rescrape_status():
+def get_bulk_rescrape_status():
     """
     一括補完の進捗状況を取得
     """
@@ -0,0 +1,77 @@
+"""
+ジョブAPI
+
+ワーカープロセスで実行するバックグラウンドジョブ（再学習・シミュレーションなど）の
+状態確認とキャンセル
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api.sse import event_stream
+from app.db.session import get_db
+from app.models import Job
+from app.services import job_service
+from app.services.event_broker import job_channel
+
+router = APIRouter()
+
+
+def _job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "params": job.params,
+        "result": job.result,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@router.get("")
+def list_jobs(
+    kind: Optional[str] = Query(None, description="retrain, simulation, threshold_sweep, bulk_rescrape, feature_sync"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """ジョブ一覧を取得（新しい順）"""
+    return {"jobs": [_job_to_dict(job) for job in job_service.list_jobs(db, kind, limit)]}
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """ジョブの状態を取得"""
+    job = job_service.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_to_dict(job)
+
+
+@router.get("/{job_id}/stream")
+async def stream_job(job_id: int, last_event_id: Optional[str] = Header(None)):
+    """
+    ジョブの進捗をSSEでストリーミング
+
+    状態の変化は "status"、終了は "complete" / "error" / "cancelled" イベントで届きます。
+    """
+    return event_stream(job_channel(job_id), lambda: job_service.is_watched(job_id), last_event_id)
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    ジョブのキャンセルを要求
+
+    ワーカーは次に進捗を書き込む時点で停止します。
+    JOB_CANCEL_GRACE_SECONDS 以内に停止しない場合はプロセスを終了させます。
+    """
+    job = job_service.request_cancel(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_to_dict(job)
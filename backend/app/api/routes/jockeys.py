@@ -2,70 +2,67 @@ import time
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload
 
+from app.db.pagination import count_rows, paginate
+from app.api.deps import scrape_slot
 from app.db.session import get_db
 from app.models.jockey import Jockey
 from app.models.race import Entry, Race
+from app.services import stats_summary_service
 from app.services.scraper.jockey import JockeyScraper
 
 router = APIRouter()
 
+# 一覧の並び順（名前・騎手ID）
+JOCKEY_LIST_ORDER = [(Jockey.name, False), (Jockey.jockey_id, False)]
+
 
 @router.get("")
-async def get_jockeys(
+def get_jockeys(
     search: Optional[str] = Query(None, description="Search by name"),
     race_type: Optional[str] = Query(None, description="Filter by race type (central/local/banei)"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (takes precedence over offset)"),
     db: Session = Depends(get_db),
 ):
     """Get jockey list with search"""
-    query = db.query(Jockey)
+    query = select(Jockey)
 
     if search:
-        query = query.filter(Jockey.name.contains(search))
+        query = query.where(Jockey.name.contains(search))
 
     # Filter by race_type: only jockeys that have entries in races of this type
     if race_type:
-        query = query.filter(
+        query = query.where(
             Jockey.jockey_id.in_(
-                db.query(Entry.jockey_id)
+                select(Entry.jockey_id)
                 .join(Race, Entry.race_id == Race.race_id)
-                .filter(Race.race_type == race_type)
+                .where(Race.race_type == race_type)
                 .distinct()
             )
         )
 
-    total = query.count()
-    jockeys = query.order_by(Jockey.name).offset(offset).limit(limit).all()
+    total = count_rows(db, query, cache_key=("jockeys", search, race_type))
+    try:
+        jockeys, next_cursor = paginate(db, query, JOCKEY_LIST_ORDER, limit, offset=offset, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Entry counts (filtered by race_type if specified) and win stats in one grouped query
+    stats = stats_summary_service.compute_jockey_stats(
+        db, [j.jockey_id for j in jockeys], entries_race_type=race_type
+    )
 
-    # Get entry counts for each jockey (filtered by race_type if specified)
     result = []
     for j in jockeys:
-        entry_query = db.query(Entry).filter(Entry.jockey_id == j.jockey_id)
-        if race_type:
-            entry_query = entry_query.join(Race, Entry.race_id == Race.race_id).filter(Race.race_type == race_type)
-        entries_count = entry_query.count()
-
-        # Calculate win stats from entries
-        wins = db.query(Entry).filter(
-            Entry.jockey_id == j.jockey_id,
-            Entry.result == 1
-        ).count()
-
-        places = db.query(Entry).filter(
-            Entry.jockey_id == j.jockey_id,
-            Entry.result <= 2,
-            Entry.result >= 1
-        ).count()
-
-        shows = db.query(Entry).filter(
-            Entry.jockey_id == j.jockey_id,
-            Entry.result <= 3,
-            Entry.result >= 1
-        ).count()
+        jockey_stats = stats[j.jockey_id]
+        entries_count = jockey_stats["total_entries"]
+        wins = jockey_stats["wins"]
+        places = jockey_stats["places"]
+        shows = jockey_stats["shows"]
 
         result.append({
             "jockey_id": j.jockey_id,
@@ -79,12 +76,13 @@ async def get_jockeys(
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "jockeys": result,
     }
 
 
 @router.get("/stats")
-async def get_jockey_stats(
+def get_jockey_stats(
     db: Session = Depends(get_db),
 ):
     """Get jockey statistics"""
@@ -110,7 +108,7 @@ async def get_jockey_stats(
 
 
 @router.get("/{jockey_id}")
-async def get_jockey(
+def get_jockey(
     jockey_id: str,
     db: Session = Depends(get_db),
 ):
@@ -122,6 +120,7 @@ async def get_jockey(
     # Get race history from entries
     entries = (
         db.query(Entry)
+        .options(joinedload(Entry.race), joinedload(Entry.horse))
         .filter(Entry.jockey_id == jockey_id)
         .order_by(Entry.race_id.desc())
         .limit(30)
@@ -129,10 +128,11 @@ async def get_jockey(
     )
 
     # Calculate stats
-    total_entries = db.query(Entry).filter(Entry.jockey_id == jockey_id).count()
-    wins = db.query(Entry).filter(Entry.jockey_id == jockey_id, Entry.result == 1).count()
-    places = db.query(Entry).filter(Entry.jockey_id == jockey_id, Entry.result <= 2, Entry.result >= 1).count()
-    shows = db.query(Entry).filter(Entry.jockey_id == jockey_id, Entry.result <= 3, Entry.result >= 1).count()
+    stats = stats_summary_service.get_jockey_stats(db, jockey_id)
+    total_entries = stats["total_entries"]
+    wins = stats["wins"]
+    places = stats["places"]
+    shows = stats["shows"]
 
     race_history = []
     for e in entries:
@@ -166,8 +166,8 @@ async def get_jockey(
     }
 
 
-@router.post("/refresh-names")
-async def refresh_jockey_names(
+@router.post("/refresh-names", dependencies=[Depends(scrape_slot)])
+def refresh_jockey_names(
     db: Session = Depends(get_db),
 ):
     """Refresh all jockey names from their detail pages"""
@@ -4,29 +4,27 @@
 再学習・モデル切り替え・バージョン管理・シミュレーションエンドポイント
 SSEストリーミング対応
 """
-import asyncio
-import json
 from datetime import datetime
 from itertools import combinations
 from typing import Optional
 
-import numpy as np
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.api.sse import event_stream
+from app.db.session import get_db, run_in_batch_session
 from app.logging_config import get_logger
 from app.models import Race, Entry
-from app.services import retraining_service, prediction_service
-from app.services.predictor import FeatureExtractor, get_model, LocalFeatureExtractor, BaneiFeatureExtractor
-from app.services.predictor.model import list_model_versions as list_versions_by_type, DEFAULT_RACE_TYPE, RACE_TYPES
+from app.services import retraining_service, prediction_service, job_service
+from app.services.predictor.model_files import list_model_versions as list_versions_by_type, DEFAULT_RACE_TYPE, RACE_TYPES
 
 
 def get_feature_extractor(db: Session, race_type: str):
     """レースタイプに応じた特徴量抽出器を取得"""
+    from app.services.predictor import FeatureExtractor, LocalFeatureExtractor, BaneiFeatureExtractor
+
     if race_type == "local":
         return LocalFeatureExtractor(db)
     elif race_type == "banei":
@@ -37,14 +35,14 @@ def get_feature_extractor(db: Session, race_type: str):
 logger = get_logger(__name__)
 router = APIRouter()
 
-# シミュレーション状態管理
-_simulation_status = {
+# シミュレーション状態管理（ワーカーでの変更がAPIプロセスに反映される）
+_simulation_status = job_service.SharedStatus("simulation", {
     "is_running": False,
     "progress": 0,
     "total": 0,
     "results": None,
     "error": None,
-}
+})
 
 
 class RetrainParams(BaseModel):
@@ -63,12 +61,12 @@ class RetrainParams(BaseModel):
 
 
 @router.post("/retrain")
-async def retrain_model(params: RetrainParams):
+def retrain_model(params: RetrainParams, db: Session = Depends(get_db)):
     """
     モデルの再学習を開始
 
-    バックグラウンドで再学習を実行します。
-    進捗は GET /api/v1/model/status で確認できます。
+    ワーカープロセスで再学習を実行します。
+    進捗は GET /api/v1/model/status で確認でき、POST /api/v1/jobs/{job_id}/cancel で中止できます。
 
     ## モード
 
@@ -116,6 +114,7 @@ async def retrain_model(params: RetrainParams):
                 f"train_end={params.train_end_date}, valid_end={params.valid_end_date}, race_type={race_type}")
 
     result = retraining_service.start_retraining(
+        db,
         min_date=parsed_min_date,
         num_boost_round=params.num_boost_round,
         early_stopping=params.early_stopping,
@@ -135,12 +134,13 @@ async def retrain_model(params: RetrainParams):
     return {
         "status": "success",
         "message": "Retraining started",
+        "job_id": result["job_id"],
         "started_at": result["started_at"],
     }
 
 
 @router.get("/status")
-async def get_retraining_status():
+def get_retraining_status():
     """
     再学習の状態を取得
 
@@ -154,12 +154,13 @@ async def get_retraining_status():
 
 
 @router.get("/status/stream")
-async def stream_retraining_status():
+async def stream_retraining_status(last_event_id: Optional[str] = Header(None)):
     """
     再学習の進捗をSSEでストリーミング
 
     リアルタイムで学習の進捗状況を受け取れます。
     学習完了またはエラー時に接続が終了します。
+    再接続時は Last-Event-ID ヘッダー以降のイベントが再送されます。
 
     ## 使用例（JavaScript）
     ```javascript
@@ -170,59 +171,16 @@ async def stream_retraining_status():
     };
     ```
     """
-    async def event_generator():
-        # リスナーを登録
-        progress_queue = retraining_service.register_progress_listener()
-
-        try:
-            # 初期状態を送信
-            status = retraining_service.get_retraining_status()
-            yield f"data: {json.dumps({'type': 'connected', 'is_running': status['is_running']})}\n\n"
-
-            # イベントを待機してストリーミング
-            while True:
-                try:
-                    # 非同期でキューからイベントを取得（1秒タイムアウト）
-                    event = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: progress_queue.get(timeout=1.0)
-                    )
-
-                    # イベントをSSE形式で送信
-                    yield f"data: {json.dumps(event)}\n\n"
-
-                    # 完了またはエラーの場合は終了
-                    if event.get("type") in ("complete", "error"):
-                        break
-
-                except Exception:
-                    # タイムアウト時はハートビートを送信
-                    status = retraining_service.get_retraining_status()
-                    if not status["is_running"]:
-                        # 学習が終了している場合は接続終了
-                        yield f"data: {json.dumps({'type': 'idle', 'message': '学習は実行されていません'})}\n\n"
-                        break
-                    else:
-                        # ハートビート
-                        yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
-
-        finally:
-            # リスナーを解除
-            retraining_service.unregister_progress_listener(progress_queue)
-
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        }
+    return event_stream(
+        retraining_service.JOB_KIND,
+        lambda: retraining_service.get_retraining_status()["is_running"],
+        last_event_id,
+        idle_message="学習は実行されていません",
     )
 
 
 @router.get("/versions")
-async def list_model_versions(
+def list_model_versions(
     race_type: str = Query(DEFAULT_RACE_TYPE, description="Race type: central, local, banei"),
 ):
     """
@@ -244,7 +202,7 @@ async def list_model_versions(
 
 
 @router.get("/current")
-async def get_current_model(
+def get_current_model(
     race_type: str = Query(DEFAULT_RACE_TYPE, description="Race type: central, local, banei"),
 ):
     """
@@ -258,7 +216,7 @@ async def get_current_model(
     predictor = prediction_service.get_predictor(race_type)
 
     model_info = {
-        "version": prediction_service.MODEL_VERSIONS.get(race_type, prediction_service.MODEL_VERSION),
+        "version": prediction_service.get_model_versions().get(race_type, prediction_service.MODEL_VERSION),
         "race_type": race_type,
         "is_loaded": predictor.model is not None,
         "num_features": len(predictor.feature_columns) if predictor.feature_columns else 0,
@@ -274,7 +232,7 @@ async def get_current_model(
 
 
 @router.post("/switch")
-async def switch_model(
+def switch_model(
     version: str = Query(..., description="Model version to switch to"),
     race_type: str = Query(DEFAULT_RACE_TYPE, description="Race type: central, local, banei"),
 ):
@@ -283,7 +241,7 @@ async def switch_model(
 
     指定したバージョンのモデルに切り替えます。
     race_typeでレースタイプを指定できます。
-    現在はランタイム中の切り替えのみで、永続化はされません。
+    選択したバージョンは保存され、他のワーカーも数秒以内に同じバージョンに切り替わります。
     """
     if race_type not in RACE_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid race_type: {race_type}. Must be one of {RACE_TYPES}")
@@ -337,7 +295,7 @@ async def switch_model(
 
 
 @router.get("/feature-importance")
-async def get_feature_importance(
+def get_feature_importance(
     limit: int = Query(20, description="Number of top features to return"),
     race_type: str = Query(DEFAULT_RACE_TYPE, description="Race type: central, local, banei"),
 ):
@@ -421,6 +379,47 @@ def _calculate_umaren_prob(probabilities: dict, h1: int, h2: int, n_horses: int)
     return min(umaren_prob, 1.0)
 
 
+def _predict_races(predictor, frames: list) -> list[bool]:
+    """
+    複数レースの特徴量をまとめて1回で予測し、各レースの DataFrame に
+    probability（レース内で正規化した勝率）と pred_rank を追加
+
+    まとめての予測が失敗したときはレースごとに予測し直し、失敗したレースだけを除く。
+
+    Returns:
+        レースごとに予測できたか
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not frames:
+        return []
+
+    def assign(df, probabilities_arr):
+        df["probability"] = probabilities_arr
+        df["pred_rank"] = (-probabilities_arr).argsort().argsort() + 1
+
+    sizes = [len(df) for df in frames]
+    race_ids = np.repeat(np.arange(len(frames)), sizes)
+    try:
+        probabilities = predictor.predict_proba_grouped(pd.concat(frames, ignore_index=True), race_ids)
+    except RuntimeError as e:
+        logger.warning(f"Batched prediction failed, predicting race by race: {e}")
+    else:
+        for df, probabilities_arr in zip(frames, np.split(probabilities, np.cumsum(sizes)[:-1])):
+            assign(df, probabilities_arr)
+        return [True] * len(frames)
+
+    predicted = []
+    for df in frames:
+        try:
+            assign(df, predictor.predict_proba(df))
+            predicted.append(True)
+        except RuntimeError:
+            predicted.append(False)
+    return predicted
+
+
 def _run_simulation(
     db: Session,
     params: SimulationParams,
@@ -477,6 +476,8 @@ def _run_simulation(
         tansho_bets = []
         umaren_bets = []
 
+        # 特徴量抽出（予測は全レースまとめて1回で行う）
+        race_data = []
         for i, race in enumerate(races):
             _simulation_status["progress"] = i + 1
 
@@ -497,15 +498,13 @@ def _run_simulation(
             if not actual_results or not odds_data:
                 continue
 
-            # 予測（正規化済み確率を使用）
-            try:
-                probabilities_arr = predictor.predict_proba(df)
-            except RuntimeError:
-                continue
+            race_data.append((df, actual_results, odds_data))
 
-            df["probability"] = probabilities_arr
-            df["pred_rank"] = (-probabilities_arr).argsort().argsort() + 1
+        # 予測（正規化済み確率を使用）
+        predicted = _predict_races(predictor, [df for df, _, _ in race_data])
+        race_data = [data for data, ok in zip(race_data, predicted) if ok]
 
+        for df, actual_results, odds_data in race_data:
             probabilities = dict(zip(df["horse_number"].astype(int), df["probability"]))
 
             # 単勝シミュレーション
@@ -627,36 +626,49 @@ def _run_simulation(
         _simulation_status["is_running"] = False
 
 
+def run_simulation_job(**params):
+    """シミュレーションのワーカープロセスの入口"""
+    run_in_batch_session(_run_simulation, SimulationParams(**params))
+    return _simulation_status["results"]
+
+
 @router.post("/simulate")
-async def start_simulation(
-    background_tasks: BackgroundTasks,
+def start_simulation(
     params: SimulationParams,
     db: Session = Depends(get_db),
 ):
     """
     期待値ベースのシミュレーションを開始
 
-    バックグラウンドで実行され、結果は /api/v1/model/simulate/status で確認できます。
+    ワーカープロセスで実行され、結果は /api/v1/model/simulate/status で確認できます。
     """
     global _simulation_status
 
-    if _simulation_status["is_running"]:
+    job = None
+    if not _simulation_status["is_running"]:
+        job = job_service.submit_job(db, "simulation", run_simulation_job, params=params.model_dump())
+    if job is None:
         raise HTTPException(
             status_code=409,
             detail="シミュレーションは既に実行中です"
         )
-
-    # バックグラウンドで実行
-    background_tasks.add_task(_run_simulation, db, params)
+    _simulation_status["is_running"] = True
 
     return {
         "status": "success",
         "message": "シミュレーションを開始しました",
+        "job_id": job.id,
     }
 
 
+@router.get("/simulate/stream")
+async def stream_simulation_status(last_event_id: Optional[str] = Header(None)):
+    """シミュレーションの進捗をSSEでストリーミング"""
+    return event_stream("simulation", lambda: _simulation_status["is_running"], last_event_id)
+
+
 @router.get("/simulate/status")
-async def get_simulation_status():
+def get_simulation_status():
     """
     シミュレーションの状態と結果を取得
     """
@@ -667,7 +679,7 @@ async def get_simulation_status():
 
 
 @router.post("/simulate/sync")
-async def run_simulation_sync(
+def run_simulation_sync(
     params: SimulationParams,
     db: Session = Depends(get_db),
 ):
@@ -701,8 +713,8 @@ async def run_simulation_sync(
 
 # ================== 閾値スイープ分析 ==================
 
-# 閾値スイープ状態管理
-_sweep_status = {
+# 閾値スイープ状態管理（ワーカーでの変更がAPIプロセスに反映される）
+_sweep_status = job_service.SharedStatus("threshold_sweep", {
     "is_running": False,
     "phase": "idle",  # "idle", "preparing", "sweeping", "complete"
     "progress": 0,
@@ -713,7 +725,7 @@ _sweep_status = {
     "error": None,
     "model_version": None,
     "num_features": None,
-}
+})
 
 
 class ThresholdSweepParams(BaseModel):
@@ -777,6 +789,8 @@ def _run_threshold_sweep(
     閾値を変化させながらシミュレーションを実行し、
     各閾値での回収率・シャープレシオを計算
     """
+    import numpy as np
+
     global _sweep_status
 
     predictor = prediction_service.get_predictor(params.race_type)
@@ -837,22 +851,20 @@ def _run_threshold_sweep(
         if not actual_results or not odds_data:
             continue
 
-        try:
-            probabilities_arr = predictor.predict_proba(df)
-        except RuntimeError:
-            continue
-
-        df["probability"] = probabilities_arr
-        df["pred_rank"] = (-probabilities_arr).argsort().argsort() + 1
-        probabilities = dict(zip(df["horse_number"].astype(int), df["probability"]))
-
         race_data.append({
             "df": df,
             "actual_results": actual_results,
             "odds_data": odds_data,
-            "probabilities": probabilities,
         })
 
+    # 予測（全レースまとめて1回で行う）
+    predicted = _predict_races(predictor, [rd["df"] for rd in race_data])
+    race_data = [rd for rd, ok in zip(race_data, predicted) if ok]
+
+    for rd in race_data:
+        df = rd["df"]
+        rd["probabilities"] = dict(zip(df["horse_number"].astype(int), df["probability"]))
+
     # 進捗: 閾値スイープフェーズ
     _sweep_status["phase"] = "sweeping"
     total_thresholds = int((params.ev_max - params.ev_min) / params.ev_step) + 1
@@ -975,36 +987,49 @@ def _run_threshold_sweep(
     return results
 
 
+def run_threshold_sweep_job(**params):
+    """閾値スイープのワーカープロセスの入口"""
+    run_in_batch_session(_run_threshold_sweep_async, ThresholdSweepParams(**params))
+    return _sweep_status["results"]
+
+
 @router.post("/simulate/threshold-sweep")
-async def start_threshold_sweep(
-    background_tasks: BackgroundTasks,
+def start_threshold_sweep(
     params: ThresholdSweepParams,
     db: Session = Depends(get_db),
 ):
     """
     閾値スイープ分析を開始（非同期）
 
-    バックグラウンドで実行され、進捗は /api/v1/model/simulate/threshold-sweep/status で確認できます。
+    ワーカープロセスで実行され、進捗は /api/v1/model/simulate/threshold-sweep/status で確認できます。
     """
     global _sweep_status
 
-    if _sweep_status["is_running"]:
+    job = None
+    if not _sweep_status["is_running"]:
+        job = job_service.submit_job(db, "threshold_sweep", run_threshold_sweep_job, params=params.model_dump())
+    if job is None:
         raise HTTPException(
             status_code=409,
             detail="閾値スイープ分析は既に実行中です"
         )
-
-    # バックグラウンドで実行
-    background_tasks.add_task(_run_threshold_sweep_async, db, params)
+    _sweep_status["is_running"] = True
 
     return {
         "status": "success",
         "message": "閾値スイープ分析を開始しました",
+        "job_id": job.id,
     }
 
 
+@router.get("/simulate/threshold-sweep/stream")
+async def stream_threshold_sweep_status(last_event_id: Optional[str] = Header(None)):
+    """閾値スイープ分析の進捗をSSEでストリーミング"""
+    return event_stream("threshold_sweep", lambda: _sweep_status["is_running"], last_event_id)
+
+
 @router.get("/simulate/threshold-sweep/status")
-async def get_threshold_sweep_status():
+def get_threshold_sweep_status():
     """
     閾値スイープ分析の進捗と結果を取得
     """
@@ -1015,7 +1040,7 @@ async def get_threshold_sweep_status():
 
 
 @router.post("/simulate/threshold-sweep/sync")
-async def run_threshold_sweep_sync(
+def run_threshold_sweep_sync(
     params: ThresholdSweepParams,
     db: Session = Depends(get_db),
 ):
@@ -1061,7 +1086,7 @@ from app.services import storage_service
 
 
 @router.get("/storage/status")
-async def get_storage_status():
+def get_storage_status():
     """
     Supabase Storage の接続状態を確認
     """
@@ -1074,7 +1099,7 @@ async def get_storage_status():
 
 
 @router.get("/storage/models")
-async def list_cloud_models():
+def list_cloud_models():
     """
     クラウド（Supabase Storage）に保存されているモデル一覧を取得
     """
@@ -1100,7 +1125,7 @@ class UploadModelParams(BaseModel):
 
 
 @router.post("/storage/upload")
-async def upload_model_to_cloud(params: UploadModelParams):
+def upload_model_to_cloud(params: UploadModelParams):
     """
     ローカルの学習済みモデルをクラウド（Supabase Storage）にアップロード
 
@@ -1169,10 +1194,11 @@ class DownloadModelParams(BaseModel):
     """モデルダウンロードパラメータ"""
     version: str = "v1"
     set_as_current: bool = True
+    race_type: str = DEFAULT_RACE_TYPE
 
 
 @router.post("/storage/download")
-async def download_model_from_cloud(params: DownloadModelParams):
+def download_model_from_cloud(params: DownloadModelParams):
     """
     クラウド（Supabase Storage）からモデルをダウンロード
 
@@ -1186,35 +1212,25 @@ async def download_model_from_cloud(params: DownloadModelParams):
         )
 
     try:
-        # ダウンロード
-        model_data = storage_service.download_model(params.version)
+        # ダウンロード（チェックサムを確認してモデルディレクトリに保存）
+        local_path = storage_service.download_model(params.version, params.race_type)
 
-        if model_data is None:
+        if local_path is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Model version '{params.version}' not found in cloud storage"
             )
 
-        # ローカルに保存
-        from app.services.predictor import HorseRacingPredictor
-        from app.services.predictor.model import MODEL_DIR
-
-        MODEL_DIR.mkdir(parents=True, exist_ok=True)
-        local_path = MODEL_DIR / f"model_{params.version}.pkl"
-
-        import pickle
-        with open(local_path, "wb") as f:
-            pickle.dump(model_data, f)
-
         logger.info(f"Model downloaded from cloud: {params.version} -> {local_path}")
 
         # 現在のモデルとして設定
         if params.set_as_current:
-            new_predictor = HorseRacingPredictor(model_version=params.version)
-            new_predictor.load()
-            prediction_service._predictor = new_predictor
-            prediction_service.MODEL_VERSION = params.version
-            logger.info(f"Model set as current: {params.version}")
+            from app.services.predictor import HorseRacingPredictor
+
+            new_predictor = HorseRacingPredictor(model_version=params.version, race_type=params.race_type)
+            new_predictor.load(local_path)
+            prediction_service.set_predictor(new_predictor, params.race_type)
+            logger.info(f"Model set as current: {params.race_type}={params.version}")
 
         return {
             "status": "success",
@@ -1247,7 +1263,7 @@ class RetrainAndUploadParams(BaseModel):
 
 
 @router.post("/retrain-and-upload")
-async def retrain_and_upload(params: RetrainAndUploadParams):
+def retrain_and_upload(params: RetrainAndUploadParams, db: Session = Depends(get_db)):
     """
     モデルを再学習してクラウドにアップロード（ハイブリッド構成用）
 
@@ -1293,6 +1309,7 @@ async def retrain_and_upload(params: RetrainAndUploadParams):
 
     # 再学習を開始
     result = retraining_service.start_retraining(
+        db,
         min_date=None,
         num_boost_round=params.num_boost_round,
         early_stopping=params.early_stopping,
@@ -1316,13 +1333,13 @@ async def retrain_and_upload(params: RetrainAndUploadParams):
     return {
         "status": "success",
         "message": f"Retraining started. Model will be uploaded as version '{params.version}' after completion.",
+        "job_id": result["job_id"],
         "started_at": result["started_at"],
         "upload_version": params.version,
     }
 
 
 from app.config import settings
-from app.services import feature_sync_service
 
 
 # ================== 特徴量同期（Colab用） ==================
@@ -1333,8 +1350,7 @@ class FeatureSyncParams(BaseModel):
 
 
 @router.post("/sync-features")
-async def sync_features_to_supabase(
-    background_tasks: BackgroundTasks,
+def sync_features_to_supabase(
     params: FeatureSyncParams = FeatureSyncParams(),
     db: Session = Depends(get_db),
 ):
@@ -1350,25 +1366,31 @@ async def sync_features_to_supabase(
             detail="Supabase is not configured"
         )
 
-    # バックグラウンドで実行
-    background_tasks.add_task(
-        feature_sync_service.sync_all_features,
-        limit=params.limit
+    # ワーカープロセスで実行（feature_sync_service は pandas を読み込むのでここで import する）
+    from app.services import feature_sync_service
+
+    job = job_service.submit_job(
+        db, "feature_sync", feature_sync_service.sync_all_features, params={"limit": params.limit}
     )
+    if job is None:
+        raise HTTPException(status_code=409, detail="Feature sync is already running")
 
     return {
         "status": "success",
         "message": "Feature sync started in background",
+        "job_id": job.id,
     }
 
 
 @router.get("/sync-features/status")
-async def get_feature_sync_status():
+def get_feature_sync_status():
     """
     特徴量同期の状態を確認
 
     Supabase DBの特徴量テーブルの件数を返します。
     """
+    from app.services import feature_sync_service
+
     supabase = feature_sync_service.get_supabase_client()
     if not supabase:
         return {
@@ -8,7 +8,7 @@ router = APIRouter()
 
 
 @router.post("")
-async def create_prediction(
+def create_prediction(
     race_id: str = Query(..., description="Race ID to predict"),
     db: Session = Depends(get_db),
 ):
@@ -28,7 +28,7 @@ async def create_prediction(
 
 
 @router.get("/{race_id}")
-async def get_prediction(
+def get_prediction(
     race_id: str,
     db: Session = Depends(get_db),
 ):
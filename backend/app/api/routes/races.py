@@ -4,6 +4,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from app.api.deps import scrape_slot
 from app.db.session import get_db
 from app.services.scraper import RaceListScraper, RaceDetailScraper, RaceCardListScraper, RaceCardScraper
 from app.services import race_service
@@ -12,12 +13,13 @@ router = APIRouter()
 
 
 @router.get("")
-async def get_races(
+def get_races(
     target_date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format"),
     course: Optional[str] = Query(None, description="Course name"),
     race_type: Optional[str] = Query(None, description="Race type: central, local, banei"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (takes precedence over offset)"),
     db: Session = Depends(get_db),
 ):
     """Get race list"""
@@ -28,12 +30,17 @@ async def get_races(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-    total, races = race_service.get_races_by_date(
-        db, target_date=parsed_date, course=course, race_type=race_type, limit=limit, offset=offset
-    )
+    try:
+        total, races, next_cursor = race_service.get_races_page(
+            db, target_date=parsed_date, course=course, race_type=race_type,
+            limit=limit, offset=offset, cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "total": total,
+        "next_cursor": next_cursor,
         "races": [
             {
                 "race_id": r.race_id,
@@ -52,12 +59,12 @@ async def get_races(
 
 
 @router.get("/{race_id}")
-async def get_race(
+def get_race(
     race_id: str,
     db: Session = Depends(get_db),
 ):
     """Get race detail"""
-    race = race_service.get_race_by_id(db, race_id)
+    race = race_service.get_race_by_id(db, race_id, with_entries=True)
     if not race:
         raise HTTPException(status_code=404, detail="Race not found")
 
@@ -92,8 +99,8 @@ async def get_race(
     }
 
 
-@router.post("/scrape")
-async def scrape_races(
+@router.post("/scrape", dependencies=[Depends(scrape_slot)])
+def scrape_races(
     target_date: str = Query(..., description="Date in YYYY-MM-DD format"),
     save_to_db: bool = Query(False, description="Save to database"),
     jra_only: bool = Query(False, description="Only scrape JRA (central racing) races (deprecated, use race_type)"),
@@ -124,8 +131,8 @@ async def scrape_races(
     }
 
 
-@router.post("/scrape/{race_id}")
-async def scrape_race_detail(
+@router.post("/scrape/{race_id}", dependencies=[Depends(scrape_slot)])
+def scrape_race_detail(
     race_id: str,
     save_to_db: bool = Query(True, description="Save to database"),
     skip_existing: bool = Query(True, description="Skip if race already has entries"),
@@ -172,8 +179,8 @@ async def scrape_race_detail(
 
 # === Race Card (出馬表) Endpoints for Today's Races ===
 
-@router.post("/scrape-card")
-async def scrape_race_cards(
+@router.post("/scrape-card", dependencies=[Depends(scrape_slot)])
+def scrape_race_cards(
     target_date: str = Query(..., description="Date in YYYY-MM-DD format"),
     save_to_db: bool = Query(True, description="Save to database"),
     jra_only: bool = Query(False, description="Only scrape JRA (central racing) races (deprecated, use race_type)"),
@@ -205,8 +212,8 @@ async def scrape_race_cards(
     }
 
 
-@router.post("/scrape-card/{race_id}")
-async def scrape_race_card_detail(
+@router.post("/scrape-card/{race_id}", dependencies=[Depends(scrape_slot)])
+def scrape_race_card_detail(
     race_id: str,
     save_to_db: bool = Query(True, description="Save to database"),
     skip_existing: bool = Query(True, description="Skip if race already has entries"),
@@ -3,9 +3,12 @@ Supabase Sync API
 
 ローカルDBからSupabaseへのデータ同期エンドポイント
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from app.api.sse import event_stream
 from app.db.session import get_db
 from app.logging_config import get_logger
 from app.services import sync_service
@@ -15,18 +18,18 @@ router = APIRouter()
 
 
 @router.post("/to-supabase")
-async def start_sync_to_supabase(
+def start_sync_to_supabase(
     force_full: bool = Query(False, description="全件同期を強制する場合はTrue"),
     db: Session = Depends(get_db),
 ):
     """
     ローカルDBのデータをSupabaseに同期（非同期実行・差分同期）
 
-    デフォルトでは前回同期以降に更新されたレコードと、
+    デフォルトでは変更ログに記録された前回同期以降の変更と、
     前回失敗したレコードのみを同期します。
-    force_full=True で全件同期を実行します。
+    force_full=True（または初回）で全件同期を実行します。
     """
-    status = sync_service.get_sync_status()
+    status = sync_service.get_sync_status(db)
     if status["is_running"]:
         raise HTTPException(status_code=409, detail="同期が既に実行中です")
 
@@ -43,7 +46,7 @@ async def start_sync_to_supabase(
 
 
 @router.get("/status")
-async def get_sync_status():
+def get_sync_status(db: Session = Depends(get_db)):
     """
     同期状態を取得
 
@@ -54,5 +57,18 @@ async def get_sync_status():
         - current_table: 現在処理中のテーブル名
         - results: 完了時の結果（各テーブルの同期数・エラー数）
         - error: エラーメッセージ（失敗時）
+        - last_sync_at: 前回同期時刻
+        - pending_changes: 未同期の変更数
+        - pending_retries: うち前回失敗した再試行分
+    """
+    return sync_service.get_sync_status(db)
+
+
+@router.get("/stream")
+async def stream_sync_status(last_event_id: Optional[str] = Header(None)):
+    """
+    同期の進捗をSSEでストリーミング
+
+    進捗は "status"、終了は "complete" / "error" イベントで届きます。
     """
-    return sync_service.get_sync_status()
+    return event_stream(sync_service.SYNC_CHANNEL, sync_service.is_sync_running, last_event_id)
@@ -0,0 +1,75 @@
+"""
+進捗のSSEレスポンス
+
+event_broker のチャンネルを購読し、イベントを "id: <連番>" 付きで送る。
+再接続時の Last-Event-ID ヘッダー以降のイベントは再送される。
+"""
+import asyncio
+import json
+from typing import Callable, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.services.event_broker import TERMINAL_TYPES, broker
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if value and value.strip().isdigit():
+        return int(value.strip())
+    return None
+
+
+def _format(event: dict, event_id: Optional[int] = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def event_stream(
+    channel: str,
+    is_running: Callable[[], bool],
+    last_event_id: Optional[str] = None,
+    idle_message: str = "実行中の処理はありません",
+) -> StreamingResponse:
+    """
+    チャンネルのイベントをSSEで送るレスポンス
+
+    Args:
+        channel: event_broker のチャンネル名
+        is_running: 処理が実行中か（イベントループ上で呼ぶのでブロックしないこと）
+        last_event_id: Last-Event-ID ヘッダーの値
+        idle_message: 実行中でない場合に送るメッセージ
+    """
+    async def event_generator():
+        subscription = broker.subscribe(channel, _parse_last_event_id(last_event_id))
+        try:
+            yield _format({"type": "connected", "is_running": is_running()})
+
+            while True:
+                if not subscription.pending() and not is_running():
+                    # 他スレッドから配信予約済みのイベントを受け取ってから判定する
+                    await asyncio.sleep(0)
+                    if not subscription.pending():
+                        yield _format({"type": "idle", "message": idle_message})
+                        break
+
+                item = await subscription.get(timeout=settings.SSE_HEARTBEAT_SECONDS)
+                if item is None:
+                    if is_running():
+                        yield _format({"type": "heartbeat"})
+                    continue
+
+                event_id, event = item
+                yield _format(event, event_id)
+                if event.get("type") in TERMINAL_TYPES:
+                    break
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
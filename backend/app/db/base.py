@@ -1,5 +1,19 @@
-from sqlalchemy import create_engine
+"""
+エンジンとセッション
+
+APIリクエスト用（engine / SessionLocal）とバックグラウンドジョブ用
+（batch_engine / BatchSessionLocal）でコネクションプールを分け、
+長時間のスクレイピングや同期がリクエストの接続を使い切らないようにする。
+プールの設定は DB_* / DB_BATCH_* で変更する。
+"""
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.config import settings
 
@@ -8,5 +22,136 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+class PoolStats:
+    """プールからの接続取得の待ち時間"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """接続取得の待ち時間を stats に記録する QueuePool"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return entry
+
+
+_pool_stats: dict[str, PoolStats] = {}
+_engines: dict[str, Engine] = {}
+
+
+def _pool_settings(name: str) -> dict:
+    """プール名（api / batch）に対応する設定"""
+    prefix = "DB_" if name == "api" else f"DB_{name.upper()}_"
+    return {
+        "pool_size": getattr(settings, f"{prefix}POOL_SIZE"),
+        "max_overflow": getattr(settings, f"{prefix}MAX_OVERFLOW"),
+        "pool_timeout": getattr(settings, f"{prefix}POOL_TIMEOUT"),
+        "pool_recycle": getattr(settings, f"{prefix}POOL_RECYCLE"),
+        "pool_pre_ping": getattr(settings, f"{prefix}POOL_PRE_PING"),
+        "statement_timeout_ms": getattr(settings, f"{prefix}STATEMENT_TIMEOUT_MS"),
+    }
+
+
+def engine_options(url: str, statement_timeout_ms: int = 0, echo: bool = False, **pool) -> dict:
+    """
+    create_engine に渡す引数
+
+    SQLiteのインメモリDBは既定のプールのまま（プールサイズ等は使わない）。
+    statement_timeout は PostgreSQL の接続オプションで設定する。
+    """
+    parsed = make_url(url)
+    options: dict = {"echo": echo}
+    backend = parsed.get_backend_name()
+
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+
+    options.update(poolclass=TimedQueuePool, **pool)
+    if backend == "postgresql" and statement_timeout_ms > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout_ms)}"}
+    return options
+
+
+def create_db_engine(name: str, url: Optional[str] = None, **overrides) -> Engine:
+    """
+    名前付きのコネクションプールでエンジンを作成
+
+    Args:
+        name: プール名（api / batch）。DB_* / DB_BATCH_* の設定を使う
+        url: 接続先（省略時は DATABASE_URL）
+        overrides: 設定を上書きする引数（pool_size, statement_timeout_ms など）
+    """
+    url = url or settings.DATABASE_URL
+    params = {**_pool_settings(name), "echo": settings.DB_ECHO, **overrides}
+    options = engine_options(url, **params)
+
+    stats = _pool_stats.setdefault(name, PoolStats(name))
+    if options.get("poolclass") is TimedQueuePool:
+        # recreate() でも同じ集計先を使うよう、プール名ごとのサブクラスに持たせる
+        options["poolclass"] = type(f"TimedQueuePool_{name}", (TimedQueuePool,), {"stats": stats})
+
+    engine = create_engine(url, **options)
+    _engines[name] = engine
+    return engine
+
+
+def get_pool_stats() -> dict[str, dict]:
+    """プールごとの接続数と取得待ち時間"""
+    result = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        info = _pool_stats[name].snapshot()
+        if isinstance(pool, QueuePool):
+            info.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+                idle=pool.checkedin(),
+            )
+        result[name] = info
+    return result
+
+
+engine = create_db_engine("api")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+batch_engine = create_db_engine("batch")
+BatchSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=batch_engine)
@@ -0,0 +1,145 @@
+"""
+一覧APIのページネーション
+
+- count_rows: SELECT count(*) で件数を取得（フィルタごとに短時間キャッシュ可能）
+- キーセットページネーション: 直前ページの最後の行の並び順キーを不透明なカーソル文字列にし、
+  OFFSETを使わずに次ページを取得する（深いページでも一定時間）
+"""
+import base64
+import json
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Hashable, Optional, Sequence, Union
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import ColumnElement, Select
+
+from app.config import settings
+
+# (列, 降順か) の並び
+OrderKey = Sequence[tuple[ColumnElement, bool]]
+
+_count_cache: dict[Hashable, tuple[float, int]] = {}
+_count_lock = threading.Lock()
+
+
+def count_rows(
+    db: Session,
+    stmt: Union[Select, Query],
+    cache_key: Optional[Hashable] = None,
+) -> int:
+    """
+    クエリに一致する件数を SELECT count(*) で取得
+
+    Args:
+        db: データベースセッション
+        stmt: 一覧クエリ（ORDER BY / LIMIT は無視される）
+        cache_key: フィルタ条件を表すキー。COUNT_CACHE_TTL_SECONDS > 0 の場合にキャッシュする
+    """
+    ttl = settings.COUNT_CACHE_TTL_SECONDS
+    if cache_key is not None and ttl > 0:
+        with _count_lock:
+            cached = _count_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+    if isinstance(stmt, Query):
+        stmt = stmt.statement
+    subquery = stmt.order_by(None).limit(None).offset(None).subquery()
+    total = db.execute(select(func.count()).select_from(subquery)).scalar() or 0
+
+    if cache_key is not None and ttl > 0:
+        with _count_lock:
+            _count_cache[cache_key] = (time.monotonic(), total)
+    return total
+
+
+def clear_count_cache() -> None:
+    """件数キャッシュを破棄"""
+    with _count_lock:
+        _count_cache.clear()
+
+
+def order_by_clauses(order: OrderKey) -> list:
+    """並び順キーのORDER BY句"""
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """並び順キーの値を不透明なカーソル文字列に変換"""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, order: OrderKey) -> list[Any]:
+    """
+    カーソル文字列を並び順キーの値に戻す
+
+    Raises:
+        ValueError: 不正なカーソル
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(order):
+        raise ValueError("Invalid cursor")
+
+    decoded = []
+    for (column, _), value in zip(order, values):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            elif python_type is date:
+                decoded.append(date.fromisoformat(value))
+            else:
+                decoded.append(python_type(value))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    return decoded
+
+
+def keyset_condition(order: OrderKey, values: Sequence[Any]) -> ColumnElement:
+    """並び順でカーソル位置より後ろの行に一致する条件（昇順・降順の混在に対応）"""
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        after = column < values[i] if descending else column > values[i]
+        equal_prefix = [c == v for (c, _), v in zip(order[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+
+def paginate(
+    db: Session,
+    stmt: Select,
+    order: OrderKey,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> tuple[list[Any], Optional[str]]:
+    """
+    並び順キーでページを取得
+
+    cursor がある場合はキーセット、ない場合は offset で取得する。
+
+    Returns:
+        (行, 次ページのカーソル（最終ページならNone）)
+    """
+    if cursor:
+        stmt = stmt.where(keyset_condition(order, decode_cursor(cursor, order)))
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    # 1件多く取得して次ページの有無を判定
+    rows = list(db.execute(stmt.order_by(*order_by_clauses(order)).limit(limit + 1)).scalars().all())
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column, _ in order])
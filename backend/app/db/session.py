@@ -1,6 +1,9 @@
-from typing import Generator
+from contextlib import contextmanager
+from typing import Callable, Generator, Iterator
 
-from app.db.base import SessionLocal
+from sqlalchemy.orm import Session
+
+from app.db.base import BatchSessionLocal, SessionLocal
 
 
 def get_db() -> Generator:
@@ -9,3 +12,19 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def batch_session() -> Iterator[Session]:
+    """バックグラウンドジョブ用のセッション（バッチ用プール）"""
+    db = BatchSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def run_in_batch_session(func: Callable, *args, **kwargs):
+    """バッチ用セッションを開いて func(db, *args) を実行（BackgroundTasks 用）"""
+    with batch_session() as db:
+        return func(db, *args, **kwargs)
@@ -2,24 +2,48 @@
 ログ設定モジュール
 
 JSON形式のログ出力とローテーションを設定
+
+ログを出したスレッドではレコードをキューに入れるだけで、整形と書き込みは
+バックグラウンドのスレッド（QueueListener）がまとめて行う。
+ループ内の DEBUG ログは呼び出し箇所ごとに件数を制限し、超えた分は間引く。
 """
+import atexit
+import json
 import logging
 import logging.handlers
-import json
+import queue
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 from app.config import settings
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 動作中のリスナー（setup_logging で作り直す）
+_listener: Optional["BatchingQueueListener"] = None
+
+
+def _dumps(data: dict) -> str:
+    """JSON文字列に変換（orjson があれば使う）"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode()
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
 
 class JSONFormatter(logging.Formatter):
     """JSON形式でログを出力するフォーマッター"""
 
     def format(self, record: logging.LogRecord) -> str:
+        # 書き込みは後でまとめて行うので、時刻はログを出した時点のものを使う
+        seconds = int(record.created)
         log_data: dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+                         + f".{int((record.created - seconds) * 1_000_000):06d}Z",
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -27,11 +51,136 @@ class JSONFormatter(logging.Formatter):
 
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data["exception"] = record.exc_text
 
         if hasattr(record, "extra_data"):
             log_data["data"] = record.extra_data
 
-        return json.dumps(log_data, ensure_ascii=False)
+        if hasattr(record, "suppressed"):
+            log_data["suppressed"] = record.suppressed
+
+        return _dumps(log_data)
+
+
+class HotLoopFilter(logging.Filter):
+    """
+    ループ内の DEBUG ログの間引き
+
+    呼び出し箇所（ファイル・行）ごとに1秒あたり rate 件までは通し、
+    超えた分は sample_every 件に1件だけ通す。間引いた件数は次に通したレコードの
+    suppressed に入れる。件数はロックを取らずに数えるので、並行時は多少ずれる。
+    """
+
+    def __init__(self, rate: int, sample_every: int, level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.sample_every = sample_every
+        self.level = level
+        # (ファイル, 行) -> [区間の開始時刻, 区間内の件数, 間引いた件数]
+        self._sites: dict[tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.level or self.rate <= 0:
+            return True
+
+        key = (record.pathname, record.lineno)
+        site = self._sites.get(key)
+        if site is None:
+            site = self._sites[key] = [record.created, 0, 0]
+        elif record.created - site[0] >= 1.0:
+            site[0] = record.created
+            site[1] = 0
+
+        site[1] += 1
+        over = site[1] - self.rate
+        if over > 0 and (self.sample_every <= 0 or over % self.sample_every):
+            site[2] += 1
+            return False
+
+        if site[2]:
+            record.suppressed = site[2]
+            site[2] = 0
+        return True
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """レコードをキューに入れるハンドラ（例外のトレースバックは文字列にして渡す）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 標準の prepare は例外をメッセージに連結してしまうので、exc_text に分けて残す
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """キューのレコードをまとめて取り出し、ハンドラごとに1回の書き込みで出力する"""
+
+    def __init__(self, log_queue, *handlers, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def _monitor(self) -> None:
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+
+            records = [record for record in batch if record is not self._sentinel]
+            if records:
+                self.handle_batch(records)
+            if len(records) < len(batch):
+                break
+
+    def handle_batch(self, records: list[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            accepted = [
+                record for record in records
+                if record.levelno >= handler.level and handler.filter(record)
+            ]
+            if not accepted:
+                continue
+            if isinstance(handler, logging.StreamHandler):
+                _write_batch(handler, accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+
+def _write_batch(handler: logging.StreamHandler, records: list[logging.LogRecord]) -> None:
+    """整形済みの行をまとめて書き込み、flush は1回だけ行う"""
+    try:
+        text = "".join(handler.format(record) + handler.terminator for record in records)
+        with handler.lock:
+            if isinstance(handler, logging.handlers.RotatingFileHandler):
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                if handler.maxBytes > 0 and handler.stream.tell() > 0 \
+                        and handler.stream.tell() + len(text) >= handler.maxBytes:
+                    handler.doRollover()
+            handler.stream.write(text)
+            handler.flush()
+    except Exception:
+        handler.handleError(records[-1])
+
+
+def shutdown_logging() -> None:
+    """キューに残っているログを書き出して、書き込みスレッドを止める"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def setup_logging() -> None:
@@ -45,6 +194,7 @@ def setup_logging() -> None:
     root_logger.setLevel(settings.LOG_LEVEL)
 
     # 既存のハンドラをクリア
+    shutdown_logging()
     root_logger.handlers.clear()
 
     # コンソールハンドラ
@@ -60,8 +210,6 @@ def setup_logging() -> None:
             )
         )
 
-    root_logger.addHandler(console_handler)
-
     # ファイルハンドラ（ローテーション付き）
     file_handler = logging.handlers.RotatingFileHandler(
         log_dir / "app.log",
@@ -71,7 +219,19 @@ def setup_logging() -> None:
     )
     file_handler.setLevel(settings.LOG_LEVEL)
     file_handler.setFormatter(JSONFormatter())
-    root_logger.addHandler(file_handler)
+
+    if settings.LOG_ASYNC:
+        global _listener
+        queue_handler = LogQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(HotLoopFilter(settings.LOG_DEBUG_RATE_LIMIT, settings.LOG_DEBUG_SAMPLE_EVERY))
+        root_logger.addHandler(queue_handler)
+        _listener = BatchingQueueListener(
+            queue_handler.queue, console_handler, file_handler, batch_size=settings.LOG_BATCH_SIZE
+        )
+        _listener.start()
+    else:
+        root_logger.addHandler(console_handler)
+        root_logger.addHandler(file_handler)
 
     # uvicornのログレベルを調整
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -81,6 +241,10 @@ def setup_logging() -> None:
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
 
+# プロセス終了時にキューに残ったログを書き出す
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str) -> logging.Logger:
     """名前付きロガーを取得する"""
     return logging.getLogger(name)
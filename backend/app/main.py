@@ -1,9 +1,16 @@
+import threading
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
+from app.db.base import get_pool_stats
 from app.logging_config import setup_logging, get_logger
-from app.api.routes import races, predictions, history, data, stats, model, horses, jockeys, sync
+from app.profiling import ProfilingMiddleware, install_sql_hooks, render_metrics
+from app.api.routes import races, predictions, history, data, stats, model, horses, jockeys, sync, jobs
+from app.services import job_service, prediction_service
+from app.services.race_scheduler import scheduler
 
 # ログ設定の初期化
 setup_logging()
@@ -15,6 +22,10 @@ app = FastAPI(
     version="0.1.0",
 )
 
+# リクエストごとの処理時間・DB時間・クエリ数の計測
+install_sql_hooks()
+app.add_middleware(ProfilingMiddleware)
+
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -34,16 +45,26 @@ app.include_router(model.router, prefix="/api/v1/model", tags=["model"])
 app.include_router(horses.router, prefix="/api/v1/horses", tags=["horses"])
 app.include_router(jockeys.router, prefix="/api/v1/jockeys", tags=["jockeys"])
 app.include_router(sync.router, prefix="/api/v1/sync", tags=["sync"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["jobs"])
 
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Keiba Predictor API starting up...")
+    # 再起動前から実行中・待機中のジョブを引き継ぐ
+    job_service.start_monitor(recover=True)
+    if settings.MODEL_WARMUP:
+        # リクエストの受け付けを待たせないよう、MLライブラリとモデルは別スレッドで読み込む
+        threading.Thread(target=prediction_service.warm_up, name="model-warmup", daemon=True).start()
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Keiba Predictor API shutting down...")
+    await scheduler.stop()
+    job_service.stop_monitor()
 
 
 @app.get("/")
@@ -56,6 +77,18 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/db")
+async def db_pool_health():
+    """コネクションプールの使用状況と接続取得の待ち時間"""
+    return {"pools": get_pool_stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """リクエスト・SQL・処理区間の計測値（Prometheus テキスト形式）"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=settings.HOST, port=settings.PORT)
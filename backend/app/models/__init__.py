@@ -4,8 +4,16 @@ from app.models.jockey import Jockey
 from app.models.prediction import Prediction, History
 from app.models.training import Training
 from app.models.trainer import Trainer, Sire
+from app.models.odds import OddsSnapshot, OddsLatest
+from app.models.backfill import BackfillJob, BackfillDate, BackfillRace
+from app.models.change_log import ChangeLog, SyncCursor
+from app.models.summary import JockeyStats, HistoryDailySummary, PredictionOutcome
+from app.models.entry_history import EntryHistory
+from app.models.job import Job, JobEvent
 
 __all__ = [
     "Race", "Entry", "Horse", "Jockey", "Prediction", "History", "Training",
-    "Trainer", "Sire",
+    "Trainer", "Sire", "OddsSnapshot", "OddsLatest", "BackfillJob", "BackfillDate", "BackfillRace",
+    "ChangeLog", "SyncCursor", "JockeyStats", "HistoryDailySummary",
+    "PredictionOutcome", "EntryHistory", "Job", "JobEvent",
 ]
@@ -0,0 +1,98 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import (
+    Boolean, Date, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    """Return current UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+# ジョブ・日付・レースの状態
+BACKFILL_PENDING = "pending"
+BACKFILL_RUNNING = "running"
+BACKFILL_LISTED = "listed"
+BACKFILL_COMPLETED = "completed"
+BACKFILL_SKIPPED = "skipped"
+BACKFILL_FAILED = "failed"
+
+
+class BackfillJob(Base):
+    """過去データ一括取得ジョブ"""
+    __tablename__ = "backfill_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    start_date: Mapped[date] = mapped_column(Date, nullable=False)
+    end_date: Mapped[date] = mapped_column(Date, nullable=False)
+    include_training: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    status: Mapped[str] = mapped_column(
+        String(20), default=BACKFILL_PENDING, nullable=False, index=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+    # Relationships
+    dates: Mapped[list["BackfillDate"]] = relationship(
+        back_populates="job", cascade="all, delete-orphan"
+    )
+
+
+class BackfillDate(Base):
+    """ジョブ内の日付ごとの進捗"""
+    __tablename__ = "backfill_dates"
+    __table_args__ = (
+        UniqueConstraint("job_id", "target_date", name="uq_backfill_dates_job_date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("backfill_jobs.id"), nullable=False, index=True
+    )
+    target_date: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default=BACKFILL_PENDING, nullable=False)
+
+    # レース一覧取得後に設定 (Noneなら一覧未取得)
+    races_total: Mapped[Optional[int]] = mapped_column(Integer)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
+
+    # Relationships
+    job: Mapped["BackfillJob"] = relationship(back_populates="dates")
+
+
+class BackfillRace(Base):
+    """ジョブ内のレースごとの進捗"""
+    __tablename__ = "backfill_races"
+    __table_args__ = (
+        UniqueConstraint("job_id", "race_id", name="uq_backfill_races_job_race"),
+        Index("ix_backfill_races_job_date", "job_id", "target_date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("backfill_jobs.id"), nullable=False
+    )
+    target_date: Mapped[date] = mapped_column(Date, nullable=False)
+    race_id: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default=BACKFILL_PENDING, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Integer, String, event, insert, inspect
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.db.base import Base
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def utcnow() -> datetime:
+    """Return current UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+# 変更種別
+CHANGE_INSERT = "insert"
+CHANGE_UPDATE = "update"
+CHANGE_DELETE = "delete"
+CHANGE_RETRY = "retry"
+
+# 変更を記録するテーブル
+TRACKED_TABLES = {"horses", "jockeys", "races", "entries", "trainings", "predictions"}
+
+
+class ChangeLog(Base):
+    """変更ログ（アウトボックス）。idの順に消費する"""
+    __tablename__ = "change_log"
+    # 消費済みの行を削除してもidを再利用しない（SQLite）
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(30), nullable=False)
+    record_id: Mapped[str] = mapped_column(String(50), nullable=False)
+
+    # insert, update, delete, retry
+    operation: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
+
+
+class SyncCursor(Base):
+    """変更ログの消費位置（コンシューマごと）"""
+    __tablename__ = "sync_cursors"
+
+    consumer: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_change_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
+
+
+def _record_changes(session: Session, flush_context) -> None:
+    """
+    flushされた追跡対象の行を同じトランザクションで変更ログに書き込む
+
+    Session.execute(insert()/update()/delete()) による一括の書き込みは flush を
+    経由しないので記録されない（_warn_bulk_write が警告する）。その場合は
+    change_log_service.enqueue() で変更を追加するか、全件同期で反映する。
+    """
+    changes = []
+    for objects, operation in (
+        (session.new, CHANGE_INSERT),
+        (session.dirty, CHANGE_UPDATE),
+        (session.deleted, CHANGE_DELETE),
+    ):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in TRACKED_TABLES:
+                continue
+            if operation == CHANGE_UPDATE and not session.is_modified(obj, include_collections=False):
+                continue
+            key = inspect(obj).mapper.primary_key_from_instance(obj)
+            changes.append({
+                "table_name": table,
+                "record_id": str(key[0]),
+                "operation": operation,
+                "changed_at": utcnow(),
+            })
+
+    if changes:
+        session.connection().execute(insert(ChangeLog), changes)
+
+
+def _warn_bulk_write(orm_execute_state) -> None:
+    """
+    追跡対象テーブルへの一括 insert/update/delete を警告する（変更ログに残らないため）
+
+    意図して記録しない場合は execution_options(skip_change_log=True) を付ける。
+    """
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get("skip_change_log"):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name in TRACKED_TABLES:
+        logger.warning(
+            f"Bulk {orm_execute_state.statement.__visit_name__} on {table.name} is not recorded in the change log"
+        )
+
+
+event.listen(Session, "after_flush", _record_changes)
+event.listen(Session, "do_orm_execute", _warn_bulk_write)
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    """Return current UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+class EntryHistory(Base):
+    """
+    着順が確定した出走の非正規化テーブル（1出走1行）
+
+    特徴量抽出の過去成績をracesと結合せずに読むため、レースの条件列を複写している。
+    列名は Entry / Race と同じにしてあり、どちらの代わりにも使える。
+    """
+    __tablename__ = "entry_history"
+    __table_args__ = (
+        # 馬ごとの日付範囲読み出し（PostgreSQLではこの索引でCLUSTERする）
+        Index("ix_entry_history_horse_date", "horse_id", "date"),
+        Index("ix_entry_history_jockey_date", "jockey_id", "date"),
+    )
+
+    # entries.id
+    id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("entries.id", ondelete="CASCADE"), primary_key=True, autoincrement=False
+    )
+    race_id: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    horse_id: Mapped[str] = mapped_column(String(20), nullable=False)
+    jockey_id: Mapped[Optional[str]] = mapped_column(String(20))
+
+    # レース（races から複写）
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    race_type: Mapped[str] = mapped_column(String(10), nullable=False)
+    course: Mapped[str] = mapped_column(String(10), nullable=False)
+    distance: Mapped[int] = mapped_column(Integer, nullable=False)
+    track_type: Mapped[str] = mapped_column(String(10), nullable=False)
+    condition: Mapped[Optional[str]] = mapped_column(String(10))
+    grade: Mapped[Optional[str]] = mapped_column(String(10))
+
+    # 出走（entries から複写）
+    frame_number: Mapped[Optional[int]] = mapped_column(Integer)
+    horse_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight: Mapped[Optional[float]] = mapped_column(Float)
+    horse_weight: Mapped[Optional[int]] = mapped_column(Integer)
+    weight_diff: Mapped[Optional[int]] = mapped_column(Integer)
+    odds: Mapped[Optional[float]] = mapped_column(Float)
+    popularity: Mapped[Optional[int]] = mapped_column(Integer)
+    result: Mapped[int] = mapped_column(Integer, nullable=False)
+    finish_time: Mapped[Optional[str]] = mapped_column(String(10))
+    margin: Mapped[Optional[str]] = mapped_column(String(20))
+    corner_position: Mapped[Optional[str]] = mapped_column(String(20))
+    last_3f: Mapped[Optional[float]] = mapped_column(Float)
+    pace: Mapped[Optional[str]] = mapped_column(String(20))
+    prize_money: Mapped[Optional[int]] = mapped_column(Integer)
+
+    # corner_position / pace をパースした値
+    first_corner: Mapped[Optional[int]] = mapped_column(Integer)
+    last_corner: Mapped[Optional[int]] = mapped_column(Integer)
+    pace_first: Mapped[Optional[float]] = mapped_column(Float)
+    pace_second: Mapped[Optional[float]] = mapped_column(Float)
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import DateTime, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 
 from app.db.base import Base
 
@@ -33,6 +33,9 @@ class Horse(Base):
         DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
     )
 
+    # 一覧取得時に with_expression で読み込む出走数（それ以外は None）
+    entries_count: Mapped[Optional[int]] = query_expression()
+
     # Relationships
     entries: Mapped[list["Entry"]] = relationship(back_populates="horse")
 
@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import (
+    JSON, Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text, text,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    """Return current UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+# ジョブの状態
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+JOB_ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# 同じ種別の実行中（待機中を含む）ジョブは1つだけ（部分一意インデックスの条件）
+ACTIVE_JOB_WHERE = text("status IN ('queued', 'running')")
+
+
+class Job(Base):
+    """ワーカープロセスで実行するバックグラウンドジョブ（再学習・シミュレーションなど）"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # 複数のAPIワーカーから同時に登録されても、同じ種別は1つしか実行しない
+        Index(
+            "ux_jobs_active_kind", "kind", unique=True,
+            postgresql_where=ACTIVE_JOB_WHERE, sqlite_where=ACTIVE_JOB_WHERE,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # retrain, simulation, threshold_sweep, bulk_rescrape, feature_sync
+    kind: Mapped[str] = mapped_column(String(30), nullable=False, index=True)
+    # 実行する関数（"module:function"）とキーワード引数
+    target: Mapped[str] = mapped_column(String(200), nullable=False)
+    params: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+
+    status: Mapped[str] = mapped_column(String(20), default=JOB_QUEUED, nullable=False, index=True)
+    progress: Mapped[Optional[float]] = mapped_column(Float)  # 0-100
+    # ワーカー側の状態（ルートが返す進捗dict）のスナップショット
+    state: Mapped[Optional[dict]] = mapped_column(JSON)
+    result: Mapped[Optional[dict]] = mapped_column(JSON)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    pid: Mapped[Optional[int]] = mapped_column(Integer)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+
+class JobEvent(Base):
+    """ジョブの進捗イベント。APIプロセスが id 順に読み出してSSEへ中継する"""
+    __tablename__ = "job_events"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
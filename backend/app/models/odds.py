@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    """Return current UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+class OddsSnapshot(Base):
+    """オッズ時系列（前回スナップショットから変化した組み合わせのみ保存）"""
+    __tablename__ = "odds_snapshots"
+    __table_args__ = (
+        Index("ix_odds_snapshots_race_captured", "race_id", "captured_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # 出馬表より先にオッズを取得することがあるので races への外部キーは張らない
+    race_id: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    # 券種 (win, place, quinella, quinella_place, exacta, trio, trifecta)
+    bet_type: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    # 組み合わせキー ("5", "1-2", "1-2-3")
+    combination: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    # オッズ (複勝・ワイドは下限)
+    odds: Mapped[Optional[float]] = mapped_column(Float)
+
+    # 複勝・ワイドの上限
+    odds_max: Mapped[Optional[float]] = mapped_column(Float)
+
+    captured_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
+
+
+class OddsLatest(Base):
+    """組み合わせごとの最新オッズ（スナップショット保存時に更新。差分の計算に使う）"""
+    __tablename__ = "odds_latest"
+
+    race_id: Mapped[str] = mapped_column(String(20), primary_key=True)
+    bet_type: Mapped[str] = mapped_column(String(20), primary_key=True)
+    combination: Mapped[str] = mapped_column(String(20), primary_key=True)
+
+    odds: Mapped[Optional[float]] = mapped_column(Float)
+    odds_max: Mapped[Optional[float]] = mapped_column(Float)
+
+    captured_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, nullable=False
+    )
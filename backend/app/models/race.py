@@ -1,7 +1,7 @@
 from datetime import date, datetime, timezone
 from typing import Optional
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -14,6 +14,13 @@ def utcnow() -> datetime:
 
 class Race(Base):
     __tablename__ = "races"
+    __table_args__ = (
+        # 出走履歴との結合で日付・条件列まで索引だけで読む（PostgreSQLはINCLUDE）
+        Index(
+            "ix_races_race_id_date", "race_id", "date",
+            postgresql_include=["course", "distance", "condition", "track_type"],
+        ),
+    )
 
     race_id: Mapped[str] = mapped_column(String(20), primary_key=True)
     race_type: Mapped[str] = mapped_column(
@@ -45,6 +52,21 @@ class Race(Base):
 
 class Entry(Base):
     __tablename__ = "entries"
+    __table_args__ = (
+        # 馬・騎手ごとの確定済み出走履歴（特徴量抽出）
+        Index(
+            "ix_entries_horse_race_finished", "horse_id", "race_id",
+            postgresql_include=["result"],
+            postgresql_where=text("result IS NOT NULL"),
+            sqlite_where=text("result IS NOT NULL"),
+        ),
+        Index(
+            "ix_entries_jockey_race_finished", "jockey_id", "race_id",
+            postgresql_include=["result"],
+            postgresql_where=text("result IS NOT NULL"),
+            sqlite_where=text("result IS NOT NULL"),
+        ),
+    )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     race_id: Mapped[str] = mapped_column(
@@ -54,7 +76,7 @@ class Entry(Base):
         String(20), ForeignKey("horses.horse_id"), nullable=False, index=True
     )
     jockey_id: Mapped[Optional[str]] = mapped_column(
-        String(20), ForeignKey("jockeys.jockey_id")
+        String(20), ForeignKey("jockeys.jockey_id"), index=True
     )
     
     frame_number: Mapped[Optional[int]] = mapped_column(Integer)
@@ -0,0 +1,79 @@
+from datetime import date, datetime, timezone
+
+from typing import Optional
+
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    """Return current UTC datetime"""
+    return datetime.now(timezone.utc)
+
+
+class JockeyStats(Base):
+    """騎手ごとの成績集計（結果取得後に再計算）"""
+    __tablename__ = "jockey_stats"
+
+    jockey_id: Mapped[str] = mapped_column(
+        String(20), ForeignKey("jockeys.jockey_id"), primary_key=True
+    )
+    total_entries: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    wins: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    places: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    shows: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
+
+
+class HistoryDailySummary(Base):
+    """馬券履歴の日別集計（結果が確定した履歴のみ）"""
+    __tablename__ = "history_daily_summary"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    # 結果未確定を含む履歴件数
+    total_records: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    total_bets: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_hits: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_bet_amount: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_payout: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
+
+
+class PredictionOutcome(Base):
+    """予測ごとの的中判定（レース結果の取得後に作成）"""
+    __tablename__ = "prediction_outcomes"
+
+    prediction_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("predictions.id", ondelete="CASCADE"), primary_key=True
+    )
+    race_id: Mapped[str] = mapped_column(
+        String(20), ForeignKey("races.race_id"), nullable=False, index=True
+    )
+    model_version: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+
+    # 集計の切り口（レースから複写）
+    grade: Mapped[Optional[str]] = mapped_column(String(10))
+    track_type: Mapped[Optional[str]] = mapped_column(String(10))
+
+    # 予測1位が実際の1着 / 3着以内 / 5着以内か
+    top1_hit: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    top3_hit: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    top5_hit: Mapped[bool] = mapped_column(Boolean, nullable=False)
+
+    # 期間での絞り込み用（Prediction.created_at の複写）
+    predicted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+    evaluated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
+    )
@@ -17,7 +17,7 @@ class Trainer(Base):
     __tablename__ = "trainers"
 
     trainer_id: Mapped[str] = mapped_column(String(20), primary_key=True)
-    name: Mapped[str] = mapped_column(String(50), nullable=False)
+    name: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
 
     # 基本成績
     win_rate: Mapped[Optional[float]] = mapped_column(Float)
@@ -43,7 +43,7 @@ class Sire(Base):
     __tablename__ = "sires"
 
     sire_id: Mapped[str] = mapped_column(String(50), primary_key=True)  # 種牡馬名がID
-    name: Mapped[str] = mapped_column(String(50), nullable=False)
+    name: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
 
     # 基本成績
     win_rate: Mapped[Optional[float]] = mapped_column(Float)
@@ -0,0 +1,327 @@
+"""
+リクエスト単位の計測
+
+- ProfilingMiddleware: リクエストごとの処理時間・DB時間・クエリ数を記録する
+- SQLAlchemy の before/after_cursor_execute で全エンジンのSQL実行時間を計測する
+- span(): 処理の区間（特徴量抽出・推論など）の時間を記録する
+- render_metrics(): /metrics 用の Prometheus テキスト形式
+
+リクエストに "X-Profile: 1" ヘッダーを付けると、内訳を X-Profile レスポンスヘッダーで返す。
+処理時間が PROFILE_SLOW_REQUEST_MS を超えたリクエストは遅いSQLの上位とともにログに出す。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# リクエスト処理時間のヒストグラムの区切り（秒）
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ログに出すSQL文の最大長
+_STATEMENT_MAX_LENGTH = 500
+
+
+@dataclass
+class RequestProfile:
+    """1リクエストの計測結果"""
+    method: str
+    path: str
+    started: float = field(default_factory=time.perf_counter)
+    db_seconds: float = 0.0
+    query_count: int = 0
+    # (秒, SQL) の遅い順上位
+    slow_statements: list[tuple[float, str]] = field(default_factory=list)
+    # 区間名 -> (回数, 合計秒)
+    spans: dict[str, tuple[int, float]] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add_query(self, seconds: float, statement: str) -> None:
+        self.db_seconds += seconds
+        self.query_count += 1
+        limit = settings.PROFILE_TOP_STATEMENTS
+        if limit <= 0:
+            return
+        if len(self.slow_statements) < limit or seconds > self.slow_statements[-1][0]:
+            self.slow_statements.append((seconds, statement[:_STATEMENT_MAX_LENGTH]))
+            self.slow_statements.sort(key=lambda item: item[0], reverse=True)
+            del self.slow_statements[limit:]
+
+    def add_span(self, name: str, seconds: float) -> None:
+        count, total = self.spans.get(name, (0, 0.0))
+        self.spans[name] = (count + 1, total + seconds)
+
+    def header_value(self) -> str:
+        """X-Profile ヘッダーの値（例: total=12.3ms; db=4.1ms; queries=7; predict=1.2ms）"""
+        parts = [
+            f"total={self.elapsed * 1000:.1f}ms",
+            f"db={self.db_seconds * 1000:.1f}ms",
+            f"queries={self.query_count}",
+        ]
+        parts.extend(f"{name}={total * 1000:.1f}ms" for name, (_, total) in self.spans.items())
+        return "; ".join(parts)
+
+    def summary(self) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+            "db_ms": round(self.db_seconds * 1000, 1),
+            "query_count": self.query_count,
+            "spans_ms": {name: round(total * 1000, 1) for name, (_, total) in self.spans.items()},
+            "slow_statements": [
+                {"ms": round(seconds * 1000, 1), "statement": statement}
+                for seconds, statement in self.slow_statements
+            ],
+        }
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """処理中のリクエストの計測結果（リクエスト外ではNone）"""
+    return _current.get()
+
+
+class Metrics:
+    """プロセス全体の集計（/metrics で公開）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            # (method, route, status) -> 件数
+            self.requests: dict[tuple[str, str, int], int] = {}
+            # (method, route) -> [バケットごとの件数..., 合計秒, 件数]
+            self.durations: dict[tuple[str, str], list[float]] = {}
+            self.db_seconds: dict[tuple[str, str], float] = {}
+            self.queries: dict[tuple[str, str], int] = {}
+            # 区間名 -> [回数, 合計秒]
+            self.spans: dict[str, list[float]] = {}
+
+    def observe_request(self, method: str, route: str, status: int, profile: RequestProfile) -> None:
+        elapsed = profile.elapsed
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            histogram = self.durations.setdefault(key, [0.0] * (len(DURATION_BUCKETS) + 2))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if elapsed <= bound:
+                    histogram[i] += 1
+            histogram[-2] += elapsed
+            histogram[-1] += 1
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + profile.db_seconds
+            self.queries[key] = self.queries.get(key, 0) + profile.query_count
+
+    def observe_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            totals = self.spans.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def render(self) -> str:
+        """Prometheus テキスト形式"""
+        lines: list[str] = []
+        with self._lock:
+            lines += [
+                "# HELP keiba_http_requests_total HTTP requests.",
+                "# TYPE keiba_http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"keiba_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            lines += [
+                "# HELP keiba_http_request_duration_seconds Request wall time.",
+                "# TYPE keiba_http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, histogram):
+                    labels = _labels(method=method, route=route, le=bound)
+                    lines.append(f"keiba_http_request_duration_seconds_bucket{labels} {count:g}")
+                labels = _labels(method=method, route=route, le="+Inf")
+                lines.append(f"keiba_http_request_duration_seconds_bucket{labels} {histogram[-1]:g}")
+                labels = _labels(method=method, route=route)
+                lines.append(f"keiba_http_request_duration_seconds_sum{labels} {histogram[-2]:.6f}")
+                lines.append(f"keiba_http_request_duration_seconds_count{labels} {histogram[-1]:g}")
+
+            lines += [
+                "# HELP keiba_http_request_db_seconds_total Time spent in SQL during requests.",
+                "# TYPE keiba_http_request_db_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"keiba_http_request_db_seconds_total{_labels(method=method, route=route)} {seconds:.6f}")
+
+            lines += [
+                "# HELP keiba_http_request_queries_total SQL statements executed during requests.",
+                "# TYPE keiba_http_request_queries_total counter",
+            ]
+            for (method, route), count in sorted(self.queries.items()):
+                lines.append(f"keiba_http_request_queries_total{_labels(method=method, route=route)} {count}")
+
+            lines += [
+                "# HELP keiba_span_seconds Time spent in named spans.",
+                "# TYPE keiba_span_seconds summary",
+            ]
+            for name, (count, seconds) in sorted(self.spans.items()):
+                lines.append(f"keiba_span_seconds_sum{_labels(span=name)} {seconds:.6f}")
+                lines.append(f"keiba_span_seconds_count{_labels(span=name)} {count:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """処理区間の時間を記録（リクエスト中ならリクエストの内訳にも加える）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe_span(name, seconds)
+        profile = _current.get()
+        if profile is not None:
+            profile.add_span(name, seconds)
+
+
+# === SQLの計測 ===
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("profiling_started")
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    profile = _current.get()
+    if profile is not None:
+        profile.add_query(seconds, statement)
+
+
+def _handle_error(context):
+    started = context.connection.info.get("profiling_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+_sql_hooks_installed = False
+
+
+def install_sql_hooks() -> None:
+    """全エンジンのSQL実行時間をリクエストの計測に加える"""
+    global _sql_hooks_installed
+    if _sql_hooks_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _sql_hooks_installed = True
+
+
+# === ミドルウェア ===
+
+def _route_template(scope) -> str:
+    """
+    集計に使うルートのパス（"/api/v1/races/{race_id}" の形、マッチしなければ "unmatched"）
+
+    include_router したルートの path がプレフィックスを含まない場合もあるので、
+    実際のパスの末尾を path_format に置き換えて組み立てる。
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if not path_format:
+        return "unmatched"
+    concrete = path_format
+    for name, value in scope.get("path_params", {}).items():
+        concrete = concrete.replace("{" + name + "}", str(value))
+    path = scope["path"]
+    if path.endswith(concrete):
+        return path[:len(path) - len(concrete)] + path_format
+    return path_format
+
+
+class ProfilingMiddleware:
+    """
+    リクエストごとに処理時間・DB時間・クエリ数を計測するASGIミドルウェア
+
+    レスポンス本文をバッファしないので、SSEのストリーミングにも影響しない
+    （ストリームの計測値はヘッダー送信までの時間になる）。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current.set(profile)
+        wants_header = any(
+            name == b"x-profile" and value not in (b"", b"0")
+            for name, value in scope.get("headers", ())
+        )
+        status_code = 500
+
+        async def send_with_profile(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if wants_header:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"x-profile", profile.header_value().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current.reset(token)
+            metrics.observe_request(scope["method"], _route_template(scope), status_code, profile)
+            if profile.elapsed * 1000 >= settings.PROFILE_SLOW_REQUEST_MS:
+                logger.warning(
+                    f"Slow request: {scope['method']} {scope['path']} {profile.elapsed * 1000:.0f}ms",
+                    extra={"extra_data": profile.summary()},
+                )
+
+
+def render_metrics() -> str:
+    """/metrics のレスポンス本文（コネクションプールの状態を含む）"""
+    from app.db.base import get_pool_stats
+
+    pools = sorted(get_pool_stats().items())
+    lines = []
+    for metric, key, kind, help_text in (
+        ("keiba_db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out."),
+        ("keiba_db_pool_checkouts_total", "checkouts", "counter", "Connection checkouts."),
+        ("keiba_db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{_labels(pool=name)} {info.get(key, 0)}" for name, info in pools]
+    return metrics.render() + "\n".join(lines) + "\n"
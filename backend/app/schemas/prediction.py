@@ -109,8 +109,14 @@ class AccuracyByCategory(BaseModel):
     top3: float
 
 
+class AccuracyByModel(AccuracyStats):
+    total_races: int
+
+
 class StatsResponse(BaseModel):
     period: str
+    total_races: int = 0
     accuracy: AccuracyStats
     by_grade: dict[str, AccuracyByCategory] = {}
     by_track: dict[str, AccuracyByCategory] = {}
+    by_model_version: dict[str, AccuracyByModel] = {}
@@ -1,6 +1,15 @@
-from app.services import race_service
-from app.services import prediction_service
-from app.services import training_service
-from app.services import storage_service
+"""
+サービス層
+
+"from app.services import xxx_service" はそのサービスだけを読み込む。
+パッケージの属性として参照された場合も、最初に使われたときに読み込む。
+"""
+import importlib
 
 __all__ = ["race_service", "prediction_service", "training_service", "storage_service"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,519 @@
+"""
+過去データ一括取得（バックフィル）サービス
+
+日付・レースごとの進捗をbackfill_*テーブルに記録し、
+中断しても完了済みの作業を繰り返さずに再開できるようにする
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.base import BatchSessionLocal
+from app.logging_config import get_logger
+from app.models import Race, Entry, Horse, Jockey, Training
+from app.models.backfill import (
+    BackfillJob,
+    BackfillDate,
+    BackfillRace,
+    BACKFILL_PENDING,
+    BACKFILL_RUNNING,
+    BACKFILL_LISTED,
+    BACKFILL_COMPLETED,
+    BACKFILL_SKIPPED,
+    BACKFILL_FAILED,
+)
+from app.services.scraper import (
+    RateLimiter,
+    RaceListScraper,
+    RaceDetailScraper,
+    HorseScraper,
+    JockeyScraper,
+    TrainingScraper,
+)
+from app.services import entry_history_service
+from app.services.scraper_service import ScrapeResult
+
+logger = get_logger(__name__)
+
+# 失敗したレースの最大試行回数
+MAX_RACE_ATTEMPTS = 3
+
+# 進捗コールバック: (event_type, data)
+ProgressCallback = Callable[[str, dict], None]
+
+
+def get_or_create_job(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    include_training: bool = True,
+) -> BackfillJob:
+    """
+    同じ期間の未完了ジョブがあれば返し、なければ作成する
+
+    失敗で終わったジョブは、試行回数の上限に達したレースの回数を戻してから返す
+    （再度リクエストすれば失敗したレースをもう一度試す）。
+
+    Args:
+        db: データベースセッション
+        start_date: 開始日
+        end_date: 終了日
+        include_training: 調教データも取得するか
+
+    Returns:
+        バックフィルジョブ
+    """
+    stmt = (
+        select(BackfillJob)
+        .where(
+            BackfillJob.start_date == start_date,
+            BackfillJob.end_date == end_date,
+            BackfillJob.include_training == include_training,
+            BackfillJob.status != BACKFILL_COMPLETED,
+        )
+        .order_by(BackfillJob.id.desc())
+        .limit(1)
+    )
+    job = db.execute(stmt).scalar_one_or_none()
+    if job:
+        if job.status == BACKFILL_FAILED:
+            db.execute(
+                update(BackfillRace)
+                .where(BackfillRace.job_id == job.id, BackfillRace.status == BACKFILL_FAILED)
+                .values(attempts=0)
+            )
+            job.status = BACKFILL_PENDING
+            db.commit()
+        return job
+
+    job = BackfillJob(
+        start_date=start_date,
+        end_date=end_date,
+        include_training=include_training,
+        status=BACKFILL_PENDING,
+    )
+    current = start_date
+    while current <= end_date:
+        job.dates.append(BackfillDate(target_date=current, status=BACKFILL_PENDING))
+        current += timedelta(days=1)
+
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job_summary(db: Session, job_id: int) -> Optional[dict]:
+    """ジョブの進捗集計を取得"""
+    job = db.get(BackfillJob, job_id)
+    if not job:
+        return None
+
+    date_counts: dict[str, int] = {}
+    for status in db.execute(
+        select(BackfillDate.status).where(BackfillDate.job_id == job_id)
+    ).scalars():
+        date_counts[status] = date_counts.get(status, 0) + 1
+
+    race_counts: dict[str, int] = {}
+    for status in db.execute(
+        select(BackfillRace.status).where(BackfillRace.job_id == job_id)
+    ).scalars():
+        race_counts[status] = race_counts.get(status, 0) + 1
+
+    return {
+        "job_id": job.id,
+        "start_date": job.start_date.isoformat(),
+        "end_date": job.end_date.isoformat(),
+        "status": job.status,
+        "dates": date_counts,
+        "races": race_counts,
+    }
+
+
+def run_job(
+    job_id: int,
+    workers: int = 1,
+    session_factory: sessionmaker = BatchSessionLocal,
+    rate_limiter: Optional[RateLimiter] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> ScrapeResult:
+    """
+    バックフィルジョブを実行（中断位置から再開）
+
+    日付単位で並列処理し、全スクレイパーで1つのレート制限を共有する。
+
+    Args:
+        job_id: ジョブID
+        workers: 並列処理する日付数
+        session_factory: スレッドごとのセッション生成に使うファクトリ
+        rate_limiter: 共有レート制限（省略時は新規作成）
+        progress_callback: 進捗通知コールバック
+
+    Returns:
+        スクレイピング結果
+    """
+    rate_limiter = rate_limiter or RateLimiter()
+    result = ScrapeResult()
+
+    db = session_factory()
+    try:
+        job = db.get(BackfillJob, job_id)
+        if not job:
+            raise ValueError(f"Backfill job {job_id} not found")
+
+        job.status = BACKFILL_RUNNING
+        job.finished_at = None
+        db.commit()
+
+        pending_dates = list(
+            db.execute(
+                select(BackfillDate.target_date)
+                .where(
+                    BackfillDate.job_id == job_id,
+                    BackfillDate.status != BACKFILL_COMPLETED,
+                )
+                .order_by(BackfillDate.target_date)
+            ).scalars()
+        )
+        known_race_ids = _load_known_race_ids(db, job.start_date, job.end_date)
+        include_training = job.include_training
+    finally:
+        db.close()
+
+    logger.info(
+        f"Backfill job {job_id}: {len(pending_dates)} dates remaining, "
+        f"{len(known_race_ids)} races already in DB"
+    )
+
+    def _run(target_date: date) -> ScrapeResult:
+        return _process_date(
+            job_id,
+            target_date,
+            known_race_ids,
+            include_training,
+            session_factory,
+            rate_limiter,
+            progress_callback,
+        )
+
+    date_results: list[ScrapeResult] = []
+    if workers <= 1:
+        date_results = [_run(d) for d in pending_dates]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run, d) for d in pending_dates]
+            for future in as_completed(futures):
+                date_results.append(future.result())
+
+    for date_result in date_results:
+        result.success_count += date_result.success_count
+        result.error_count += date_result.error_count
+        result.skipped_count += date_result.skipped_count
+        result.errors.extend(date_result.errors)
+        result.saved_items.extend(date_result.saved_items)
+
+    db = session_factory()
+    try:
+        remaining = db.execute(
+            select(BackfillDate.id)
+            .where(
+                BackfillDate.job_id == job_id,
+                BackfillDate.status != BACKFILL_COMPLETED,
+            )
+            .limit(1)
+        ).first()
+        job = db.get(BackfillJob, job_id)
+        job.status = BACKFILL_FAILED if remaining else BACKFILL_COMPLETED
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        logger.info(f"Backfill job {job_id} finished: {job.status}")
+    finally:
+        db.close()
+
+    _notify(progress_callback, "job_complete", {"job_id": job_id, **result.to_dict()})
+    return result
+
+
+def _load_known_race_ids(db: Session, start_date: date, end_date: date) -> frozenset[str]:
+    """期間内にDBへ保存済みのrace_idを1クエリで取得"""
+    stmt = select(Race.race_id).where(Race.date >= start_date, Race.date <= end_date)
+    return frozenset(db.execute(stmt).scalars())
+
+
+def _process_date(
+    job_id: int,
+    target_date: date,
+    known_race_ids: frozenset[str],
+    include_training: bool,
+    session_factory: sessionmaker,
+    rate_limiter: RateLimiter,
+    progress_callback: Optional[ProgressCallback],
+) -> ScrapeResult:
+    """1日分のレースを処理（スレッドごとにセッション・スクレイパーを持つ）"""
+    result = ScrapeResult()
+    db = session_factory()
+
+    list_scraper = RaceListScraper(rate_limiter=rate_limiter)
+    detail_scraper = RaceDetailScraper(rate_limiter=rate_limiter)
+    horse_scraper = HorseScraper(rate_limiter=rate_limiter)
+    jockey_scraper = JockeyScraper(rate_limiter=rate_limiter)
+    training_scraper = TrainingScraper(rate_limiter=rate_limiter) if include_training else None
+
+    try:
+        date_state = db.execute(
+            select(BackfillDate).where(
+                BackfillDate.job_id == job_id,
+                BackfillDate.target_date == target_date,
+            )
+        ).scalar_one()
+
+        _notify(progress_callback, "date_start", {"date": target_date.isoformat()})
+
+        # レース一覧が未取得なら取得してレース単位の状態を作成
+        if date_state.races_total is None:
+            try:
+                races = list_scraper.scrape(target_date)
+            except Exception as e:
+                logger.error(f"Failed to get race list for {target_date}: {e}")
+                date_state.status = BACKFILL_FAILED
+                date_state.error = str(e)
+                db.commit()
+                result.errors.append({"date": target_date.isoformat(), "error": str(e)})
+                result.error_count += 1
+                return result
+
+            for race_info in races:
+                race_id = race_info["race_id"]
+                already_saved = race_id in known_race_ids
+                db.add(BackfillRace(
+                    job_id=job_id,
+                    target_date=target_date,
+                    race_id=race_id,
+                    status=BACKFILL_SKIPPED if already_saved else BACKFILL_PENDING,
+                ))
+                if already_saved:
+                    result.skipped_count += 1
+            date_state.races_total = len(races)
+            date_state.status = BACKFILL_LISTED
+            date_state.error = None
+            db.commit()
+
+        race_states = db.execute(
+            select(BackfillRace)
+            .where(
+                BackfillRace.job_id == job_id,
+                BackfillRace.target_date == target_date,
+                BackfillRace.status.in_([BACKFILL_PENDING, BACKFILL_FAILED]),
+                BackfillRace.attempts < MAX_RACE_ATTEMPTS,
+            )
+            .order_by(BackfillRace.race_id)
+        ).scalars().all()
+
+        for race_state in race_states:
+            race_id = race_state.race_id
+            try:
+                # 一覧の取得後（前回の実行以降）に保存されたレースはスクレイピングしない
+                saved = race_id not in known_race_ids
+                if saved:
+                    detail = detail_scraper.scrape(race_id)
+                    try:
+                        _save_race(
+                            db, race_id, target_date, detail,
+                            horse_scraper, jockey_scraper, training_scraper,
+                        )
+                        db.flush()
+                    except IntegrityError:
+                        # 並列実行中に他の処理が同じレース・馬・騎手を保存した場合は1回だけやり直す
+                        # （ジョブ開始後にレースが保存されていればスキップ扱い）
+                        db.rollback()
+                        saved = db.get(Race, race_id) is None
+                        if saved:
+                            _save_race(
+                                db, race_id, target_date, detail,
+                                horse_scraper, jockey_scraper, training_scraper,
+                            )
+                if not saved:
+                    race_state.status = BACKFILL_SKIPPED
+                    race_state.error = None
+                    db.commit()
+                    result.skipped_count += 1
+                    continue
+                race_state.status = BACKFILL_COMPLETED
+                race_state.attempts += 1
+                race_state.error = None
+                # レースデータと進捗を同一トランザクションでコミット
+                db.commit()
+                result.success_count += 1
+                result.saved_items.append(race_id)
+                _notify(progress_callback, "race_saved", {
+                    "date": target_date.isoformat(),
+                    "race_id": race_id,
+                    "entries": len(detail.get("entries", [])),
+                })
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error processing race {race_id}: {e}")
+                race_state.status = BACKFILL_FAILED
+                race_state.attempts += 1
+                race_state.error = str(e)
+                db.commit()
+                result.errors.append({"race_id": race_id, "error": str(e)})
+                result.error_count += 1
+                _notify(progress_callback, "race_error", {
+                    "date": target_date.isoformat(),
+                    "race_id": race_id,
+                    "error": str(e),
+                })
+
+        if result.saved_items:
+            entry_history_service.refresh_entry_history_for_races(db, result.saved_items)
+
+        unfinished = db.execute(
+            select(BackfillRace.id)
+            .where(
+                BackfillRace.job_id == job_id,
+                BackfillRace.target_date == target_date,
+                BackfillRace.status.in_([BACKFILL_PENDING, BACKFILL_FAILED]),
+            )
+            .limit(1)
+        ).first()
+        date_state.status = BACKFILL_FAILED if unfinished else BACKFILL_COMPLETED
+        db.commit()
+
+        _notify(progress_callback, "date_complete", {
+            "date": target_date.isoformat(),
+            "status": date_state.status,
+            **result.to_dict(),
+        })
+        return result
+    finally:
+        db.close()
+
+
+def _save_race(
+    db: Session,
+    race_id: str,
+    target_date: date,
+    detail: dict,
+    horse_scraper: HorseScraper,
+    jockey_scraper: JockeyScraper,
+    training_scraper: Optional[TrainingScraper],
+) -> None:
+    """レース・出走馬・調教データをセッションに追加（コミットは呼び出し側）"""
+    race = Race(
+        race_id=race_id,
+        date=target_date,
+        course=detail.get("course", ""),
+        race_number=detail.get("race_number", 0),
+        race_name=detail.get("race_name"),
+        distance=detail.get("distance", 0),
+        track_type=detail.get("track_type", ""),
+        weather=detail.get("weather"),
+        condition=detail.get("condition"),
+        grade=detail.get("grade"),
+    )
+    if detail.get("race_type"):
+        race.race_type = detail["race_type"]
+    db.add(race)
+
+    for entry_data in detail.get("entries", []):
+        horse_id = entry_data.get("horse_id")
+        jockey_id = entry_data.get("jockey_id")
+
+        if horse_id and db.get(Horse, horse_id) is None:
+            db.add(_build_horse(horse_id, entry_data, horse_scraper))
+
+        if jockey_id and db.get(Jockey, jockey_id) is None:
+            db.add(_build_jockey(jockey_id, entry_data, jockey_scraper))
+
+        db.add(Entry(
+            race_id=race_id,
+            horse_id=horse_id or "",
+            jockey_id=jockey_id,
+            frame_number=entry_data.get("frame_number"),
+            horse_number=entry_data.get("horse_number", 0),
+            weight=entry_data.get("weight"),
+            horse_weight=entry_data.get("horse_weight"),
+            weight_diff=entry_data.get("weight_diff"),
+            odds=entry_data.get("odds"),
+            popularity=entry_data.get("popularity"),
+            result=entry_data.get("result"),
+            finish_time=entry_data.get("finish_time"),
+            margin=entry_data.get("margin"),
+            corner_position=entry_data.get("corner_position"),
+            last_3f=entry_data.get("last_3f"),
+        ))
+        db.flush()
+
+    if training_scraper is not None:
+        try:
+            for t_data in training_scraper.scrape(race_id):
+                db.add(Training(
+                    race_id=race_id,
+                    horse_id=t_data.get("horse_id", ""),
+                    horse_number=t_data.get("horse_number"),
+                    training_course=t_data.get("training_course"),
+                    training_time=t_data.get("training_time"),
+                    lap_times=t_data.get("lap_times"),
+                    training_rank=t_data.get("training_rank"),
+                ))
+        except Exception as e:
+            logger.warning(f"Could not get training data for {race_id}: {e}")
+
+
+def _build_horse(horse_id: str, entry_data: dict, horse_scraper: HorseScraper) -> Horse:
+    """馬情報をスクレイピングしてHorseを作成（失敗時は出走表の情報で作成）"""
+    try:
+        horse_info = horse_scraper.scrape(horse_id)
+        return Horse(
+            horse_id=horse_id,
+            name=horse_info.get("name", entry_data.get("horse_name", "")),
+            sex=horse_info.get("sex", entry_data.get("sex", "")),
+            birth_year=horse_info.get("birth_year", 2020),
+            father=horse_info.get("father"),
+            mother=horse_info.get("mother"),
+            mother_father=horse_info.get("mother_father"),
+            trainer=horse_info.get("trainer"),
+            owner=horse_info.get("owner"),
+        )
+    except Exception as e:
+        logger.warning(f"Could not get horse info for {horse_id}: {e}")
+        return Horse(
+            horse_id=horse_id,
+            name=entry_data.get("horse_name", "Unknown"),
+            sex=entry_data.get("sex", ""),
+            birth_year=2020,
+        )
+
+
+def _build_jockey(jockey_id: str, entry_data: dict, jockey_scraper: JockeyScraper) -> Jockey:
+    """騎手情報をスクレイピングしてJockeyを作成（失敗時は出走表の情報で作成）"""
+    try:
+        jockey_info = jockey_scraper.scrape(jockey_id)
+        return Jockey(
+            jockey_id=jockey_id,
+            name=jockey_info.get("name") or entry_data.get("jockey_name", "Unknown"),
+            win_rate=jockey_info.get("win_rate"),
+            place_rate=jockey_info.get("place_rate"),
+            show_rate=jockey_info.get("show_rate"),
+        )
+    except Exception:
+        return Jockey(
+            jockey_id=jockey_id,
+            name=entry_data.get("jockey_name", "Unknown"),
+        )
+
+
+def _notify(callback: Optional[ProgressCallback], event_type: str, data: dict) -> None:
+    """進捗コールバックを呼び出す（例外は握りつぶす）"""
+    if callback is None:
+        return
+    try:
+        callback(event_type, data)
+    except Exception as e:
+        logger.warning(f"Backfill progress callback failed: {e}")
@@ -0,0 +1,173 @@
+"""
+変更ログ（アウトボックス）サービス
+
+ChangeLog は追跡対象テーブルへの insert/update/delete を flush 時に記録する
+（app.models.change_log のイベントリスナー）。コンシューマは SyncCursor に
+保存した位置から id 順に読み出し、処理が終わった位置まで ack する。
+
+id は採番順でありコミット順ではないので、小さい id を取ったトランザクションが
+後からコミットすると、読み出した時点ではその id が欠番に見える。コンシューマは
+committed_prefix() で欠番の手前までだけを消費し、欠番を飛ばして進まないようにする。
+
+ORMの flush を経由しない一括の insert()/update()/delete() は記録されない
+（app.models.change_log の警告を参照）。その場合は enqueue() で明示的に追加する。
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.logging_config import get_logger
+from app.models import ChangeLog, SyncCursor
+from app.models.change_log import CHANGE_RETRY, utcnow
+
+logger = get_logger(__name__)
+
+
+def get_cursor(db: Session, consumer: str) -> Optional[SyncCursor]:
+    """コンシューマの消費位置を取得（未作成ならNone）"""
+    return db.get(SyncCursor, consumer)
+
+
+def latest_change_id(db: Session) -> int:
+    """変更ログの最新id（空なら0）"""
+    return db.execute(select(func.max(ChangeLog.id))).scalar() or 0
+
+
+def pending_count(db: Session, consumer: str) -> int:
+    """未消費の変更数"""
+    cursor = get_cursor(db, consumer)
+    after_id = cursor.last_change_id if cursor else 0
+    return db.execute(
+        select(func.count()).select_from(ChangeLog).where(ChangeLog.id > after_id)
+    ).scalar() or 0
+
+
+def read_changes(
+    db: Session,
+    after_id: int,
+    limit: int,
+    until_id: Optional[int] = None,
+) -> list[ChangeLog]:
+    """after_id より後（until_id 以下）の変更を id 順に取得"""
+    stmt = select(ChangeLog).where(ChangeLog.id > after_id)
+    if until_id is not None:
+        stmt = stmt.where(ChangeLog.id <= until_id)
+    stmt = stmt.order_by(ChangeLog.id).limit(limit)
+    return list(db.execute(stmt).scalars().all())
+
+
+def committed_prefix(
+    changes: list[ChangeLog],
+    after_id: int,
+    visibility_lag_seconds: float,
+    now: Optional[datetime] = None,
+) -> list[ChangeLog]:
+    """
+    読み出した変更のうち、消費してよい先頭部分
+
+    id が after_id から連続している間はそのまま消費する。欠番の後ろの変更は
+    visibility_lag_seconds より古いときだけ消費する（それだけ経っても見えない欠番は
+    ロールバックされたものとみなす）。新しい欠番があればその手前で止め、
+    欠番のトランザクションがコミットされるのを次回まで待つ。
+    """
+    now = now or utcnow()
+    expected = after_id + 1
+    safe = []
+    for change in changes:
+        if change.id != expected and _age_seconds(change, now) < visibility_lag_seconds:
+            break
+        safe.append(change)
+        expected = change.id + 1
+    return safe
+
+
+def committed_until(
+    db: Session,
+    after_id: int,
+    visibility_lag_seconds: float,
+    until_id: Optional[int] = None,
+    window: int = 10000,
+) -> int:
+    """
+    after_id から欠番を待たずに消費してよい最後の id（committed_prefix を最新まで適用）
+
+    全件同期のように変更を読まずに消費位置を進めるときに使う。
+    """
+    now = utcnow()
+    if until_id is None:
+        until_id = latest_change_id(db)
+    while after_id < until_id:
+        changes = list(db.execute(
+            select(ChangeLog.id, ChangeLog.changed_at)
+            .where(ChangeLog.id > after_id, ChangeLog.id <= until_id)
+            .order_by(ChangeLog.id)
+            .limit(window)
+        ))
+        safe = committed_prefix(changes, after_id, visibility_lag_seconds, now)
+        if safe:
+            after_id = safe[-1].id
+        if not changes or len(safe) < len(changes):
+            break
+    return after_id
+
+
+def _age_seconds(change: ChangeLog, now: datetime) -> float:
+    changed_at = change.changed_at
+    if changed_at.tzinfo is None:
+        # SQLite はタイムゾーンを保存しない（UTCで書き込んでいる）
+        changed_at = changed_at.replace(tzinfo=timezone.utc)
+    return (now - changed_at).total_seconds()
+
+
+def group_changes(changes: list[ChangeLog]) -> dict[str, dict[str, str]]:
+    """
+    変更をテーブルごとにまとめる（同じ行への複数の変更は最後の1件）
+
+    Returns:
+        テーブル名 -> {record_id: operation}（最初に現れた順）
+    """
+    grouped: dict[str, OrderedDict] = {}
+    for change in changes:
+        records = grouped.setdefault(change.table_name, OrderedDict())
+        records[change.record_id] = change.operation
+    return grouped
+
+
+def enqueue(db: Session, table_name: str, record_ids: list, operation: str = CHANGE_RETRY) -> None:
+    """変更ログの末尾に再処理対象を追加（commitは呼び出し側）"""
+    if not record_ids:
+        return
+    now = utcnow()
+    db.execute(insert(ChangeLog), [
+        {"table_name": table_name, "record_id": str(record_id), "operation": operation, "changed_at": now}
+        for record_id in record_ids
+    ])
+
+
+def ack(db: Session, consumer: str, change_id: int) -> None:
+    """change_id までを処理済みとして消費位置を進める（commitは呼び出し側）"""
+    cursor = get_cursor(db, consumer)
+    if cursor is None:
+        db.add(SyncCursor(consumer=consumer, last_change_id=change_id))
+        return
+    cursor.last_change_id = max(cursor.last_change_id, change_id)
+    cursor.updated_at = utcnow()
+
+
+def prune(db: Session) -> int:
+    """全コンシューマが消費済みの変更を削除"""
+    min_cursor = db.execute(select(func.min(SyncCursor.last_change_id))).scalar()
+    if not min_cursor:
+        return 0
+    result = db.execute(delete(ChangeLog).where(ChangeLog.id <= min_cursor))
+    db.commit()
+    return result.rowcount or 0
+
+
+def last_consumed_at(db: Session, consumer: str) -> Optional[datetime]:
+    """最後に ack した時刻"""
+    cursor = get_cursor(db, consumer)
+    return cursor.updated_at if cursor else None
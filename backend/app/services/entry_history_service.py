@@ -0,0 +1,165 @@
+"""
+出走履歴（entry_history）サービス
+
+着順が確定した出走をレースの条件列と一緒に entry_history へ複写する。
+FEATURE_HISTORY_TABLE が有効な場合、特徴量抽出の過去成績はこのテーブルを
+(horse_id, date) の範囲で読むだけになり、races との結合が不要になる。
+結果の取り込み（scrape_races_for_date / scrape_race_results / バックフィル）で
+該当レース分だけ再作成する。
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logging_config import get_logger
+from app.models import Entry, EntryHistory, Race
+from app.models.entry_history import utcnow
+
+logger = get_logger(__name__)
+
+# Entry / Race から複写する列
+ENTRY_COLUMNS = [
+    "id", "race_id", "horse_id", "jockey_id", "frame_number", "horse_number",
+    "weight", "horse_weight", "weight_diff", "odds", "popularity", "result",
+    "finish_time", "margin", "corner_position", "last_3f", "pace", "prize_money",
+]
+RACE_COLUMNS = ["date", "race_type", "course", "distance", "track_type", "condition", "grade"]
+
+# 全件再作成時の書き込み単位
+REBUILD_BATCH_SIZE = 5000
+
+
+def parse_corners(corner_position: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """"2-2-3-3" 形式の通過順から (最初のコーナー, 最後のコーナー) を取得"""
+    if not corner_position:
+        return None, None
+    positions = [int(c) for c in corner_position.replace(" ", "").split("-") if c.isdigit()]
+    if not positions:
+        return None, None
+    return positions[0], positions[-1]
+
+
+def parse_pace(pace: Optional[str]) -> tuple[Optional[float], Optional[float]]:
+    """"35.4-38.1" 形式のペースから (前半, 後半) を取得"""
+    if not pace:
+        return None, None
+    parts = pace.replace(" ", "").split("-")
+    if len(parts) != 2:
+        return None, None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None, None
+
+
+def _history_stmt(race_ids: Optional[list[str]] = None):
+    """確定済み出走を entries⨝races から読むクエリ"""
+    stmt = (
+        select(
+            *(getattr(Entry, c) for c in ENTRY_COLUMNS),
+            *(getattr(Race, c) for c in RACE_COLUMNS),
+        )
+        .join(Race, Entry.race_id == Race.race_id)
+        .where(Entry.result.isnot(None))
+    )
+    if race_ids is not None:
+        stmt = stmt.where(Entry.race_id.in_(race_ids))
+    return stmt
+
+
+def _to_row(row, refreshed_at) -> dict:
+    values = dict(row._mapping)
+    values["first_corner"], values["last_corner"] = parse_corners(values["corner_position"])
+    values["pace_first"], values["pace_second"] = parse_pace(values["pace"])
+    values["refreshed_at"] = refreshed_at
+    return values
+
+
+def refresh_entry_history(
+    db: Session,
+    race_ids: Optional[Iterable[str]] = None,
+    batch_size: int = REBUILD_BATCH_SIZE,
+    progress_callback: Optional[callable] = None,
+) -> int:
+    """
+    entry_history を再作成
+
+    Args:
+        db: データベースセッション
+        race_ids: 対象レース（Noneなら全件を作り直す）
+        batch_size: 一度に書き込む行数
+        progress_callback: 進捗コールバック (current, total, message)
+
+    Returns:
+        書き込んだ行数
+    """
+    if race_ids is not None:
+        race_ids = list(set(race_ids))
+        if not race_ids:
+            return 0
+
+    stmt = delete(EntryHistory)
+    if race_ids is not None:
+        stmt = stmt.where(EntryHistory.race_id.in_(race_ids))
+    db.execute(stmt)
+
+    total = 0
+    if progress_callback:
+        total = db.scalar(select(func.count()).select_from(_history_stmt(race_ids).subquery()))
+        progress_callback(0, total, "Rebuilding entry history")
+
+    refreshed_at = utcnow()
+    written = 0
+    batch: list[dict] = []
+    for row in db.execute(_history_stmt(race_ids).execution_options(yield_per=batch_size)):
+        batch.append(_to_row(row, refreshed_at))
+        if len(batch) >= batch_size:
+            db.execute(insert(EntryHistory), batch)
+            written += len(batch)
+            batch = []
+            if progress_callback:
+                progress_callback(written, total, "Rebuilding entry history")
+    if batch:
+        db.execute(insert(EntryHistory), batch)
+        written += len(batch)
+    db.commit()
+    if progress_callback:
+        progress_callback(written, total, "Entry history rebuilt")
+
+    # 全件再作成後は (horse_id, date) 順に物理的に並べ直す
+    if race_ids is None and db.get_bind().dialect.name == "postgresql":
+        db.execute(text("CLUSTER entry_history USING ix_entry_history_horse_date"))
+        db.execute(text("ANALYZE entry_history"))
+        db.commit()
+
+    logger.info(f"Refreshed entry history: {written} rows")
+    return written
+
+
+def refresh_entry_history_for_races(db: Session, race_ids: Iterable[str]) -> int:
+    """結果を取り込んだレースの entry_history を再作成（FEATURE_HISTORY_TABLE 無効時は何もしない）"""
+    if not settings.FEATURE_HISTORY_TABLE:
+        return 0
+    return refresh_entry_history(db, race_ids)
+
+
+def history_sources() -> tuple[type, type]:
+    """
+    過去成績の読み出し元
+
+    Returns:
+        (出走の列を持つエンティティ, レースの列を持つエンティティ)。
+        FEATURE_HISTORY_TABLE が有効なら両方とも EntryHistory
+    """
+    if settings.FEATURE_HISTORY_TABLE:
+        return EntryHistory, EntryHistory
+    return Entry, Race
+
+
+def join_races(stmt, entity: type):
+    """出走の読み出し元が entries ならレースを結合する"""
+    if entity is Entry:
+        return stmt.join(Race)
+    return stmt
@@ -0,0 +1,159 @@
+"""
+進捗イベントのpub/sub（SSE用）
+
+チャンネル（"retrain" などのジョブ種別、ジョブごとの "job:<id>"、"sync"）ごとに
+連番のidを付けてイベントを配信する。
+
+- publish はどのスレッドからでも呼べる。購読者への配信はイベントループ上で行うので、
+  購読者（SSE接続）ごとにスレッドを使わない
+- 購読者ごとのバッファは SSE_SUBSCRIBER_BUFFER 件まで。進捗の途中経過は新しいもので
+  置き換え、溢れた場合も complete / error / cancelled は捨てない
+- チャンネルごとに直近 SSE_CHANNEL_HISTORY 件を保持し、Last-Event-ID 以降を再送する
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Optional
+
+from app.config import settings
+
+# ストリームを終了するイベント
+TERMINAL_TYPES = frozenset({"complete", "error", "cancelled"})
+
+# 途中経過を表すイベント（未配信の同じ種類のイベントは最新の1件にまとめる）
+COALESCE_TYPES = frozenset({"status", "data_progress"})
+
+# (id, イベント)
+Item = tuple[int, dict]
+
+
+class Subscription:
+    """1つのSSE接続の受信バッファ（イベントループ上でのみ操作する）"""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.maxsize = maxsize
+        self.coalesced = 0
+        self._buffer: deque[Item] = deque()
+        self._ready = asyncio.Event()
+
+    def push(self, item: Item) -> None:
+        event_type = item[1].get("type")
+        if event_type in COALESCE_TYPES:
+            self._remove_first(lambda queued: queued.get("type") == event_type)
+        if len(self._buffer) >= self.maxsize:
+            self._remove_first(lambda queued: queued.get("type") not in TERMINAL_TYPES)
+        self._buffer.append(item)
+        self._ready.set()
+
+    def _remove_first(self, predicate) -> None:
+        for i, (_, queued) in enumerate(self._buffer):
+            if predicate(queued):
+                del self._buffer[i]
+                self.coalesced += 1
+                return
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Item]:
+        """次のイベント（timeout 秒以内に届かなければNone）"""
+        while not self._buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._buffer.popleft()
+
+
+class EventBroker:
+    """チャンネルごとのイベント配信"""
+
+    def __init__(self, history_size: int, buffer_size: int):
+        self.history_size = history_size
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._history: dict[str, deque[Item]] = {}
+        self._next_id: dict[str, int] = {}
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(self, channel: str, event: dict) -> int:
+        """イベントを配信してidを返す（どのスレッドからでも呼べる）"""
+        with self._lock:
+            event_id = self._next_id.get(channel, 0) + 1
+            self._next_id[channel] = event_id
+            item = (event_id, event)
+            self._history.setdefault(channel, deque(maxlen=self.history_size)).append(item)
+            subscribers = list(self._subscribers.get(channel, ()))
+            loop = self._loop
+
+        if subscribers and loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self._deliver(subscribers, item)
+            else:
+                loop.call_soon_threadsafe(self._deliver, subscribers, item)
+        return event_id
+
+    @staticmethod
+    def _deliver(subscribers: list[Subscription], item: Item) -> None:
+        for subscription in subscribers:
+            subscription.push(item)
+
+    def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        チャンネルを購読（イベントループ上で呼ぶ）
+
+        Args:
+            channel: チャンネル名
+            last_event_id: 受信済みの最後のid。指定するとそれ以降の保持分を再送する
+        """
+        subscription = Subscription(channel, self.buffer_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.setdefault(channel, set()).add(subscription)
+            replay = [
+                item for item in self._history.get(channel, ())
+                if last_event_id is not None and item[0] > last_event_id
+            ]
+        for item in replay:
+            subscription.push(item)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def history(self, channel: str, after: int = 0) -> list[Item]:
+        """保持しているイベント（id が after より後）"""
+        with self._lock:
+            return [item for item in self._history.get(channel, ()) if item[0] > after]
+
+    def clear(self) -> None:
+        """保持しているイベントを破棄（テスト用）"""
+        with self._lock:
+            self._history.clear()
+            self._next_id.clear()
+
+
+broker = EventBroker(settings.SSE_CHANNEL_HISTORY, settings.SSE_SUBSCRIBER_BUFFER)
+
+
+def job_channel(job_id: int) -> str:
+    """ジョブごとのチャンネル名"""
+    return f"job:{job_id}"
@@ -3,18 +3,26 @@
 
 馬・騎手・調教師の特徴量を事前計算してSupabase DBに保存する。
 Google Colabからの当日予想で使用する。
+
+同期時は entries⨝races を1回だけ読み込み、pandasのgroupbyで
+全馬・全騎手の特徴量をまとめて計算してからバッチでupsertする。
+compute_horse_features / compute_jockey_features は1件ずつ計算する参照実装。
 """
 import logging
+import time
 from datetime import date, datetime
 from typing import Optional
 import numpy as np
+import pandas as pd
 
 from sqlalchemy import select, func, text
 from sqlalchemy.orm import Session
 
-from app.db.session import SessionLocal
+from app.db.session import BatchSessionLocal
 from app.models import Horse, Jockey, Entry, Race
 from app.config import settings
+from app.services.entry_history_service import history_sources, join_races
+from app.services.sync_service import upsert_in_batches
 
 logger = logging.getLogger(__name__)
 
@@ -267,83 +275,426 @@ def _encode_sex(sex: Optional[str]) -> Optional[int]:
     return None
 
 
-def sync_horse_features_to_supabase(
-    db: Session,
-    limit: Optional[int] = None,
-    progress_callback: Optional[callable] = None,
-) -> dict:
+# ==================== 一括スナップショット ====================
+
+# Supabaseの horse_features / jockey_features の列（INTEGER列は整数で送る）
+HORSE_FEATURE_COLUMNS = [
+    "horse_id", "horse_age", "horse_sex",
+    "avg_rank_last3", "avg_rank_last5", "avg_rank_last10", "avg_rank_all",
+    "prize_3races", "prize_5races", "prize_10races",
+    "win_rate", "place_rate", "show_rate", "best_rank", "total_runs",
+    "days_since_last", "last_result", "avg_last3f", "best_last3f",
+    "turf_win_rate", "turf_show_rate", "turf_runs",
+    "dirt_win_rate", "dirt_show_rate", "dirt_runs",
+    "short_win_rate", "short_show_rate", "short_runs",
+    "mile_win_rate", "mile_show_rate", "mile_runs",
+    "middle_win_rate", "middle_show_rate", "middle_runs",
+    "long_win_rate", "long_show_rate", "long_runs",
+    "running_style", "avg_first_corner", "avg_last_corner", "position_up_avg",
+    "escape_rate", "front_rate", "stalker_rate", "closer_rate",
+    "avg_pace_first", "avg_pace_second", "avg_pace_diff", "pace_consistency",
+    "high_pop_win_rate", "high_pop_show_rate", "high_pop_runs",
+    "mid_pop_win_rate", "mid_pop_show_rate", "mid_pop_runs",
+    "low_pop_win_rate", "low_pop_show_rate", "low_pop_runs",
+    "avg_odds_when_win",
+]
+HORSE_INTEGER_COLUMNS = {
+    "horse_age", "horse_sex", "best_rank", "total_runs", "days_since_last",
+    "last_result", "turf_runs", "dirt_runs", "short_runs", "mile_runs",
+    "middle_runs", "long_runs", "running_style",
+    "high_pop_runs", "mid_pop_runs", "low_pop_runs",
+}
+JOCKEY_FEATURE_COLUMNS = [
+    "jockey_id", "total_rides", "total_wins", "win_rate", "place_rate", "show_rate",
+]
+JOCKEY_INTEGER_COLUMNS = {"total_rides", "total_wins"}
+
+DISTANCE_BANDS = [("short", 0, 1400), ("mile", 1401, 1800), ("middle", 1801, 2200), ("long", 2201, 9999)]
+POPULARITY_BANDS = [("high_pop", 1, 3), ("mid_pop", 4, 6), ("low_pop", 7, 99)]
+TRACK_TYPES = [("turf", "芝"), ("dirt", "ダート")]
+
+
+def load_history_frame(db: Session) -> pd.DataFrame:
+    """着順のある全出走履歴を1クエリで読み込む（entry_history 有効時は単一テーブル）"""
+    E, R = history_sources()
+    stmt = (
+        join_races(select(
+            E.horse_id,
+            E.jockey_id,
+            E.result,
+            E.prize_money,
+            E.last_3f,
+            E.corner_position,
+            E.pace,
+            E.popularity,
+            E.odds,
+            R.date,
+            R.track_type,
+            R.distance,
+        ), E)
+        .where(E.result.isnot(None))
+    )
+    columns = [
+        "horse_id", "jockey_id", "result", "prize_money", "last_3f",
+        "corner_position", "pace", "popularity", "odds",
+        "date", "track_type", "distance",
+    ]
+    frame = pd.DataFrame(db.execute(stmt).all(), columns=columns)
+    frame["date"] = pd.to_datetime(frame["date"])
+    for column in ["result", "prize_money", "last_3f", "popularity", "odds", "distance"]:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    return frame
+
+
+def _truthy(series: pd.Series) -> pd.Series:
+    """Pythonの真偽判定（None・0を偽）と同じマスク"""
+    return series.notna() & (series != 0)
+
+
+def _rates(results: pd.Series, keys: pd.Series) -> tuple[pd.Series, pd.Series, pd.Series]:
+    """着順から (勝率, 連対率, 複勝率) をキーごとに計算"""
+    return (
+        (results == 1).groupby(keys).mean(),
+        (results <= 2).groupby(keys).mean(),
+        (results <= 3).groupby(keys).mean(),
+    )
+
+
+def _parse_corner_positions(value) -> Optional[list[int]]:
+    """通過順 ("3-3-2-1") を数値リストに変換"""
+    if not value:
+        return None
+    try:
+        positions = [int(p) for p in value.replace(" ", "-").split("-") if p.strip().isdigit()]
+    except ValueError:
+        return None
+    return positions or None
+
+
+def _parse_pace(value) -> Optional[tuple[float, float]]:
+    """ペース ("35.1-36.0") を (前半, 後半) に変換"""
+    if not value:
+        return None
+    parts = value.split("-")
+    if len(parts) < 2:
+        return None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+
+def build_horse_features(
+    history: pd.DataFrame,
+    horses: pd.DataFrame,
+    horse_ids: list[str],
+    as_of_date: Optional[date] = None,
+) -> pd.DataFrame:
     """
-    全馬の特徴量をSupabaseに同期
+    全馬の特徴量をgroupbyでまとめて計算（compute_horse_featuresと同じ定義）
 
     Args:
-        db: データベースセッション
-        limit: 処理する馬の上限数
-        progress_callback: 進捗コールバック (current, total, message)
+        history: load_history_frameの結果
+        horses: horse_id, birth_year, sex を持つ馬情報
+        horse_ids: 対象の馬ID
+        as_of_date: 基準日（指定しない場合は現在）
 
     Returns:
-        同期結果
+        horse_idをインデックスとした特徴量（HORSE_FEATURE_COLUMNS）
     """
-    supabase = get_supabase_client()
-    if not supabase:
-        return {"status": "error", "message": "Supabase not configured"}
+    if as_of_date is None:
+        as_of_date = date.today()
+    as_of = pd.Timestamp(as_of_date)
+
+    df = history[history["horse_id"].isin(horse_ids) & (history["date"] < as_of)]
+    # 直近の出走から順に並べる
+    df = df.sort_values(["horse_id", "date"], ascending=[True, False], kind="stable")
+    df = df.assign(nth=df.groupby("horse_id").cumcount())
+    key = df["horse_id"]
+
+    out = pd.DataFrame(index=pd.Index(horse_ids, name="horse_id"), columns=HORSE_FEATURE_COLUMNS[1:], dtype=object)
+    has_history = pd.Index(key.unique())
+
+    def put(column: str, values: pd.Series):
+        out[column] = values.reindex(out.index)
+
+    def counts(mask: pd.Series) -> pd.Series:
+        """対象履歴のある馬について件数（0件を含む）"""
+        return mask.groupby(key).sum().reindex(has_history, fill_value=0)
+
+    # 基本情報（履歴のある馬のみ）
+    info = horses.set_index("horse_id").reindex(has_history).dropna(how="all")
+    birth_year = pd.to_numeric(info["birth_year"], errors="coerce")
+    put("horse_age", (as_of_date.year - birth_year).where(_truthy(birth_year)))
+    put("horse_sex", info["sex"].map({"牡": 1, "牝": 2, "セ": 3}))
+
+    # 過去成績
+    ranked_mask = _truthy(df["result"])
+    ranked = df[ranked_mask]
+    ranked_nth = ranked.groupby("horse_id").cumcount()
+    runs = ranked.groupby("horse_id").size()
+    put("total_runs", counts(ranked_mask))
+    put("avg_rank_last3", ranked[ranked_nth < 3].groupby("horse_id")["result"].mean())
+    put("avg_rank_last5", ranked[ranked_nth < 5].groupby("horse_id")["result"].mean()[runs >= 3])
+    put("avg_rank_last10", ranked[ranked_nth < 10].groupby("horse_id")["result"].mean()[runs >= 5])
+    put("avg_rank_all", ranked.groupby("horse_id")["result"].mean())
+    put("best_rank", ranked.groupby("horse_id")["result"].min())
+    win, place, show = _rates(ranked["result"], ranked["horse_id"])
+    put("win_rate", win)
+    put("place_rate", place)
+    put("show_rate", show)
 
-    # アクティブな馬を取得（直近1年以内に出走）
+    # 賞金
+    prizes = df[_truthy(df["prize_money"])]
+    prize_nth = prizes.groupby("horse_id").cumcount()
+    for n in (3, 5, 10):
+        put(f"prize_{n}races", prizes[prize_nth < n].groupby("horse_id")["prize_money"].sum())
+
+    # 前走情報
+    last = df[df["nth"] == 0].set_index("horse_id")
+    put("last_result", last["result"])
+    put("days_since_last", (as_of - last["date"]).dt.days)
+
+    # 上がり3F
+    last3f = df[_truthy(df["last_3f"])]
+    last3f_nth = last3f.groupby("horse_id").cumcount()
+    put("avg_last3f", last3f[last3f_nth < 10].groupby("horse_id")["last_3f"].mean())
+    put("best_last3f", last3f.groupby("horse_id")["last_3f"].min())
+
+    # コース適性（芝/ダート）: その馬場の出走がある馬のみ
+    for prefix, track_type in TRACK_TYPES:
+        on_track = df["track_type"] == track_type
+        track_ranked = df[on_track & ranked_mask]
+        put(f"{prefix}_runs", (on_track & ranked_mask).groupby(key).sum()[on_track.groupby(key).any()])
+        win, _, show = _rates(track_ranked["result"], track_ranked["horse_id"])
+        put(f"{prefix}_win_rate", win)
+        put(f"{prefix}_show_rate", show)
+
+    # 距離適性: 着順のある出走数（無ければ出走数）
+    for prefix, min_dist, max_dist in DISTANCE_BANDS:
+        in_band = _truthy(df["distance"]) & df["distance"].between(min_dist, max_dist)
+        band_ranked = df[in_band & ranked_mask]
+        ranked_runs = counts(in_band & ranked_mask)
+        put(f"{prefix}_runs", ranked_runs.where(ranked_runs > 0, counts(in_band)))
+        win, _, show = _rates(band_ranked["result"], band_ranked["horse_id"])
+        put(f"{prefix}_win_rate", win)
+        put(f"{prefix}_show_rate", show)
+
+    # 脚質（直近20走）
+    recent = df[df["nth"] < 20]
+    corners = recent["corner_position"].map(_parse_corner_positions, na_action="ignore").dropna()
+    if not corners.empty:
+        corner_key = recent.loc[corners.index, "horse_id"]
+        first = corners.str[0].astype(float)
+        last_corner = corners.str[-1].astype(float)
+        avg_first = first.groupby(corner_key).mean()
+        put("avg_first_corner", avg_first)
+        put("avg_last_corner", last_corner.groupby(corner_key).mean())
+        put("position_up_avg", (first - last_corner).groupby(corner_key).mean())
+
+        style = pd.Series(
+            np.select([avg_first <= 3, avg_first <= 6, avg_first <= 10], [1, 2, 3], default=4),
+            index=avg_first.index,
+        )
+        put("running_style", style)
+        put("escape_rate", (first <= 2).groupby(corner_key).mean()[style == 1])
+        put("front_rate", (first <= 4).groupby(corner_key).mean())
+        put("stalker_rate", first.between(3, 6).groupby(corner_key).mean())
+        put("closer_rate", (first >= 7).groupby(corner_key).mean())
+
+    # ペース（直近20走）
+    paces = recent["pace"].map(_parse_pace, na_action="ignore").dropna()
+    if not paces.empty:
+        pace_key = recent.loc[paces.index, "horse_id"]
+        pace_first = paces.str[0]
+        pace_second = paces.str[1]
+        put("avg_pace_first", pace_first.groupby(pace_key).mean())
+        put("avg_pace_second", pace_second.groupby(pace_key).mean())
+        put("avg_pace_diff", (pace_second - pace_first).groupby(pace_key).mean())
+        pace_std = pace_first.groupby(pace_key).std(ddof=0)
+        put("pace_consistency", pace_std[pace_first.groupby(pace_key).size() > 1])
+
+    # 人気別成績: 出走数は着順の有無によらない
+    for prefix, min_pop, max_pop in POPULARITY_BANDS:
+        in_band = _truthy(df["popularity"]) & df["popularity"].between(min_pop, max_pop)
+        band_ranked = df[in_band & ranked_mask]
+        put(f"{prefix}_runs", counts(in_band))
+        win, _, show = _rates(band_ranked["result"], band_ranked["horse_id"])
+        put(f"{prefix}_win_rate", win)
+        put(f"{prefix}_show_rate", show)
+
+    # 勝利時の平均オッズ
+    wins = df[(df["result"] == 1) & _truthy(df["odds"])]
+    put("avg_odds_when_win", wins.groupby("horse_id")["odds"].mean())
+
+    return out
+
+
+def build_jockey_features(history: pd.DataFrame, jockey_ids: list[str]) -> pd.DataFrame:
+    """全騎手の特徴量をgroupbyでまとめて計算（compute_jockey_featuresと同じ定義）"""
+    df = history[history["jockey_id"].isin(jockey_ids)]
+    key = df["jockey_id"]
+    has_history = pd.Index(key.unique())
+
+    out = pd.DataFrame(index=pd.Index(jockey_ids, name="jockey_id"), columns=JOCKEY_FEATURE_COLUMNS[1:], dtype=object)
+    ranked_mask = _truthy(df["result"])
+    ranked = df[ranked_mask]
+
+    out["total_rides"] = ranked_mask.groupby(key).sum().reindex(has_history, fill_value=0).reindex(out.index)
+    out["total_wins"] = (ranked["result"] == 1).groupby(ranked["jockey_id"]).sum() \
+        .reindex(has_history, fill_value=0).reindex(out.index)
+    win, place, show = _rates(ranked["result"], ranked["jockey_id"])
+    out["win_rate"] = win.reindex(out.index)
+    out["place_rate"] = place.reindex(out.index)
+    out["show_rate"] = show.reindex(out.index)
+    return out
+
+
+def _to_records(features: pd.DataFrame, integer_columns: set[str], updated_at: str) -> list[dict]:
+    """特徴量をupsert用の行に変換（NaN -> None, 整数列は int）"""
+    records = []
+    for record in features.reset_index().to_dict("records"):
+        row = {}
+        for k, v in record.items():
+            if v is None or (not isinstance(v, str) and pd.isna(v)):
+                row[k] = None
+            elif k in integer_columns:
+                row[k] = int(v)
+            elif isinstance(v, (np.floating, np.integer, float, int)) and not isinstance(v, bool):
+                row[k] = float(v) if np.isfinite(v) else None
+            else:
+                row[k] = v
+        row["updated_at"] = updated_at
+        records.append(row)
+    return records
+
+
+def _active_ids(db: Session, column, limit: Optional[int]) -> list[str]:
+    """直近1年以内に出走した馬・騎手のID"""
     one_year_ago = date.today().replace(year=date.today().year - 1)
     stmt = (
-        select(Entry.horse_id)
+        select(column)
         .join(Race, Entry.race_id == Race.race_id)
         .where(Race.date >= one_year_ago)
-        .where(Entry.horse_id.isnot(None))
+        .where(column.isnot(None))
         .distinct()
     )
-
     if limit:
         stmt = stmt.limit(limit)
+    return [r[0] for r in db.execute(stmt).all()]
 
-    horse_ids = [r[0] for r in db.execute(stmt).all()]
-    total = len(horse_ids)
 
-    logger.info(f"Syncing features for {total} horses")
+def build_feature_snapshot(
+    db: Session,
+    limit: Optional[int] = None,
+    as_of_date: Optional[date] = None,
+    history: Optional[pd.DataFrame] = None,
+) -> dict:
+    """
+    アクティブな全馬・全騎手の特徴量スナップショットを作成
 
-    synced = 0
-    errors = 0
+    Args:
+        db: データベースセッション
+        limit: 処理する馬・騎手の上限数
+        as_of_date: 基準日（指定しない場合は現在）
+        history: 読み込み済みの出走履歴（省略時はDBから読み込む）
 
-    for i, horse_id in enumerate(horse_ids):
-        try:
-            if progress_callback and i % 100 == 0:
-                progress_callback(i, total, f"Processing horse {horse_id}")
+    Returns:
+        {"horse_features": [...], "jockey_features": [...], "timings": {フェーズ: 秒}}
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    horse_ids = _active_ids(db, Entry.horse_id, limit)
+    jockey_ids = _active_ids(db, Entry.jockey_id, limit)
+    if history is None:
+        history = load_history_frame(db)
+    horses = pd.DataFrame(
+        db.execute(select(Horse.horse_id, Horse.birth_year, Horse.sex)).all(),
+        columns=["horse_id", "birth_year", "sex"],
+    )
+    timings["load"] = time.perf_counter() - started
 
-            features = compute_horse_features(db, horse_id)
+    updated_at = datetime.now().isoformat()
 
-            # Noneをnullに変換、numpy型をPython型に変換
-            clean_features = {}
-            for k, v in features.items():
-                if v is None:
-                    clean_features[k] = None
-                elif isinstance(v, (np.floating, np.integer)):
-                    clean_features[k] = float(v) if np.isfinite(v) else None
-                else:
-                    clean_features[k] = v
+    started = time.perf_counter()
+    horse_features = _to_records(
+        build_horse_features(history, horses, horse_ids, as_of_date),
+        HORSE_INTEGER_COLUMNS,
+        updated_at,
+    )
+    timings["horse_features"] = time.perf_counter() - started
 
-            clean_features["updated_at"] = datetime.now().isoformat()
+    started = time.perf_counter()
+    jockey_features = _to_records(
+        build_jockey_features(history, jockey_ids),
+        JOCKEY_INTEGER_COLUMNS,
+        updated_at,
+    )
+    timings["jockey_features"] = time.perf_counter() - started
 
-            # Upsert
-            supabase.table("horse_features").upsert(
-                clean_features,
-                on_conflict="horse_id"
-            ).execute()
+    logger.info(
+        f"Feature snapshot: {len(horse_features)} horses, {len(jockey_features)} jockeys "
+        f"from {len(history)} entries ({timings})"
+    )
+    return {
+        "horse_features": horse_features,
+        "jockey_features": jockey_features,
+        "timings": timings,
+    }
 
-            synced += 1
 
-        except Exception as e:
-            logger.error(f"Error syncing horse {horse_id}: {e}")
-            errors += 1
+def _upload(supabase, table: str, rows: list[dict], key: str, batch_size: Optional[int]) -> dict:
+    """特徴量をバッチでupsertして結果を返す"""
+    started = time.perf_counter()
+    synced, failed = upsert_in_batches(supabase, table, rows, key, batch_size)
+    return {
+        "synced": synced,
+        "errors": len(failed),
+        "failed_ids": failed,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def sync_horse_features_to_supabase(
+    db: Session,
+    limit: Optional[int] = None,
+    progress_callback: Optional[callable] = None,
+    batch_size: Optional[int] = None,
+) -> dict:
+    """
+    全馬の特徴量をSupabaseに同期
+
+    Args:
+        db: データベースセッション
+        limit: 処理する馬の上限数
+        progress_callback: 進捗コールバック (current, total, message)
+        batch_size: 1リクエストでupsertする行数
+
+    Returns:
+        同期結果
+    """
+    supabase = get_supabase_client()
+    if not supabase:
+        return {"status": "error", "message": "Supabase not configured"}
+
+    snapshot = build_feature_snapshot(db, limit)
+    rows = snapshot["horse_features"]
+    total = len(rows)
+    logger.info(f"Syncing features for {total} horses")
+
+    if progress_callback:
+        progress_callback(0, total, "Uploading horse features")
+    upload = _upload(supabase, "horse_features", rows, "horse_id", batch_size)
+    if progress_callback:
+        progress_callback(total, total, "Horse features uploaded")
 
     result = {
         "status": "success",
         "total_horses": total,
-        "synced": synced,
-        "errors": errors,
+        "synced": upload["synced"],
+        "errors": upload["errors"],
+        "timings": {**snapshot["timings"], "upload": upload["seconds"]},
     }
 
     logger.info(f"Feature sync complete: {result}")
@@ -353,81 +704,73 @@ def sync_horse_features_to_supabase(
 def sync_jockey_features_to_supabase(
     db: Session,
     limit: Optional[int] = None,
+    batch_size: Optional[int] = None,
 ) -> dict:
     """全騎手の特徴量をSupabaseに同期"""
     supabase = get_supabase_client()
     if not supabase:
         return {"status": "error", "message": "Supabase not configured"}
 
-    # アクティブな騎手を取得
-    one_year_ago = date.today().replace(year=date.today().year - 1)
-    stmt = (
-        select(Entry.jockey_id)
-        .join(Race, Entry.race_id == Race.race_id)
-        .where(Race.date >= one_year_ago)
-        .where(Entry.jockey_id.isnot(None))
-        .distinct()
-    )
-
-    if limit:
-        stmt = stmt.limit(limit)
-
-    jockey_ids = [r[0] for r in db.execute(stmt).all()]
-    total = len(jockey_ids)
-
-    logger.info(f"Syncing features for {total} jockeys")
-
-    synced = 0
-    errors = 0
-
-    for jockey_id in jockey_ids:
-        try:
-            features = compute_jockey_features(db, jockey_id)
-
-            clean_features = {}
-            for k, v in features.items():
-                if v is None:
-                    clean_features[k] = None
-                elif isinstance(v, (np.floating, np.integer)):
-                    clean_features[k] = float(v) if np.isfinite(v) else None
-                else:
-                    clean_features[k] = v
-
-            clean_features["updated_at"] = datetime.now().isoformat()
-
-            supabase.table("jockey_features").upsert(
-                clean_features,
-                on_conflict="jockey_id"
-            ).execute()
-
-            synced += 1
-
-        except Exception as e:
-            logger.error(f"Error syncing jockey {jockey_id}: {e}")
-            errors += 1
+    snapshot = build_feature_snapshot(db, limit)
+    rows = snapshot["jockey_features"]
+    logger.info(f"Syncing features for {len(rows)} jockeys")
+    upload = _upload(supabase, "jockey_features", rows, "jockey_id", batch_size)
 
     return {
         "status": "success",
-        "total_jockeys": total,
-        "synced": synced,
-        "errors": errors,
+        "total_jockeys": len(rows),
+        "synced": upload["synced"],
+        "errors": upload["errors"],
+        "timings": {**snapshot["timings"], "upload": upload["seconds"]},
     }
 
 
 def sync_all_features(
     limit: Optional[int] = None,
     progress_callback: Optional[callable] = None,
+    batch_size: Optional[int] = None,
 ) -> dict:
-    """全特徴量を同期（馬 + 騎手）"""
-    db = SessionLocal()
+    """
+    全特徴量を同期（馬 + 騎手）
+
+    出走履歴の読み込みと特徴量計算は1回だけ行い、両テーブルにバッチでupsertする。
+    """
+    supabase = get_supabase_client()
+    if not supabase:
+        return {"status": "error", "message": "Supabase not configured"}
+
+    db = BatchSessionLocal()
     try:
-        horse_result = sync_horse_features_to_supabase(db, limit, progress_callback)
-        jockey_result = sync_jockey_features_to_supabase(db, limit)
-
-        return {
-            "status": "success",
-            "horse_features": horse_result,
-            "jockey_features": jockey_result,
-        }
+        snapshot = build_feature_snapshot(db, limit)
     finally:
         db.close()
+
+    horse_rows = snapshot["horse_features"]
+    jockey_rows = snapshot["jockey_features"]
+    if progress_callback:
+        progress_callback(0, len(horse_rows), "Uploading features")
+
+    horse_upload = _upload(supabase, "horse_features", horse_rows, "horse_id", batch_size)
+    jockey_upload = _upload(supabase, "jockey_features", jockey_rows, "jockey_id", batch_size)
+
+    timings = {
+        **snapshot["timings"],
+        "upload_horse_features": horse_upload["seconds"],
+        "upload_jockey_features": jockey_upload["seconds"],
+    }
+    result = {
+        "status": "success",
+        "horse_features": {
+            "total_horses": len(horse_rows),
+            "synced": horse_upload["synced"],
+            "errors": horse_upload["errors"],
+        },
+        "jockey_features": {
+            "total_jockeys": len(jockey_rows),
+            "synced": jockey_upload["synced"],
+            "errors": jockey_upload["errors"],
+        },
+        "timings": timings,
+    }
+    logger.info(f"Feature sync complete: {result}")
+    return result
@@ -0,0 +1,529 @@
+"""
+ジョブランナー
+
+再学習・シミュレーション・閾値スイープ・一括補完・特徴量同期を
+APIとは別のワーカープロセス（python -m app.worker <job_id>）で実行する。
+学習や特徴量計算がリクエスト処理とGIL・CPUを取り合わないようにし、
+ジョブの状態は jobs テーブルに残るのでAPIを再起動しても追跡できる。
+
+- ワーカー: 対象関数を実行し、SharedStatus の変更を jobs.state に、
+  emit_event のイベントを job_events に書き込む。書き込みのたびに
+  キャンセル要求を確認し、要求があれば JobCancelled で処理を打ち切る
+- APIプロセス: モニタースレッドが job_events / jobs.state を読み出し、
+  SharedStatus に反映して event_broker の種別チャンネルとジョブごとのチャンネルへ配信する
+  （状態の変化は "status" イベント、終了は complete / error / cancelled）。
+  キャンセル要求後 JOB_CANCEL_GRACE_SECONDS 以内に止まらないワーカーは終了させる
+"""
+import importlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.base import BatchSessionLocal
+from app.logging_config import get_logger
+from app.models import Job, JobEvent
+from app.services.event_broker import TERMINAL_TYPES, broker, job_channel
+from app.models.job import (
+    JOB_ACTIVE_STATUSES,
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    utcnow,
+)
+
+logger = get_logger(__name__)
+
+# python -m app.worker を実行するディレクトリ（backend/）
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# 名前 -> SharedStatus（名前はジョブ種別と同じ）
+_shared: dict[str, "SharedStatus"] = {}
+
+
+class JobCancelled(BaseException):
+    """キャンセル要求によるジョブの打ち切り（対象関数の except Exception で握りつぶされない）"""
+
+
+def _json_default(value: Any):
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # numpy のスカラー
+        return value.item()
+    return str(value)
+
+
+def to_jsonable(value: Any) -> Any:
+    """JSON列に保存できる値に変換"""
+    return json.loads(json.dumps(value, default=_json_default))
+
+
+class SharedStatus(dict):
+    """
+    ワーカーとAPIで共有する進捗dict
+
+    ワーカーでの変更は jobs.state に書き込まれ、APIプロセスの同名のインスタンスに反映される。
+    ワーカー外では通常のdictとして動く。
+    """
+
+    def __init__(self, name: str, initial: dict):
+        super().__init__(initial)
+        self.name = name
+        _shared[name] = self
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        if _context is not None:
+            _context.state_changed(self)
+
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        if _context is not None:
+            _context.state_changed(self)
+
+
+def _progress_of(state: dict, fallback: Optional[float]) -> Optional[float]:
+    """進捗dictから0-100の進捗率を推定"""
+    progress, total = state.get("progress"), state.get("total")
+    if isinstance(progress, (int, float)) and isinstance(total, (int, float)) and total > 0:
+        return round(100.0 * progress / total, 1)
+    return fallback
+
+
+class JobContext:
+    """ワーカープロセスで実行中のジョブ"""
+
+    def __init__(self, job_id: int, db: Session):
+        self.job_id = job_id
+        self.db = db
+        self.progress: Optional[float] = None
+        self._dirty: set[str] = set()
+        self._last_flush = 0.0
+        self._cancelling = False
+
+    def state_changed(self, status: SharedStatus) -> None:
+        self._dirty.add(status.name)
+        if time.monotonic() - self._last_flush >= settings.JOB_STATE_FLUSH_SECONDS:
+            self.flush()
+
+    def emit(self, payload: dict) -> None:
+        if isinstance(payload.get("progress_percent"), (int, float)):
+            self.progress = float(payload["progress_percent"])
+        self.db.add(JobEvent(job_id=self.job_id, payload=to_jsonable(payload)))
+        self.flush()
+
+    def flush(self, check_cancel: bool = True) -> None:
+        """状態を書き込み、キャンセル要求を確認"""
+        job = self.db.get(Job, self.job_id)
+        if self._dirty:
+            state = dict(job.state or {})
+            for name in self._dirty:
+                state[name] = to_jsonable(dict(_shared[name]))
+                self.progress = _progress_of(state[name], self.progress)
+            job.state = state
+            self._dirty.clear()
+        job.progress = self.progress
+        self.db.commit()
+        self._last_flush = time.monotonic()
+
+        if check_cancel and not self._cancelling:
+            self.db.refresh(job, ["cancel_requested"])
+            if job.cancel_requested:
+                self._cancelling = True
+                raise JobCancelled()
+
+
+# ワーカープロセスで実行中のジョブ（APIプロセスではNone）
+_context: Optional[JobContext] = None
+
+
+def emit_event(payload: dict) -> bool:
+    """
+    実行中のジョブの進捗イベントを記録
+
+    Returns:
+        ワーカープロセス内ならTrue（APIプロセスでは何もせずFalse）
+    """
+    if _context is None:
+        return False
+    _context.emit(payload)
+    return True
+
+
+def current_job_id() -> Optional[int]:
+    """ワーカープロセスで実行中のジョブのid"""
+    return _context.job_id if _context is not None else None
+
+
+def _target_path(target: Callable) -> str:
+    return f"{target.__module__}:{target.__qualname__}"
+
+
+def _resolve(path: str) -> Callable:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# ==================== APIプロセス ====================
+
+# 起動したワーカー（終了コードの回収用）
+_processes: dict[int, subprocess.Popen] = {}
+# 監視中のジョブ -> 中継済みの最後のイベントid
+_watched: dict[int, int] = {}
+# キャンセル要求を検知した時刻
+_cancel_seen: dict[int, float] = {}
+# 配信済みの状態（変化したときだけ status イベントを送る）
+_state_seen: dict[int, dict] = {}
+# 終了イベントを配信済みのジョブ
+_terminal_sent: set[int] = set()
+_watch_lock = threading.Lock()
+_monitor_thread: Optional[threading.Thread] = None
+_monitor_stop = threading.Event()
+
+
+def active_job(db: Session, kind: str) -> Optional[Job]:
+    """同じ種別の実行中（待機中を含む）ジョブ"""
+    return db.execute(
+        select(Job)
+        .where(Job.kind == kind, Job.status.in_(JOB_ACTIVE_STATUSES))
+        .order_by(Job.id.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def get_job(db: Session, job_id: int) -> Optional[Job]:
+    return db.get(Job, job_id)
+
+
+def list_jobs(db: Session, kind: Optional[str] = None, limit: int = 20) -> list[Job]:
+    """新しい順にジョブを取得"""
+    stmt = select(Job)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    return list(db.execute(stmt.order_by(Job.id.desc()).limit(limit)).scalars().all())
+
+
+def submit_job(
+    db: Session,
+    kind: str,
+    target: Callable,
+    params: Optional[dict] = None,
+) -> Optional[Job]:
+    """
+    ジョブを登録してワーカープロセスを起動
+
+    Args:
+        db: データベースセッション
+        kind: ジョブ種別（同じ種別は同時に1つだけ）
+        target: ワーカーで実行するモジュールレベルの関数。params をキーワード引数で受け取る
+        params: JSONで保存できる引数
+
+    Returns:
+        登録したジョブ（同じ種別のジョブが実行中ならNone）
+    """
+    if active_job(db, kind) is not None:
+        return None
+
+    job = Job(kind=kind, target=_target_path(target), params=to_jsonable(params or {}))
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 他のAPIワーカーが同じ種別を先に登録した（jobs の部分一意インデックス）
+        db.rollback()
+        return None
+    launch(db, job)
+    return job
+
+
+def launch(db: Session, job: Job) -> None:
+    """待機中のジョブのワーカープロセスを起動"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.worker", str(job.id)],
+        cwd=BACKEND_DIR,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        # APIの再起動・Ctrl+C でワーカーを巻き込まない
+        start_new_session=True,
+    )
+    job.pid = process.pid
+    db.commit()
+    logger.info(f"Launched job {job.id} ({job.kind}) in worker pid={process.pid}")
+
+    with _watch_lock:
+        _processes[job.id] = process
+        _watched.setdefault(job.id, 0)
+    start_monitor()
+
+
+def request_cancel(db: Session, job_id: int) -> Optional[Job]:
+    """ジョブのキャンセルを要求（ワーカーが次に進捗を書き込む時点で止まる）"""
+    job = db.get(Job, job_id)
+    if job is None:
+        return None
+    if job.status in JOB_ACTIVE_STATUSES:
+        job.cancel_requested = True
+        db.commit()
+        with _watch_lock:
+            _watched.setdefault(job.id, 0)
+        start_monitor()
+    return job
+
+
+def _pid_alive(job: Job) -> bool:
+    process = _processes.get(job.id)
+    if process is not None:
+        return process.poll() is None
+    if not job.pid:
+        return False
+    try:
+        os.kill(job.pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def is_watched(job_id: int) -> bool:
+    """APIプロセスが監視中（未終了）のジョブか"""
+    with _watch_lock:
+        return job_id in _watched
+
+
+def _notify(job: Job, payload: dict) -> None:
+    payload = {**payload, "job_id": job.id}
+    broker.publish(job.kind, payload)
+    broker.publish(job_channel(job.id), payload)
+    if payload.get("type") in TERMINAL_TYPES:
+        _terminal_sent.add(job.id)
+
+
+def _finish_from_monitor(db: Session, job: Job, status: str, error: str) -> None:
+    """ワーカーが状態を書けずに終了したジョブを閉じる"""
+    db.refresh(job)
+    if job.status not in JOB_ACTIVE_STATUSES:
+        return
+    job.status = status
+    job.error = error
+    job.finished_at = utcnow()
+    db.commit()
+
+    shared = _shared.get(job.kind)
+    if shared is not None:
+        dict.__setitem__(shared, "is_running", False)
+        if "error" in shared:
+            dict.__setitem__(shared, "error", error)
+    _notify(job, {
+        "type": "cancelled" if status == JOB_CANCELLED else "error",
+        "step": status,
+        "message": error,
+        "timestamp": datetime.now().isoformat(),
+    })
+
+
+def poll_jobs(db: Session) -> int:
+    """
+    監視中のジョブのイベントと状態をAPIプロセスに反映
+
+    Returns:
+        まだ終了していない監視中のジョブ数
+    """
+    with _watch_lock:
+        watched = dict(_watched)
+
+    remaining = 0
+    for job_id, last_event_id in watched.items():
+        job = db.get(Job, job_id)
+        if job is None:
+            with _watch_lock:
+                _watched.pop(job_id, None)
+            continue
+        db.refresh(job)
+
+        events = db.execute(
+            select(JobEvent)
+            .where(JobEvent.job_id == job_id, JobEvent.id > last_event_id)
+            .order_by(JobEvent.id)
+        ).scalars().all()
+        for event in events:
+            _notify(job, event.payload)
+            last_event_id = event.id
+
+        state = job.state or {}
+        for name, snapshot in state.items():
+            shared = _shared.get(name)
+            if shared is not None:
+                dict.update(shared, snapshot)
+        # 終了イベントの後には途中経過を送らない
+        if state and state != _state_seen.get(job_id) and job_id not in _terminal_sent:
+            _state_seen[job_id] = state
+            _notify(job, {"type": "status", "progress_percent": job.progress, **state.get(job.kind, {})})
+
+        if job.status not in JOB_ACTIVE_STATUSES and job_id not in _terminal_sent:
+            _notify(job, {
+                "type": {JOB_COMPLETED: "complete", JOB_CANCELLED: "cancelled"}.get(job.status, "error"),
+                "step": job.status,
+                "progress_percent": job.progress,
+                "result": job.result,
+                "error": job.error,
+                "timestamp": datetime.now().isoformat(),
+            })
+
+        if job.status in JOB_ACTIVE_STATUSES:
+            if job.pid and not _pid_alive(job):
+                _finish_from_monitor(db, job, JOB_FAILED, "ワーカープロセスが異常終了しました")
+            elif job.cancel_requested:
+                seen = _cancel_seen.setdefault(job_id, time.monotonic())
+                if time.monotonic() - seen >= settings.JOB_CANCEL_GRACE_SECONDS:
+                    if job.pid and _pid_alive(job):
+                        os.kill(job.pid, signal.SIGTERM)
+                    _finish_from_monitor(db, job, JOB_CANCELLED, "ジョブがキャンセルされました")
+
+        with _watch_lock:
+            if job.status in JOB_ACTIVE_STATUSES:
+                _watched[job_id] = last_event_id
+                remaining += 1
+            else:
+                _watched.pop(job_id, None)
+                _cancel_seen.pop(job_id, None)
+                _state_seen.pop(job_id, None)
+                _terminal_sent.discard(job_id)
+                process = _processes.pop(job_id, None)
+                if process is not None:
+                    process.poll()
+    return remaining
+
+
+def recover_jobs(db: Session) -> None:
+    """
+    APIの起動時に未終了のジョブを引き継ぐ
+
+    - 実行中: ワーカーが生きていれば監視を再開、終了していれば失敗にする
+    - 待機中: ワーカーを起動する
+    """
+    jobs = db.execute(
+        select(Job).where(Job.status.in_(JOB_ACTIVE_STATUSES)).order_by(Job.id)
+    ).scalars().all()
+    for job in jobs:
+        if job.status == JOB_QUEUED and not job.pid:
+            launch(db, job)
+            continue
+        # 再起動前のイベントは中継しない
+        last_event_id = db.execute(
+            select(func.max(JobEvent.id)).where(JobEvent.job_id == job.id)
+        ).scalar() or 0
+        with _watch_lock:
+            _watched[job.id] = last_event_id
+        if not _pid_alive(job):
+            _finish_from_monitor(db, job, JOB_FAILED, "APIの再起動時にワーカーが見つかりませんでした")
+
+
+def _monitor_loop(recover: bool) -> None:
+    global _monitor_thread
+    db = BatchSessionLocal()
+    try:
+        if recover:
+            recover_jobs(db)
+        while not _monitor_stop.is_set():
+            if poll_jobs(db) == 0:
+                with _watch_lock:
+                    if not _watched:
+                        _monitor_thread = None
+                        return
+            _monitor_stop.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+    except Exception as e:
+        logger.error(f"Job monitor stopped: {e}")
+        with _watch_lock:
+            _monitor_thread = None
+    finally:
+        db.close()
+
+
+def start_monitor(recover: bool = False) -> None:
+    """モニタースレッドを起動（監視するジョブがなくなると終了する）"""
+    global _monitor_thread
+    with _watch_lock:
+        if _monitor_thread is not None and _monitor_thread.is_alive():
+            return
+        _monitor_stop.clear()
+        _monitor_thread = threading.Thread(
+            target=_monitor_loop, args=(recover,), name="job-monitor", daemon=True
+        )
+        _monitor_thread.start()
+
+
+def stop_monitor() -> None:
+    """モニタースレッドを停止（ワーカーはそのまま実行を続ける）"""
+    _monitor_stop.set()
+    thread = _monitor_thread
+    if thread is not None:
+        thread.join(timeout=5)
+
+
+# ==================== ワーカープロセス ====================
+
+
+def run_job(job_id: int) -> None:
+    """ジョブを現在のプロセスで実行（app.worker から呼ばれる）"""
+    global _context
+    db = BatchSessionLocal()
+    job = db.get(Job, job_id)
+    if job is None:
+        logger.error(f"Job {job_id} not found")
+        db.close()
+        return
+
+    job.status = JOB_RUNNING
+    job.pid = os.getpid()
+    job.started_at = utcnow()
+    db.commit()
+    logger.info(f"Running job {job.id} ({job.kind}): {job.target}")
+
+    context = JobContext(job_id, db)
+    _context = context
+    status, result, error = JOB_COMPLETED, None, None
+    try:
+        if job.cancel_requested:
+            raise JobCancelled()
+        value = _resolve(job.target)(**job.params)
+        result = to_jsonable(value if isinstance(value, dict) else {"value": value})
+    except JobCancelled:
+        status, error = JOB_CANCELLED, "ジョブがキャンセルされました"
+    except Exception as e:
+        logger.error(f"Job {job.id} failed: {e}")
+        status, error = JOB_FAILED, str(e)
+    finally:
+        _context = None
+
+    try:
+        if status == JOB_CANCELLED:
+            db.add(JobEvent(job_id=job_id, payload={
+                "type": "cancelled", "step": JOB_CANCELLED, "message": error,
+                "timestamp": datetime.now().isoformat(),
+            }))
+        context.flush(check_cancel=False)
+        job = db.get(Job, job_id)
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = utcnow()
+        if status == JOB_COMPLETED:
+            job.progress = 100.0
+        db.commit()
+        logger.info(f"Job {job.id} ({job.kind}) {status}")
+    finally:
+        db.close()
@@ -0,0 +1,281 @@
+"""
+モデルファイルの転送形式（圧縮・チェックサム・ローカルキャッシュ）
+
+アップロード・ダウンロードとも一時ファイル経由でストリーミングし、モデル全体をメモリに載せない。
+
+- アーティファクト: pickle を zstd で圧縮したファイル（zstandard が無い環境では gzip）
+- マニフェスト: アーティファクトと展開後の pickle の SHA-256・サイズ・圧縮形式・メタデータ
+- キャッシュ: ダウンロードしたアーティファクトを SHA-256 の名前で保存し、同じ内容は再ダウンロードしない
+
+マニフェストはアーティファクトの後にアップロードするので、マニフェストが見えていれば
+アーティファクトは揃っている。マニフェストが無い場合は従来の非圧縮 pickle として扱う。
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Protocol
+
+from app.logging_config import get_logger
+from app.services.predictor.model_files import get_model_filename
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# ダウンロードしたアーティファクトのキャッシュ
+CACHE_DIR = Path(__file__).parent.parent.parent / "ml" / "cache" / "artifacts"
+
+# 圧縮形式 -> 拡張子
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+class ArtifactStore(Protocol):
+    """アーティファクトの保存先（Supabase Storage のバケットなど）"""
+
+    def put(self, name: str, path: Path, content_type: str) -> None:
+        """ファイルをアップロード（既存は上書き）"""
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        """小さいファイル（マニフェスト）を読む（無ければNone）"""
+
+    def download(self, name: str, dest: BinaryIO) -> None:
+        """ファイルを dest に書き出す（無ければ FileNotFoundError）"""
+
+
+class LocalArtifactStore:
+    """ローカルのディレクトリをバケットとして使う（テスト・オフライン用）"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def put(self, name: str, path: Path, content_type: str) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, self.root / name)
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        try:
+            return (self.root / name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def download(self, name: str, dest: BinaryIO) -> None:
+        with open(self.root / name, "rb") as f:
+            shutil.copyfileobj(f, dest, CHUNK_SIZE)
+
+
+@dataclass
+class Manifest:
+    """アーティファクトの内容"""
+    artifact: str  # アーティファクトのファイル名
+    compression: str
+    sha256: str  # アーティファクト（圧縮後）
+    size_bytes: int
+    content_sha256: str  # 展開後の pickle
+    content_size_bytes: int
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    metadata: dict = field(default_factory=dict)
+
+    def to_json(self) -> bytes:
+        return json.dumps(asdict(self), ensure_ascii=False, default=str, indent=2).encode()
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "Manifest":
+        return cls(**json.loads(data))
+
+
+class _HashingWriter:
+    """書き込んだバイト列の SHA-256 とサイズを記録しながら下流に渡す"""
+
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.hash.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+
+def default_compression() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def artifact_names(race_type: str, version: str, compression: str) -> tuple[str, str]:
+    """(アーティファクト名, マニフェスト名)"""
+    filename = get_model_filename(race_type, version)
+    return filename + EXTENSIONS[compression], filename.removesuffix(".pkl") + ".manifest.json"
+
+
+def _compressor(compression: str, raw: BinaryIO):
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required for zstd artifacts")
+        return zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb")
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompressor(compression: str, raw: BinaryIO):
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required for zstd artifacts")
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def pack(model_data: Any, dest: Path, compression: Optional[str] = None) -> Manifest:
+    """model_data を pickle・圧縮して dest に書き出す（artifact 名とメタデータは呼び出し側で埋める）"""
+    compression = compression or default_compression()
+    with open(dest, "wb") as f:
+        compressed = _HashingWriter(f)
+        with _compressor(compression, compressed) as stream:
+            content = _HashingWriter(stream)
+            pickle.dump(model_data, content, protocol=pickle.HIGHEST_PROTOCOL)
+    return Manifest(
+        artifact=dest.name,
+        compression=compression,
+        sha256=compressed.hash.hexdigest(),
+        size_bytes=compressed.size,
+        content_sha256=content.hash.hexdigest(),
+        content_size_bytes=content.size,
+    )
+
+
+def upload(
+    store: ArtifactStore,
+    model_data: Any,
+    race_type: str,
+    version: str,
+    metadata: Optional[dict] = None,
+    compression: Optional[str] = None,
+) -> Manifest:
+    """モデルを圧縮してアップロードし、マニフェストを返す"""
+    compression = compression or default_compression()
+    artifact_name, manifest_name = artifact_names(race_type, version, compression)
+    with tempfile.TemporaryDirectory(prefix="model-upload-") as tmp_dir:
+        manifest = pack(model_data, Path(tmp_dir) / artifact_name, compression)
+        manifest.metadata = metadata or {}
+        store.put(artifact_name, Path(tmp_dir) / artifact_name, "application/octet-stream")
+        manifest_path = Path(tmp_dir) / manifest_name
+        manifest_path.write_bytes(manifest.to_json())
+        store.put(manifest_name, manifest_path, "application/json")
+    logger.info(
+        f"Model artifact uploaded: {artifact_name} "
+        f"({manifest.content_size_bytes} -> {manifest.size_bytes} bytes, sha256={manifest.sha256[:12]})"
+    )
+    return manifest
+
+
+def read_manifest(store: ArtifactStore, race_type: str, version: str) -> Optional[Manifest]:
+    """アップロード済みのマニフェスト（無ければNone）"""
+    _, manifest_name = artifact_names(race_type, version, default_compression())
+    data = store.read_bytes(manifest_name)
+    return Manifest.from_json(data) if data is not None else None
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fetch_to_cache(store: ArtifactStore, manifest: Manifest, cache_dir: Path) -> Path:
+    """アーティファクトをキャッシュに置く（同じ SHA-256 があればダウンロードしない）"""
+    cached = cache_dir / f"{manifest.sha256}{EXTENSIONS[manifest.compression]}"
+    if cached.exists():
+        logger.info(f"Model artifact cache hit: {manifest.artifact} ({manifest.sha256[:12]})")
+        return cached
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=cache_dir, prefix=".download-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer = _HashingWriter(f)
+            store.download(manifest.artifact, writer)
+        if writer.hash.hexdigest() != manifest.sha256:
+            raise ValueError(f"Checksum mismatch for {manifest.artifact}")
+        os.replace(tmp_name, cached)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return cached
+
+
+def _install(source: BinaryIO, dest: Path, expected_sha256: Optional[str]) -> str:
+    """source を一時ファイルに書き出し、SHA-256 を確認してから dest に置き換える"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer = _HashingWriter(f)
+            shutil.copyfileobj(source, writer, CHUNK_SIZE)
+        digest = writer.hash.hexdigest()
+        if expected_sha256 is not None and digest != expected_sha256:
+            raise ValueError(f"Checksum mismatch for {dest.name}")
+        os.replace(tmp_name, dest)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return digest
+
+
+def download(
+    store: ArtifactStore,
+    race_type: str,
+    version: str,
+    dest: Path,
+    cache_dir: Path = CACHE_DIR,
+) -> Optional[Manifest]:
+    """
+    モデルをダウンロードして dest（展開後の pickle）に置く
+
+    Returns:
+        マニフェスト（従来の非圧縮 pickle だった場合はNone）
+    """
+    manifest = read_manifest(store, race_type, version)
+    if manifest is None:
+        # 従来形式: pickle をそのまま保存
+        legacy_name = get_model_filename(race_type, version)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                store.download(legacy_name, f)
+            os.replace(tmp_name, dest)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        logger.info(f"Model downloaded (legacy pickle): {legacy_name} -> {dest}")
+        return None
+
+    if dest.exists() and dest.stat().st_size == manifest.content_size_bytes \
+            and _file_sha256(dest) == manifest.content_sha256:
+        logger.info(f"Model already installed: {dest} ({manifest.content_sha256[:12]})")
+        return manifest
+
+    cached = _fetch_to_cache(store, manifest, cache_dir)
+    with open(cached, "rb") as f, _decompressor(manifest.compression, f) as stream:
+        _install(stream, dest, manifest.content_sha256)
+    logger.info(f"Model downloaded: {manifest.artifact} -> {dest}")
+    return manifest
@@ -0,0 +1,95 @@
+"""
+モデルレジストリ
+
+レースタイプ別の使用中モデルバージョンを1つのJSONファイル（ml/config/selected_models.json）で共有する。
+
+uvicorn のワーカーはそれぞれモデルを読み込んで持っているので、/model/switch を受けた
+ワーカーがここにバージョンを公開し、他のワーカーは poll() でファイルの更新を検知して
+同じバージョンに切り替える（prediction_service が新しいモデルをバックグラウンドで読み込んでから差し替える）。
+
+書き込みは一時ファイルへの書き出しと os.replace で行うので、読む側が書きかけの内容を見ることはない。
+複数のワーカーが同時に公開しても互いの更新を消さないよう、読み込みから置き換えまでは
+ロックファイルの flock で排他する。
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# ファイルの同一性（inode, 更新時刻, サイズ）
+Stamp = tuple[int, int, int]
+
+
+class ModelRegistry:
+    """使用中のモデルバージョン（レースタイプ -> バージョン）を共有するファイル"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seen: Optional[Stamp] = None
+        self._checked = 0.0
+
+    def _stamp(self) -> Optional[Stamp]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """他のプロセスと排他する（ロックはファイルを閉じると解放される）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_name(f".{self.path.name}.lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def read(self) -> dict[str, str]:
+        """公開されているバージョン（ファイルがなければ空）"""
+        stamp = self._stamp()
+        try:
+            with open(self.path) as f:
+                versions = json.load(f)
+        except FileNotFoundError:
+            versions = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load model registry {self.path}: {e}")
+            versions = {}
+        self._seen = stamp
+        return versions if isinstance(versions, dict) else {}
+
+    def publish(self, race_type: str, version: str) -> dict[str, str]:
+        """レースタイプの使用バージョンを公開し、公開後の全体を返す"""
+        with self._lock, self._file_lock():
+            versions = self.read()
+            versions[race_type] = version
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(versions, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._seen = self._stamp()
+        logger.info(f"Published model version: {race_type}={version}")
+        return versions
+
+    def poll(self, interval: float) -> Optional[dict[str, str]]:
+        """
+        前回読んでから更新されていれば公開中のバージョンを返す（更新がなければNone）
+
+        ファイルの確認は interval 秒に1回だけ行う。
+        """
+        now = time.monotonic()
+        if now - self._checked < interval:
+            return None
+        self._checked = now
+        if self._stamp() == self._seen:
+            return None
+        return self.read()
@@ -0,0 +1,224 @@
+"""
+オッズ時系列サービス
+
+OddsScraperの結果をスナップショットとして保存する。
+前回から値が変わった組み合わせだけを書き込むため、
+発走前に繰り返し取得してもテーブルは変化分しか増えない。
+差分は組み合わせごとの最新値 (odds_latest) と比べるので、履歴の長さによらず
+1回の取得で読むのはそのレースの組み合わせ数の行だけになる。
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.logging_config import get_logger
+from app.models import Entry, OddsLatest, OddsSnapshot
+
+logger = get_logger(__name__)
+
+# scrape_allの結果に含まれる券種
+BET_TYPES = ["win", "place", "quinella", "quinella_place", "exacta", "trio", "trifecta"]
+
+OddsKey = tuple[str, str]
+OddsValue = tuple[Optional[float], Optional[float]]
+
+
+def flatten_odds(odds_data: dict) -> dict[OddsKey, OddsValue]:
+    """
+    scrape / scrape_allの結果を (券種, 組み合わせ) -> (オッズ, 上限) に変換
+
+    Args:
+        odds_data: OddsScraperの戻り値
+
+    Returns:
+        券種・組み合わせをキーとしたオッズ
+    """
+    flat: dict[OddsKey, OddsValue] = {}
+    for bet_type in BET_TYPES:
+        for item in odds_data.get(bet_type) or []:
+            if "horses" in item:
+                combination = "-".join(str(n) for n in item["horses"])
+            elif item.get("horse_number") is not None:
+                combination = str(item["horse_number"])
+            else:
+                continue
+
+            if "odds_min" in item or "odds_max" in item:
+                value = (item.get("odds_min"), item.get("odds_max"))
+            else:
+                value = (item.get("odds"), None)
+
+            if value == (None, None):
+                continue
+            flat[(bet_type, combination)] = value
+    return flat
+
+
+def get_latest_odds(
+    db: Session,
+    race_id: str,
+    bet_type: Optional[str] = None,
+    as_of: Optional[datetime] = None,
+) -> dict[OddsKey, OddsValue]:
+    """
+    組み合わせごとの最新オッズを取得
+
+    Args:
+        db: データベースセッション
+        race_id: レースID
+        bet_type: 券種で絞り込み
+        as_of: この時刻以前のスナップショットのみを対象にする
+
+    Returns:
+        (券種, 組み合わせ) -> (オッズ, 上限)
+    """
+    if as_of is None:
+        stmt = select(
+            OddsLatest.bet_type,
+            OddsLatest.combination,
+            OddsLatest.odds,
+            OddsLatest.odds_max,
+        ).where(OddsLatest.race_id == race_id)
+        if bet_type:
+            stmt = stmt.where(OddsLatest.bet_type == bet_type)
+    else:
+        # 過去時点の値は履歴から組み合わせごとに最後の1行を選ぶ
+        rank = func.row_number().over(
+            partition_by=(OddsSnapshot.bet_type, OddsSnapshot.combination),
+            order_by=(OddsSnapshot.captured_at.desc(), OddsSnapshot.id.desc()),
+        ).label("rank")
+        ranked = select(
+            OddsSnapshot.bet_type,
+            OddsSnapshot.combination,
+            OddsSnapshot.odds,
+            OddsSnapshot.odds_max,
+            rank,
+        ).where(
+            OddsSnapshot.race_id == race_id,
+            OddsSnapshot.captured_at <= as_of,
+        )
+        if bet_type:
+            ranked = ranked.where(OddsSnapshot.bet_type == bet_type)
+        ranked = ranked.subquery()
+        stmt = select(
+            ranked.c.bet_type,
+            ranked.c.combination,
+            ranked.c.odds,
+            ranked.c.odds_max,
+        ).where(ranked.c.rank == 1)
+
+    return {
+        (row.bet_type, row.combination): (row.odds, row.odds_max)
+        for row in db.execute(stmt)
+    }
+
+
+def save_snapshot(
+    db: Session,
+    race_id: str,
+    odds_data: dict,
+    captured_at: Optional[datetime] = None,
+) -> int:
+    """
+    オッズのスナップショットを保存（変化した組み合わせのみ）
+
+    Args:
+        db: データベースセッション
+        race_id: レースID
+        odds_data: OddsScraperの戻り値
+        captured_at: 取得時刻（省略時は現在時刻）
+
+    Returns:
+        書き込んだ行数
+    """
+    captured_at = captured_at or datetime.now(timezone.utc)
+    current = flatten_odds(odds_data)
+    previous = {
+        (row.bet_type, row.combination): row
+        for row in db.execute(
+            select(OddsLatest).where(OddsLatest.race_id == race_id)
+        ).scalars()
+    }
+
+    rows = []
+    for (bet_type, combination), (odds, odds_max) in current.items():
+        latest = previous.get((bet_type, combination))
+        if latest is not None and (latest.odds, latest.odds_max) == (odds, odds_max):
+            continue
+        rows.append(OddsSnapshot(
+            race_id=race_id,
+            bet_type=bet_type,
+            combination=combination,
+            odds=odds,
+            odds_max=odds_max,
+            captured_at=captured_at,
+        ))
+        if latest is None:
+            db.add(OddsLatest(
+                race_id=race_id,
+                bet_type=bet_type,
+                combination=combination,
+                odds=odds,
+                odds_max=odds_max,
+                captured_at=captured_at,
+            ))
+        else:
+            latest.odds = odds
+            latest.odds_max = odds_max
+            latest.captured_at = captured_at
+
+    if rows:
+        db.add_all(rows)
+        db.commit()
+
+    logger.debug(f"Odds snapshot for {race_id}: {len(rows)}/{len(current)} changed")
+    return len(rows)
+
+
+def apply_win_odds(db: Session, race_id: str, odds_data: dict) -> int:
+    """
+    単勝オッズと人気を出走馬 (Entry) に反映
+
+    Returns:
+        更新した出走馬数
+    """
+    win_odds = {
+        item["horse_number"]: item["odds"]
+        for item in odds_data.get("win") or []
+        if item.get("horse_number") is not None and item.get("odds")
+    }
+    if not win_odds:
+        return 0
+
+    popularity = {
+        horse_number: rank
+        for rank, horse_number in enumerate(sorted(win_odds, key=win_odds.get), 1)
+    }
+
+    updated = 0
+    entries = db.execute(select(Entry).where(Entry.race_id == race_id)).scalars()
+    for entry in entries:
+        if entry.horse_number in win_odds:
+            entry.odds = win_odds[entry.horse_number]
+            entry.popularity = popularity[entry.horse_number]
+            updated += 1
+    db.commit()
+    return updated
+
+
+def get_odds_history(
+    db: Session,
+    race_id: str,
+    bet_type: Optional[str] = None,
+    combination: Optional[str] = None,
+) -> list[OddsSnapshot]:
+    """オッズの変化履歴を取得（時刻順）"""
+    stmt = select(OddsSnapshot).where(OddsSnapshot.race_id == race_id)
+    if bet_type:
+        stmt = stmt.where(OddsSnapshot.bet_type == bet_type)
+    if combination:
+        stmt = stmt.where(OddsSnapshot.combination == combination)
+    stmt = stmt.order_by(OddsSnapshot.captured_at, OddsSnapshot.id)
+    return list(db.execute(stmt).scalars().all())
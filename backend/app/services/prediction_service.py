@@ -3,46 +3,31 @@ from functools import lru_cache
 from itertools import combinations
 from pathlib import Path
 from typing import Optional
-import json
+import threading
 import time
 
-import numpy as np
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.logging_config import get_logger
-from app.models.prediction import Prediction, History
+from app.profiling import span
+from app.models.prediction import Prediction, History, utcnow
 from app.models.race import Race, Entry
-from app.services.predictor import FeatureExtractor, get_model
-from app.services.predictor.model import DEFAULT_RACE_TYPE, RACE_TYPES, list_model_versions
+from app.services import stats_summary_service
+from app.services.model_registry import ModelRegistry
+from app.services.predictor.model_files import DEFAULT_RACE_TYPE, RACE_TYPES, list_model_versions
 
 logger = get_logger(__name__)
 
-# 選択されたモデルを永続化する設定ファイル
+# 選択されたモデルを永続化する設定ファイル（全ワーカーで共有するレジストリ）
 CONFIG_DIR = Path(__file__).parent.parent.parent / "ml" / "config"
 MODEL_CONFIG_FILE = CONFIG_DIR / "selected_models.json"
 
+registry = ModelRegistry(MODEL_CONFIG_FILE)
 
-def _load_selected_models() -> dict[str, str]:
-    """設定ファイルから選択されたモデルバージョンを読み込む"""
-    if MODEL_CONFIG_FILE.exists():
-        try:
-            with open(MODEL_CONFIG_FILE) as f:
-                return json.load(f)
-        except Exception as e:
-            logger.warning(f"Failed to load model config: {e}")
-    return {}
-
-
-def _save_selected_models(versions: dict[str, str]) -> None:
-    """選択されたモデルバージョンを設定ファイルに保存"""
-    try:
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        with open(MODEL_CONFIG_FILE, "w") as f:
-            json.dump(versions, f, indent=2)
-        logger.info(f"Saved model config: {versions}")
-    except Exception as e:
-        logger.error(f"Failed to save model config: {e}")
+# スケジューラーが作った予測の results_json["source"]
+SCHEDULER_SOURCE = "scheduler"
 
 
 def _get_latest_model_version(race_type: str) -> str:
@@ -65,7 +50,7 @@ def _init_model_versions() -> dict[str, str]:
     2. 最新のモデルバージョン
     3. デフォルト v1
     """
-    saved_versions = _load_selected_models()
+    saved_versions = registry.read()
     versions = {}
 
     for race_type in RACE_TYPES:
@@ -79,9 +64,30 @@ def _init_model_versions() -> dict[str, str]:
     return versions
 
 
-# レースタイプ別のモデルバージョン（動的に初期化）
+# レースタイプ別のモデルバージョン（最初に使うときに初期化）
 MODEL_VERSION = "v1"
-MODEL_VERSIONS: dict[str, str] = _init_model_versions()
+_model_versions: Optional[dict[str, str]] = None
+
+# モデルの読み込みを1回にするためのロック（ウォームアップとリクエストが同時に読み込まない）
+_model_lock = threading.RLock()
+
+
+def get_model_versions() -> dict[str, str]:
+    """レースタイプ別のモデルバージョン（初回に設定ファイルとモデルディレクトリから決める）"""
+    global _model_versions
+    if _model_versions is None:
+        with _model_lock:
+            if _model_versions is None:
+                _model_versions = _init_model_versions()
+    return _model_versions
+
+
+def __getattr__(name: str):
+    # 後方互換性: prediction_service.MODEL_VERSIONS
+    if name == "MODEL_VERSIONS":
+        return get_model_versions()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # 期待値ベース推奨のデフォルト閾値（PDF推奨値に準拠）
 DEFAULT_EV_THRESHOLD = 1.0  # 期待値が1.0以上で推奨
@@ -97,6 +103,10 @@ _predictors: dict[str, any] = {}
 # 後方互換性のため（centralのモデル）
 _predictor = None
 
+# 他のワーカーが公開したバージョン（読み込み待ち）と、読み込み中のレースタイプ
+_wanted_versions: dict[str, str] = {}
+_reloading: set[str] = set()
+
 # 予測結果キャッシュ（TTL: 5分）
 _prediction_cache: dict[str, tuple[float, dict]] = {}
 CACHE_TTL_SECONDS = 300  # 5分
@@ -159,43 +169,144 @@ def get_predictor(race_type: str = DEFAULT_RACE_TYPE):
     if race_type not in RACE_TYPES:
         race_type = DEFAULT_RACE_TYPE
 
+    # 他のワーカーでの切り替えに追従（読み込みが終わるまでは今のモデルを返す）
+    _sync_with_registry()
+
     # キャッシュにあればそれを返す
     if race_type in _predictors:
         return _predictors[race_type]
 
-    # 新しいモデルを読み込み
-    version = MODEL_VERSIONS.get(race_type, MODEL_VERSION)
-    predictor = get_model(version, race_type)
+    from app.services.predictor import get_model
+
+    with _model_lock:
+        if race_type in _predictors:
+            return _predictors[race_type]
+
+        # 新しいモデルを読み込み
+        version = get_model_versions().get(race_type, MODEL_VERSION)
+        predictor = get_model(version, race_type)
+        _predictors[race_type] = predictor
+
+        # 後方互換性: centralの場合は_predictorにも設定
+        if race_type == DEFAULT_RACE_TYPE:
+            _predictor = predictor
+
+    return predictor
+
+
+def _activate(predictor, race_type: str) -> None:
+    """読み込み済みのモデルを使用中にする（_model_lock を持って呼ぶ）"""
+    global _predictor, MODEL_VERSION
+
     _predictors[race_type] = predictor
+    get_model_versions()[race_type] = predictor.model_version
 
-    # 後方互換性: centralの場合は_predictorにも設定
+    # 後方互換性
     if race_type == DEFAULT_RACE_TYPE:
         _predictor = predictor
+        MODEL_VERSION = predictor.model_version
 
-    return predictor
+
+def _sync_with_registry() -> None:
+    """レジストリの更新を確認し、バージョンが変わったレースタイプのモデルを読み込み直す"""
+    published = registry.poll(settings.MODEL_REGISTRY_POLL_SECONDS)
+    if not published:
+        return
+
+    with _model_lock:
+        versions = get_model_versions()
+        for race_type, version in published.items():
+            if race_type not in RACE_TYPES or versions.get(race_type) == version:
+                continue
+            if race_type not in _predictors:
+                # まだ読み込んでいなければ、次に使うときに新しいバージョンを読み込む
+                versions[race_type] = version
+                continue
+            _wanted_versions[race_type] = version
+            if race_type not in _reloading:
+                _reloading.add(race_type)
+                threading.Thread(
+                    target=_reload_predictor, args=(race_type,), name=f"model-reload-{race_type}", daemon=True
+                ).start()
+
+
+def _reload_predictor(race_type: str) -> None:
+    """
+    公開されたバージョンのモデルを読み込んでから差し替える
+
+    読み込み中に別のバージョンが公開された場合は、読み込み直してから差し替える。
+    読み込みに失敗した場合は今のモデルを使い続ける。
+    """
+    from app.services.predictor import HorseRacingPredictor
+
+    while True:
+        with _model_lock:
+            version = _wanted_versions.get(race_type)
+            if version is None or get_model_versions().get(race_type) == version:
+                _wanted_versions.pop(race_type, None)
+                _reloading.discard(race_type)
+                return
+
+        start = time.perf_counter()
+        try:
+            predictor = HorseRacingPredictor(model_version=version, race_type=race_type)
+            predictor.load()
+        except Exception as e:
+            logger.error(f"Failed to load published model {race_type}={version}: {e}")
+            with _model_lock:
+                if _wanted_versions.get(race_type) == version:
+                    _wanted_versions.pop(race_type, None)
+                    _reloading.discard(race_type)
+                    return
+            continue
+
+        with _model_lock:
+            if _wanted_versions.get(race_type) != version:
+                continue
+            _activate(predictor, race_type)
+            _wanted_versions.pop(race_type, None)
+            _reloading.discard(race_type)
+        clear_prediction_cache()
+        logger.info(f"Switched to published model {race_type}={version} in {time.perf_counter() - start:.2f}s")
+        return
 
 
 def set_predictor(predictor, race_type: str = DEFAULT_RACE_TYPE):
     """
     モデルを設定（モデル切り替え用）
 
+    レジストリにバージョンを公開するので、他のワーカーも同じバージョンに切り替わる。
+
     Args:
         predictor: HorseRacingPredictorインスタンス
         race_type: レースタイプ
     """
-    global _predictors, _predictor, MODEL_VERSIONS
+    with _model_lock:
+        _activate(predictor, race_type)
+        # 読み込み中の古いバージョンで上書きしない
+        _wanted_versions.pop(race_type, None)
+        try:
+            registry.publish(race_type, predictor.model_version)
+        except OSError as e:
+            logger.error(f"Failed to publish model version: {e}")
+    clear_prediction_cache()
 
-    _predictors[race_type] = predictor
-    MODEL_VERSIONS[race_type] = predictor.model_version
 
-    # 設定ファイルに永続化
-    _save_selected_models(MODEL_VERSIONS)
+def warm_up() -> None:
+    """
+    MLライブラリと各レースタイプのモデルを読み込んでおく
 
-    # 後方互換性
-    if race_type == DEFAULT_RACE_TYPE:
-        _predictor = predictor
-        global MODEL_VERSION
-        MODEL_VERSION = predictor.model_version
+    起動後にバックグラウンドで呼び、最初の予測リクエストで読み込みを待たせないようにする
+    （モデルの読み込みで特徴量抽出のモジュールも読み込まれる）。
+    """
+    start = time.perf_counter()
+    try:
+        for race_type in RACE_TYPES:
+            get_predictor(race_type)
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {e}")
+        return
+    logger.info(f"Model warm-up finished in {time.perf_counter() - start:.2f}s")
 
 
 def create_prediction(db: Session, race_id: str) -> Prediction:
@@ -215,6 +326,41 @@ def create_prediction(db: Session, race_id: str) -> Prediction:
     db.add(prediction)
     db.commit()
     db.refresh(prediction)
+    # 結果が出ているレース（過去レースの再予測）は即座に判定する
+    stats_summary_service.refresh_prediction_outcomes(db, [race_id])
+    return prediction
+
+
+def refresh_scheduled_prediction(db: Session, race_id: str) -> Prediction:
+    """
+    スケジューラーの予測を作り直す
+
+    出馬表・オッズが更新されるたびに呼ばれるので、行を増やさずにレースごとに1件
+    （results_json の source が scheduler のもの）を上書きする。
+    """
+    race = db.get(Race, race_id)
+    if not race:
+        raise ValueError(f"Race {race_id} not found")
+
+    clear_prediction_cache(race_id)
+    predictions_result = {**_generate_predictions(db, race), "source": SCHEDULER_SOURCE}
+
+    stmt = (
+        select(Prediction)
+        .where(Prediction.race_id == race_id)
+        .where(Prediction.results_json["source"].as_string() == SCHEDULER_SOURCE)
+        .limit(1)
+    )
+    prediction = db.execute(stmt).scalar_one_or_none()
+    if prediction is None:
+        prediction = Prediction(race_id=race_id)
+        db.add(prediction)
+    prediction.model_version = MODEL_VERSION
+    prediction.results_json = predictions_result
+    prediction.created_at = utcnow()
+    db.commit()
+    db.refresh(prediction)
+    stats_summary_service.refresh_prediction_outcomes(db, [race_id])
     return prediction
 
 
@@ -253,9 +399,12 @@ def _generate_predictions(db: Session, race: Race) -> dict:
     else:
         predictions = _generate_baseline_predictions(entries)
 
+    with span("generate_recommended_bets"):
+        recommended_bets = _generate_recommended_bets(predictions)
+
     result = {
         "predictions": predictions,
-        "recommended_bets": _generate_recommended_bets(predictions),
+        "recommended_bets": recommended_bets,
         "model_type": "ml" if use_ml else "baseline",
     }
 
@@ -267,20 +416,25 @@ def _generate_predictions(db: Session, race: Race) -> dict:
 
 def _generate_ml_predictions(db: Session, race: Race, predictor) -> list[dict]:
     """MLモデルを使用した予測"""
+    from app.services.predictor import FeatureExtractor
+
     try:
         extractor = FeatureExtractor(db)
-        df = extractor.extract_race_features(race)
+        with span("extract_race_features"):
+            df = extractor.extract_race_features(race)
 
         if df.empty:
             logger.warning(f"No features extracted for race {race.race_id}, falling back to baseline")
             return _generate_baseline_predictions(race.entries)
 
         # 予測スコアを取得
-        scores = predictor.predict(df)
+        with span("predict"):
+            scores = predictor.predict(df)
         df["pred_score"] = scores
 
-        # キャリブレーション済み確率を取得（または従来のソフトマックス）
-        probabilities = predictor.predict_proba(df)
+        # キャリブレーション済み確率を取得（モデルは再度呼ばずにスコアから変換）
+        with span("predict_proba"):
+            probabilities = predictor.proba_from_scores(scores)
         df["probability"] = probabilities
 
         # ランキングを計算（スコアが高いほど上位）
@@ -535,7 +689,10 @@ def get_history(
     limit: int = 50,
     offset: int = 0,
 ) -> tuple[int, list[History], dict]:
-    """Get prediction history with summary"""
+    """Get prediction history with summary
+
+    Count and summary come from a single aggregate query; only the page rows are loaded.
+    """
     query = select(History)
 
     if from_date:
@@ -543,22 +700,12 @@ def get_history(
     if to_date:
         query = query.where(History.created_at <= to_date)
 
-    # Get total count
-    count_result = db.execute(
-        select(func.count(History.id)).where(
-            (History.created_at >= from_date) if from_date else True,
-            (History.created_at <= to_date) if to_date else True,
-        )
-    ).scalar()
-    total = count_result or 0
+    total, summary = stats_summary_service.get_history_totals(db, from_date, to_date)
 
     # Get paginated results
     query = query.order_by(History.created_at.desc()).offset(offset).limit(limit)
     history_list = list(db.execute(query).scalars().all())
 
-    # Calculate summary
-    summary = _calculate_summary(db, from_date, to_date)
-
     return total, history_list, summary
 
 
@@ -568,31 +715,7 @@ def _calculate_summary(
     to_date: Optional[datetime] = None,
 ) -> dict:
     """Calculate betting summary statistics"""
-    query = select(History).where(History.is_hit.isnot(None))
-
-    if from_date:
-        query = query.where(History.created_at >= from_date)
-    if to_date:
-        query = query.where(History.created_at <= to_date)
-
-    history_list = db.execute(query).scalars().all()
-
-    total_bets = len(history_list)
-    total_hits = sum(1 for h in history_list if h.is_hit)
-    total_bet_amount = sum(h.bet_amount or 0 for h in history_list)
-    total_payout = sum(h.payout or 0 for h in history_list if h.is_hit)
-
-    hit_rate = (total_hits / total_bets * 100) if total_bets > 0 else 0.0
-    roi = ((total_payout / total_bet_amount - 1) * 100) if total_bet_amount > 0 else 0.0
-
-    return {
-        "total_bets": total_bets,
-        "total_hits": total_hits,
-        "hit_rate": round(hit_rate, 2),
-        "total_bet_amount": total_bet_amount,
-        "total_payout": total_payout,
-        "roi": round(roi, 2),
-    }
+    return stats_summary_service.get_history_totals(db, from_date, to_date)[1]
 
 
 def create_history(
@@ -612,6 +735,7 @@ def create_history(
     db.add(history)
     db.commit()
     db.refresh(history)
+    stats_summary_service.refresh_history_day_of(db, history)
     return history
 
 
@@ -630,4 +754,6 @@ def update_history_result(
     history.payout = payout if is_hit else 0
     db.commit()
     db.refresh(history)
+    stats_summary_service.refresh_history_day_of(db, history)
+    stats_summary_service.refresh_prediction_outcomes(db, [history.prediction.race_id])
     return history
@@ -1,34 +1,37 @@
 """
 予測モジュール
+
+特徴量抽出・モデルは pandas・LightGBM・scikit-learn を読み込むので、
+APIの起動を遅くしないよう、各名前は最初に使われたときにサブモジュールから読み込む。
 """
-from .features import FeatureExtractor, get_feature_columns, prepare_training_data, prepare_time_split_data
-from .features_banei import (
-    BaneiFeatureExtractor,
-    get_banei_feature_columns,
-    prepare_banei_training_data,
-    prepare_banei_time_split_data,
-)
-from .features_local import (
-    LocalFeatureExtractor,
-    get_local_feature_columns,
-    prepare_local_training_data,
-    prepare_local_time_split_data,
-)
-from .model import HorseRacingPredictor, get_model
+import importlib
+
+# 公開名 -> 定義しているサブモジュール
+_EXPORTS = {
+    "FeatureGroupProfiler": ".feature_profile",
+    "FeatureExtractor": ".features",
+    "get_feature_columns": ".features",
+    "prepare_training_data": ".features",
+    "prepare_time_split_data": ".features",
+    "BaneiFeatureExtractor": ".features_banei",
+    "get_banei_feature_columns": ".features_banei",
+    "prepare_banei_training_data": ".features_banei",
+    "prepare_banei_time_split_data": ".features_banei",
+    "LocalFeatureExtractor": ".features_local",
+    "get_local_feature_columns": ".features_local",
+    "prepare_local_training_data": ".features_local",
+    "prepare_local_time_split_data": ".features_local",
+    "HorseRacingPredictor": ".model",
+    "get_model": ".model",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    "FeatureExtractor",
-    "get_feature_columns",
-    "prepare_training_data",
-    "prepare_time_split_data",
-    "BaneiFeatureExtractor",
-    "get_banei_feature_columns",
-    "prepare_banei_training_data",
-    "prepare_banei_time_split_data",
-    "LocalFeatureExtractor",
-    "get_local_feature_columns",
-    "prepare_local_training_data",
-    "prepare_local_time_split_data",
-    "HorseRacingPredictor",
-    "get_model",
-]
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
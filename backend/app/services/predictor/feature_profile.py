@@ -0,0 +1,101 @@
+"""
+特徴量グループごとの処理時間・クエリ数の集計
+
+抽出器（中央・地方・ばんえい）に FeatureGroupProfiler を渡すと、
+_extract_entry_features の各グループ（過去成績・騎手・調教など）の
+呼び出し回数・合計時間・発行したSQLの数を学習データ準備の全体にわたって集計する。
+
+SQLはスレッドごとに数えるので、同じプロセスで並行して処理している
+APIリクエストのSQLは含めない。
+"""
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# プロファイラを渡さないときの区間（何もしない）
+NO_PROFILE = nullcontext()
+
+# スレッドごとの実行SQL数
+_local = threading.local()
+_hook_installed = False
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    _local.queries = getattr(_local, "queries", 0) + 1
+
+
+def _thread_queries() -> int:
+    return getattr(_local, "queries", 0)
+
+
+def _install_query_hook() -> None:
+    global _hook_installed
+    if not _hook_installed:
+        event.listen(Engine, "before_cursor_execute", _count_query)
+        _hook_installed = True
+
+
+class FeatureGroupProfiler:
+    """特徴量グループ別の集計"""
+
+    def __init__(self):
+        # グループ名 -> [回数, 合計秒, クエリ数]
+        self.groups: dict[str, list] = {}
+        _install_query_hook()
+
+    @contextmanager
+    def measure(self, group: str) -> Iterator[None]:
+        """グループの処理1回分を計測"""
+        queries = _thread_queries()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.groups.get(group)
+            if totals is None:
+                totals = self.groups[group] = [0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += time.perf_counter() - start
+            totals[2] += _thread_queries() - queries
+
+    def report(self) -> list[dict]:
+        """合計時間の長い順のグループ別集計"""
+        total_seconds = sum(seconds for _, seconds, _ in self.groups.values()) or 1.0
+        rows = [
+            {
+                "group": group,
+                "calls": calls,
+                "total_ms": round(seconds * 1000, 1),
+                "avg_us": round(seconds / calls * 1_000_000, 1) if calls else 0.0,
+                "queries": queries,
+                "queries_per_call": round(queries / calls, 2) if calls else 0.0,
+                "share": round(seconds / total_seconds, 3),
+            }
+            for group, (calls, seconds, queries) in self.groups.items()
+        ]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def log_report(self, title: str) -> None:
+        """集計結果をログに出す"""
+        if self.groups:
+            logger.info(f"Feature group profile: {title}\n{self.format_report()}")
+
+    def format_report(self, limit: Optional[int] = None) -> str:
+        """ログ用の表（limit 指定時は上位のみ）"""
+        rows = self.report()[:limit] if limit else self.report()
+        lines = [f"{'group':<28} {'calls':>8} {'total_ms':>10} {'avg_us':>9} {'queries':>8} {'share':>6}"]
+        lines += [
+            f"{row['group']:<28} {row['calls']:>8} {row['total_ms']:>10.1f} {row['avg_us']:>9.1f} "
+            f"{row['queries']:>8} {row['share']:>6.1%}"
+            for row in rows
+        ]
+        return "\n".join(lines)
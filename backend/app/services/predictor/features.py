@@ -3,14 +3,17 @@
 
 DBから取得したデータを機械学習モデル用の特徴量に変換する
 """
-from datetime import date, datetime
+from datetime import date
 from typing import Optional
 import numpy as np
 import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.models import Race, Entry, Horse, Jockey, Training, Trainer, Sire
+from app.config import settings
+from app.models import Race, Entry, Training, Trainer, Sire
+from app.services.entry_history_service import history_sources, join_races
+from app.services.predictor.feature_profile import NO_PROFILE, FeatureGroupProfiler
 
 
 # カテゴリ変数のマッピング
@@ -60,14 +63,16 @@ AROUND_MAP = {
 class FeatureExtractor:
     """特徴量抽出クラス"""
 
-    def __init__(self, db: Session, use_cache: bool = True):
+    def __init__(self, db: Session, use_cache: bool = True, profiler: Optional[FeatureGroupProfiler] = None):
         """
         Args:
             db: データベースセッション
             use_cache: キャッシュを使用するか（学習時はTrue推奨）
+            profiler: 指定すると特徴量グループごとの処理時間・クエリ数を集計する
         """
         self.db = db
         self.use_cache = use_cache
+        self.profiler = profiler
         # キャッシュ用辞書
         self._horse_history_cache: dict = {}  # horse_id -> list of past entries
         self._cache_loaded = False
@@ -89,15 +94,25 @@ class FeatureExtractor:
             return
 
         # 一括クエリで全馬の過去成績を取得
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry, Race.date, Race.track_type, Race.distance, Race.condition, Race.course)
-            .join(Race)
-            .where(Entry.horse_id.in_(uncached_ids))
-            .where(Entry.result.isnot(None))
+            join_races(
+                select(
+                    entry_model,
+                    race_model.date,
+                    race_model.track_type,
+                    race_model.distance,
+                    race_model.condition,
+                    race_model.course,
+                ),
+                entry_model,
+            )
+            .where(entry_model.horse_id.in_(uncached_ids))
+            .where(entry_model.result.isnot(None))
         )
         if max_date:
-            stmt = stmt.where(Race.date < max_date)
-        stmt = stmt.order_by(Entry.horse_id, Race.date.desc())
+            stmt = stmt.where(race_model.date < max_date)
+        stmt = stmt.order_by(entry_model.horse_id, race_model.date.desc())
 
         results = list(self.db.execute(stmt).all())
 
@@ -161,6 +176,12 @@ class FeatureExtractor:
         df = pd.DataFrame(features_list)
         return df
 
+    def _group(self, name: str):
+        """特徴量グループの計測区間（プロファイラがなければ何もしない）"""
+        if self.profiler is None:
+            return NO_PROFILE
+        return self.profiler.measure(name)
+
     def _extract_entry_features(self, race: Race, entry: Entry) -> dict:
         """単一出走馬の特徴量を抽出"""
         features = {}
@@ -170,56 +191,72 @@ class FeatureExtractor:
         features["horse_id"] = entry.horse_id
 
         # === ID特徴量（参考ドキュメント準拠） ===
-        features.update(self._get_id_features(race, entry))
+        with self._group("id"):
+            features.update(self._get_id_features(race, entry))
 
         # === レース条件特徴量 ===
-        features.update(self._get_race_features(race, entry))
+        with self._group("race"):
+            features.update(self._get_race_features(race, entry))
 
         # === 馬の基本情報 ===
-        features.update(self._get_horse_basic_features(race, entry))
+        with self._group("horse_basic"):
+            features.update(self._get_horse_basic_features(race, entry))
 
         # === 騎手情報 ===
-        features.update(self._get_jockey_features(entry))
+        with self._group("jockey"):
+            features.update(self._get_jockey_features(entry))
 
         # === 騎手リーディングデータ ===
-        features.update(self._get_jockey_leading_features(entry))
+        with self._group("jockey_leading"):
+            features.update(self._get_jockey_leading_features(entry))
 
         # === 調教師リーディングデータ ===
-        features.update(self._get_trainer_leading_features(entry))
+        with self._group("trainer_leading"):
+            features.update(self._get_trainer_leading_features(entry))
 
         # === 種牡馬リーディングデータ ===
-        features.update(self._get_sire_leading_features(entry, race.track_type, race.distance))
+        with self._group("sire_leading"):
+            features.update(self._get_sire_leading_features(entry, race.track_type, race.distance))
 
         # === 過去成績 ===
-        features.update(self._get_past_performance_features(entry.horse_id, race.date))
+        with self._group("past_performance"):
+            features.update(self._get_past_performance_features(entry.horse_id, race.date))
 
         # === コース適性 ===
-        features.update(self._get_course_aptitude_features(
-            entry.horse_id, race.course, race.distance, race.track_type, race.date
-        ))
+        with self._group("course_aptitude"):
+            features.update(self._get_course_aptitude_features(
+                entry.horse_id, race.course, race.distance, race.track_type, race.date
+            ))
 
         # === 条件別成績 ===
-        features.update(self._get_condition_specific_features(
-            entry.horse_id, race.condition, race.distance, race.track_type, race.date
-        ))
+        with self._group("condition_specific"):
+            features.update(self._get_condition_specific_features(
+                entry.horse_id, race.condition, race.distance, race.track_type, race.date
+            ))
 
         # === オッズ・人気 ===
-        features.update(self._get_odds_features(entry))
+        with self._group("odds"):
+            features.update(self._get_odds_features(entry))
 
         # === 調教情報 ===
-        features.update(self._get_training_features(race.race_id, entry.horse_id))
+        with self._group("training"):
+            features.update(self._get_training_features(race.race_id, entry.horse_id))
 
         # === 脚質特徴量（新規追加） ===
-        features.update(self._get_running_style_features(entry.horse_id, race.date))
+        with self._group("running_style"):
+            features.update(self._get_running_style_features(entry.horse_id, race.date))
 
         # === 季節特徴量（新規追加） ===
-        features.update(self._get_season_features(race.date))
+        with self._group("season"):
+            features.update(self._get_season_features(race.date))
 
         # === ペース特徴量（新規追加） ===
-        features.update(self._get_pace_features(entry.horse_id, race.date))
+        with self._group("pace"):
+            features.update(self._get_pace_features(entry.horse_id, race.date))
 
         # === 人気別成績（新規追加） ===
-        features.update(self._get_popularity_performance_features(entry.horse_id, race.date))
+        with self._group("popularity_performance"):
+            features.update(self._get_popularity_performance_features(entry.horse_id, race.date))
 
         return features
 
@@ -443,13 +480,13 @@ class FeatureExtractor:
         - prize_3races, prize_5races, prize_10races, prize_1000races（平均賞金）
         """
         # 過去のエントリーを取得（最大1000件）
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
-            .order_by(Race.date.desc())
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
+            .order_by(race_model.date.desc())
             .limit(n_races)
         )
         past_entries = list(self.db.execute(stmt).scalars().all())
@@ -544,35 +581,33 @@ class FeatureExtractor:
     ) -> dict:
         """コース適性の特徴量（過去データのみ使用）"""
         # 同コースでの成績（予測対象レースより前のみ）
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.course == course)
-            .where(Race.date < race_date)  # データリーク防止
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.course == course)
+            .where(race_model.date < race_date)  # データリーク防止
+            .where(entry_model.result.isnot(None))
         )
         course_entries = list(self.db.execute(stmt).scalars().all())
 
         # 同距離帯での成績（±200m、過去のみ）
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.distance.between(distance - 200, distance + 200))
-            .where(Race.date < race_date)  # データリーク防止
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.distance.between(distance - 200, distance + 200))
+            .where(race_model.date < race_date)  # データリーク防止
+            .where(entry_model.result.isnot(None))
         )
         distance_entries = list(self.db.execute(stmt).scalars().all())
 
         # 同芝/ダートでの成績（過去のみ）
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.track_type == track_type)
-            .where(Race.date < race_date)  # データリーク防止
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.track_type == track_type)
+            .where(race_model.date < race_date)  # データリーク防止
+            .where(entry_model.result.isnot(None))
         )
         track_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -601,13 +636,13 @@ class FeatureExtractor:
         - 距離カテゴリ別成績（短距離/マイル/中距離/長距離）
         """
         # 馬場状態別成績（過去のみ）
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.condition == condition)
-            .where(Race.date < race_date)  # データリーク防止
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.condition == condition)
+            .where(race_model.date < race_date)  # データリーク防止
+            .where(entry_model.result.isnot(None))
         )
         condition_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -622,24 +657,22 @@ class FeatureExtractor:
             dist_min, dist_max = 2201, 9999
 
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.distance.between(dist_min, dist_max))
-            .where(Race.date < race_date)  # データリーク防止
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.distance.between(dist_min, dist_max))
+            .where(race_model.date < race_date)  # データリーク防止
+            .where(entry_model.result.isnot(None))
         )
         dist_cat_entries = list(self.db.execute(stmt).scalars().all())
 
         # 馬場状態×馬場タイプの成績（過去のみ）
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.condition == condition)
-            .where(Race.track_type == track_type)
-            .where(Race.date < race_date)  # データリーク防止
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.condition == condition)
+            .where(race_model.track_type == track_type)
+            .where(race_model.date < race_date)  # データリーク防止
+            .where(entry_model.result.isnot(None))
         )
         cond_track_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -737,14 +770,14 @@ class FeatureExtractor:
 
         # キャッシュがない場合はDBから取得（後方互換性）
         if not history and not self._cache_loaded:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .where(Entry.corner_position.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .where(entry_model.corner_position.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(20)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -870,14 +903,14 @@ class FeatureExtractor:
 
         # キャッシュがない場合はDBから取得（後方互換性）
         if not history and not self._cache_loaded:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .where(Entry.pace.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .where(entry_model.pace.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(20)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -943,14 +976,14 @@ class FeatureExtractor:
 
         # キャッシュがない場合はDBから取得（後方互換性）
         if not history and not self._cache_loaded:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .where(Entry.popularity.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .where(entry_model.popularity.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(50)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -1081,6 +1114,7 @@ def prepare_training_data(
     max_date: Optional[date] = None,
     progress_callback: Optional[callable] = None,
     target_strategy: int = 0,
+    profiler: Optional[FeatureGroupProfiler] = None,
 ) -> tuple[pd.DataFrame, pd.Series]:
     """
     学習用データを準備する
@@ -1093,12 +1127,16 @@ def prepare_training_data(
         target_strategy: ターゲット変数の戦略
             0: 1着のみを正例（従来）
             2: 1着と同タイムの馬も正例（タイム同着を含む）
+        profiler: 特徴量グループ別の集計先（省略時は FEATURE_PROFILING が有効なら新しく作ってログに出す）
 
     Returns:
         X: 特徴量DataFrame
         y: ターゲット（着順、target_strategy=2の場合は同着馬も1として返す）
     """
-    extractor = FeatureExtractor(db, use_cache=True)
+    own_profiler = profiler is None and settings.FEATURE_PROFILING
+    if own_profiler:
+        profiler = FeatureGroupProfiler()
+    extractor = FeatureExtractor(db, use_cache=True, profiler=profiler)
 
     # 結果が確定しているレースを取得
     stmt = select(Race).where(Race.entries.any(Entry.result.isnot(None)))
@@ -1123,7 +1161,8 @@ def prepare_training_data(
 
     if all_horse_ids:
         # 一括でキャッシュをプリロード
-        extractor.preload_horse_history(list(all_horse_ids), max_date=max_date)
+        with extractor._group("preload"):
+            extractor.preload_horse_history(list(all_horse_ids), max_date=max_date)
 
     all_features = []
     all_targets = []
@@ -1140,18 +1179,19 @@ def prepare_training_data(
         # 結果（着順）とfinish_timeを取得
         results = []
         finish_times = []
-        for _, row in df.iterrows():
-            entry_stmt = select(Entry).where(
-                Entry.race_id == race.race_id,
-                Entry.horse_number == row["horse_number"]
-            )
-            entry = db.execute(entry_stmt).scalar_one_or_none()
-            if entry and entry.result:
-                results.append(entry.result)
-                finish_times.append(entry.finish_time)
-            else:
-                results.append(None)
-                finish_times.append(None)
+        with extractor._group("result_lookup"):
+            for _, row in df.iterrows():
+                entry_stmt = select(Entry).where(
+                    Entry.race_id == race.race_id,
+                    Entry.horse_number == row["horse_number"]
+                )
+                entry = db.execute(entry_stmt).scalar_one_or_none()
+                if entry and entry.result:
+                    results.append(entry.result)
+                    finish_times.append(entry.finish_time)
+                else:
+                    results.append(None)
+                    finish_times.append(None)
 
         df["result"] = results
         df["finish_time"] = finish_times
@@ -1180,6 +1220,9 @@ def prepare_training_data(
 
             all_features.append(df)
 
+    if own_profiler:
+        profiler.log_report(f"prepare_training_data {min_date}〜{max_date}")
+
     if not all_features:
         return pd.DataFrame(), pd.Series(dtype=float)
 
@@ -1203,6 +1246,7 @@ def prepare_time_split_data(
     train_start_date: Optional[date] = None,
     progress_callback: Optional[callable] = None,
     target_strategy: int = 0,
+    profiler: Optional[FeatureGroupProfiler] = None,
 ) -> dict:
     """
     時系列ベースで学習・検証・テストデータを準備する
@@ -1221,6 +1265,7 @@ def prepare_time_split_data(
         target_strategy: ターゲット変数の戦略
             0: 1着のみを正例（従来）
             2: 1着と同タイムの馬も正例（タイム同着を含む）
+        profiler: 特徴量グループ別の集計先（3フェーズ分をまとめて集計する）
 
     Returns:
         dict: {
@@ -1236,6 +1281,10 @@ def prepare_time_split_data(
     """
     from datetime import timedelta
 
+    own_profiler = profiler is None and settings.FEATURE_PROFILING
+    if own_profiler:
+        profiler = FeatureGroupProfiler()
+
     # 進捗コールバックをラップ
     def make_phase_callback(phase: str, phase_offset: int, total_phases: int = 3):
         def callback(current, total, message):
@@ -1253,6 +1302,7 @@ def prepare_time_split_data(
         db,
         min_date=train_start_date,
         max_date=train_end_date,
+        profiler=profiler,
         progress_callback=make_phase_callback("train", 0),
         target_strategy=target_strategy,
     )
@@ -1265,6 +1315,7 @@ def prepare_time_split_data(
         db,
         min_date=valid_start,
         max_date=valid_end_date,
+        profiler=profiler,
         progress_callback=make_phase_callback("valid", 1),
         target_strategy=target_strategy,
     )
@@ -1276,10 +1327,14 @@ def prepare_time_split_data(
     X_test, y_test = prepare_training_data(
         db,
         min_date=test_start,
+        profiler=profiler,
         progress_callback=make_phase_callback("test", 2),
         target_strategy=target_strategy,
     )
 
+    if own_profiler:
+        profiler.log_report(f"prepare_time_split_data {train_start_date}〜")
+
     return {
         'train': (X_train, y_train),
         'valid': (X_valid, y_valid),
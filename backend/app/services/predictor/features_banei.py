@@ -17,7 +17,10 @@ import pandas as pd
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.models import Race, Entry, Horse, Jockey, Trainer
+from app.config import settings
+from app.models import Race, Entry, Trainer
+from app.services.entry_history_service import history_sources, join_races
+from app.services.predictor.feature_profile import NO_PROFILE, FeatureGroupProfiler
 
 
 # ばんえい用グレードマッピング
@@ -91,14 +94,16 @@ def get_banei_feature_columns() -> list[str]:
 class BaneiFeatureExtractor:
     """ばんえい競馬専用の特徴量抽出クラス"""
 
-    def __init__(self, db: Session, use_cache: bool = True):
+    def __init__(self, db: Session, use_cache: bool = True, profiler: Optional[FeatureGroupProfiler] = None):
         """
         Args:
             db: データベースセッション
             use_cache: キャッシュを使用するか（学習時はTrue推奨）
+            profiler: 指定すると特徴量グループごとの処理時間・クエリ数を集計する
         """
         self.db = db
         self.use_cache = use_cache
+        self.profiler = profiler
         # キャッシュ用辞書
         self._horse_history_cache: dict = {}
         self._jockey_history_cache: dict = {}
@@ -113,16 +118,21 @@ class BaneiFeatureExtractor:
         if not uncached_ids:
             return
 
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry, Race.date, Race.condition, Race.grade)
-            .join(Race)
-            .where(Entry.horse_id.in_(uncached_ids))
-            .where(Race.race_type == "banei")
-            .where(Entry.result.isnot(None))
+            join_races(
+                select(
+                    entry_model, race_model.date, race_model.condition, race_model.grade
+                ),
+                entry_model,
+            )
+            .where(entry_model.horse_id.in_(uncached_ids))
+            .where(race_model.race_type == "banei")
+            .where(entry_model.result.isnot(None))
         )
         if max_date:
-            stmt = stmt.where(Race.date < max_date)
-        stmt = stmt.order_by(Entry.horse_id, Race.date.desc())
+            stmt = stmt.where(race_model.date < max_date)
+        stmt = stmt.order_by(entry_model.horse_id, race_model.date.desc())
 
         results = list(self.db.execute(stmt).all())
 
@@ -183,6 +193,12 @@ class BaneiFeatureExtractor:
             'field_size': len(race.entries),
         }
 
+    def _group(self, name: str):
+        """特徴量グループの計測区間（プロファイラがなければ何もしない）"""
+        if self.profiler is None:
+            return NO_PROFILE
+        return self.profiler.measure(name)
+
     def _extract_entry_features(self, race: Race, entry: Entry, race_stats: dict) -> dict:
         """単一出走馬の特徴量を抽出"""
         features = {}
@@ -192,37 +208,48 @@ class BaneiFeatureExtractor:
         features["horse_id"] = entry.horse_id
 
         # === ID特徴量 ===
-        features.update(self._get_id_features(entry))
+        with self._group("id"):
+            features.update(self._get_id_features(entry))
 
         # === ソリ重量関連 ===
-        features.update(self._get_sori_weight_features(race, entry, race_stats))
+        with self._group("sori_weight"):
+            features.update(self._get_sori_weight_features(race, entry, race_stats))
 
         # === 馬体重関連 ===
-        features.update(self._get_horse_weight_features(entry, race.date))
+        with self._group("horse_weight"):
+            features.update(self._get_horse_weight_features(entry, race.date))
 
         # === 水分量・馬場 ===
-        features.update(self._get_moisture_features(race, entry))
+        with self._group("moisture"):
+            features.update(self._get_moisture_features(race, entry))
 
         # === レース条件 ===
-        features.update(self._get_race_features(race, entry, race_stats))
+        with self._group("race"):
+            features.update(self._get_race_features(race, entry, race_stats))
 
         # === 馬基本情報 ===
-        features.update(self._get_horse_basic_features(race, entry))
+        with self._group("horse_basic"):
+            features.update(self._get_horse_basic_features(race, entry))
 
         # === 騎手 ===
-        features.update(self._get_jockey_features(entry, race.date))
+        with self._group("jockey"):
+            features.update(self._get_jockey_features(entry, race.date))
 
         # === 過去成績 ===
-        features.update(self._get_past_performance_features(entry.horse_id, race.date))
+        with self._group("past_performance"):
+            features.update(self._get_past_performance_features(entry.horse_id, race.date))
 
         # === 重量別成績 ===
-        features.update(self._get_weight_class_features(entry.horse_id, race.date))
+        with self._group("weight_class"):
+            features.update(self._get_weight_class_features(entry.horse_id, race.date))
 
         # === オッズ ===
-        features.update(self._get_odds_features(entry))
+        with self._group("odds"):
+            features.update(self._get_odds_features(entry))
 
         # === 季節 ===
-        features.update(self._get_season_features(race.date))
+        with self._group("season"):
+            features.update(self._get_season_features(race.date))
 
         return features
 
@@ -491,14 +518,14 @@ class BaneiFeatureExtractor:
         """騎手の重量戦勝率を計算"""
         if race_date is None:
             return 0
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.jockey_id == jockey_id)
-            .where(Race.race_type == "banei")
-            .where(Race.date < race_date)
-            .where(Entry.weight >= 700)
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.jockey_id == jockey_id)
+            .where(race_model.race_type == "banei")
+            .where(race_model.date < race_date)
+            .where(entry_model.weight >= 700)
+            .where(entry_model.result.isnot(None))
             .limit(100)
         )
         entries = list(self.db.execute(stmt).scalars().all())
@@ -514,14 +541,14 @@ class BaneiFeatureExtractor:
         if race_date is None:
             return 0
         # 直近のばんえいレースでの成績
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.jockey_id == jockey_id)
-            .where(Race.race_type == "banei")
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
-            .order_by(Race.date.desc())
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.jockey_id == jockey_id)
+            .where(race_model.race_type == "banei")
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
+            .order_by(race_model.date.desc())
             .limit(50)
         )
         entries = list(self.db.execute(stmt).scalars().all())
@@ -536,14 +563,14 @@ class BaneiFeatureExtractor:
         """騎手×馬の相性を計算"""
         if race_date is None:
             return 0
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.jockey_id == jockey_id)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
-            .order_by(Race.date.desc())
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.jockey_id == jockey_id)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
+            .order_by(race_model.date.desc())
             .limit(20)
         )
         entries = list(self.db.execute(stmt).scalars().all())
@@ -573,14 +600,14 @@ class BaneiFeatureExtractor:
         history = self.get_cached_history(horse_id, race_date, limit=50)
 
         if not history:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.race_type == "banei")
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.race_type == "banei")
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(50)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -650,15 +677,15 @@ class BaneiFeatureExtractor:
         history = self.get_cached_history(horse_id, race_date, limit=50)
 
         if not history:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.race_type == "banei")
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .where(Entry.weight.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.race_type == "banei")
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .where(entry_model.weight.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(50)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -741,6 +768,7 @@ def prepare_banei_training_data(
     min_date: Optional[date] = None,
     max_date: Optional[date] = None,
     progress_callback: Optional[callable] = None,
+    profiler: Optional[FeatureGroupProfiler] = None,
 ) -> tuple[pd.DataFrame, pd.Series]:
     """
     ばんえい用学習データを準備する
@@ -750,12 +778,16 @@ def prepare_banei_training_data(
         min_date: 最小日付
         max_date: 最大日付
         progress_callback: 進捗コールバック関数
+        profiler: 特徴量グループ別の集計先（省略時は FEATURE_PROFILING が有効なら新しく作ってログに出す）
 
     Returns:
         X: 特徴量DataFrame
         y: ターゲット（着順）
     """
-    extractor = BaneiFeatureExtractor(db, use_cache=True)
+    own_profiler = profiler is None and settings.FEATURE_PROFILING
+    if own_profiler:
+        profiler = FeatureGroupProfiler()
+    extractor = BaneiFeatureExtractor(db, use_cache=True, profiler=profiler)
 
     # ばんえいレースのみを取得
     stmt = (
@@ -783,7 +815,8 @@ def prepare_banei_training_data(
                 all_horse_ids.add(entry.horse_id)
 
     if all_horse_ids:
-        extractor.preload_horse_history(list(all_horse_ids), max_date=max_date)
+        with extractor._group("preload"):
+            extractor.preload_horse_history(list(all_horse_ids), max_date=max_date)
 
     all_features = []
     all_targets = []
@@ -798,16 +831,17 @@ def prepare_banei_training_data(
 
         # 結果（着順）を取得
         results = []
-        for _, row in df.iterrows():
-            entry_stmt = select(Entry).where(
-                Entry.race_id == race.race_id,
-                Entry.horse_number == row["horse_number"]
-            )
-            entry = db.execute(entry_stmt).scalar_one_or_none()
-            if entry and entry.result:
-                results.append(entry.result)
-            else:
-                results.append(None)
+        with extractor._group("result_lookup"):
+            for _, row in df.iterrows():
+                entry_stmt = select(Entry).where(
+                    Entry.race_id == race.race_id,
+                    Entry.horse_number == row["horse_number"]
+                )
+                entry = db.execute(entry_stmt).scalar_one_or_none()
+                if entry and entry.result:
+                    results.append(entry.result)
+                else:
+                    results.append(None)
 
         df["result"] = results
         df = df.dropna(subset=["result"])
@@ -816,6 +850,9 @@ def prepare_banei_training_data(
             all_targets.extend(df["result"].tolist())
             all_features.append(df)
 
+    if own_profiler:
+        profiler.log_report(f"prepare_banei_training_data {min_date}〜{max_date}")
+
     if not all_features:
         return pd.DataFrame(), pd.Series(dtype=float)
 
@@ -838,12 +875,17 @@ def prepare_banei_time_split_data(
     valid_end_date: date,
     train_start_date: Optional[date] = None,
     progress_callback: Optional[callable] = None,
+    profiler: Optional[FeatureGroupProfiler] = None,
 ) -> dict:
     """
     時系列ベースでばんえい学習・検証・テストデータを準備する
     """
     from datetime import timedelta
 
+    own_profiler = profiler is None and settings.FEATURE_PROFILING
+    if own_profiler:
+        profiler = FeatureGroupProfiler()
+
     def make_phase_callback(phase: str, phase_offset: int, total_phases: int = 3):
         def callback(current, total, message):
             if progress_callback:
@@ -859,6 +901,7 @@ def prepare_banei_time_split_data(
         db,
         min_date=train_start_date,
         max_date=train_end_date,
+        profiler=profiler,
         progress_callback=make_phase_callback("train", 0),
     )
 
@@ -870,6 +913,7 @@ def prepare_banei_time_split_data(
         db,
         min_date=valid_start,
         max_date=valid_end_date,
+        profiler=profiler,
         progress_callback=make_phase_callback("valid", 1),
     )
 
@@ -880,9 +924,13 @@ def prepare_banei_time_split_data(
     X_test, y_test = prepare_banei_training_data(
         db,
         min_date=test_start,
+        profiler=profiler,
         progress_callback=make_phase_callback("test", 2),
     )
 
+    if own_profiler:
+        profiler.log_report(f"prepare_banei_time_split_data {train_start_date}〜")
+
     return {
         'train': (X_train, y_train),
         'valid': (X_valid, y_valid),
@@ -8,14 +8,17 @@
 - 騎手が固定されやすい
 - クラス体系が異なる（A1, A2, B1, B2, C1, C2など）
 """
-from datetime import date, datetime
+from datetime import date
 from typing import Optional
 import numpy as np
 import pandas as pd
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
-from app.models import Race, Entry, Horse, Jockey, Training, Trainer, Sire
+from app.config import settings
+from app.models import Race, Entry
+from app.services.entry_history_service import history_sources, join_races
+from app.services.predictor.feature_profile import NO_PROFILE, FeatureGroupProfiler
 
 
 # === 地方競馬場マッピング ===
@@ -73,9 +76,10 @@ WEATHER_MAP = {"晴": 0, "曇": 1, "雨": 2, "小雨": 2, "雪": 3}
 class LocalFeatureExtractor:
     """地方競馬専用の特徴量抽出クラス"""
 
-    def __init__(self, db: Session, use_cache: bool = True):
+    def __init__(self, db: Session, use_cache: bool = True, profiler: Optional[FeatureGroupProfiler] = None):
         self.db = db
         self.use_cache = use_cache
+        self.profiler = profiler
         self._horse_history_cache: dict = {}
         self._jockey_horse_cache: dict = {}  # 騎手-馬コンビキャッシュ
         self._cache_loaded = False
@@ -89,15 +93,25 @@ class LocalFeatureExtractor:
         if not uncached_ids:
             return
 
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry, Race.date, Race.track_type, Race.distance, Race.condition, Race.course)
-            .join(Race)
-            .where(Entry.horse_id.in_(uncached_ids))
-            .where(Entry.result.isnot(None))
+            join_races(
+                select(
+                    entry_model,
+                    race_model.date,
+                    race_model.track_type,
+                    race_model.distance,
+                    race_model.condition,
+                    race_model.course,
+                ),
+                entry_model,
+            )
+            .where(entry_model.horse_id.in_(uncached_ids))
+            .where(entry_model.result.isnot(None))
         )
         if max_date:
-            stmt = stmt.where(Race.date < max_date)
-        stmt = stmt.order_by(Entry.horse_id, Race.date.desc())
+            stmt = stmt.where(race_model.date < max_date)
+        stmt = stmt.order_by(entry_model.horse_id, race_model.date.desc())
 
         results = list(self.db.execute(stmt).all())
 
@@ -140,6 +154,12 @@ class LocalFeatureExtractor:
 
         return pd.DataFrame(features_list)
 
+    def _group(self, name: str):
+        """特徴量グループの計測区間（プロファイラがなければ何もしない）"""
+        if self.profiler is None:
+            return NO_PROFILE
+        return self.profiler.measure(name)
+
     def _extract_entry_features(self, race: Race, entry: Entry) -> dict:
         """単一出走馬の特徴量を抽出"""
         features = {}
@@ -149,40 +169,54 @@ class LocalFeatureExtractor:
         features["horse_id"] = entry.horse_id
 
         # === 基本特徴量 ===
-        features.update(self._get_id_features(race, entry))
-        features.update(self._get_race_features(race, entry))
-        features.update(self._get_horse_basic_features(race, entry))
+        with self._group("id"):
+            features.update(self._get_id_features(race, entry))
+        with self._group("race"):
+            features.update(self._get_race_features(race, entry))
+        with self._group("horse_basic"):
+            features.update(self._get_horse_basic_features(race, entry))
 
         # === 騎手特徴量（地方向け強化） ===
-        features.update(self._get_jockey_features(entry))
-        features.update(self._get_jockey_horse_combo_features(entry, race.date))
+        with self._group("jockey"):
+            features.update(self._get_jockey_features(entry))
+        with self._group("jockey_horse_combo"):
+            features.update(self._get_jockey_horse_combo_features(entry, race.date))
 
         # === 過去成績（地方向け調整） ===
-        features.update(self._get_past_performance_features(entry.horse_id, race.date))
+        with self._group("past_performance"):
+            features.update(self._get_past_performance_features(entry.horse_id, race.date))
 
         # === 同一競馬場成績（地方特有） ===
-        features.update(self._get_same_course_features(entry.horse_id, race.course, race.date))
+        with self._group("same_course"):
+            features.update(self._get_same_course_features(entry.horse_id, race.course, race.date))
 
         # === 出走間隔特徴量（地方特有） ===
-        features.update(self._get_interval_features(entry.horse_id, race.date))
+        with self._group("interval"):
+            features.update(self._get_interval_features(entry.horse_id, race.date))
 
         # === ダート適性（地方はダート100%） ===
-        features.update(self._get_dirt_aptitude_features(entry.horse_id, race.condition, race.distance, race.date))
+        with self._group("dirt_aptitude"):
+            features.update(self._get_dirt_aptitude_features(entry.horse_id, race.condition, race.distance, race.date))
 
         # === オッズ・人気 ===
-        features.update(self._get_odds_features(entry))
+        with self._group("odds"):
+            features.update(self._get_odds_features(entry))
 
         # === 脚質特徴量 ===
-        features.update(self._get_running_style_features(entry.horse_id, race.date))
+        with self._group("running_style"):
+            features.update(self._get_running_style_features(entry.horse_id, race.date))
 
         # === 季節特徴量 ===
-        features.update(self._get_season_features(race.date))
+        with self._group("season"):
+            features.update(self._get_season_features(race.date))
 
         # === クラス昇降特徴量（地方特有） ===
-        features.update(self._get_class_change_features(entry.horse_id, race.grade, race.date))
+        with self._group("class_change"):
+            features.update(self._get_class_change_features(entry.horse_id, race.grade, race.date))
 
         # === 人気別成績 ===
-        features.update(self._get_popularity_performance_features(entry.horse_id, race.date))
+        with self._group("popularity_performance"):
+            features.update(self._get_popularity_performance_features(entry.horse_id, race.date))
 
         return features
 
@@ -304,13 +338,13 @@ class LocalFeatureExtractor:
             }
 
         # 同じ騎手-馬の過去成績を取得
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == entry.horse_id)
-            .where(Entry.jockey_id == entry.jockey_id)
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == entry.horse_id)
+            .where(entry_model.jockey_id == entry.jockey_id)
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
         )
         combo_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -329,11 +363,10 @@ class LocalFeatureExtractor:
 
         # この馬の総出走回数を取得してレギュラー騎手か判定
         stmt_total = (
-            select(func.count(Entry.id))
-            .join(Race)
-            .where(Entry.horse_id == entry.horse_id)
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
+            join_races(select(func.count(entry_model.id)), entry_model)
+            .where(entry_model.horse_id == entry.horse_id)
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
         )
         total_runs = self.db.execute(stmt_total).scalar() or 0
 
@@ -353,13 +386,13 @@ class LocalFeatureExtractor:
         history = self.get_cached_history(horse_id, race_date, limit=50)
 
         if not history:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(50)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -412,13 +445,13 @@ class LocalFeatureExtractor:
         同一競馬場での成績（地方特有）
         地方競馬は同じ競馬場での出走が多いため重要
         """
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.course == course)
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.course == course)
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
         )
         course_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -452,13 +485,13 @@ class LocalFeatureExtractor:
         history = self.get_cached_history(horse_id, race_date, limit=10)
 
         if not history:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry, Race.date)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model, race_model.date), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(10)
             )
             results = list(self.db.execute(stmt).all())
@@ -501,13 +534,13 @@ class LocalFeatureExtractor:
         馬場状態別、距離別の成績を重視
         """
         # 馬場状態別成績
+        entry_model, race_model = history_sources()
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.condition == condition)
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.condition == condition)
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
         )
         condition_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -522,23 +555,21 @@ class LocalFeatureExtractor:
             dist_min, dist_max = 2001, 9999
 
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.distance.between(dist_min, dist_max))
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.distance.between(dist_min, dist_max))
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
         )
         distance_entries = list(self.db.execute(stmt).scalars().all())
 
         # 重馬場成績（地方で重要）
         stmt = (
-            select(Entry)
-            .join(Race)
-            .where(Entry.horse_id == horse_id)
-            .where(Race.condition.in_(["重", "不良"]))
-            .where(Race.date < race_date)
-            .where(Entry.result.isnot(None))
+            join_races(select(entry_model), entry_model)
+            .where(entry_model.horse_id == horse_id)
+            .where(race_model.condition.in_(["重", "不良"]))
+            .where(race_model.date < race_date)
+            .where(entry_model.result.isnot(None))
         )
         heavy_entries = list(self.db.execute(stmt).scalars().all())
 
@@ -583,14 +614,14 @@ class LocalFeatureExtractor:
         history = self.get_cached_history(horse_id, race_date, limit=20)
 
         if not history:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .where(Entry.corner_position.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .where(entry_model.corner_position.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(20)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -719,14 +750,14 @@ class LocalFeatureExtractor:
         history = self.get_cached_history(horse_id, race_date, limit=50)
 
         if not history:
+            entry_model, race_model = history_sources()
             stmt = (
-                select(Entry)
-                .join(Race)
-                .where(Entry.horse_id == horse_id)
-                .where(Race.date < race_date)
-                .where(Entry.result.isnot(None))
-                .where(Entry.popularity.isnot(None))
-                .order_by(Race.date.desc())
+                join_races(select(entry_model), entry_model)
+                .where(entry_model.horse_id == horse_id)
+                .where(race_model.date < race_date)
+                .where(entry_model.result.isnot(None))
+                .where(entry_model.popularity.isnot(None))
+                .order_by(race_model.date.desc())
                 .limit(50)
             )
             past_entries = list(self.db.execute(stmt).scalars().all())
@@ -832,6 +863,7 @@ def prepare_local_training_data(
     max_date: Optional[date] = None,
     progress_callback: Optional[callable] = None,
     target_strategy: int = 0,
+    profiler: Optional[FeatureGroupProfiler] = None,
 ) -> tuple[pd.DataFrame, pd.Series]:
     """
     地方競馬用の学習データを準備する
@@ -844,12 +876,16 @@ def prepare_local_training_data(
         target_strategy: ターゲット変数の戦略
             0: 1着のみを正例（従来）
             2: 1着と同タイムの馬も正例（タイム同着を含む）
+        profiler: 特徴量グループ別の集計先（省略時は FEATURE_PROFILING が有効なら新しく作ってログに出す）
 
     Returns:
         X: 特徴量DataFrame
         y: ターゲット（着順、target_strategy=2の場合は同着馬も1として返す）
     """
-    extractor = LocalFeatureExtractor(db, use_cache=True)
+    own_profiler = profiler is None and settings.FEATURE_PROFILING
+    if own_profiler:
+        profiler = FeatureGroupProfiler()
+    extractor = LocalFeatureExtractor(db, use_cache=True, profiler=profiler)
 
     # 地方競馬のレースのみ取得
     stmt = (
@@ -877,7 +913,8 @@ def prepare_local_training_data(
                 all_horse_ids.add(entry.horse_id)
 
     if all_horse_ids:
-        extractor.preload_horse_history(list(all_horse_ids), max_date=max_date)
+        with extractor._group("preload"):
+            extractor.preload_horse_history(list(all_horse_ids), max_date=max_date)
 
     all_features = []
     all_targets = []
@@ -893,18 +930,19 @@ def prepare_local_training_data(
         # 結果とfinish_timeを取得
         results = []
         finish_times = []
-        for _, row in df.iterrows():
-            entry_stmt = select(Entry).where(
-                Entry.race_id == race.race_id,
-                Entry.horse_number == row["horse_number"]
-            )
-            entry = db.execute(entry_stmt).scalar_one_or_none()
-            if entry and entry.result:
-                results.append(entry.result)
-                finish_times.append(getattr(entry, 'finish_time', None))
-            else:
-                results.append(None)
-                finish_times.append(None)
+        with extractor._group("result_lookup"):
+            for _, row in df.iterrows():
+                entry_stmt = select(Entry).where(
+                    Entry.race_id == race.race_id,
+                    Entry.horse_number == row["horse_number"]
+                )
+                entry = db.execute(entry_stmt).scalar_one_or_none()
+                if entry and entry.result:
+                    results.append(entry.result)
+                    finish_times.append(getattr(entry, 'finish_time', None))
+                else:
+                    results.append(None)
+                    finish_times.append(None)
 
         df["result"] = results
         df["finish_time"] = finish_times
@@ -930,6 +968,9 @@ def prepare_local_training_data(
                 all_targets.extend(df["result"].tolist())
             all_features.append(df)
 
+    if own_profiler:
+        profiler.log_report(f"prepare_local_training_data {min_date}〜{max_date}")
+
     if not all_features:
         return pd.DataFrame(), pd.Series(dtype=float)
 
@@ -951,6 +992,7 @@ def prepare_local_time_split_data(
     train_start_date: Optional[date] = None,
     progress_callback: Optional[callable] = None,
     target_strategy: int = 0,
+    profiler: Optional[FeatureGroupProfiler] = None,
 ) -> dict:
     """
     地方競馬用の時系列ベースで学習・検証・テストデータを準備する
@@ -969,6 +1011,7 @@ def prepare_local_time_split_data(
         target_strategy: ターゲット変数の戦略
             0: 1着のみを正例（従来）
             2: 1着と同タイムの馬も正例（タイム同着を含む）
+        profiler: 特徴量グループ別の集計先（3フェーズ分をまとめて集計する）
 
     Returns:
         dict: {
@@ -984,6 +1027,10 @@ def prepare_local_time_split_data(
     """
     from datetime import timedelta
 
+    own_profiler = profiler is None and settings.FEATURE_PROFILING
+    if own_profiler:
+        profiler = FeatureGroupProfiler()
+
     # 進捗コールバックをラップ
     def make_phase_callback(phase: str, phase_offset: int, total_phases: int = 3):
         def callback(current, total, message):
@@ -1000,6 +1047,7 @@ def prepare_local_time_split_data(
         db,
         min_date=train_start_date,
         max_date=train_end_date,
+        profiler=profiler,
         progress_callback=make_phase_callback("train", 0),
         target_strategy=target_strategy,
     )
@@ -1012,6 +1060,7 @@ def prepare_local_time_split_data(
         db,
         min_date=valid_start,
         max_date=valid_end_date,
+        profiler=profiler,
         progress_callback=make_phase_callback("valid", 1),
         target_strategy=target_strategy,
     )
@@ -1023,10 +1072,14 @@ def prepare_local_time_split_data(
     X_test, y_test = prepare_local_training_data(
         db,
         min_date=test_start,
+        profiler=profiler,
         progress_callback=make_phase_callback("test", 2),
         target_strategy=target_strategy,
     )
 
+    if own_profiler:
+        profiler.log_report(f"prepare_local_time_split_data {train_start_date}〜")
+
     return {
         'train': (X_train, y_train),
         'valid': (X_valid, y_valid),
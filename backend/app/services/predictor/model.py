@@ -6,7 +6,6 @@ LightGBMを使用した競馬予測モデル
 """
 import os
 import pickle
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -20,29 +19,14 @@ from sklearn.calibration import CalibratedClassifierCV
 from .features import get_feature_columns
 from .features_banei import get_banei_feature_columns
 from .features_local import get_local_feature_columns
-
-
-# モデル保存ディレクトリ
-MODEL_DIR = Path(__file__).parent.parent.parent.parent / "ml" / "models"
-
-# サポートするレースタイプ
-RACE_TYPES = ["central", "local", "banei"]
-DEFAULT_RACE_TYPE = "central"
-
-
-def get_model_filename(race_type: str, version: str) -> str:
-    """モデルファイル名を生成"""
-    if race_type == DEFAULT_RACE_TYPE:
-        # 後方互換性: centralの場合は従来の命名も許容
-        return f"model_{version}.pkl"
-    return f"model_{race_type}_{version}.pkl"
-
-
-def get_model_dir(race_type: str) -> Path:
-    """レースタイプ別のモデルディレクトリを取得"""
-    if race_type == DEFAULT_RACE_TYPE:
-        return MODEL_DIR
-    return MODEL_DIR / race_type
+# モデルファイルの場所（既存の import 先を変えないよう、ここからも参照できるようにする）
+from .model_files import (
+    DEFAULT_RACE_TYPE,
+    MODEL_DIR,
+    RACE_TYPES,
+    get_model_dir,
+    get_model_filename,
+)
 
 
 class HorseRacingPredictor:
@@ -552,25 +536,53 @@ class HorseRacingPredictor:
         勝率を予測（二値分類モデルの出力）
 
         Args:
-            X: 特徴量DataFrame
+            X: 特徴量DataFrame（1レース分）
+
+        Returns:
+            勝率（0-1）、レース内で合計が1になるよう正規化
+        """
+        return self.proba_from_scores(self.predict(X))
+
+    def predict_proba_grouped(self, X: pd.DataFrame, race_ids) -> np.ndarray:
+        """
+        複数レースの勝率をまとめて予測
+
+        モデルの呼び出しは全レースで1回だけ行い、正規化はレースごとに行う。
+
+        Args:
+            X: 特徴量DataFrame（複数レースの出走馬）
+            race_ids: 各行のレースID（X と同じ長さ、同じレースの行が連続していなくてもよい）
+
+        Returns:
+            勝率（0-1）、各レース内で合計が1になるよう正規化
+        """
+        return self.proba_from_scores(self.predict(X), race_ids)
+
+    def proba_from_scores(self, scores: np.ndarray, race_ids=None) -> np.ndarray:
+        """
+        予測スコアを勝率に変換（キャリブレーション・レース内正規化）
+
+        Args:
+            scores: predict() の出力
+            race_ids: 各行のレースID（省略時は全体を1レースとして扱う）
 
         Returns:
             勝率（0-1）、レース内で合計が1になるよう正規化
         """
-        # 二値分類モデルは直接確率を出力
-        probs = self.predict(X)
+        probs = np.asarray(scores, dtype=float)
 
         if self.calibrator is not None and self.use_calibration:
             # キャリブレーション適用（微調整）
-            calibrated_probs = self.calibrator.predict(probs)
-            probs = calibrated_probs
+            probs = self.calibrator.predict(probs)
 
         # 確率の正規化（レース内で合計が1になるように）
-        total = probs.sum()
-        if total > 0:
-            probs = probs / total
+        if race_ids is None:
+            total = probs.sum()
+            return probs / total if total > 0 else probs
 
-        return probs
+        codes, _ = pd.factorize(np.asarray(race_ids))
+        totals = np.bincount(codes, weights=probs)[codes]
+        return np.divide(probs, totals, out=probs.copy(), where=totals > 0)
 
     def predict_ranking(self, X: pd.DataFrame) -> list[int]:
         """
@@ -696,53 +708,3 @@ def get_model(
         pass
 
     return predictor
-
-
-def list_model_versions(race_type: str = DEFAULT_RACE_TYPE) -> list[dict]:
-    """
-    利用可能なモデルバージョン一覧を取得
-
-    Args:
-        race_type: レースタイプ
-
-    Returns:
-        モデルバージョン情報のリスト
-    """
-    model_dir = get_model_dir(race_type)
-    versions = []
-
-    if not model_dir.exists():
-        return versions
-
-    # レースタイプに応じたパターンでファイルを検索
-    if race_type == DEFAULT_RACE_TYPE:
-        # centralの場合は両方のパターンを検索（後方互換性）
-        patterns = ["model_v*.pkl", "model_central_v*.pkl"]
-    else:
-        patterns = [f"model_{race_type}_v*.pkl"]
-
-    import glob
-    found_files = set()
-    for pattern in patterns:
-        for filepath in model_dir.glob(pattern):
-            if filepath.name not in found_files:
-                found_files.add(filepath.name)
-                # バージョン名を抽出
-                name = filepath.stem  # model_v1 or model_central_v1
-                if name.startswith(f"model_{race_type}_"):
-                    version = name.replace(f"model_{race_type}_", "")
-                else:
-                    version = name.replace("model_", "")
-
-                stat = filepath.stat()
-                versions.append({
-                    "version": version,
-                    "file_path": str(filepath),
-                    "size_bytes": stat.st_size,
-                    "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    "race_type": race_type,
-                })
-
-    # 作成日時の降順でソート
-    versions.sort(key=lambda x: x["created_at"], reverse=True)
-    return versions
@@ -0,0 +1,80 @@
+"""
+モデルファイルの置き場所と一覧
+
+lightgbm・scikit-learn・pandas を読み込まないので、APIの起動時や
+モデル一覧の表示からはこちらを使う。
+"""
+from datetime import datetime
+from pathlib import Path
+
+
+# モデル保存ディレクトリ
+MODEL_DIR = Path(__file__).parent.parent.parent.parent / "ml" / "models"
+
+# サポートするレースタイプ
+RACE_TYPES = ["central", "local", "banei"]
+DEFAULT_RACE_TYPE = "central"
+
+
+def get_model_filename(race_type: str, version: str) -> str:
+    """モデルファイル名を生成"""
+    if race_type == DEFAULT_RACE_TYPE:
+        # 後方互換性: centralの場合は従来の命名も許容
+        return f"model_{version}.pkl"
+    return f"model_{race_type}_{version}.pkl"
+
+
+def get_model_dir(race_type: str) -> Path:
+    """レースタイプ別のモデルディレクトリを取得"""
+    if race_type == DEFAULT_RACE_TYPE:
+        return MODEL_DIR
+    return MODEL_DIR / race_type
+
+
+def list_model_versions(race_type: str = DEFAULT_RACE_TYPE) -> list[dict]:
+    """
+    利用可能なモデルバージョン一覧を取得
+
+    Args:
+        race_type: レースタイプ
+
+    Returns:
+        モデルバージョン情報のリスト
+    """
+    model_dir = get_model_dir(race_type)
+    versions = []
+
+    if not model_dir.exists():
+        return versions
+
+    # レースタイプに応じたパターンでファイルを検索
+    if race_type == DEFAULT_RACE_TYPE:
+        # centralの場合は両方のパターンを検索（後方互換性）
+        patterns = ["model_v*.pkl", "model_central_v*.pkl"]
+    else:
+        patterns = [f"model_{race_type}_v*.pkl"]
+
+    found_files = set()
+    for pattern in patterns:
+        for filepath in model_dir.glob(pattern):
+            if filepath.name not in found_files:
+                found_files.add(filepath.name)
+                # バージョン名を抽出
+                name = filepath.stem  # model_v1 or model_central_v1
+                if name.startswith(f"model_{race_type}_"):
+                    version = name.replace(f"model_{race_type}_", "")
+                else:
+                    version = name.replace("model_", "")
+
+                stat = filepath.stat()
+                versions.append({
+                    "version": version,
+                    "file_path": str(filepath),
+                    "size_bytes": stat.st_size,
+                    "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                    "race_type": race_type,
+                })
+
+    # 作成日時の降順でソート
+    versions.sort(key=lambda x: x["created_at"], reverse=True)
+    return versions
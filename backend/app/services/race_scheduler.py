@@ -0,0 +1,383 @@
+"""
+発走前スケジューラー
+
+RaceCardListScraperから取得した発走時刻をもとに、
+出馬表の再取得・オッズ取得・再予測をasyncioで自動実行する。
+発走が近づくほどオッズ取得間隔を短くし、取得のたびに予測キャッシュを更新するため、
+判断時点の予測取得はキャッシュ読み込みだけで済む。
+
+同時実行数はセマフォで、HTTPリクエスト間隔は共有RateLimiterで制御する。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import date, datetime
+from typing import Callable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db.base import BatchSessionLocal
+from app.logging_config import get_logger
+from app.services import odds_service, prediction_service, race_service
+from app.services.scraper import (
+    OddsScraper,
+    RaceCardListScraper,
+    RaceCardScraper,
+    RateLimiter,
+)
+
+logger = get_logger(__name__)
+
+JST = ZoneInfo("Asia/Tokyo")
+
+JOB_CARD = "card"
+JOB_ODDS = "odds"
+JOB_PREDICT = "predict"
+JOB_TYPES = [JOB_CARD, JOB_ODDS, JOB_PREDICT]
+
+# 発走までの残り時間（分）の下限 -> オッズ取得間隔（分）
+ODDS_POLL_SCHEDULE = [(120, 30.0), (60, 15.0), (30, 5.0), (10, 2.0), (0, 1.0)]
+
+# オッズ取得を開始する発走前の時間（分）
+ODDS_WINDOW_MINUTES = 180
+
+# 全券種オッズを取得し始める発走前の時間（分）
+ALL_ODDS_MINUTES = 30
+
+# 出馬表を再取得するタイミング（発走何分前）: 取消・馬体重発表に追従
+CARD_REFRESH_OFFSETS = [180, 60, 20]
+
+
+def odds_poll_interval(minutes_to_post: float) -> Optional[float]:
+    """発走までの残り時間からオッズ取得間隔（分）を決める（発走後はNone）"""
+    if minutes_to_post <= 0:
+        return None
+    for threshold, interval in ODDS_POLL_SCHEDULE:
+        if minutes_to_post > threshold:
+            return interval
+    return ODDS_POLL_SCHEDULE[-1][1]
+
+
+def parse_post_time(target_date: date, post_time: Optional[str]) -> Optional[datetime]:
+    """"HH:MM"形式の発走時刻をJSTのdatetimeに変換"""
+    if not post_time:
+        return None
+    try:
+        hour, minute = (int(v) for v in post_time.split(":"))
+        return datetime(
+            target_date.year, target_date.month, target_date.day, hour, minute, tzinfo=JST
+        )
+    except ValueError:
+        return None
+
+
+class RaceScheduler:
+    """発走前の出馬表・オッズ・予測更新を管理するスケジューラー"""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        plan_interval_minutes: Optional[int] = None,
+        race_type: Optional[str] = None,
+        session_factory: sessionmaker = BatchSessionLocal,
+        rate_limiter: Optional[RateLimiter] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_concurrency = max_concurrency or settings.SCHEDULER_MAX_CONCURRENCY
+        self.plan_interval = (
+            plan_interval_minutes or settings.SCHEDULER_PLAN_INTERVAL_MINUTES
+        ) * 60
+        self.race_type = race_type or settings.SCHEDULER_RACE_TYPE
+        self.session_factory = session_factory
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.clock = clock
+
+        # (実行予定時刻, 連番, 種類, race_id)
+        self._queue: list[tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._queued: set[tuple[str, str]] = set()
+        self._post_times: dict[str, datetime] = {}
+
+        self._running = False
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+
+        self._metrics = {
+            "jobs": {kind: {"completed": 0, "failed": 0} for kind in JOB_TYPES},
+            "lag_last": 0.0,
+            "lag_max": 0.0,
+            "lag_total": 0.0,
+            "lag_count": 0,
+            "last_plan_at": None,
+            "last_error": None,
+        }
+
+    # ==================== 起動・停止 ====================
+
+    def start(self) -> None:
+        """イベントループ上でスケジューラーを起動"""
+        if self._running:
+            return
+        self._running = True
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks = [
+            asyncio.create_task(self._plan_loop()),
+            asyncio.create_task(self._dispatch_loop()),
+        ]
+        logger.info(
+            f"Race scheduler started (concurrency={self.max_concurrency}, "
+            f"interval={self.rate_limiter.interval}s)"
+        )
+
+    async def stop(self) -> None:
+        """スケジューラーを停止"""
+        if not self._running:
+            return
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Race scheduler stopped")
+
+    # ==================== スケジュール ====================
+
+    def schedule(self, kind: str, race_id: str, due: float) -> bool:
+        """ジョブを登録（同じ種類・レースの未実行ジョブがあれば登録しない）"""
+        key = (kind, race_id)
+        if key in self._queued:
+            return False
+        self._queued.add(key)
+        heapq.heappush(self._queue, (due, next(self._seq), kind, race_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def pop_job(self) -> tuple[float, str, str]:
+        """実行予定時刻が最も早いジョブを取り出す"""
+        due, _, kind, race_id = heapq.heappop(self._queue)
+        self._queued.discard((kind, race_id))
+        return due, kind, race_id
+
+    def plan_races(self, races: list[dict], target_date: date) -> int:
+        """
+        レース一覧から出馬表再取得・オッズ取得ジョブを登録
+
+        Args:
+            races: RaceCardListScraperの戻り値
+            target_date: 開催日
+
+        Returns:
+            新たに追跡を開始したレース数
+        """
+        now = self.clock()
+
+        # 発走済みのレースは追跡をやめる
+        for race_id, post in list(self._post_times.items()):
+            if post.timestamp() < now and not any(
+                (kind, race_id) in self._queued for kind in JOB_TYPES
+            ):
+                del self._post_times[race_id]
+
+        added = 0
+        for race in races:
+            race_id = race["race_id"]
+            post = parse_post_time(target_date, race.get("post_time"))
+            if post is None or post.timestamp() <= now:
+                continue
+
+            is_new = race_id not in self._post_times
+            self._post_times[race_id] = post
+            if not is_new:
+                continue
+            added += 1
+
+            post_ts = post.timestamp()
+            for offset in CARD_REFRESH_OFFSETS:
+                due = post_ts - offset * 60
+                if due > now:
+                    self.schedule(JOB_CARD, race_id, due)
+                    break
+            else:
+                self.schedule(JOB_CARD, race_id, now)
+
+            self.schedule(JOB_ODDS, race_id, max(now, post_ts - ODDS_WINDOW_MINUTES * 60))
+        return added
+
+    def _schedule_next(self, kind: str, race_id: str) -> None:
+        """完了したジョブの次回実行を登録"""
+        post = self._post_times.get(race_id)
+        if post is None:
+            return
+        now = self.clock()
+        minutes_to_post = (post.timestamp() - now) / 60
+
+        if kind == JOB_ODDS:
+            interval = odds_poll_interval(minutes_to_post)
+            if interval is not None:
+                self.schedule(JOB_ODDS, race_id, now + interval * 60)
+        elif kind == JOB_CARD:
+            for offset in CARD_REFRESH_OFFSETS:
+                if minutes_to_post > offset:
+                    self.schedule(JOB_CARD, race_id, post.timestamp() - offset * 60)
+                    break
+
+    # ==================== ループ ====================
+
+    async def _plan_loop(self) -> None:
+        """定期的に当日のレース一覧（発走時刻）を取得"""
+        loop = asyncio.get_running_loop()
+        while self._running:
+            try:
+                today = datetime.now(JST).date()
+                races = await loop.run_in_executor(None, self._fetch_race_list, today)
+                added = self.plan_races(races, today)
+                self._metrics["last_plan_at"] = datetime.now(JST).isoformat()
+                logger.info(f"Scheduler planned {len(races)} races ({added} new)")
+            except Exception as e:
+                self._metrics["last_error"] = str(e)
+                logger.error(f"Scheduler planning failed: {e}")
+            await asyncio.sleep(self.plan_interval)
+
+    async def _dispatch_loop(self) -> None:
+        """実行時刻になったジョブを同時実行数の範囲で実行"""
+        while self._running:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due = self._queue[0][0]
+            delay = due - self.clock()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._semaphore.acquire()
+            due, kind, race_id = self.pop_job()
+            asyncio.create_task(self._execute(kind, race_id, due))
+
+    async def _execute(self, kind: str, race_id: str, due: float) -> None:
+        """ジョブを実行（同期処理はスレッドプールで実行）"""
+        lag = max(0.0, self.clock() - due)
+        self._metrics["lag_last"] = lag
+        self._metrics["lag_max"] = max(self._metrics["lag_max"], lag)
+        self._metrics["lag_total"] += lag
+        self._metrics["lag_count"] += 1
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            ok = await loop.run_in_executor(None, self.run_job, kind, race_id)
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+        # キュー操作はイベントループのスレッドでのみ行う
+        self.after_job(kind, race_id, ok)
+
+    # ==================== ジョブ ====================
+
+    def run_job(self, kind: str, race_id: str) -> bool:
+        """ジョブを同期実行（スレッドプールから呼ばれる）"""
+        try:
+            if kind == JOB_CARD:
+                self._refresh_card(race_id)
+            elif kind == JOB_ODDS:
+                self._poll_odds(race_id)
+            elif kind == JOB_PREDICT:
+                self._predict(race_id)
+            self._metrics["jobs"][kind]["completed"] += 1
+            return True
+        except Exception as e:
+            self._metrics["jobs"][kind]["failed"] += 1
+            self._metrics["last_error"] = f"{kind} {race_id}: {e}"
+            logger.warning(f"Scheduler job {kind} failed for {race_id}: {e}")
+            return False
+
+    def after_job(self, kind: str, race_id: str, ok: bool) -> None:
+        """後続ジョブを登録"""
+        # 出馬表・オッズが更新されたら予測を作り直す
+        if ok and kind in (JOB_CARD, JOB_ODDS):
+            self.schedule(JOB_PREDICT, race_id, self.clock())
+        if kind != JOB_PREDICT:
+            self._schedule_next(kind, race_id)
+
+    def _fetch_race_list(self, target_date: date) -> list[dict]:
+        scraper = RaceCardListScraper(save_html=False, rate_limiter=self.rate_limiter)
+        return scraper.scrape(target_date, race_type=self.race_type)
+
+    def _refresh_card(self, race_id: str) -> None:
+        scraper = RaceCardScraper(rate_limiter=self.rate_limiter)
+        detail = scraper.scrape(race_id)
+        db = self.session_factory()
+        try:
+            race_service.save_race_with_entries(db, detail)
+        finally:
+            db.close()
+
+    def _poll_odds(self, race_id: str) -> None:
+        post = self._post_times.get(race_id)
+        minutes_to_post = (post.timestamp() - self.clock()) / 60 if post else 0
+        scraper = OddsScraper(save_html=False, rate_limiter=self.rate_limiter)
+        if minutes_to_post <= ALL_ODDS_MINUTES:
+            odds_data = scraper.scrape_all(race_id)
+        else:
+            odds_data = scraper.scrape(race_id)
+
+        db = self.session_factory()
+        try:
+            odds_service.save_snapshot(db, race_id, odds_data)
+            odds_service.apply_win_odds(db, race_id, odds_data)
+        finally:
+            db.close()
+
+    def _predict(self, race_id: str) -> None:
+        db = self.session_factory()
+        try:
+            prediction_service.refresh_scheduled_prediction(db, race_id)
+        finally:
+            db.close()
+
+    # ==================== メトリクス ====================
+
+    def get_status(self) -> dict:
+        """キュー長・遅延などのメトリクスを取得"""
+        now = self.clock()
+        lag_count = self._metrics["lag_count"]
+        next_due = self._queue[0][0] if self._queue else None
+        return {
+            "running": self._running,
+            "queue_depth": len(self._queue),
+            "queue_depth_by_type": {
+                kind: sum(1 for _, _, k, _ in self._queue if k == kind)
+                for kind in JOB_TYPES
+            },
+            "overdue": sum(1 for due, _, _, _ in self._queue if due <= now),
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rate_interval_seconds": self.rate_limiter.interval,
+            "tracked_races": len(self._post_times),
+            "next_job_in_seconds": round(next_due - now, 1) if next_due else None,
+            "lag_seconds": {
+                "last": round(self._metrics["lag_last"], 3),
+                "max": round(self._metrics["lag_max"], 3),
+                "avg": round(self._metrics["lag_total"] / lag_count, 3) if lag_count else 0.0,
+            },
+            "jobs": self._metrics["jobs"],
+            "last_plan_at": self._metrics["last_plan_at"],
+            "last_error": self._metrics["last_error"],
+        }
+
+
+# アプリ全体で共有するスケジューラー
+scheduler = RaceScheduler()
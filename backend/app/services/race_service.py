@@ -1,9 +1,10 @@
 from datetime import date
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy import select
 
+from app.db.pagination import count_rows, paginate
 from app.models.race import Race, Entry
 from app.models.horse import Horse
 from app.models.jockey import Jockey
@@ -11,15 +12,28 @@ from app.services.scraper.jockey import JockeyScraper
 from app.constants import RACE_TYPE_CENTRAL
 
 
-def get_races_by_date(
+# 一覧の並び順（日付降順・レース番号・レースID）
+RACE_LIST_ORDER = [(Race.date, True), (Race.race_number, False), (Race.race_id, False)]
+
+
+def get_races_page(
     db: Session,
     target_date: Optional[date] = None,
     course: Optional[str] = None,
     race_type: Optional[str] = None,
     limit: int = 50,
     offset: int = 0,
-) -> tuple[int, list[Race]]:
-    """Get races with filters and pagination"""
+    cursor: Optional[str] = None,
+) -> tuple[int, list[Race], Optional[str]]:
+    """
+    Get races with filters and keyset pagination
+
+    Returns:
+        (total, races, next_cursor)
+
+    Raises:
+        ValueError: invalid cursor
+    """
     query = select(Race)
 
     if target_date:
@@ -29,26 +43,46 @@ def get_races_by_date(
     if race_type:
         query = query.where(Race.race_type == race_type)
 
-    # Get total count
-    count_query = select(Race)
-    if target_date:
-        count_query = count_query.where(Race.date == target_date)
-    if course:
-        count_query = count_query.where(Race.course == course)
-    if race_type:
-        count_query = count_query.where(Race.race_type == race_type)
-    total = len(db.execute(count_query).scalars().all())
-
-    # Get paginated results
-    query = query.order_by(Race.date.desc(), Race.race_number).offset(offset).limit(limit)
-    races = db.execute(query).scalars().all()
-
-    return total, list(races)
+    total = count_rows(db, query, cache_key=("races", target_date, course, race_type))
+    races, next_cursor = paginate(db, query, RACE_LIST_ORDER, limit, offset=offset, cursor=cursor)
+    return total, races, next_cursor
 
 
-def get_race_by_id(db: Session, race_id: str) -> Optional[Race]:
-    """Get a race by its ID with entries"""
-    return db.get(Race, race_id)
+def get_races_by_date(
+    db: Session,
+    target_date: Optional[date] = None,
+    course: Optional[str] = None,
+    race_type: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> tuple[int, list[Race]]:
+    """Get races with filters and pagination"""
+    total, races, _ = get_races_page(
+        db, target_date=target_date, course=course, race_type=race_type, limit=limit, offset=offset
+    )
+    return total, races
+
+
+def get_race_by_id(db: Session, race_id: str, with_entries: bool = False) -> Optional[Race]:
+    """
+    Get a race by its ID
+
+    with_entries=True loads entries with their horse and jockey in the same
+    round trips (no per-entry lazy loads).
+    """
+    if not with_entries:
+        return db.get(Race, race_id)
+    stmt = (
+        select(Race)
+        .where(Race.race_id == race_id)
+        .options(
+            selectinload(Race.entries).options(
+                joinedload(Entry.horse),
+                joinedload(Entry.jockey),
+            )
+        )
+    )
+    return db.execute(stmt).scalar_one_or_none()
 
 
 def save_race(db: Session, race_data: dict) -> Race:
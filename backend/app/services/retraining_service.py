@@ -2,76 +2,63 @@
 モデル再学習サービス
 
 APIから呼び出し可能な再学習機能を提供
-SSEストリーミング対応
+再学習は job_service のワーカープロセスで実行し、進捗はSSEで中継する
 """
 from datetime import datetime, date
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, Dict, Any
 import threading
-import queue
 import json
 
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.logging_config import get_logger
-from app.db.base import SessionLocal
-from app.services.predictor import prepare_training_data, prepare_time_split_data, HorseRacingPredictor
-from app.services.predictor.model import MODEL_DIR, DEFAULT_RACE_TYPE, RACE_TYPES
-from app.services.predictor.features_local import (
-    prepare_local_training_data,
-    prepare_local_time_split_data,
-    get_local_feature_columns,
-)
-from app.services.predictor.features_banei import (
-    prepare_banei_training_data,
-    prepare_banei_time_split_data,
-    get_banei_feature_columns,
-)
+from app.db.base import BatchSessionLocal
+from app.services import job_service
+from app.services.event_broker import broker
+from app.services.predictor.feature_profile import FeatureGroupProfiler
+from app.services.predictor.model_files import MODEL_DIR, DEFAULT_RACE_TYPE, RACE_TYPES
 
 logger = get_logger(__name__)
 
-# 再学習状態を管理
-_retraining_status = {
+JOB_KIND = "retrain"
+
+# 再学習状態を管理（ワーカーでの変更がAPIプロセスに反映される）
+_retraining_status = job_service.SharedStatus(JOB_KIND, {
     "is_running": False,
+    "job_id": None,
     "started_at": None,
     "progress": None,
     "last_result": None,
-}
+})
 _lock = threading.Lock()
 
-# SSE用の進捗イベントキュー（複数クライアント対応）
-_progress_queues: List[queue.Queue] = []
-_queues_lock = threading.Lock()
-
-
-def register_progress_listener() -> queue.Queue:
-    """進捗リスナーを登録"""
-    q = queue.Queue()
-    with _queues_lock:
-        _progress_queues.append(q)
-    return q
-
-
-def unregister_progress_listener(q: queue.Queue):
-    """進捗リスナーを解除"""
-    with _queues_lock:
-        if q in _progress_queues:
-            _progress_queues.remove(q)
-
-
 def emit_progress(event_type: str, data: Dict[str, Any]):
-    """進捗イベントを発行"""
+    """進捗イベントを発行（ワーカープロセスではAPIプロセスへ中継され、"retrain" チャンネルに配信される）"""
     event = {
         "type": event_type,
         "timestamp": datetime.now().isoformat(),
         **data,
     }
-    with _queues_lock:
-        for q in _progress_queues:
-            try:
-                q.put_nowait(event)
-            except queue.Full:
-                pass  # キューがいっぱいの場合はスキップ
+    if not job_service.emit_event(event):
+        broker.publish(JOB_KIND, event)
+
+
+def _report_feature_profile(profiler: Optional[FeatureGroupProfiler]) -> None:
+    """特徴量グループ別の集計をログに出し、"feature_profile" イベントで配信する"""
+    if profiler is None or not profiler.groups:
+        return
+    profiler.log_report("retraining")
+    groups = profiler.report()
+    slowest = groups[0]
+    emit_progress("feature_profile", {
+        "message": (
+            f"特徴量グループ別の処理時間: 最も遅いのは {slowest['group']} "
+            f"({slowest['total_ms']:.0f}ms, {slowest['share']:.0%}, {slowest['queries']}クエリ)"
+        ),
+        "groups": groups,
+    })
 
 
 class RetrainingResult:
@@ -135,21 +122,35 @@ def get_retraining_status() -> dict:
     with _lock:
         return {
             "is_running": _retraining_status["is_running"],
-            "started_at": (
-                _retraining_status["started_at"].isoformat()
-                if _retraining_status["started_at"]
-                else None
-            ),
+            "job_id": _retraining_status["job_id"],
+            "started_at": _retraining_status["started_at"],
             "progress": _retraining_status["progress"],
-            "last_result": (
-                _retraining_status["last_result"].to_dict()
-                if _retraining_status["last_result"]
-                else None
-            ),
+            "last_result": _retraining_status["last_result"],
         }
 
 
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+def run_retraining_job(
+    min_date: Optional[str] = None,
+    train_end_date: Optional[str] = None,
+    valid_end_date: Optional[str] = None,
+    **params,
+) -> Optional[dict]:
+    """ワーカープロセスの入口（日付はISO形式の文字列で受け取る）"""
+    _run_retraining(
+        min_date=_parse_date(min_date),
+        train_end_date=_parse_date(train_end_date),
+        valid_end_date=_parse_date(valid_end_date),
+        **params,
+    )
+    return _retraining_status["last_result"]
+
+
 def start_retraining(
+    db: Session,
     min_date: Optional[date] = None,
     num_boost_round: int = 1000,
     early_stopping: int = 50,
@@ -171,6 +172,7 @@ def start_retraining(
     再学習を開始する
 
     Args:
+        db: データベースセッション（ジョブの登録用）
         min_date: 学習データの最小日付（従来モード）
         num_boost_round: ブースティング回数
         early_stopping: 早期停止回数
@@ -190,31 +192,42 @@ def start_retraining(
     # race_typeのバリデーション
     if race_type not in RACE_TYPES:
         race_type = DEFAULT_RACE_TYPE
+    # ワーカープロセスで再学習を実行
+    job = job_service.submit_job(db, JOB_KIND, run_retraining_job, params={
+        "min_date": min_date,
+        "num_boost_round": num_boost_round,
+        "early_stopping": early_stopping,
+        "valid_fraction": valid_fraction,
+        "use_time_split": use_time_split,
+        "train_end_date": train_end_date,
+        "valid_end_date": valid_end_date,
+        "upload_after_training": upload_after_training,
+        "upload_version": upload_version,
+        "upload_description": upload_description,
+        "target_strategy": target_strategy,
+        "race_type": race_type,
+    })
+    if job is None:
+        active = job_service.active_job(db, JOB_KIND)
+        return {
+            "status": "already_running",
+            "job_id": active.id if active else None,
+            "started_at": (active.started_at or active.created_at).isoformat() if active else None,
+        }
+
+    started_at = job.created_at.isoformat()
     with _lock:
-        if _retraining_status["is_running"]:
-            return {
-                "status": "already_running",
-                "started_at": _retraining_status["started_at"].isoformat(),
-            }
-
-        _retraining_status["is_running"] = True
-        _retraining_status["started_at"] = datetime.now()
-        _retraining_status["progress"] = "starting"
-
-    # バックグラウンドで再学習を実行
-    thread = threading.Thread(
-        target=_run_retraining,
-        args=(min_date, num_boost_round, early_stopping, valid_fraction,
-              use_time_split, train_end_date, valid_end_date,
-              upload_after_training, upload_version, upload_description,
-              target_strategy, race_type),
-        daemon=True,
-    )
-    thread.start()
+        dict.update(_retraining_status, {
+            "is_running": True,
+            "job_id": job.id,
+            "started_at": started_at,
+            "progress": "starting",
+        })
 
     return {
         "status": "started",
-        "started_at": _retraining_status["started_at"].isoformat(),
+        "job_id": job.id,
+        "started_at": started_at,
     }
 
 
@@ -233,10 +246,27 @@ def _run_retraining(
     race_type: str = DEFAULT_RACE_TYPE,
 ) -> None:
     """バックグラウンドで再学習を実行"""
+    # pandas・LightGBM はワーカープロセスで初めて読み込む（APIの起動を遅くしない）
+    from app.services.predictor import (
+        HorseRacingPredictor,
+        prepare_banei_time_split_data,
+        prepare_banei_training_data,
+        prepare_local_time_split_data,
+        prepare_local_training_data,
+        prepare_time_split_data,
+        prepare_training_data,
+    )
+
     result = RetrainingResult()
     result.started_at = datetime.now()
 
-    db = SessionLocal()
+    db = BatchSessionLocal()
+    with _lock:
+        _retraining_status.update(
+            is_running=True,
+            job_id=job_service.current_job_id(),
+            started_at=result.started_at.isoformat(),
+        )
 
     try:
         # ステップ1: データ準備開始
@@ -272,6 +302,8 @@ def _run_retraining(
         })
         logger.info(f"Race type: {race_type}")
 
+        profiler = FeatureGroupProfiler() if settings.FEATURE_PROFILING else None
+
         if use_time_split and train_end_date and valid_end_date:
             # 時系列分割モード（Train/Valid/Testの3分割）
             logger.info(f"Using time-split mode: train_end={train_end_date}, valid_end={valid_end_date}")
@@ -303,6 +335,7 @@ def _run_retraining(
                     valid_end_date=valid_end_date,
                     train_start_date=min_date,
                     progress_callback=data_progress_callback,
+                    profiler=profiler,
                     target_strategy=target_strategy,
                 )
             elif race_type == "banei":
@@ -315,6 +348,7 @@ def _run_retraining(
                     valid_end_date=valid_end_date,
                     train_start_date=min_date,
                     progress_callback=data_progress_callback,
+                    profiler=profiler,
                 )
             else:
                 data = prepare_time_split_data(
@@ -323,6 +357,7 @@ def _run_retraining(
                     valid_end_date=valid_end_date,
                     train_start_date=min_date,
                     progress_callback=data_progress_callback,
+                    profiler=profiler,
                     target_strategy=target_strategy,
                 )
 
@@ -350,6 +385,7 @@ def _run_retraining(
                 "num_features": result.num_features,
             })
 
+            _report_feature_profile(profiler)
             logger.info(f"Train: {len(X_train)} samples, Valid: {len(X_valid)} samples, Test: {len(X_test)} samples")
 
             with _lock:
@@ -398,14 +434,18 @@ def _run_retraining(
                 emit_progress("info", {
                     "message": "地方競馬専用の特徴量を使用します",
                 })
-                X, y = prepare_local_training_data(db, min_date=min_date, target_strategy=target_strategy)
+                X, y = prepare_local_training_data(
+                    db, min_date=min_date, target_strategy=target_strategy, profiler=profiler
+                )
             elif race_type == "banei":
                 emit_progress("info", {
                     "message": "ばんえい競馬専用の特徴量を使用します",
                 })
-                X, y = prepare_banei_training_data(db, min_date=min_date)
+                X, y = prepare_banei_training_data(db, min_date=min_date, profiler=profiler)
             else:
-                X, y = prepare_training_data(db, min_date=min_date, target_strategy=target_strategy)
+                X, y = prepare_training_data(
+                    db, min_date=min_date, target_strategy=target_strategy, profiler=profiler
+                )
 
             if X.empty:
                 raise ValueError("No training data found")
@@ -421,6 +461,7 @@ def _run_retraining(
                 "num_features": result.num_features,
             })
 
+            _report_feature_profile(profiler)
             logger.info(f"Training data: {result.num_samples} samples, {result.num_features} features")
 
             with _lock:
@@ -540,7 +581,7 @@ def _run_retraining(
                         "trained_at": result.started_at.isoformat() if result.started_at else None,
                     }
 
-                    upload_result = storage_service.upload_model(model_data, version, metadata)
+                    upload_result = storage_service.upload_model(model_data, version, metadata, race_type)
                     logger.info(f"Model uploaded to cloud: {upload_result}")
 
                     emit_progress("info", {
@@ -563,7 +604,7 @@ def _run_retraining(
 
         with _lock:
             _retraining_status["progress"] = "completed"
-            _retraining_status["last_result"] = result
+            _retraining_status["last_result"] = result.to_dict()
 
         # ステップ6: 完了
         emit_progress("complete", {
@@ -595,7 +636,7 @@ def _run_retraining(
 
         with _lock:
             _retraining_status["progress"] = "failed"
-            _retraining_status["last_result"] = result
+            _retraining_status["last_result"] = result.to_dict()
 
         # エラーイベントを発行
         emit_progress("error", {
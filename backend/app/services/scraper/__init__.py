@@ -1,4 +1,4 @@
-from app.services.scraper.base import BaseScraper, ScraperError, RateLimitError, PageNotFoundError
+from app.services.scraper.base import BaseScraper, RateLimiter, ScraperError, RateLimitError, PageNotFoundError
 from app.services.scraper.race import RaceListScraper, RaceDetailScraper
 from app.services.scraper.shutuba import RaceCardListScraper, RaceCardScraper
 from app.services.scraper.horse import HorseScraper
@@ -9,6 +9,7 @@ from app.services.scraper.training import TrainingScraper
 
 __all__ = [
     "BaseScraper",
+    "RateLimiter",
     "ScraperError",
     "RateLimitError",
     "PageNotFoundError",
@@ -1,12 +1,21 @@
+import logging
+import threading
 import time
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Optional
-
-import requests
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
 
 from app.config import settings
+from app.services.scraper import fast_parser
+
+if TYPE_CHECKING:
+    # requests と bs4 は読み込みが重いので、最初にスクレイピングするときまで遅らせる
+    import requests
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 # HTML保存ディレクトリ
 HTML_STORAGE_DIR = Path(__file__).parent.parent.parent.parent / "data" / "html"
@@ -27,6 +36,27 @@ class PageNotFoundError(ScraperError):
     pass
 
 
+class RateLimiter:
+    """複数スクレイパー・スレッド間で共有するレート制限
+
+    リクエスト開始時刻をSCRAPE_INTERVAL間隔のスロットとして予約する。
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = settings.SCRAPE_INTERVAL if interval is None else interval
+        self._lock = threading.Lock()
+        self._next_slot: float = 0
+
+    def wait(self) -> None:
+        """次のスロットまで待機"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class BaseScraper(ABC):
     """Base class for all scrapers"""
 
@@ -45,16 +75,23 @@ class BaseScraper(ABC):
 
     def __init__(
         self,
-        session: Optional[requests.Session] = None,
+        session: Optional["requests.Session"] = None,
         save_html: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
     ):
+        import requests
+
         self.session = session or requests.Session()
         self.session.headers.update(self.HEADERS)
         self._last_request_time: float = 0
         self._save_html = save_html
+        self._rate_limiter = rate_limiter
     
     def _wait_for_rate_limit(self) -> None:
         """Wait to respect rate limit"""
+        if self._rate_limiter is not None:
+            self._rate_limiter.wait()
+            return
         elapsed = time.time() - self._last_request_time
         if elapsed < settings.SCRAPE_INTERVAL:
             time.sleep(settings.SCRAPE_INTERVAL - elapsed)
@@ -88,6 +125,8 @@ class BaseScraper(ABC):
             url: URL to fetch
             identifier: Optional identifier for HTML storage (e.g., race_id, jockey_id)
         """
+        import requests
+
         self._wait_for_rate_limit()
 
         for attempt in range(settings.SCRAPE_MAX_RETRIES):
@@ -129,9 +168,24 @@ class BaseScraper(ABC):
 
         raise ScraperError(f"Max retries exceeded for {url}")
     
-    def parse_html(self, html: str) -> BeautifulSoup:
+    def parse_html(self, html: str) -> "BeautifulSoup":
         """Parse HTML string"""
+        from bs4 import BeautifulSoup
+
         return BeautifulSoup(html, "lxml")
+
+    def parse_with_fallback(self, html: str, parse_fn: Callable[[Any], T]) -> T:
+        """Parse with the lxml fast path, falling back to BeautifulSoup
+
+        parse_fn receives either a fast_parser.FastNode or a BeautifulSoup
+        object and must only use the selectors supported by fast_parser.
+        """
+        if settings.SCRAPE_FAST_PARSER:
+            try:
+                return parse_fn(fast_parser.parse(html))
+            except Exception as e:
+                logger.debug(f"Fast parser failed, falling back to BeautifulSoup: {e}")
+        return parse_fn(self.parse_html(html))
     
     @abstractmethod
     def scrape(self, *args, **kwargs) -> dict:
@@ -0,0 +1,95 @@
+"""
+lxml.htmlによる高速HTMLパーサー
+
+大量に再取得するページ（馬の過去成績・レース結果・組み合わせオッズ）向けに、
+BeautifulSoupのツリーを構築せず、事前コンパイル済みXPathで要素を取り出す。
+
+FastNodeはBeautifulSoup Tagのうちスクレイパーが使う最小限のメソッド
+(select / select_one / get / get_text) だけを実装しており、
+既存の行パーサーをBeautifulSoup・lxmlのどちらでも共用できる。
+"""
+from typing import Iterator, Optional
+
+from lxml import etree
+from lxml import html as lxml_html
+
+
+def _has_class(name: str) -> str:
+    """CSSのクラスセレクタに相当するXPath条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# CSSセレクタ -> 事前コンパイル済みXPath（いずれも子孫要素を文書順で返す）
+_SELECTORS: dict[str, etree.XPath] = {
+    css: etree.XPath(xpath)
+    for css, xpath in {
+        "a": ".//a",
+        "td": ".//td",
+        "th": ".//th",
+        "tr": ".//tr",
+        "table": ".//table",
+        "tbody tr": ".//tbody//tr",
+        ".db_h_race_results": f".//*[{_has_class('db_h_race_results')}]",
+        "table.nk_tb_common": f".//table[{_has_class('nk_tb_common')}]",
+        "table.race_table_01": f".//table[{_has_class('race_table_01')}]",
+        ".racedata h1, .data_intro h1": (
+            f".//*[{_has_class('racedata')} or {_has_class('data_intro')}]//h1"
+        ),
+        ".racedata, .data_intro": (
+            f".//*[{_has_class('racedata')} or {_has_class('data_intro')}]"
+        ),
+        ".mainrace_data .racedata p, .data_intro .smalltxt, .race_otherdata p": (
+            f".//*[{_has_class('mainrace_data')}]//*[{_has_class('racedata')}]//p"
+            f" | .//*[{_has_class('data_intro')}]//*[{_has_class('smalltxt')}]"
+            f" | .//*[{_has_class('race_otherdata')}]//p"
+        ),
+    }.items()
+}
+
+# BeautifulSoupのget_textと同様にscript/styleとコメントを除いたテキストノード
+_TEXT_NODES = etree.XPath(
+    ".//text()[not(ancestor::script) and not(ancestor::style)]"
+)
+
+
+class FastNode:
+    """BeautifulSoup Tag互換の最小限のインターフェースを持つlxml要素ラッパー"""
+
+    __slots__ = ("_el",)
+
+    def __init__(self, element: lxml_html.HtmlElement):
+        self._el = element
+
+    def select(self, selector: str) -> list["FastNode"]:
+        """事前定義したCSSセレクタに一致する子孫要素"""
+        try:
+            xpath = _SELECTORS[selector]
+        except KeyError:
+            raise ValueError(f"Selector not supported by fast parser: {selector}")
+        return [FastNode(el) for el in xpath(self._el)]
+
+    def select_one(self, selector: str) -> Optional["FastNode"]:
+        """事前定義したCSSセレクタに一致する最初の子孫要素"""
+        found = self.select(selector)
+        return found[0] if found else None
+
+    def get(self, key: str, default=None):
+        """属性値を取得"""
+        return self._el.get(key, default)
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        """テキストを取得（BeautifulSoupのget_textと同じ結合規則）"""
+        strings: Iterator[str] = (str(s) for s in _TEXT_NODES(self._el))
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+
+def parse(html: str) -> FastNode:
+    """HTML文字列をlxml.htmlで直接パース
+
+    Raises:
+        etree.ParserError: 空文字列など解析できない場合
+    """
+    return FastNode(lxml_html.document_fromstring(html))
@@ -193,7 +193,11 @@ class HorseScraper(BaseScraper):
         if not results_html:
             return results
 
-        soup = self.parse_html(results_html)
+        return self.parse_with_fallback(results_html, self._parse_past_results)
+
+    def _parse_past_results(self, soup) -> list[dict]:
+        """Parse past results table (BeautifulSoup or fast_parser node)"""
+        results = []
 
         # Try multiple table selectors
         result_table = soup.select_one(".db_h_race_results")
@@ -77,41 +77,46 @@ class OddsScraper(BaseScraper):
         """Scrape quinella (馬連) odds"""
         url = f"https://race.netkeiba.com/odds/index.html?type=b4&race_id={race_id}"
         html = self.fetch(url, identifier=f"{race_id}_quinella")
-        soup = self.parse_html(html)
 
-        return self._parse_combination_odds(soup, 2)
+        return self.parse_with_fallback(
+            html, lambda soup: self._parse_combination_odds(soup, 2)
+        )
 
     def _scrape_quinella_place(self, race_id: str) -> list[dict]:
         """Scrape quinella place (ワイド) odds"""
         url = f"https://race.netkeiba.com/odds/index.html?type=b5&race_id={race_id}"
         html = self.fetch(url, identifier=f"{race_id}_quinella_place")
-        soup = self.parse_html(html)
 
-        return self._parse_combination_odds(soup, 2, has_range=True)
+        return self.parse_with_fallback(
+            html, lambda soup: self._parse_combination_odds(soup, 2, has_range=True)
+        )
 
     def _scrape_exacta(self, race_id: str) -> list[dict]:
         """Scrape exacta (馬単) odds"""
         url = f"https://race.netkeiba.com/odds/index.html?type=b6&race_id={race_id}"
         html = self.fetch(url, identifier=f"{race_id}_exacta")
-        soup = self.parse_html(html)
 
-        return self._parse_combination_odds(soup, 2)
+        return self.parse_with_fallback(
+            html, lambda soup: self._parse_combination_odds(soup, 2)
+        )
 
     def _scrape_trio(self, race_id: str) -> list[dict]:
         """Scrape trio (三連複) odds"""
         url = f"https://race.netkeiba.com/odds/index.html?type=b7&race_id={race_id}"
         html = self.fetch(url, identifier=f"{race_id}_trio")
-        soup = self.parse_html(html)
 
-        return self._parse_combination_odds(soup, 3)
+        return self.parse_with_fallback(
+            html, lambda soup: self._parse_combination_odds(soup, 3)
+        )
 
     def _scrape_trifecta(self, race_id: str) -> list[dict]:
         """Scrape trifecta (三連単) odds"""
         url = f"https://race.netkeiba.com/odds/index.html?type=b8&race_id={race_id}"
         html = self.fetch(url, identifier=f"{race_id}_trifecta")
-        soup = self.parse_html(html)
 
-        return self._parse_combination_odds(soup, 3)
+        return self.parse_with_fallback(
+            html, lambda soup: self._parse_combination_odds(soup, 3)
+        )
 
     def _parse_combination_odds(
         self, soup, num_horses: int, has_range: bool = False
@@ -288,8 +288,12 @@ class RaceDetailScraper(BaseScraper):
         """
         url = f"{self.BASE_URL}/{race_id}/"
         html = self.fetch(url, identifier=race_id)
-        soup = self.parse_html(html)
+        return self.parse_with_fallback(
+            html, lambda soup: self._parse_race_detail(soup, race_id)
+        )
 
+    def _parse_race_detail(self, soup, race_id: str) -> dict:
+        """Parse race info and entries (BeautifulSoup or fast_parser node)"""
         race_info = self._parse_race_info(soup, race_id)
         entries = self._parse_entries(soup)
 
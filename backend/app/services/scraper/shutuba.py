@@ -98,6 +98,7 @@ class RaceCardListScraper(BaseScraper):
                         "course": course,
                         "race_number": race_number,
                         "race_name": race_name if race_name else f"{race_number}R",
+                        "post_time": self._parse_post_time(link),
                     })
 
         # Sort by course and race number
@@ -107,6 +108,14 @@ class RaceCardListScraper(BaseScraper):
     # Course code mapping (centralized)
     COURSE_CODES = ALL_COURSE_CODES
 
+    def _parse_post_time(self, link) -> Optional[str]:
+        """Extract post time (発走時刻, "HH:MM") from the race list item"""
+        item = link.find_parent("li") or link
+        time_match = re.search(r"(\d{1,2}):(\d{2})", item.get_text(" ", strip=True))
+        if time_match:
+            return f"{int(time_match.group(1)):02d}:{time_match.group(2)}"
+        return None
+
     def _get_course_from_id(self, race_id: str) -> str:
         """Extract course name from race_id"""
         if len(race_id) >= 6:
@@ -16,7 +16,7 @@ from app.services.scraper import (
     HorseScraper,
     TrainingScraper,
 )
-from app.services import training_service
+from app.services import entry_history_service, stats_summary_service, training_service
 
 logger = get_logger(__name__)
 
@@ -123,6 +123,10 @@ def scrape_races_for_date(
             result.errors.append({"race_id": race_id, "error": str(e)})
             result.error_count += 1
 
+    if result.success_count:
+        entry_history_service.refresh_entry_history_for_races(db, result.saved_items)
+        stats_summary_service.refresh_jockey_stats_for_date(db, target_date)
+
     return result
 
 
@@ -251,6 +255,11 @@ def scrape_race_results(
             result.errors.append({"race_id": race.race_id, "error": str(e)})
             result.error_count += 1
 
+    if result.success_count:
+        entry_history_service.refresh_entry_history_for_races(db, result.saved_items)
+        stats_summary_service.refresh_jockey_stats_for_date(db, target_date)
+        stats_summary_service.refresh_prediction_outcomes(db, result.saved_items)
+
     return result
 
 
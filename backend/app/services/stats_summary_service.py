@@ -0,0 +1,436 @@
+"""
+成績集計サービス
+
+騎手成績・馬券履歴のサマリー・予測精度を SUM(CASE ...) の1クエリで集計する。
+STATS_SUMMARY_TABLES が有効な場合は集計結果を jockey_stats / history_daily_summary に
+保存しておき、結果取得・馬券結果の更新時に該当分だけ再計算する。
+予測精度は常に prediction_outcomes に保存した的中判定から集計する。
+"""
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import Date, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logging_config import get_logger
+from app.models import (
+    Entry, History, HistoryDailySummary, JockeyStats, Prediction, PredictionOutcome, Race,
+)
+from app.models.summary import utcnow
+
+logger = get_logger(__name__)
+
+
+# ==================== 騎手成績 ====================
+
+
+def _jockey_stats_stmt(
+    jockey_ids: Optional[Iterable[str]] = None,
+    entries_race_type: Optional[str] = None,
+):
+    """騎手ごとの (出走数, 1着, 2着以内, 3着以内) を集計するクエリ"""
+    result = Entry.result
+    if entries_race_type:
+        total = func.sum(case((Race.race_type == entries_race_type, 1), else_=0))
+    else:
+        total = func.count(Entry.id)
+
+    stmt = (
+        select(
+            Entry.jockey_id,
+            total.label("total_entries"),
+            func.sum(case((result == 1, 1), else_=0)).label("wins"),
+            func.sum(case((result.between(1, 2), 1), else_=0)).label("places"),
+            func.sum(case((result.between(1, 3), 1), else_=0)).label("shows"),
+        )
+        .where(Entry.jockey_id.isnot(None))
+        .group_by(Entry.jockey_id)
+    )
+    if entries_race_type:
+        stmt = stmt.join(Race, Entry.race_id == Race.race_id)
+    if jockey_ids is not None:
+        stmt = stmt.where(Entry.jockey_id.in_(list(jockey_ids)))
+    return stmt
+
+
+def _stats_dict(total_entries=0, wins=0, places=0, shows=0) -> dict:
+    return {
+        "total_entries": int(total_entries or 0),
+        "wins": int(wins or 0),
+        "places": int(places or 0),
+        "shows": int(shows or 0),
+    }
+
+
+def compute_jockey_stats(
+    db: Session,
+    jockey_ids: Iterable[str],
+    entries_race_type: Optional[str] = None,
+) -> dict[str, dict]:
+    """
+    複数騎手の成績を1クエリで集計
+
+    Args:
+        db: データベースセッション
+        jockey_ids: 騎手ID
+        entries_race_type: 出走数だけをこのレース種別に絞る（着順の集計は全レース）
+
+    Returns:
+        jockey_id -> {"total_entries", "wins", "places", "shows"}（出走なしは0）
+    """
+    jockey_ids = list(jockey_ids)
+    stats = {jockey_id: _stats_dict() for jockey_id in jockey_ids}
+    if not jockey_ids:
+        return stats
+    for row in db.execute(_jockey_stats_stmt(jockey_ids, entries_race_type)):
+        stats[row.jockey_id] = _stats_dict(row.total_entries, row.wins, row.places, row.shows)
+    return stats
+
+
+def get_jockey_stats(db: Session, jockey_id: str) -> dict:
+    """騎手の成績（集計テーブルが有効ならそちらを参照）"""
+    if settings.STATS_SUMMARY_TABLES:
+        row = db.get(JockeyStats, jockey_id)
+        if row is not None:
+            return _stats_dict(row.total_entries, row.wins, row.places, row.shows)
+    return compute_jockey_stats(db, [jockey_id])[jockey_id]
+
+
+def refresh_jockey_stats(db: Session, jockey_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    jockey_stats を再計算
+
+    Args:
+        jockey_ids: 対象の騎手（Noneなら全騎手）
+
+    Returns:
+        更新した騎手数
+    """
+    if jockey_ids is not None:
+        jockey_ids = list(set(jockey_ids))
+        if not jockey_ids:
+            return 0
+
+    rows = [
+        {
+            "jockey_id": row.jockey_id,
+            **_stats_dict(row.total_entries, row.wins, row.places, row.shows),
+            "refreshed_at": utcnow(),
+        }
+        for row in db.execute(_jockey_stats_stmt(jockey_ids))
+    ]
+
+    stmt = delete(JockeyStats)
+    if jockey_ids is not None:
+        stmt = stmt.where(JockeyStats.jockey_id.in_(jockey_ids))
+    db.execute(stmt)
+    if rows:
+        db.execute(insert(JockeyStats), rows)
+    db.commit()
+    logger.info(f"Refreshed jockey stats for {len(rows)} jockeys")
+    return len(rows)
+
+
+def refresh_jockey_stats_for_date(db: Session, target_date: date) -> int:
+    """指定日に騎乗した騎手の jockey_stats を再計算（集計テーブル無効時は何もしない）"""
+    if not settings.STATS_SUMMARY_TABLES:
+        return 0
+    jockey_ids = db.execute(
+        select(Entry.jockey_id)
+        .join(Race, Entry.race_id == Race.race_id)
+        .where(Race.date == target_date, Entry.jockey_id.isnot(None))
+        .distinct()
+    ).scalars().all()
+    return refresh_jockey_stats(db, jockey_ids)
+
+
+# ==================== 馬券履歴 ====================
+
+
+def _history_day():
+    """履歴の登録日（SQLiteでは文字列で返るため Date 型として扱う）"""
+    return func.date(History.created_at, type_=Date)
+
+
+def _history_aggregates(group_by_day: bool = False):
+    """履歴件数と結果確定分の (件数, 的中数, 購入額, 払戻額) を集計する列"""
+    settled = History.is_hit.isnot(None)
+    hit = History.is_hit.is_(True)
+    columns = [
+        func.count(History.id).label("total_records"),
+        func.sum(case((settled, 1), else_=0)).label("total_bets"),
+        func.sum(case((hit, 1), else_=0)).label("total_hits"),
+        func.sum(case((settled, func.coalesce(History.bet_amount, 0)), else_=0)).label("total_bet_amount"),
+        func.sum(case((hit, func.coalesce(History.payout, 0)), else_=0)).label("total_payout"),
+    ]
+    if group_by_day:
+        day = _history_day()
+        return select(day.label("day"), *columns).group_by(day)
+    return select(*columns)
+
+
+def build_summary(total_bets=0, total_hits=0, total_bet_amount=0, total_payout=0) -> dict:
+    """集計値から的中率・回収率を含むサマリーを作成"""
+    total_bets = int(total_bets or 0)
+    total_hits = int(total_hits or 0)
+    total_bet_amount = int(total_bet_amount or 0)
+    total_payout = int(total_payout or 0)
+
+    hit_rate = (total_hits / total_bets * 100) if total_bets > 0 else 0.0
+    roi = ((total_payout / total_bet_amount - 1) * 100) if total_bet_amount > 0 else 0.0
+
+    return {
+        "total_bets": total_bets,
+        "total_hits": total_hits,
+        "hit_rate": round(hit_rate, 2),
+        "total_bet_amount": total_bet_amount,
+        "total_payout": total_payout,
+        "roi": round(roi, 2),
+    }
+
+
+def get_history_totals(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+) -> tuple[int, dict]:
+    """
+    履歴の総件数とサマリーを取得
+
+    期間指定がなく集計テーブルが有効な場合は日別集計を合計する。
+
+    Returns:
+        (総件数, サマリー)
+    """
+    if settings.STATS_SUMMARY_TABLES and from_date is None and to_date is None:
+        stmt = select(
+            func.sum(HistoryDailySummary.total_records).label("total_records"),
+            func.sum(HistoryDailySummary.total_bets).label("total_bets"),
+            func.sum(HistoryDailySummary.total_hits).label("total_hits"),
+            func.sum(HistoryDailySummary.total_bet_amount).label("total_bet_amount"),
+            func.sum(HistoryDailySummary.total_payout).label("total_payout"),
+        )
+    else:
+        stmt = _history_aggregates()
+        if from_date:
+            stmt = stmt.where(History.created_at >= from_date)
+        if to_date:
+            stmt = stmt.where(History.created_at <= to_date)
+
+    row = db.execute(stmt).one()
+    summary = build_summary(row.total_bets, row.total_hits, row.total_bet_amount, row.total_payout)
+    return int(row.total_records or 0), summary
+
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def refresh_history_daily(db: Session, days: Optional[Iterable] = None) -> int:
+    """
+    history_daily_summary を再計算
+
+    Args:
+        days: 対象日（Noneなら全期間）
+
+    Returns:
+        更新した日数
+    """
+    stmt = _history_aggregates(group_by_day=True)
+    if days is not None:
+        days = sorted({_as_date(d) for d in days})
+        if not days:
+            return 0
+        stmt = stmt.where(_history_day().in_(days))
+
+    rows = [
+        {
+            "day": _as_date(row.day),
+            "total_records": int(row.total_records or 0),
+            "total_bets": int(row.total_bets or 0),
+            "total_hits": int(row.total_hits or 0),
+            "total_bet_amount": int(row.total_bet_amount or 0),
+            "total_payout": int(row.total_payout or 0),
+            "refreshed_at": utcnow(),
+        }
+        for row in db.execute(stmt)
+    ]
+
+    delete_stmt = delete(HistoryDailySummary)
+    if days is not None:
+        delete_stmt = delete_stmt.where(HistoryDailySummary.day.in_(days))
+    db.execute(delete_stmt)
+    if rows:
+        db.execute(insert(HistoryDailySummary), rows)
+    db.commit()
+    return len(rows)
+
+
+def refresh_history_day_of(db: Session, history: History) -> None:
+    """履歴1件が属する日の集計を再計算（集計テーブル無効時は何もしない）"""
+    if not settings.STATS_SUMMARY_TABLES:
+        return
+    day = db.execute(
+        select(_history_day()).where(History.id == history.id)
+    ).scalar()
+    if day is not None:
+        refresh_history_daily(db, [day])
+
+
+# ==================== 予測精度 ====================
+
+
+def _evaluate(results_json: Optional[dict], finishing_order: list[int]) -> Optional[tuple[bool, bool, bool]]:
+    """
+    予測1位の馬が実際の 1着 / 3着以内 / 5着以内 に入ったか
+
+    Args:
+        results_json: Prediction.results_json
+        finishing_order: 着順の昇順に並べた馬番
+
+    Returns:
+        (top1, top3, top5)。予測か結果がなければNone
+    """
+    if not results_json or not results_json.get("predictions") or not finishing_order:
+        return None
+    pred_top1 = results_json["predictions"][0]["horse_number"]
+    return (
+        pred_top1 == finishing_order[0],
+        pred_top1 in finishing_order[:3],
+        pred_top1 in finishing_order[:5],
+    )
+
+
+def refresh_prediction_outcomes(db: Session, race_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    prediction_outcomes を再計算
+
+    予測・着順・レースをそれぞれ1クエリで読み込み、対象レースの判定を作り直す。
+
+    Args:
+        race_ids: 対象レース（Noneなら全予測）
+
+    Returns:
+        判定を保存した予測数
+    """
+    if race_ids is not None:
+        race_ids = list(set(race_ids))
+        if not race_ids:
+            return 0
+
+    prediction_stmt = select(
+        Prediction.id, Prediction.race_id, Prediction.model_version,
+        Prediction.results_json, Prediction.created_at,
+    )
+    entry_stmt = (
+        select(Entry.race_id, Entry.horse_number)
+        .where(Entry.result.isnot(None))
+        .order_by(Entry.race_id, Entry.result)
+    )
+    race_stmt = select(Race.race_id, Race.grade, Race.track_type)
+    if race_ids is not None:
+        prediction_stmt = prediction_stmt.where(Prediction.race_id.in_(race_ids))
+        entry_stmt = entry_stmt.where(Entry.race_id.in_(race_ids))
+        race_stmt = race_stmt.where(Race.race_id.in_(race_ids))
+    else:
+        entry_stmt = entry_stmt.where(Entry.race_id.in_(select(Prediction.race_id)))
+        race_stmt = race_stmt.where(Race.race_id.in_(select(Prediction.race_id)))
+
+    finishing_orders: dict[str, list[int]] = {}
+    for row in db.execute(entry_stmt):
+        finishing_orders.setdefault(row.race_id, []).append(row.horse_number)
+    races = {row.race_id: row for row in db.execute(race_stmt)}
+
+    now = utcnow()
+    rows = []
+    for pred in db.execute(prediction_stmt):
+        race = races.get(pred.race_id)
+        hits = _evaluate(pred.results_json, finishing_orders.get(pred.race_id, []))
+        if race is None or hits is None:
+            continue
+        rows.append({
+            "prediction_id": pred.id,
+            "race_id": pred.race_id,
+            "model_version": pred.model_version,
+            "grade": race.grade,
+            "track_type": race.track_type,
+            "top1_hit": hits[0],
+            "top3_hit": hits[1],
+            "top5_hit": hits[2],
+            "predicted_at": pred.created_at,
+            "evaluated_at": now,
+        })
+
+    stmt = delete(PredictionOutcome)
+    if race_ids is not None:
+        stmt = stmt.where(PredictionOutcome.race_id.in_(race_ids))
+    db.execute(stmt)
+    if rows:
+        db.execute(insert(PredictionOutcome), rows)
+    db.commit()
+    logger.info(f"Evaluated {len(rows)} predictions")
+    return len(rows)
+
+
+def _rates(total, top1, top3, top5=None) -> dict:
+    """的中数を的中率に変換"""
+    rates = {
+        "top1": round((top1 or 0) / total, 2) if total else 0.0,
+        "top3": round((top3 or 0) / total, 2) if total else 0.0,
+    }
+    if top5 is not None:
+        rates["top5"] = round((top5 or 0) / total, 2) if total else 0.0
+    return rates
+
+
+def get_accuracy_stats(db: Session, start_date: Optional[datetime] = None) -> dict:
+    """
+    予測精度を prediction_outcomes の GROUP BY で集計
+
+    Args:
+        start_date: この時刻以降の予測のみを対象にする
+
+    Returns:
+        total_races, accuracy, by_grade, by_track, by_model_version
+    """
+    hit_counts = [
+        func.count().label("total"),
+        func.sum(case((PredictionOutcome.top1_hit, 1), else_=0)).label("top1"),
+        func.sum(case((PredictionOutcome.top3_hit, 1), else_=0)).label("top3"),
+        func.sum(case((PredictionOutcome.top5_hit, 1), else_=0)).label("top5"),
+    ]
+    grade = func.coalesce(PredictionOutcome.grade, "other")
+    stmt = select(
+        PredictionOutcome.model_version,
+        grade.label("grade"),
+        PredictionOutcome.track_type,
+        *hit_counts,
+    ).group_by(PredictionOutcome.model_version, grade, PredictionOutcome.track_type)
+    if start_date:
+        stmt = stmt.where(PredictionOutcome.predicted_at >= start_date)
+
+    # (モデル, グレード, コース種別) ごとの件数を1クエリで取得し、各切り口に足し込む
+    totals = [0, 0, 0, 0]
+    groups: dict[str, dict] = {"by_grade": {}, "by_track": {}, "by_model_version": {}}
+    for row in db.execute(stmt):
+        counts = (row.total, row.top1 or 0, row.top3 or 0, row.top5 or 0)
+        totals = [a + b for a, b in zip(totals, counts)]
+        for name, key in (
+            ("by_grade", row.grade),
+            ("by_track", row.track_type),
+            ("by_model_version", row.model_version),
+        ):
+            current = groups[name].get(key, (0, 0, 0, 0))
+            groups[name][key] = tuple(a + b for a, b in zip(current, counts))
+
+    return {
+        "total_races": totals[0],
+        "accuracy": _rates(*totals),
+        "by_grade": {key: _rates(*counts[:3]) for key, counts in groups["by_grade"].items()},
+        "by_track": {key: _rates(*counts[:3]) for key, counts in groups["by_track"].items()},
+        "by_model_version": {
+            key: {"total_races": counts[0], **_rates(*counts)}
+            for key, counts in groups["by_model_version"].items()
+        },
+    }
@@ -3,24 +3,26 @@ Supabase Storage サービス
 
 モデルファイルのアップロード・ダウンロードを管理
 """
-import io
-import pickle
-from datetime import datetime
+import json
+import tempfile
 from pathlib import Path
-from typing import Optional, List, Dict, Any
-
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, BinaryIO, Optional, List, Dict, Any
 
 from app.config import settings
 from app.logging_config import get_logger
+from app.services import model_artifacts
+from app.services.predictor.model_files import get_model_dir, get_model_filename
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = get_logger(__name__)
 
 # Supabase クライアント（遅延初期化）
-_supabase_client: Optional[Client] = None
+_supabase_client: Optional["Client"] = None
 
 
-def get_supabase_client() -> Optional[Client]:
+def get_supabase_client() -> Optional["Client"]:
     """Supabase クライアントを取得"""
     global _supabase_client
 
@@ -32,6 +34,9 @@ def get_supabase_client() -> Optional[Client]:
         return None
 
     try:
+        # supabase の読み込みは重いので、最初に使うときまで遅らせる
+        from supabase import create_client
+
         _supabase_client = create_client(
             settings.SUPABASE_URL,
             settings.SUPABASE_KEY
@@ -58,71 +63,98 @@ def is_storage_available() -> bool:
         return False
 
 
+class SupabaseArtifactStore:
+    """Supabase Storage のバケット（model_artifacts.ArtifactStore）"""
+
+    def __init__(self, client: "Client", bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def put(self, name: str, path: Path, content_type: str) -> None:
+        # ファイルオブジェクトを渡すと httpx がチャンクごとに送信する
+        with open(path, "rb") as f:
+            self.client.storage.from_(self.bucket).upload(
+                name,
+                f,
+                file_options={"content-type": content_type, "upsert": "true"}
+            )
+
+    def read_bytes(self, name: str) -> Optional[bytes]:
+        try:
+            return self.client.storage.from_(self.bucket).download(name)
+        except Exception:
+            return None
+
+    def download(self, name: str, dest: BinaryIO) -> None:
+        # storage の download() は全体をメモリに読むので、署名付きURLからストリーミングする
+        import httpx
+
+        result = self.client.storage.from_(self.bucket).create_signed_url(name, 600)
+        url = result.get("signedURL") or result.get("signedUrl")
+        if not url:
+            raise FileNotFoundError(name)
+        with httpx.stream("GET", url, timeout=60.0, follow_redirects=True) as response:
+            if response.status_code in (400, 404):
+                raise FileNotFoundError(name)
+            response.raise_for_status()
+            for chunk in response.iter_bytes(model_artifacts.CHUNK_SIZE):
+                dest.write(chunk)
+
+
+def get_artifact_store() -> Optional[SupabaseArtifactStore]:
+    """モデルのバケット（Supabase 未設定ならNone）"""
+    client = get_supabase_client()
+    if client is None:
+        return None
+    return SupabaseArtifactStore(client, settings.SUPABASE_MODEL_BUCKET)
+
+
 def upload_model(
     model_data: Dict[str, Any],
     version: str,
     metadata: Optional[Dict] = None,
-    race_type: str = "central"
+    race_type: str = "central",
+    store: Optional[model_artifacts.ArtifactStore] = None,
 ) -> Dict[str, Any]:
     """
     モデルを Supabase Storage にアップロード
 
+    pickle を圧縮したアーティファクトとマニフェスト（SHA-256・サイズ）を保存する。
+
     Args:
         model_data: pickle化するモデルデータ
         version: モデルバージョン (例: "v1", "v2")
         metadata: 追加のメタデータ
         race_type: レースタイプ (central/local/banei)
+        store: 保存先（省略時は Supabase のバケット）
 
     Returns:
         アップロード結果
     """
-    client = get_supabase_client()
-    if client is None:
+    store = store or get_artifact_store()
+    if store is None:
         raise RuntimeError("Supabase not configured")
 
-    bucket = settings.SUPABASE_MODEL_BUCKET
-    # race_typeに応じたファイル名
-    if race_type == "central":
-        filename = f"model_{version}.pkl"
-    else:
-        filename = f"model_{race_type}_{version}.pkl"
-
     try:
-        # モデルをバイト列に変換
-        buffer = io.BytesIO()
-        pickle.dump(model_data, buffer)
-        buffer.seek(0)
-        model_bytes = buffer.getvalue()
-
-        # アップロード（既存ファイルは上書き）
-        client.storage.from_(bucket).upload(
-            filename,
-            model_bytes,
-            file_options={"content-type": "application/octet-stream", "upsert": "true"}
-        )
+        manifest = model_artifacts.upload(store, model_data, race_type, version, metadata)
 
-        logger.info(f"Model uploaded: {filename} ({len(model_bytes)} bytes)")
-
-        # メタデータを別ファイルとして保存
+        # メタデータを別ファイルとしても保存（従来の形式）
         if metadata:
-            if race_type == "central":
-                meta_filename = f"model_{version}_meta.json"
-            else:
-                meta_filename = f"model_{race_type}_{version}_meta.json"
-            import json
-            meta_bytes = json.dumps(metadata, ensure_ascii=False, default=str).encode()
-            client.storage.from_(bucket).upload(
-                meta_filename,
-                meta_bytes,
-                file_options={"content-type": "application/json", "upsert": "true"}
-            )
+            meta_filename = get_model_filename(race_type, version).removesuffix(".pkl") + "_meta.json"
+            with tempfile.TemporaryDirectory(prefix="model-meta-") as tmp_dir:
+                meta_path = Path(tmp_dir) / meta_filename
+                meta_path.write_text(json.dumps(metadata, ensure_ascii=False, default=str))
+                store.put(meta_filename, meta_path, "application/json")
 
         return {
             "status": "success",
-            "filename": filename,
-            "size_bytes": len(model_bytes),
+            "filename": manifest.artifact,
+            "size_bytes": manifest.content_size_bytes,
+            "compressed_size_bytes": manifest.size_bytes,
+            "compression": manifest.compression,
+            "sha256": manifest.sha256,
             "version": version,
-            "uploaded_at": datetime.now().isoformat(),
+            "uploaded_at": manifest.created_at,
         }
 
     except Exception as e:
@@ -130,33 +162,38 @@ def upload_model(
         raise RuntimeError(f"Upload failed: {e}")
 
 
-def download_model(version: str) -> Optional[Dict[str, Any]]:
+def download_model(
+    version: str,
+    race_type: str = "central",
+    dest: Optional[Path] = None,
+    store: Optional[model_artifacts.ArtifactStore] = None,
+    cache_dir: Path = model_artifacts.CACHE_DIR,
+) -> Optional[Path]:
     """
-    モデルを Supabase Storage からダウンロード
+    モデルを Supabase Storage からダウンロードしてモデルディレクトリに置く
+
+    チェックサムを確認してから置き換える。同じ内容のアーティファクトがキャッシュにあれば
+    ダウンロードしない。
 
     Args:
         version: モデルバージョン
+        race_type: レースタイプ (central/local/banei)
+        dest: 保存先（省略時はモデルディレクトリの model_{version}.pkl など）
+        store: 取得元（省略時は Supabase のバケット）
+        cache_dir: アーティファクトのキャッシュ
 
     Returns:
-        モデルデータ（pickle.load済み）
+        保存したモデルファイルのパス（失敗時はNone）
     """
-    client = get_supabase_client()
-    if client is None:
+    store = store or get_artifact_store()
+    if store is None:
         raise RuntimeError("Supabase not configured")
 
-    bucket = settings.SUPABASE_MODEL_BUCKET
-    filename = f"model_{version}.pkl"
+    dest = dest or get_model_dir(race_type) / get_model_filename(race_type, version)
 
     try:
-        # ダウンロード
-        response = client.storage.from_(bucket).download(filename)
-
-        # バイト列からモデルを復元
-        buffer = io.BytesIO(response)
-        model_data = pickle.load(buffer)
-
-        logger.info(f"Model downloaded: {filename}")
-        return model_data
+        model_artifacts.download(store, race_type, version, dest, cache_dir)
+        return dest
 
     except Exception as e:
         logger.error(f"Failed to download model: {e}")
@@ -181,12 +218,15 @@ def list_models() -> List[Dict[str, Any]]:
 
         models = []
         for f in files:
-            if f["name"].endswith(".pkl"):
-                # バージョン抽出 (model_v1.pkl -> v1)
-                version = f["name"].replace("model_", "").replace(".pkl", "")
+            # 圧縮済み (model_v1.pkl.zst) と従来形式 (model_v1.pkl)
+            stem, dot, ext = f["name"].rpartition(".pkl")
+            if dot and ext in ("", *model_artifacts.EXTENSIONS.values()):
+                # バージョン抽出 (model_v1.pkl.zst -> v1)
+                version = stem.replace("model_", "", 1)
                 models.append({
                     "version": version,
                     "filename": f["name"],
+                    "compressed": bool(ext),
                     "size_bytes": f.get("metadata", {}).get("size", 0),
                     "created_at": f.get("created_at"),
                     "updated_at": f.get("updated_at"),
@@ -215,15 +255,19 @@ def delete_model(version: str) -> bool:
 
     bucket = settings.SUPABASE_MODEL_BUCKET
     filename = f"model_{version}.pkl"
-    meta_filename = f"model_{version}_meta.json"
+    meta_filenames = [
+        f"model_{version}.manifest.json",
+        f"model_{version}_meta.json",
+        *(filename + ext for ext in model_artifacts.EXTENSIONS.values()),
+    ]
 
     try:
         # モデルファイル削除
         client.storage.from_(bucket).remove([filename])
 
-        # メタデータも削除（存在する場合）
+        # 圧縮済みアーティファクト・マニフェスト・メタデータも削除（存在する場合）
         try:
-            client.storage.from_(bucket).remove([meta_filename])
+            client.storage.from_(bucket).remove(meta_filenames)
         except:
             pass
 
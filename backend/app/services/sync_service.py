@@ -2,25 +2,38 @@
 Supabase Sync サービス
 
 ローカルDBからSupabaseへのデータ同期を管理
-差分同期対応: 前回同期以降の更新分 + 失敗したレコードのみを同期
+差分同期対応: 変更ログ (change_log) を前回の消費位置から順に読み出し、
+変更された行と前回失敗した行のみを同期する。
+
+行はバッチ単位 (SUPABASE_SYNC_BATCH_SIZE) でupsertし、バッチが失敗した場合は
+二分割して再送することで、問題のある行だけを再試行として変更ログに戻す。
+外部キー制約の順序を守りつつ、依存関係のないテーブルは並行してアップロードする。
 """
-from datetime import datetime, timezone
-from typing import Dict, Any, List, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
 import threading
-import json
-import os
 
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.logging_config import get_logger
-from app.models import Horse, Jockey, Race, Entry
+from app.models import Horse, Jockey, Race, Entry, Training, Prediction, ChangeLog
+from app.models.change_log import CHANGE_RETRY
+from app.services import change_log_service
+from app.services.event_broker import broker
 from app.services.storage_service import get_supabase_client
 
 logger = get_logger(__name__)
 
-# 同期状態ファイルのパス
-SYNC_STATE_FILE = os.path.join(os.path.dirname(__file__), ".sync_state.json")
+# 変更ログのコンシューマ名
+SYNC_CONSUMER = "supabase"
+
+# IN句1回あたりの主キー数
+_ID_CHUNK_SIZE = 1000
+
+# SSEのチャンネル名
+SYNC_CHANNEL = "sync"
 
 # 同期状態管理
 _sync_status: Dict[str, Any] = {
@@ -34,59 +47,375 @@ _sync_status: Dict[str, Any] = {
 _sync_lock = threading.Lock()
 
 
-def _load_sync_state() -> Dict[str, Any]:
-    """前回の同期状態を読み込む"""
-    if os.path.exists(SYNC_STATE_FILE):
-        try:
-            with open(SYNC_STATE_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.warning(f"Failed to load sync state: {e}")
-    return {
-        "last_sync_at": None,
-        "failed_ids": {
-            "horses": [],
-            "jockeys": [],
-            "races": [],
-            "entries": [],
-        }
-    }
-
-
-def _save_sync_state(state: Dict[str, Any]):
-    """同期状態を保存"""
-    try:
-        with open(SYNC_STATE_FILE, "w") as f:
-            json.dump(state, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save sync state: {e}")
-
-
-def get_sync_status() -> Dict[str, Any]:
+def get_sync_status(db: Session) -> Dict[str, Any]:
     """同期状態を取得"""
     with _sync_lock:
         status = _sync_status.copy()
 
     # 前回の同期情報も追加
-    state = _load_sync_state()
-    status["last_sync_at"] = state.get("last_sync_at")
-    status["pending_retries"] = sum(len(ids) for ids in state.get("failed_ids", {}).values())
+    last_sync_at = change_log_service.last_consumed_at(db, SYNC_CONSUMER)
+    cursor = change_log_service.get_cursor(db, SYNC_CONSUMER)
+    after_id = cursor.last_change_id if cursor else 0
+    status["last_sync_at"] = last_sync_at.isoformat() if last_sync_at else None
+    status["pending_changes"] = change_log_service.pending_count(db, SYNC_CONSUMER)
+    status["pending_retries"] = db.execute(
+        select(func.count()).select_from(ChangeLog)
+        .where(ChangeLog.id > after_id, ChangeLog.operation == CHANGE_RETRY)
+    ).scalar() or 0
     return status
 
 
+def is_sync_running() -> bool:
+    """同期が実行中か（DBを参照しない）"""
+    with _sync_lock:
+        return _sync_status["is_running"]
+
+
+def _publish(event_type: str = "status") -> None:
+    """現在の同期状態をSSEへ配信"""
+    with _sync_lock:
+        event = {"type": event_type, **_sync_status}
+    broker.publish(SYNC_CHANNEL, event)
+
+
 def _update_status(**kwargs):
     """同期状態を更新"""
     with _sync_lock:
         _sync_status.update(kwargs)
+    _publish()
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
 
 
-def sync_to_supabase(db: Session, force_full: bool = False) -> Dict[str, Any]:
+def _horse_row(horse: Horse) -> Dict[str, Any]:
+    return {
+        "horse_id": horse.horse_id,
+        "name": horse.name,
+        "sex": horse.sex,
+        "birth_year": horse.birth_year,
+        "father": horse.father,
+        "mother": horse.mother,
+        "mother_father": horse.mother_father,
+        "trainer": horse.trainer,
+        "owner": horse.owner,
+        "created_at": _iso(horse.created_at),
+        "updated_at": _iso(horse.updated_at),
+    }
+
+
+def _jockey_row(jockey: Jockey) -> Dict[str, Any]:
+    return {
+        "jockey_id": jockey.jockey_id,
+        "name": jockey.name,
+        "win_rate": jockey.win_rate,
+        "place_rate": jockey.place_rate,
+        "show_rate": jockey.show_rate,
+        "year_rank": jockey.year_rank,
+        "year_wins": jockey.year_wins,
+        "year_rides": jockey.year_rides,
+        "year_earnings": jockey.year_earnings,
+        "created_at": _iso(jockey.created_at),
+        "updated_at": _iso(jockey.updated_at),
+    }
+
+
+def _race_row(race: Race) -> Dict[str, Any]:
+    return {
+        "race_id": race.race_id,
+        "date": _iso(race.date),
+        "course": race.course,
+        "race_number": race.race_number,
+        "race_name": race.race_name,
+        "distance": race.distance,
+        "track_type": race.track_type,
+        "weather": race.weather,
+        "condition": race.condition,
+        "grade": race.grade,
+        "num_horses": race.num_horses,
+        "venue_detail": race.venue_detail,
+        "created_at": _iso(race.created_at),
+        "updated_at": _iso(race.updated_at),
+    }
+
+
+def _entry_row(entry: Entry) -> Dict[str, Any]:
+    return {
+        "id": entry.id,
+        "race_id": entry.race_id,
+        "horse_id": entry.horse_id,
+        "jockey_id": entry.jockey_id,
+        "frame_number": entry.frame_number,
+        "horse_number": entry.horse_number,
+        "weight": entry.weight,
+        "horse_weight": entry.horse_weight,
+        "weight_diff": entry.weight_diff,
+        "odds": entry.odds,
+        "popularity": entry.popularity,
+        "result": entry.result,
+        "finish_time": entry.finish_time,
+        "margin": entry.margin,
+        "corner_position": entry.corner_position,
+        "last_3f": entry.last_3f,
+        "pace": entry.pace,
+        "prize_money": entry.prize_money,
+        "winner_or_second": entry.winner_or_second,
+        "created_at": _iso(entry.created_at),
+        "updated_at": _iso(entry.updated_at),
+    }
+
+
+def _training_row(training: Training) -> Dict[str, Any]:
+    return {
+        "id": training.id,
+        "race_id": training.race_id,
+        "horse_id": training.horse_id,
+        "horse_number": training.horse_number,
+        "training_course": training.training_course,
+        "training_time": training.training_time,
+        "lap_times": training.lap_times,
+        "training_rank": training.training_rank,
+        "training_date": training.training_date,
+        "rider": training.rider,
+        "comment": training.comment,
+        "created_at": _iso(training.created_at),
+    }
+
+
+def _prediction_row(prediction: Prediction) -> Dict[str, Any]:
+    return {
+        "id": prediction.id,
+        "race_id": prediction.race_id,
+        "model_version": prediction.model_version,
+        "results_json": prediction.results_json,
+        "created_at": _iso(prediction.created_at),
+    }
+
+
+# テーブル名 -> (モデル, 主キー列, 行変換)
+_TABLES: Dict[str, tuple[Any, str, Callable[[Any], Dict[str, Any]]]] = {
+    "horses": (Horse, "horse_id", _horse_row),
+    "jockeys": (Jockey, "jockey_id", _jockey_row),
+    "races": (Race, "race_id", _race_row),
+    "entries": (Entry, "id", _entry_row),
+    "trainings": (Training, "id", _training_row),
+    "predictions": (Prediction, "id", _prediction_row),
+}
+
+# 外部キー制約の順序（同じ段のテーブルは並行してアップロード）
+SYNC_STAGES: List[List[str]] = [
+    ["horses", "jockeys"],
+    ["races"],
+    ["entries", "trainings", "predictions"],
+]
+
+
+def _load_all(db: Session, table: str) -> List[Dict[str, Any]]:
+    """テーブルの全行を読み込む"""
+    model, _, to_row = _TABLES[table]
+    return [to_row(record) for record in db.query(model).all()]
+
+
+def _load_by_ids(db: Session, table: str, record_ids: List[str]) -> List[Dict[str, Any]]:
+    """変更ログの record_id に対応する行を読み込む（削除済みの行は含まれない）"""
+    model, key, to_row = _TABLES[table]
+    column = getattr(model, key)
+    python_type = column.type.python_type
+    ids = [python_type(record_id) for record_id in record_ids]
+
+    rows = []
+    for start in range(0, len(ids), _ID_CHUNK_SIZE):
+        chunk = ids[start:start + _ID_CHUNK_SIZE]
+        rows.extend(to_row(record) for record in db.query(model).filter(column.in_(chunk)).all())
+    return rows
+
+
+def _upsert_batch(client, table: str, key: str, rows: List[Dict[str, Any]]) -> tuple[int, List]:
+    """
+    1バッチをupsert。失敗した場合は二分割して再送し、失敗行を特定する
+
+    Returns:
+        (成功行数, 失敗した行の主キー)
+    """
+    try:
+        client.table(table).upsert(rows, on_conflict=key).execute()
+        return len(rows), []
+    except Exception as e:
+        if len(rows) == 1:
+            logger.error(f"Failed to sync {table} {rows[0][key]}: {e}")
+            return 0, [rows[0][key]]
+        logger.warning(f"Batch upsert of {len(rows)} {table} failed, bisecting: {e}")
+
+    mid = len(rows) // 2
+    left_synced, left_failed = _upsert_batch(client, table, key, rows[:mid])
+    right_synced, right_failed = _upsert_batch(client, table, key, rows[mid:])
+    return left_synced + right_synced, left_failed + right_failed
+
+
+def upsert_in_batches(
+    client,
+    table: str,
+    rows: List[Dict[str, Any]],
+    on_conflict: str,
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> tuple[int, List]:
+    """
+    行をバッチ単位でSupabaseにupsert
+
+    Args:
+        client: Supabaseクライアント
+        table: テーブル名
+        rows: upsertする行（全行が同じキーを持つこと）
+        on_conflict: 競合判定に使う列
+        batch_size: 1リクエストの行数（省略時は設定値）
+        on_batch: バッチ処理ごとに処理行数を受け取るコールバック
+
+    Returns:
+        (成功行数, 失敗した行の on_conflict 値)
+    """
+    batch_size = max(1, batch_size or settings.SUPABASE_SYNC_BATCH_SIZE)
+    synced = 0
+    failed: List = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        batch_synced, batch_failed = _upsert_batch(client, table, on_conflict, batch)
+        synced += batch_synced
+        failed.extend(batch_failed)
+        if on_batch:
+            on_batch(len(batch))
+    return synced, failed
+
+
+def _add_progress(count: int):
+    """進行状況を加算（複数スレッドから呼ばれる）"""
+    with _sync_lock:
+        _sync_status["progress"] += count
+    _publish()
+
+
+def _upload_stage(
+    client,
+    pending: Dict[str, List[Dict[str, Any]]],
+    batch_size: Optional[int],
+) -> Dict[str, tuple[int, List]]:
+    """同じ段のテーブルを並行してアップロード"""
+    workers = max(1, min(settings.SUPABASE_SYNC_WORKERS, len(pending)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            table: executor.submit(
+                upsert_in_batches, client, table, rows,
+                _TABLES[table][1], batch_size, _add_progress,
+            )
+            for table, rows in pending.items()
+        }
+        return {table: future.result() for table, future in futures.items()}
+
+
+def _sync_full(db: Session, client, batch_size: Optional[int], results: Dict[str, Any]) -> None:
+    """全件同期。開始時点までのコミット済みの変更ログを消費済みにする"""
+    # 読み込み中に書き込まれた変更は次回の差分同期で拾う。
+    # まだコミットされていない欠番があれば、その手前までしか消費しない
+    cursor = change_log_service.get_cursor(db, SYNC_CONSUMER)
+    until_id = change_log_service.committed_until(
+        db,
+        cursor.last_change_id if cursor else 0,
+        settings.SUPABASE_SYNC_VISIBILITY_LAG_SECONDS,
+    )
+
+    total_to_sync = 0
+    for stage in SYNC_STAGES:
+        _update_status(current_table=",".join(stage))
+
+        # セッションはスレッド間で共有できないので読み込みはここで行う
+        pending = {table: _load_all(db, table) for table in stage}
+        for table, rows in pending.items():
+            logger.info(f"Syncing {len(rows)} {table} (full sync)")
+            total_to_sync += len(rows)
+        _update_status(total=total_to_sync)
+
+        for table, (synced, failed) in _upload_stage(client, pending, batch_size).items():
+            results[table]["synced"] += synced
+            results[table]["errors"] += len(failed)
+            change_log_service.enqueue(db, table, failed)
+
+    change_log_service.ack(db, SYNC_CONSUMER, until_id)
+    db.commit()
+
+
+def _sync_changes(db: Session, client, batch_size: Optional[int], results: Dict[str, Any]) -> None:
+    """
+    差分同期。変更ログを消費位置から順に読み出し、ウィンドウごとに同期して ack する
+
+    失敗した行は変更ログの末尾に再追加されるため、今回の実行では開始時点の
+    最新idまでしか読まない（次回の同期で再試行される）。
+    まだコミットされていない欠番があれば、その手前で止めて次回の同期で続きを読む。
+    """
+    cursor = change_log_service.get_cursor(db, SYNC_CONSUMER)
+    after_id = cursor.last_change_id
+    until_id = change_log_service.latest_change_id(db)
+    window = max(1, settings.SUPABASE_SYNC_CHANGE_WINDOW)
+
+    total_to_sync = 0
+    while after_id < until_id:
+        changes = change_log_service.read_changes(db, after_id, window, until_id)
+        safe = change_log_service.committed_prefix(
+            changes, after_id, settings.SUPABASE_SYNC_VISIBILITY_LAG_SECONDS
+        )
+        held = len(safe) < len(changes)
+        if held:
+            last_safe_id = safe[-1].id if safe else after_id
+            logger.info(f"Waiting for uncommitted change log ids after {last_safe_id}")
+        changes = safe
+        if not changes:
+            break
+        grouped = change_log_service.group_changes(changes)
+
+        for stage in SYNC_STAGES:
+            stage_ids = {table: list(grouped.get(table, {})) for table in stage}
+            if not any(stage_ids.values()):
+                continue
+            _update_status(current_table=",".join(stage))
+
+            pending = {}
+            for table, record_ids in stage_ids.items():
+                rows = _load_by_ids(db, table, record_ids)
+                # 削除された行は同期しない
+                results[table]["skipped"] += len(record_ids) - len(rows)
+                if rows:
+                    pending[table] = rows
+                    total_to_sync += len(rows)
+            _update_status(total=total_to_sync)
+            if not pending:
+                continue
+
+            for table, (synced, failed) in _upload_stage(client, pending, batch_size).items():
+                results[table]["synced"] += synced
+                results[table]["errors"] += len(failed)
+                change_log_service.enqueue(db, table, failed)
+
+        # 再試行の追加と消費位置の更新は同じトランザクションで確定する
+        after_id = changes[-1].id
+        change_log_service.ack(db, SYNC_CONSUMER, after_id)
+        db.commit()
+        logger.info(f"Synced change log up to id {after_id}/{until_id}")
+        if held:
+            break
+
+
+def sync_to_supabase(
+    db: Session,
+    force_full: bool = False,
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     ローカルDBのデータをSupabaseに同期（差分同期）
 
     Args:
         db: ローカルDBセッション
-        force_full: Trueの場合は全件同期
+        force_full: Trueの場合は全件同期（初回も全件同期）
+        batch_size: 1リクエストでupsertする行数（省略時は設定値）
 
     Returns:
         同期結果
@@ -104,250 +433,40 @@ def sync_to_supabase(db: Session, force_full: bool = False) -> Dict[str, Any]:
             "results": None,
             "error": None,
         }
+    _publish()
 
     try:
         client = get_supabase_client()
         if client is None:
             raise RuntimeError("Supabaseに接続できません")
 
-        # 前回の同期状態を読み込む
-        sync_state = _load_sync_state()
-        last_sync_at = None
-        if not force_full and sync_state.get("last_sync_at"):
-            last_sync_at = datetime.fromisoformat(sync_state["last_sync_at"])
-
-        failed_ids = sync_state.get("failed_ids", {
-            "horses": [],
-            "jockeys": [],
-            "races": [],
-            "entries": [],
-        })
-
         results = {
-            "horses": {"synced": 0, "errors": 0, "skipped": 0},
-            "jockeys": {"synced": 0, "errors": 0, "skipped": 0},
-            "races": {"synced": 0, "errors": 0, "skipped": 0},
-            "entries": {"synced": 0, "errors": 0, "skipped": 0},
-        }
-
-        new_failed_ids: Dict[str, List] = {
-            "horses": [],
-            "jockeys": [],
-            "races": [],
-            "entries": [],
+            table: {"synced": 0, "errors": 0, "skipped": 0} for table in _TABLES
         }
 
-        # 1. Horses を同期
-        _update_status(current_table="horses")
-        if force_full or last_sync_at is None:
-            horses_to_sync = db.query(Horse).all()
-            total_horses = len(horses_to_sync)
+        if force_full or change_log_service.get_cursor(db, SYNC_CONSUMER) is None:
+            _sync_full(db, client, batch_size, results)
         else:
-            # SQLレベルで差分フィルタ
-            failed_horse_ids = failed_ids.get("horses", [])
-            horses_to_sync = db.query(Horse).filter(
-                (Horse.updated_at > last_sync_at) | (Horse.horse_id.in_(failed_horse_ids)) if failed_horse_ids
-                else Horse.updated_at > last_sync_at
-            ).all()
-            total_horses = db.query(Horse).count()
-        logger.info(f"Syncing {len(horses_to_sync)}/{total_horses} horses (diff sync)")
-
-        total_to_sync = len(horses_to_sync)
-        progress = 0
-
-        for horse in horses_to_sync:
-            try:
-                data = {
-                    "horse_id": horse.horse_id,
-                    "name": horse.name,
-                    "sex": horse.sex,
-                    "birth_year": horse.birth_year,
-                    "father": horse.father,
-                    "mother": horse.mother,
-                    "mother_father": horse.mother_father,
-                    "trainer": horse.trainer,
-                    "owner": horse.owner,
-                    "created_at": horse.created_at.isoformat() if horse.created_at else None,
-                    "updated_at": horse.updated_at.isoformat() if horse.updated_at else None,
-                }
-                client.table("horses").upsert(data, on_conflict="horse_id").execute()
-                results["horses"]["synced"] += 1
-            except Exception as e:
-                logger.error(f"Failed to sync horse {horse.horse_id}: {e}")
-                results["horses"]["errors"] += 1
-                new_failed_ids["horses"].append(horse.horse_id)
-
-            progress += 1
-            _update_status(progress=progress)
-
-        results["horses"]["skipped"] = total_horses - len(horses_to_sync)
-
-        # 2. Jockeys を同期
-        _update_status(current_table="jockeys")
-        if force_full or last_sync_at is None:
-            jockeys_to_sync = db.query(Jockey).all()
-            total_jockeys = len(jockeys_to_sync)
-        else:
-            failed_jockey_ids = failed_ids.get("jockeys", [])
-            jockeys_to_sync = db.query(Jockey).filter(
-                (Jockey.updated_at > last_sync_at) | (Jockey.jockey_id.in_(failed_jockey_ids)) if failed_jockey_ids
-                else Jockey.updated_at > last_sync_at
-            ).all()
-            total_jockeys = db.query(Jockey).count()
-        logger.info(f"Syncing {len(jockeys_to_sync)}/{total_jockeys} jockeys (diff sync)")
-
-        total_to_sync += len(jockeys_to_sync)
-        _update_status(total=total_to_sync)
+            _sync_changes(db, client, batch_size, results)
+            # 変更が無くても同期時刻は更新する
+            change_log_service.ack(db, SYNC_CONSUMER, 0)
+            db.commit()
 
-        for jockey in jockeys_to_sync:
-            try:
-                data = {
-                    "jockey_id": jockey.jockey_id,
-                    "name": jockey.name,
-                    "win_rate": jockey.win_rate,
-                    "place_rate": jockey.place_rate,
-                    "show_rate": jockey.show_rate,
-                    "year_rank": jockey.year_rank,
-                    "year_wins": jockey.year_wins,
-                    "year_rides": jockey.year_rides,
-                    "year_earnings": jockey.year_earnings,
-                    "created_at": jockey.created_at.isoformat() if jockey.created_at else None,
-                    "updated_at": jockey.updated_at.isoformat() if jockey.updated_at else None,
-                }
-                client.table("jockeys").upsert(data, on_conflict="jockey_id").execute()
-                results["jockeys"]["synced"] += 1
-            except Exception as e:
-                logger.error(f"Failed to sync jockey {jockey.jockey_id}: {e}")
-                results["jockeys"]["errors"] += 1
-                new_failed_ids["jockeys"].append(jockey.jockey_id)
-
-            progress += 1
-            _update_status(progress=progress)
-
-        results["jockeys"]["skipped"] = total_jockeys - len(jockeys_to_sync)
-
-        # 3. Races を同期
-        _update_status(current_table="races")
-        if force_full or last_sync_at is None:
-            races_to_sync = db.query(Race).all()
-            total_races = len(races_to_sync)
-        else:
-            failed_race_ids = failed_ids.get("races", [])
-            races_to_sync = db.query(Race).filter(
-                (Race.updated_at > last_sync_at) | (Race.race_id.in_(failed_race_ids)) if failed_race_ids
-                else Race.updated_at > last_sync_at
-            ).all()
-            total_races = db.query(Race).count()
-        logger.info(f"Syncing {len(races_to_sync)}/{total_races} races (diff sync)")
-
-        total_to_sync += len(races_to_sync)
-        _update_status(total=total_to_sync)
-
-        for race in races_to_sync:
-            try:
-                data = {
-                    "race_id": race.race_id,
-                    "date": race.date.isoformat() if race.date else None,
-                    "course": race.course,
-                    "race_number": race.race_number,
-                    "race_name": race.race_name,
-                    "distance": race.distance,
-                    "track_type": race.track_type,
-                    "weather": race.weather,
-                    "condition": race.condition,
-                    "grade": race.grade,
-                    "num_horses": race.num_horses,
-                    "venue_detail": race.venue_detail,
-                    "created_at": race.created_at.isoformat() if race.created_at else None,
-                    "updated_at": race.updated_at.isoformat() if race.updated_at else None,
-                }
-                client.table("races").upsert(data, on_conflict="race_id").execute()
-                results["races"]["synced"] += 1
-            except Exception as e:
-                logger.error(f"Failed to sync race {race.race_id}: {e}")
-                results["races"]["errors"] += 1
-                new_failed_ids["races"].append(race.race_id)
-
-            progress += 1
-            _update_status(progress=progress)
-
-        results["races"]["skipped"] = total_races - len(races_to_sync)
-
-        # 4. Entries を同期 (外部キー制約のため最後に)
-        _update_status(current_table="entries")
-        if force_full or last_sync_at is None:
-            entries_to_sync = db.query(Entry).all()
-            total_entries = len(entries_to_sync)
-        else:
-            failed_entry_ids = failed_ids.get("entries", [])
-            entries_to_sync = db.query(Entry).filter(
-                (Entry.updated_at > last_sync_at) | (Entry.id.in_(failed_entry_ids)) if failed_entry_ids
-                else Entry.updated_at > last_sync_at
-            ).all()
-            total_entries = db.query(Entry).count()
-        logger.info(f"Syncing {len(entries_to_sync)}/{total_entries} entries (diff sync)")
-
-        total_to_sync += len(entries_to_sync)
-        _update_status(total=total_to_sync)
-
-        for entry in entries_to_sync:
-            try:
-                data = {
-                    "id": entry.id,
-                    "race_id": entry.race_id,
-                    "horse_id": entry.horse_id,
-                    "jockey_id": entry.jockey_id,
-                    "frame_number": entry.frame_number,
-                    "horse_number": entry.horse_number,
-                    "weight": entry.weight,
-                    "horse_weight": entry.horse_weight,
-                    "weight_diff": entry.weight_diff,
-                    "odds": entry.odds,
-                    "popularity": entry.popularity,
-                    "result": entry.result,
-                    "finish_time": entry.finish_time,
-                    "margin": entry.margin,
-                    "corner_position": entry.corner_position,
-                    "last_3f": entry.last_3f,
-                    "pace": entry.pace,
-                    "prize_money": entry.prize_money,
-                    "winner_or_second": entry.winner_or_second,
-                    "created_at": entry.created_at.isoformat() if entry.created_at else None,
-                    "updated_at": entry.updated_at.isoformat() if entry.updated_at else None,
-                }
-                client.table("entries").upsert(data, on_conflict="id").execute()
-                results["entries"]["synced"] += 1
-            except Exception as e:
-                logger.error(f"Failed to sync entry {entry.id}: {e}")
-                results["entries"]["errors"] += 1
-                new_failed_ids["entries"].append(entry.id)
-
-            progress += 1
-            _update_status(progress=progress)
-
-        results["entries"]["skipped"] = total_entries - len(entries_to_sync)
-
-        # 同期状態を保存
-        new_state = {
-            "last_sync_at": datetime.now(timezone.utc).isoformat(),
-            "failed_ids": new_failed_ids,
-        }
-        _save_sync_state(new_state)
+        # 消費済みの変更ログを削除
+        change_log_service.prune(db)
 
         logger.info(f"Sync completed: {results}")
-        _update_status(
-            is_running=False,
-            current_table=None,
-            results=results,
-        )
+        with _sync_lock:
+            _sync_status.update(is_running=False, current_table=None, results=results)
+        _publish("complete")
         return results
 
     except Exception as e:
+        db.rollback()
         logger.error(f"Sync failed: {e}")
-        _update_status(
-            is_running=False,
-            error=str(e),
-        )
+        with _sync_lock:
+            _sync_status.update(is_running=False, error=str(e))
+        _publish("error")
         raise
 
 
@@ -359,11 +478,11 @@ def sync_to_supabase_async(db: Session, force_full: bool = False):
         db: ローカルDBセッション
         force_full: Trueの場合は全件同期
     """
-    from app.db.session import SessionLocal
+    from app.db.session import BatchSessionLocal
 
     def run_sync():
         # 新しいセッションを作成（スレッドセーフ）
-        sync_db = SessionLocal()
+        sync_db = BatchSessionLocal()
         try:
             sync_to_supabase(sync_db, force_full=force_full)
         finally:
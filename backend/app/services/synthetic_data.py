@@ -0,0 +1,394 @@
+"""
+合成データ生成
+
+ベンチマークや負荷確認用に、実データに近い規模・分布のレースデータを作る。
+同じ seed なら同じデータになる（乱数は random.Random(seed) のみを使う）。
+
+- 土日に複数場で12レースずつ開催（中央競馬）
+- 馬は2歳でデビューし、能力に応じた着順で数戦〜数十戦走って引退する
+- 騎手・調教師・種牡馬はリーディング成績付き
+- 出走馬の多くに調教データを付ける
+"""
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.logging_config import get_logger
+from app.models import Race, Entry, Horse, Jockey, Training, Trainer, Sire
+
+logger = get_logger(__name__)
+
+# (競馬場, race_id の場コード)
+COURSES = [
+    ("札幌", "01"), ("函館", "02"), ("福島", "03"), ("新潟", "04"), ("東京", "05"),
+    ("中山", "06"), ("中京", "07"), ("京都", "08"), ("阪神", "09"), ("小倉", "10"),
+]
+DISTANCES = {"芝": [1200, 1400, 1600, 1800, 2000, 2200, 2400, 2500], "ダート": [1000, 1200, 1400, 1700, 1800, 2100]}
+CONDITIONS = ["良", "良", "良", "稍重", "重", "不良"]
+WEATHERS = ["晴", "晴", "曇", "曇", "雨", "小雨"]
+GRADES = ["新馬", "未勝利", "未勝利", "1勝クラス", "1勝クラス", "2勝クラス", "3勝クラス", "オープン", "G3", "G2", "G1"]
+TRAINING_COURSES = ["栗東坂路", "美浦坂路", "栗東CW", "美浦南W"]
+TRAINING_RANKS = ["S", "A", "B", "C", "D"]
+
+# 書き込みのバッチサイズ
+_BATCH_SIZE = 5000
+
+
+@dataclass
+class SyntheticConfig:
+    """生成するデータの規模"""
+    years: int = 1
+    start_year: int = 2022
+    courses_per_day: int = 2  # 1日の開催場数
+    races_per_course: int = 12
+    min_field: int = 8
+    max_field: int = 16
+    jockeys: int = 150
+    trainers: int = 200
+    sires: int = 60
+    training_rate: float = 0.7  # 調教データのある出走の割合
+    seed: int = 42
+
+
+@dataclass
+class _HorseState:
+    horse_id: str
+    ability: float
+    career_length: int
+    starts: int = 0
+    next_available: date = date.min
+
+
+@dataclass
+class SyntheticSummary:
+    """生成した件数"""
+    races: int = 0
+    entries: int = 0
+    horses: int = 0
+    jockeys: int = 0
+    trainers: int = 0
+    sires: int = 0
+    trainings: int = 0
+    race_ids: list[str] = field(default_factory=list, repr=False)
+
+
+class _Generator:
+    def __init__(self, db: Session, config: SyntheticConfig):
+        self.db = db
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.summary = SyntheticSummary()
+        self.active: list[_HorseState] = []
+        self.horse_serial = 0
+        self.pending: dict[type, list[dict]] = {Horse: [], Race: [], Entry: [], Training: []}
+        self.jockey_ids: list[str] = []
+        self.jockey_skill: dict[str, float] = {}
+        self.trainer_names: list[str] = []
+        self.sire_names: list[str] = []
+        self.meetings: dict[tuple[int, int, str], int] = {}
+        self.meeting_counts: dict[tuple[int, str], int] = {}
+
+    # === マスタ ===
+
+    def create_masters(self) -> None:
+        config = self.config
+        rng = self.rng
+
+        jockeys = []
+        for i in range(config.jockeys):
+            jockey_id = f"{1001 + i:05d}"
+            skill = rng.gauss(0, 0.3)
+            win_rate = _clamp(0.07 + skill * 0.08, 0.01, 0.3)
+            jockeys.append({
+                "jockey_id": jockey_id,
+                "name": f"騎手{i + 1:03d}",
+                "win_rate": round(win_rate, 3),
+                "place_rate": round(min(win_rate * 1.9, 0.5), 3),
+                "show_rate": round(min(win_rate * 2.7, 0.7), 3),
+                "year_rank": i + 1,
+                "year_wins": max(0, int(150 - i * 1.2 + rng.gauss(0, 5))),
+                "year_rides": rng.randint(200, 900),
+                "year_earnings": max(0, int(300000 - i * 2000 + rng.gauss(0, 10000))),
+            })
+            self.jockey_ids.append(jockey_id)
+            self.jockey_skill[jockey_id] = skill
+        self._insert(Jockey, jockeys)
+        self.summary.jockeys = len(jockeys)
+
+        trainers = []
+        for i in range(config.trainers):
+            name = f"調教師{i + 1:03d}"
+            win_rate = _clamp(0.12 - i * 0.0004 + rng.gauss(0, 0.02), 0.01, 0.25)
+            trainers.append({
+                "trainer_id": f"{1001 + i:05d}",
+                "name": name,
+                "win_rate": round(win_rate, 3),
+                "place_rate": round(min(win_rate * 1.9, 0.5), 3),
+                "show_rate": round(min(win_rate * 2.7, 0.7), 3),
+                "year_rank": i + 1,
+                "year_wins": max(0, int(60 - i * 0.3)),
+                "year_entries": rng.randint(150, 500),
+                "year_earnings": max(0, int(150000 - i * 700)),
+            })
+            self.trainer_names.append(name)
+        self._insert(Trainer, trainers)
+        self.summary.trainers = len(trainers)
+
+        sires = []
+        for i in range(config.sires):
+            name = f"種牡馬{i + 1:03d}"
+            win_rate = _clamp(0.1 - i * 0.001 + rng.gauss(0, 0.015), 0.01, 0.2)
+            sires.append({
+                "sire_id": name,
+                "name": name,
+                "win_rate": round(win_rate, 3),
+                "place_rate": round(min(win_rate * 1.9, 0.5), 3),
+                "show_rate": round(min(win_rate * 2.7, 0.7), 3),
+                "year_rank": i + 1,
+                "year_wins": max(0, int(200 - i * 3)),
+                "year_runners": rng.randint(100, 600),
+                "year_earnings": max(0, int(500000 - i * 8000)),
+                "turf_win_rate": round(_clamp(win_rate + rng.gauss(0, 0.02), 0.0, 0.3), 3),
+                "dirt_win_rate": round(_clamp(win_rate + rng.gauss(0, 0.02), 0.0, 0.3), 3),
+                "short_win_rate": round(_clamp(win_rate + rng.gauss(0, 0.02), 0.0, 0.3), 3),
+                "mile_win_rate": round(_clamp(win_rate + rng.gauss(0, 0.02), 0.0, 0.3), 3),
+                "middle_win_rate": round(_clamp(win_rate + rng.gauss(0, 0.02), 0.0, 0.3), 3),
+                "long_win_rate": round(_clamp(win_rate + rng.gauss(0, 0.02), 0.0, 0.3), 3),
+            })
+            self.sire_names.append(name)
+        self._insert(Sire, sires)
+        self.summary.sires = len(sires)
+        self.db.commit()
+
+    # === 馬 ===
+
+    def _new_horse(self, race_date: date) -> _HorseState:
+        rng = self.rng
+        self.horse_serial += 1
+        birth_year = race_date.year - 2 - (rng.random() < 0.3)
+        horse_id = f"{birth_year}{100000 + self.horse_serial:06d}"
+        sire_index = min(int(rng.expovariate(1 / 12)), len(self.sire_names) - 1)
+        self.pending[Horse].append({
+            "horse_id": horse_id,
+            "name": f"シンセティック{self.horse_serial}",
+            "sex": rng.choices(["牡", "牝", "セ"], weights=[50, 42, 8])[0],
+            "birth_year": birth_year,
+            "father": self.sire_names[sire_index],
+            "mother": f"繁殖牝馬{rng.randint(1, 5000)}",
+            "mother_father": self.sire_names[rng.randrange(len(self.sire_names))],
+            "trainer": self.trainer_names[rng.randrange(len(self.trainer_names))],
+            "owner": f"馬主{rng.randint(1, 800)}",
+        })
+        self.summary.horses += 1
+        # 通算出走数は1〜60戦程度（少ない戦数で引退する馬が多い）
+        career_length = max(1, min(60, int(rng.lognormvariate(2.2, 0.7))))
+        state = _HorseState(horse_id, rng.gauss(0, 1) - sire_index * 0.01, career_length)
+        self.active.append(state)
+        return state
+
+    def _pick_field(self, race_date: date, size: int) -> list[_HorseState]:
+        rng = self.rng
+        available = [h for h in self.active if h.next_available <= race_date]
+        rng.shuffle(available)
+        runners = available[:size]
+        while len(runners) < size:
+            runners.append(self._new_horse(race_date))
+        return runners
+
+    # === レース ===
+
+    def create_race(self, race_date: date, course: str, course_code: str, meeting: int, day: int, number: int) -> None:
+        rng = self.rng
+        config = self.config
+
+        race_id = f"{race_date.year}{course_code}{meeting:02d}{day:02d}{number:02d}"
+        track_type = "芝" if rng.random() < 0.55 else "ダート"
+        distance = rng.choice(DISTANCES[track_type])
+        grade = GRADES[min(len(GRADES) - 1, int(rng.expovariate(1 / 2.5)))]
+        size = rng.randint(config.min_field, config.max_field)
+        runners = self._pick_field(race_date, size)
+
+        self.pending[Race].append({
+            "race_id": race_id,
+            "race_type": "central",
+            "date": race_date,
+            "course": course,
+            "race_number": number,
+            "race_name": f"{course}{number}R",
+            "distance": distance,
+            "track_type": track_type,
+            "weather": rng.choice(WEATHERS),
+            "condition": rng.choice(CONDITIONS),
+            "grade": grade,
+            "num_horses": size,
+            "venue_detail": f"{meeting}{course}{day}",
+        })
+        self.summary.races += 1
+        self.summary.race_ids.append(race_id)
+
+        jockeys = rng.sample(self.jockey_ids, size)
+        strengths = [
+            h.ability + self.jockey_skill[jockey_id] + rng.gauss(0, 0.2)
+            for h, jockey_id in zip(runners, jockeys)
+        ]
+        # オッズは強さのソフトマックスから（控除率20%）
+        weights = [math.exp(s * 1.2) for s in strengths]
+        total_weight = sum(weights)
+        odds = [round(max(1.1, 0.8 * total_weight / w), 1) for w in weights]
+        popularity = _ranks(odds)
+        # 着順は強さ＋当日の調子
+        performance = [s + rng.gauss(0, 0.9) for s in strengths]
+        results = _ranks([-p for p in performance])
+
+        base_seconds = distance / 1000 * 60 * (1.0 if track_type == "芝" else 1.04)
+        first_half = round(rng.uniform(34.0, 37.5), 1)
+        pace = f"{first_half}-{round(first_half + rng.uniform(-1.5, 2.0), 1)}"
+        frames = _frame_numbers(size)
+        for i, (horse, jockey_id) in enumerate(zip(runners, jockeys)):
+            result = results[i]
+            finish_seconds = base_seconds + (result - 1) * rng.uniform(0.05, 0.3)
+            first_corner = _clamp_int(result + rng.randint(-5, 5), 1, size)
+            corners = [first_corner, _clamp_int((first_corner + result) // 2, 1, size), result]
+            self.pending[Entry].append({
+                "race_id": race_id,
+                "horse_id": horse.horse_id,
+                "jockey_id": jockey_id,
+                "frame_number": frames[i],
+                "horse_number": i + 1,
+                "weight": rng.choice([52.0, 54.0, 55.0, 56.0, 57.0, 58.0]),
+                "horse_weight": rng.randint(420, 540),
+                "weight_diff": rng.randint(-10, 10),
+                "odds": odds[i],
+                "popularity": popularity[i],
+                "result": result,
+                "finish_time": f"{int(finish_seconds // 60)}:{finish_seconds % 60:04.1f}",
+                "margin": None if result == 1 else rng.choice(["クビ", "ハナ", "1/2", "1", "2", "大"]),
+                "corner_position": "-".join(str(c) for c in corners),
+                "last_3f": round(rng.uniform(33.0, 40.0), 1),
+                "pace": pace,
+                "prize_money": {1: 1000, 2: 400, 3: 250}.get(result, 0),
+            })
+            self.summary.entries += 1
+
+            if rng.random() < config.training_rate:
+                self.pending[Training].append({
+                    "race_id": race_id,
+                    "horse_id": horse.horse_id,
+                    "horse_number": i + 1,
+                    "training_course": rng.choice(TRAINING_COURSES),
+                    "training_time": f"{rng.uniform(50.0, 56.0):.1f}",
+                    "lap_times": "-".join(f"{rng.uniform(11.5, 14.0):.1f}" for _ in range(4)),
+                    "training_rank": rng.choice(TRAINING_RANKS),
+                    "training_date": (race_date - timedelta(days=rng.randint(3, 7))).isoformat(),
+                    "rider": "助手",
+                })
+                self.summary.trainings += 1
+
+            horse.starts += 1
+            horse.next_available = race_date + timedelta(weeks=rng.randint(3, 10))
+            horse.ability += rng.gauss(0.02, 0.05)  # 成長
+
+        self.active = [h for h in self.active if h.starts < h.career_length]
+
+    def run(self) -> SyntheticSummary:
+        config = self.config
+        self.create_masters()
+
+        current = date(config.start_year, 1, 1)
+        end = date(config.start_year + config.years, 1, 1)
+        weekend = -1
+        while current < end:
+            if current.weekday() in (5, 6):
+                if current.weekday() == 5:
+                    weekend += 1
+                week = max(weekend, 0)
+                # 開催場は4週（8日）ごとに入れ替える
+                block = week // 4
+                day = (week % 4) * 2 + (current.weekday() - 4)
+                for c in range(config.courses_per_day):
+                    course, code = COURSES[(block * config.courses_per_day + c) % len(COURSES)]
+                    meeting = self._meeting(current.year, block, code)
+                    for number in range(1, config.races_per_course + 1):
+                        self.create_race(current, course, code, meeting, day, number)
+                if len(self.pending[Entry]) >= _BATCH_SIZE:
+                    self.flush()
+            current += timedelta(days=1)
+
+        self.flush()
+        logger.info(
+            f"Synthetic data: {self.summary.races} races, {self.summary.entries} entries, "
+            f"{self.summary.horses} horses"
+        )
+        return self.summary
+
+    def _meeting(self, year: int, block: int, code: str) -> int:
+        """その年の何回目の開催か"""
+        key = (year, block, code)
+        if key not in self.meetings:
+            count = self.meeting_counts.get((year, code), 0) + 1
+            self.meeting_counts[(year, code)] = count
+            self.meetings[key] = count
+        return self.meetings[key]
+
+    # === 書き込み ===
+
+    def flush(self) -> None:
+        # 外部キーの順に書き込む
+        for model in (Horse, Race, Entry, Training):
+            self._insert(model, self.pending[model])
+            self.pending[model] = []
+        self.db.commit()
+
+    def _insert(self, model: type, rows: list[dict]) -> None:
+        # 合成データは変更ログに残さない（同期したいときは全件同期を使う）
+        stmt = insert(model).execution_options(skip_change_log=True)
+        for start in range(0, len(rows), _BATCH_SIZE):
+            self.db.execute(stmt, rows[start:start + _BATCH_SIZE])
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def _clamp_int(value: int, low: int, high: int) -> int:
+    return max(low, min(high, value))
+
+
+def _ranks(values: list[float]) -> list[int]:
+    """小さい順の順位（1始まり）"""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0] * len(values)
+    for rank, i in enumerate(order, 1):
+        ranks[i] = rank
+    return ranks
+
+
+def _frame_numbers(size: int) -> list[int]:
+    """頭数に応じた枠番（8枠、外枠から2頭ずつ）"""
+    if size <= 8:
+        return list(range(1, size + 1))
+    doubles = size - 8
+    frames = []
+    for frame in range(1, 9):
+        count = 2 if frame > 8 - doubles else 1
+        frames.extend([frame] * count)
+    return frames[:size]
+
+
+def generate(db: Session, config: Optional[SyntheticConfig] = None) -> SyntheticSummary:
+    """
+    合成データをDBに書き込む
+
+    Args:
+        db: 書き込み先のセッション（SQLite / PostgreSQL）
+        config: 生成する規模（省略時は1年分）
+
+    Returns:
+        生成した件数
+    """
+    return _Generator(db, config or SyntheticConfig()).run()
@@ -0,0 +1,23 @@
+"""
+バックグラウンドジョブのワーカープロセス
+
+    python -m app.worker <job_id>
+
+job_service.launch() がジョブごとに起動する。
+"""
+import sys
+
+from app.logging_config import setup_logging
+from app.services import job_service
+
+
+def main(argv: list[str] = None) -> None:
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 1 or not args[0].isdigit():
+        raise SystemExit("Usage: python -m app.worker <job_id>")
+    setup_logging()
+    job_service.run_job(int(args[0]))
+
+
+if __name__ == "__main__":
+    main()
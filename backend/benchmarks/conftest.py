@@ -0,0 +1,88 @@
+"""
+ベンチマーク用のフィクスチャ
+
+合成データ（app.services.synthetic_data）を1回だけ生成してセッション全体で使う。
+
+環境変数:
+    BENCH_DATABASE_URL: 生成先のDB（省略時は一時ディレクトリのSQLite）
+    BENCH_YEARS: 生成する年数（既定 1）
+"""
+import os
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import Race
+from app.services.synthetic_data import SyntheticConfig, generate
+
+BENCH_YEARS = int(os.environ.get("BENCH_YEARS", "1"))
+BENCH_START_YEAR = 2022
+
+
+@pytest.fixture(scope="session")
+def bench_engine(tmp_path_factory):
+    url = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{tmp_path_factory.mktemp('bench') / 'bench.db'}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        generate(db, SyntheticConfig(years=BENCH_YEARS, start_year=BENCH_START_YEAR))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def bench_db(bench_engine):
+    db = sessionmaker(bind=bench_engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def bench_period():
+    """(学習終了日, 検証終了日) 最終月の中旬以降を検証・テストに使う"""
+    last_year = BENCH_START_YEAR + BENCH_YEARS - 1
+    return date(last_year, 12, 10), date(last_year, 12, 20)
+
+
+@pytest.fixture
+def late_race(bench_db):
+    """出走馬の過去成績が十分にある最終月のレース"""
+    return bench_db.execute(
+        select(Race).order_by(Race.date.desc(), Race.race_id).limit(1)
+    ).scalar_one()
+
+
+@pytest.fixture(scope="session")
+def trained_predictor(bench_engine, bench_period):
+    """合成データで学習した小さなモデル"""
+    from app.services.predictor import HorseRacingPredictor
+    from app.services.predictor.features import prepare_training_data
+
+    train_end, _ = bench_period
+    with sessionmaker(bind=bench_engine)() as db:
+        X, y = prepare_training_data(db, min_date=train_end - timedelta(days=21), max_date=train_end)
+    predictor = HorseRacingPredictor(model_version="bench")
+    predictor.train(X, y, num_boost_round=50, early_stopping_rounds=10)
+    return predictor
+
+
+@pytest.fixture
+def bench_client(bench_db, trained_predictor):
+    from unittest.mock import patch
+    from fastapi.testclient import TestClient
+    from app.db.session import get_db
+    from app.main import app
+    from app.services import prediction_service
+
+    app.dependency_overrides[get_db] = lambda: bench_db
+    with patch.object(prediction_service, "get_predictor", return_value=trained_predictor), \
+            TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
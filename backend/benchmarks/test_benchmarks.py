@@ -0,0 +1,95 @@
+"""
+特徴量抽出・学習データ準備・推論・閾値スイープ・主要APIのベンチマーク
+
+Usage:
+    # ベースラインを保存
+    pytest benchmarks --benchmark-storage=benchmarks/baselines --benchmark-save=baseline
+    # ベースラインと比較（平均が25%以上遅くなったら失敗）
+    pytest benchmarks --benchmark-storage=benchmarks/baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.services.predictor import FeatureExtractor  # noqa: E402
+from app.services.predictor.features import prepare_time_split_data  # noqa: E402
+
+
+class TestFeatureBenchmarks:
+    def test_extract_race_features(self, benchmark, bench_db, late_race):
+        """予測APIと同じく、キャッシュなしで1レース分の特徴量を抽出"""
+        def run():
+            bench_db.expire_all()
+            return FeatureExtractor(bench_db).extract_race_features(late_race)
+
+        df = benchmark(run)
+        assert len(df) == len(late_race.entries)
+
+    def test_prepare_time_split_data(self, benchmark, bench_db, bench_period):
+        """学習・検証・テストの3期間分の特徴量を準備"""
+        from datetime import timedelta
+
+        train_end, valid_end = bench_period
+
+        def run():
+            bench_db.expire_all()
+            return prepare_time_split_data(
+                bench_db,
+                train_end_date=train_end,
+                valid_end_date=valid_end,
+                train_start_date=train_end - timedelta(days=7),
+            )
+
+        data = benchmark.pedantic(run, rounds=2, iterations=1)
+        assert data["counts"]["train"] > 0
+        assert data["counts"]["test"] > 0
+
+
+class TestModelBenchmarks:
+    def test_predict(self, benchmark, bench_db, late_race, trained_predictor):
+        df = FeatureExtractor(bench_db).extract_race_features(late_race)
+        scores = benchmark(trained_predictor.predict, df)
+        assert len(scores) == len(df)
+
+    def test_threshold_sweep(self, benchmark, bench_db, trained_predictor):
+        from unittest.mock import patch
+        from app.api.routes import model as model_routes
+        from app.services import prediction_service
+
+        params = model_routes.ThresholdSweepParams(limit=50, ev_step=0.1)
+        with patch.object(prediction_service, "get_predictor", return_value=trained_predictor):
+            results = benchmark.pedantic(
+                model_routes._run_threshold_sweep, args=(bench_db, params), rounds=3, iterations=1
+            )
+        assert results
+
+
+class TestAPIBenchmarks:
+    def test_race_list(self, benchmark, bench_client, late_race):
+        response = benchmark(bench_client.get, "/api/v1/races", params={"target_date": late_race.date.isoformat()})
+        assert response.status_code == 200
+
+    def test_race_detail(self, benchmark, bench_client, late_race):
+        response = benchmark(bench_client.get, f"/api/v1/races/{late_race.race_id}")
+        assert response.status_code == 200
+
+    def test_horse_list(self, benchmark, bench_client):
+        response = benchmark(bench_client.get, "/api/v1/horses", params={"limit": 50})
+        assert response.status_code == 200
+
+    def test_jockey_list(self, benchmark, bench_client):
+        response = benchmark(bench_client.get, "/api/v1/jockeys")
+        assert response.status_code == 200
+
+    def test_create_prediction(self, benchmark, bench_client, late_race):
+        """予測の作成（特徴量抽出＋推論＋推奨買い目、キャッシュは毎回破棄）"""
+        from app.services import prediction_service
+
+        def run():
+            prediction_service.clear_prediction_cache()
+            return bench_client.post("/api/v1/predictions", params={"race_id": late_race.race_id})
+
+        response = benchmark.pedantic(run, rounds=5, iterations=1)
+        assert response.status_code == 200
+        assert response.json()["results"]["predictions"]
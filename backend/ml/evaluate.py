@@ -68,18 +68,16 @@ def calculate_metrics(predictions: list, actuals: list) -> dict:
     }
 
 
-def evaluate_by_race(db, predictor, extractor, race: Race) -> dict:
+def prepare_race(extractor, race: Race):
     """
-    レース単位で評価を行う
+    レースの特徴量と実際の着順を取得
 
     Args:
-        db: データベースセッション
-        predictor: 予測モデル
         extractor: 特徴量抽出器
         race: Raceオブジェクト
 
     Returns:
-        評価結果
+        (特徴量DataFrame, 馬番→着順)（評価できないレースはNone）
     """
     # 特徴量抽出
     df = extractor.extract_race_features(race)
@@ -95,14 +93,61 @@ def evaluate_by_race(db, predictor, extractor, race: Race) -> dict:
     if not actual_results:
         return None
 
+    return df, actual_results
+
+
+def evaluate_races(predictor, prepared: list) -> list:
+    """
+    複数レースをまとめて評価する（モデルの呼び出しは全レースで1回）
+
+    Args:
+        predictor: 予測モデル
+        prepared: (Race, 特徴量DataFrame, 馬番→着順) のリスト
+
+    Returns:
+        レースごとの評価結果
+    """
+    if not prepared:
+        return []
+
+    frames = [df for _, df, _ in prepared]
+    sizes = [len(df) for df in frames]
+
     # 予測
     try:
-        scores = predictor.predict(df)
-    except RuntimeError as e:
-        return None
+        scores = predictor.predict(pd.concat(frames, ignore_index=True))
+    except RuntimeError:
+        return []
+    probabilities = predictor.proba_from_scores(scores, np.repeat(np.arange(len(frames)), sizes))
+
+    offsets = np.cumsum(sizes)[:-1]
+    results = []
+    for (race, df, actual_results), race_scores, race_probs in zip(
+        prepared, np.split(scores, offsets), np.split(probabilities, offsets)
+    ):
+        result = evaluate_by_race(race, df, actual_results, race_scores, race_probs)
+        if result:
+            results.append(result)
+    return results
+
+
+def evaluate_by_race(race: Race, df: pd.DataFrame, actual_results: dict, scores, probabilities) -> dict:
+    """
+    レース単位で評価を行う
+
+    Args:
+        race: Raceオブジェクト
+        df: 特徴量DataFrame
+        actual_results: 馬番→着順
+        scores: 予測スコア
+        probabilities: レース内で正規化した勝率
 
+    Returns:
+        評価結果
+    """
     # 予測スコアでランキング
     df["pred_score"] = scores
+    df["probability"] = probabilities
     df["pred_rank"] = df["pred_score"].rank(ascending=False).astype(int)
     df["actual_rank"] = df["horse_number"].map(actual_results)
     df = df.dropna(subset=["actual_rank"])
@@ -126,7 +171,7 @@ def evaluate_by_race(db, predictor, extractor, race: Race) -> dict:
         "field_size": len(df),
         "win_hit": win_hit,
         "top3_hit": top3_hit,
-        "pred_ranking": df.sort_values("pred_rank")[["horse_number", "pred_rank", "actual_rank"]].to_dict("records"),
+        "pred_ranking": df.sort_values("pred_rank")[["horse_number", "pred_rank", "actual_rank", "probability"]].to_dict("records"),
     }
 
 
@@ -204,12 +249,14 @@ def main():
         # 評価
         print("\n[3/3] Evaluating...")
         extractor = FeatureExtractor(db)
-        results = []
+        prepared = []
 
         for race in races:
-            result = evaluate_by_race(db, predictor, extractor, race)
-            if result:
-                results.append(result)
+            item = prepare_race(extractor, race)
+            if item:
+                prepared.append((race, *item))
+
+        results = evaluate_races(predictor, prepared)
 
         if not results:
             print("Error: No valid results.")
@@ -253,7 +300,7 @@ def main():
                 status = "O" if r["win_hit"] else "X"
                 print(f"  [{status}] {r['date']} {r['race_name']} (Top3 hit: {r['top3_hit']}/3)")
                 for pred in r["pred_ranking"][:5]:
-                    print(f"      #{pred['horse_number']}: Pred={pred['pred_rank']}, Actual={int(pred['actual_rank'])}")
+                    print(f"      #{pred['horse_number']}: Pred={pred['pred_rank']}, Actual={int(pred['actual_rank'])}, Prob={pred['probability']:.1%}")
 
         print("\n" + "=" * 60)
         print("Evaluation completed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+HTMLパーサーのスループット比較（BeautifulSoup vs lxml高速パス）
+
+保存済みHTML (data/html/) を使ってスクレイパーごとの pages/sec を計測する。
+Usage:
+    python scripts/benchmark_parsers.py                # 各種最大200ページ
+    python scripts/benchmark_parsers.py --limit 1000 --repeat 3
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.scraper import HorseScraper, RaceDetailScraper, OddsScraper
+from app.services.scraper import fast_parser
+from app.services.scraper.base import HTML_STORAGE_DIR
+
+
+def _targets():
+    """(名前, HTMLのglob, パース関数) の一覧"""
+    horse = HorseScraper(save_html=False)
+    race = RaceDetailScraper(save_html=False)
+    odds = OddsScraper(save_html=False)
+
+    def race_id_of(path: Path) -> str:
+        return path.stem
+
+    return [
+        (
+            "HorseScraper.scrape_past_results",
+            "horses/*_result.html",
+            lambda root, path: horse._parse_past_results(root),
+        ),
+        (
+            "RaceDetailScraper.scrape",
+            "races/*.html",
+            lambda root, path: race._parse_race_detail(root, race_id_of(path)),
+        ),
+        (
+            "OddsScraper._scrape_trifecta",
+            "odds/*_trifecta.html",
+            lambda root, path: odds._parse_combination_odds(root, 3),
+        ),
+    ]
+
+
+def benchmark(limit: int, repeat: int):
+    """保存済みHTMLでパーサーごとのスループットを計測"""
+    print(f"HTML directory: {HTML_STORAGE_DIR}")
+    soup_parser = HorseScraper(save_html=False)
+
+    for name, pattern, parse_fn in _targets():
+        paths = sorted(HTML_STORAGE_DIR.glob(pattern))[:limit]
+        if not paths:
+            print(f"\n{name}: no archived HTML ({pattern})")
+            continue
+
+        pages = [(p, p.read_text(encoding="utf-8")) for p in paths]
+        print(f"\n{name}: {len(pages)} pages x {repeat}")
+
+        timings = {}
+        outputs = {}
+        for mode in ("beautifulsoup", "lxml"):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results = []
+                for path, html in pages:
+                    if mode == "lxml":
+                        root = fast_parser.parse(html)
+                    else:
+                        root = soup_parser.parse_html(html)
+                    results.append(parse_fn(root, path))
+            timings[mode] = time.perf_counter() - start
+            outputs[mode] = results
+
+        total_pages = len(pages) * repeat
+        for mode, elapsed in timings.items():
+            print(f"  {mode:<14} {total_pages / elapsed:8.1f} pages/sec ({elapsed:.2f}s)")
+        print(f"  speedup        {timings['beautifulsoup'] / timings['lxml']:8.2f}x")
+
+        mismatches = sum(
+            1 for a, b in zip(outputs["beautifulsoup"], outputs["lxml"]) if a != b
+        )
+        print(f"  mismatches     {mismatches}/{len(pages)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parse throughput")
+    parser.add_argument("--limit", type=int, default=200, help="Max pages per scraper")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat count")
+    args = parser.parse_args()
+
+    benchmark(args.limit, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
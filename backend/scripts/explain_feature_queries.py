@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+特徴量抽出クエリのインデックス診断
+
+FeatureExtractor が発行するクエリと同じ形のSQLを、開発DBの実データから選んだ
+馬・騎手・レースで組み立てて実行計画と所要時間を表示する。
+PostgreSQLでは EXPLAIN (ANALYZE, BUFFERS)、SQLiteでは EXPLAIN QUERY PLAN を使う。
+entries / races の全件走査（Seq Scan / SCAN）を含むクエリには警告を付ける。
+
+Usage:
+    python scripts/explain_feature_queries.py
+    python scripts/explain_feature_queries.py --horse-id 2019104308 --repeat 5
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from statistics import median
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.base import SessionLocal
+from app.models import Entry, Horse, Race, Sire, Trainer, Training
+
+# 全件走査として警告する実行計画の行
+SEQ_SCAN = re.compile(r"Seq Scan on (entries|races)\b|SCAN (entries|races)\b(?! USING)")
+
+
+def _pick_sample(db: Session, horse_id: str = None) -> dict:
+    """出走数の多い馬とその最新の確定レースを診断対象に選ぶ"""
+    if horse_id is None:
+        horse_id = db.execute(
+            select(Entry.horse_id)
+            .where(Entry.result.isnot(None))
+            .group_by(Entry.horse_id)
+            .order_by(func.count(Entry.id).desc())
+            .limit(1)
+        ).scalar()
+    if horse_id is None:
+        raise SystemExit("No finished entries in the database")
+
+    entry, race = db.execute(
+        select(Entry, Race)
+        .join(Race)
+        .where(Entry.horse_id == horse_id)
+        .order_by(Race.date.desc())
+        .limit(1)
+    ).one()
+    horse = db.get(Horse, horse_id)
+    return {
+        "horse_id": horse_id,
+        "jockey_id": entry.jockey_id,
+        "race_id": race.race_id,
+        "race_date": race.date,
+        "course": race.course,
+        "distance": race.distance,
+        "condition": race.condition,
+        "track_type": race.track_type,
+        "trainer": horse.trainer if horse else None,
+        "father": horse.father if horse else None,
+    }
+
+
+def _query_shapes(s: dict) -> list[tuple[str, object]]:
+    """(名前, クエリ) の一覧。FeatureExtractor / feature_sync_service と同じ絞り込み"""
+
+    def history(*conditions):
+        return (
+            select(Entry)
+            .join(Race)
+            .where(Entry.horse_id == s["horse_id"])
+            .where(*conditions)
+            .where(Race.date < s["race_date"])
+            .where(Entry.result.isnot(None))
+        )
+
+    return [
+        ("past_performance", history().order_by(Race.date.desc()).limit(10)),
+        ("course_aptitude", history(Race.course == s["course"])),
+        ("distance_aptitude", history(Race.distance.between(s["distance"] - 200, s["distance"] + 200))),
+        ("track_aptitude", history(Race.track_type == s["track_type"])),
+        ("condition_track", history(Race.condition == s["condition"], Race.track_type == s["track_type"])),
+        (
+            "preload_horse_history",
+            select(Entry, Race.date, Race.track_type, Race.distance, Race.condition, Race.course)
+            .join(Race)
+            .where(Entry.horse_id.in_([s["horse_id"]]))
+            .where(Entry.result.isnot(None))
+            .where(Race.date < s["race_date"])
+            .order_by(Entry.horse_id, Race.date.desc()),
+        ),
+        (
+            "jockey_history",
+            select(Entry.result, Race.date, Race.track_type, Race.distance)
+            .join(Race)
+            .where(Entry.jockey_id == s["jockey_id"])
+            .where(Entry.result.isnot(None))
+            .where(Race.date < s["race_date"]),
+        ),
+        (
+            "training",
+            select(Training).where(Training.race_id == s["race_id"], Training.horse_id == s["horse_id"]),
+        ),
+        ("trainer_by_name", select(Trainer).where(Trainer.name == s["trainer"])),
+        ("sire_by_name", select(Sire).where(Sire.name == s["father"])),
+    ]
+
+
+def _explain(db: Session, stmt, analyze: bool) -> list[str]:
+    """実行計画の行を取得"""
+    conn = db.connection()
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    if conn.dialect.name == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        prefix = "EXPLAIN QUERY PLAN "
+    rows = conn.exec_driver_sql(prefix + str(compiled), params).all()
+    # SQLiteは (id, parent, notused, detail)
+    return [str(row[-1]) for row in rows]
+
+
+def _time_query(db: Session, stmt, repeat: int) -> float:
+    """クエリの実行時間の中央値（ミリ秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(stmt).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN feature extraction queries")
+    parser.add_argument("--horse-id", help="Horse to use as the sample (default: most entries)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeat count")
+    parser.add_argument("--no-analyze", action="store_true", help="Plan only (PostgreSQL)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        sample = _pick_sample(db, args.horse_id)
+        print(f"Dialect: {db.get_bind().dialect.name}")
+        print("Sample: " + ", ".join(f"{k}={v}" for k, v in sample.items()))
+
+        warnings = []
+        for name, stmt in _query_shapes(sample):
+            plan = _explain(db, stmt, analyze=not args.no_analyze)
+            elapsed = _time_query(db, stmt, args.repeat)
+            seq_scans = [line for line in plan if SEQ_SCAN.search(line)]
+            if seq_scans:
+                warnings.append(name)
+
+            print(f"\n=== {name}: {elapsed:.2f} ms (median of {args.repeat}){'  [FULL SCAN]' if seq_scans else ''}")
+            for line in plan:
+                print(f"  {line}")
+
+        print()
+        if warnings:
+            print(f"Full scans on entries/races: {', '.join(warnings)}")
+            print("Run `alembic upgrade head` to create the feature query indexes, then ANALYZE.")
+        else:
+            print("All feature queries use indexes.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+合成データの生成（ベンチマーク・負荷確認用）
+
+指定した年数分のレース・出走・馬・騎手・調教師・種牡馬・調教データを作る。
+同じ --seed なら同じデータになる。
+
+Usage:
+    python scripts/generate_synthetic_data.py --database-url sqlite:///synthetic.db --years 3
+    python scripts/generate_synthetic_data.py --database-url postgresql://.../keiba_bench --years 5
+    python scripts/generate_synthetic_data.py --years 1 --courses-per-day 3 --refresh-history
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.db.base import Base
+from app.services import entry_history_service
+from app.services.synthetic_data import SyntheticConfig, generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic race data")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="Target database (SQLite / PostgreSQL)")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--start-year", type=int, default=2022)
+    parser.add_argument("--courses-per-day", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--create-tables", action="store_true", help="Create tables without alembic (empty DB only)")
+    parser.add_argument("--refresh-history", action="store_true", help="Rebuild entry_history after generation")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.create_tables:
+        Base.metadata.create_all(engine)
+    elif not inspect(engine).has_table("races"):
+        parser.error("races table not found: run alembic upgrade head or pass --create-tables")
+
+    db = sessionmaker(bind=engine)()
+    try:
+        config = SyntheticConfig(
+            years=args.years,
+            start_year=args.start_year,
+            courses_per_day=args.courses_per_day,
+            seed=args.seed,
+        )
+        start = time.perf_counter()
+        summary = generate(db, config)
+        print(
+            f"Generated {summary.races} races, {summary.entries} entries, {summary.horses} horses, "
+            f"{summary.trainings} trainings in {time.perf_counter() - start:.1f}s"
+        )
+        if args.refresh_history:
+            rows = entry_history_service.refresh_entry_history(db)
+            print(f"Refreshed entry_history: {rows} rows")
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
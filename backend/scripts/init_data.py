@@ -5,6 +5,9 @@ Usage:
     python scripts/init_data.py --days 7        # Scrape last 7 days
     python scripts/init_data.py --from 2024-12-01 --to 2024-12-22
     python scripts/init_data.py --demo          # Create demo data
+
+Scraping runs as a resumable backfill job: re-running the same range
+continues from the last completed race.
 """
 
 import argparse
@@ -18,13 +21,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from sqlalchemy.orm import Session
 from app.db.base import SessionLocal
 from app.models import Race, Entry, Horse, Jockey, Training
-from app.services.scraper import (
-    RaceListScraper,
-    RaceDetailScraper,
-    HorseScraper,
-    JockeyScraper,
-    TrainingScraper,
-)
+from app.services import backfill_service
 
 
 def create_demo_data(db: Session):
@@ -114,167 +111,34 @@ def scrape_historical_data(
     start_date: date,
     end_date: date,
     include_training: bool = True,
+    workers: int = 1,
 ):
-    """Scrape historical race data"""
-    print(f"Scraping races from {start_date} to {end_date}...")
-
-    list_scraper = RaceListScraper()
-    detail_scraper = RaceDetailScraper()
-    horse_scraper = HorseScraper()
-    jockey_scraper = JockeyScraper()
-    training_scraper = TrainingScraper()
-
-    current_date = start_date
-    total_races = 0
-    total_entries = 0
-
-    while current_date <= end_date:
-        print(f"\n=== Processing {current_date} ===")
-
-        try:
-            races = list_scraper.scrape(current_date)
-        except Exception as e:
-            print(f"  Error getting race list: {e}")
-            current_date += timedelta(days=1)
-            continue
-
-        if not races:
-            print("  No races found")
-            current_date += timedelta(days=1)
-            continue
-
-        print(f"  Found {len(races)} races")
-
-        for race_info in races:
-            race_id = race_info["race_id"]
-
-            # Check if race already exists
-            existing = db.query(Race).filter(Race.race_id == race_id).first()
-            if existing:
-                print(f"    Race {race_id} already exists, skipping")
-                continue
-
-            try:
-                # Get race detail
-                detail = detail_scraper.scrape(race_id)
-
-                # Create Race record
-                race = Race(
-                    race_id=race_id,
-                    date=current_date,
-                    course=detail.get("course", ""),
-                    race_number=detail.get("race_number", 0),
-                    race_name=detail.get("race_name"),
-                    distance=detail.get("distance", 0),
-                    track_type=detail.get("track_type", ""),
-                    weather=detail.get("weather"),
-                    condition=detail.get("condition"),
-                    grade=detail.get("grade"),
-                )
-                db.add(race)
-
-                # Process entries
-                entries = detail.get("entries", [])
-                for entry_data in entries:
-                    horse_id = entry_data.get("horse_id")
-                    jockey_id = entry_data.get("jockey_id")
-
-                    # Get or create horse
-                    if horse_id:
-                        horse = db.query(Horse).filter(Horse.horse_id == horse_id).first()
-                        if not horse:
-                            try:
-                                horse_info = horse_scraper.scrape(horse_id)
-                                horse = Horse(
-                                    horse_id=horse_id,
-                                    name=horse_info.get("name", entry_data.get("horse_name", "")),
-                                    sex=horse_info.get("sex", entry_data.get("sex", "")),
-                                    birth_year=horse_info.get("birth_year", 2020),
-                                    father=horse_info.get("father"),
-                                    mother=horse_info.get("mother"),
-                                    mother_father=horse_info.get("mother_father"),
-                                    trainer=horse_info.get("trainer"),
-                                )
-                                db.add(horse)
-                            except Exception as e:
-                                print(f"      Warning: Could not get horse {horse_id}: {e}")
-                                horse = Horse(
-                                    horse_id=horse_id,
-                                    name=entry_data.get("horse_name", "Unknown"),
-                                    sex=entry_data.get("sex", ""),
-                                    birth_year=2020,
-                                )
-                                db.add(horse)
-
-                    # Get or create jockey
-                    if jockey_id:
-                        jockey = db.query(Jockey).filter(Jockey.jockey_id == jockey_id).first()
-                        if not jockey:
-                            try:
-                                jockey_info = jockey_scraper.scrape(jockey_id)
-                                jockey = Jockey(
-                                    jockey_id=jockey_id,
-                                    name=jockey_info.get("name", entry_data.get("jockey_name", "")),
-                                    win_rate=jockey_info.get("win_rate"),
-                                    place_rate=jockey_info.get("place_rate"),
-                                    show_rate=jockey_info.get("show_rate"),
-                                )
-                                db.add(jockey)
-                            except Exception:
-                                jockey = Jockey(
-                                    jockey_id=jockey_id,
-                                    name=entry_data.get("jockey_name", "Unknown"),
-                                )
-                                db.add(jockey)
-
-                    # Create entry
-                    entry = Entry(
-                        race_id=race_id,
-                        horse_id=horse_id or "",
-                        jockey_id=jockey_id,
-                        frame_number=entry_data.get("frame_number"),
-                        horse_number=entry_data.get("horse_number", 0),
-                        weight=entry_data.get("weight"),
-                        odds=entry_data.get("odds"),
-                        popularity=entry_data.get("popularity"),
-                        result=entry_data.get("result"),
-                        finish_time=entry_data.get("finish_time"),
-                    )
-                    db.add(entry)
-                    total_entries += 1
-
-                # Get training data if requested
-                if include_training:
-                    try:
-                        training_data = training_scraper.scrape(race_id)
-                        for t_data in training_data:
-                            training = Training(
-                                race_id=race_id,
-                                horse_id=t_data.get("horse_id", ""),
-                                horse_number=t_data.get("horse_number"),
-                                training_course=t_data.get("training_course"),
-                                training_time=t_data.get("training_time"),
-                                lap_times=t_data.get("lap_times"),
-                                training_rank=t_data.get("training_rank"),
-                            )
-                            db.add(training)
-                    except Exception as e:
-                        print(f"      Warning: Could not get training data: {e}")
-
-                db.commit()
-                total_races += 1
-                print(f"    Saved: {race_id} ({len(entries)} entries)")
-
-            except Exception as e:
-                db.rollback()
-                print(f"    Error processing {race_id}: {e}")
-                continue
-
-        current_date += timedelta(days=1)
+    """Scrape historical race data (resumable backfill job)"""
+    job = backfill_service.get_or_create_job(
+        db, start_date, end_date, include_training=include_training
+    )
+    print(f"Scraping races from {start_date} to {end_date} (job #{job.id}, workers={workers})...")
+
+    def on_progress(event_type: str, data: dict):
+        if event_type == "race_saved":
+            print(f"    Saved: {data['race_id']} ({data['entries']} entries)")
+        elif event_type == "race_error":
+            print(f"    Error processing {data['race_id']}: {data['error']}")
+        elif event_type == "date_complete":
+            print(f"  {data['date']}: {data['status']}")
+
+    result = backfill_service.run_job(
+        job.id, workers=workers, progress_callback=on_progress
+    )
 
+    summary = backfill_service.get_job_summary(db, job.id)
     print(f"\n=== Summary ===")
-    print(f"Total races saved: {total_races}")
-    print(f"Total entries saved: {total_entries}")
+    print(f"Job #{job.id}: {summary['status']}")
+    print(f"Total races saved: {result.success_count}")
+    print(f"Skipped (already in DB): {result.skipped_count}")
+    print(f"Errors: {result.error_count}")
+    if summary["status"] != "completed":
+        print("Re-run the same command to resume the remaining dates/races.")
 
 
 def main():
@@ -306,6 +170,12 @@ def main():
         action="store_true",
         help="Skip training data scraping",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of dates to scrape in parallel (shares one rate limit)",
+    )
 
     args = parser.parse_args()
 
@@ -318,7 +188,9 @@ def main():
             end_date = date.today()
             start_date = end_date - timedelta(days=args.days - 1)
             scrape_historical_data(
-                db, start_date, end_date, include_training=not args.no_training
+                db, start_date, end_date,
+                include_training=not args.no_training,
+                workers=args.workers,
             )
         elif args.from_date:
             start_date = datetime.strptime(args.from_date, "%Y-%m-%d").date()
@@ -328,7 +200,9 @@ def main():
                 else date.today()
             )
             scrape_historical_data(
-                db, start_date, end_date, include_training=not args.no_training
+                db, start_date, end_date,
+                include_training=not args.no_training,
+                workers=args.workers,
             )
         else:
             print("Usage:")
@@ -338,6 +212,9 @@ def main():
             print()
             print("Options:")
             print("  --no-training    Skip training data scraping")
+            print("  --workers N      Scrape N dates in parallel")
+            print()
+            print("Interrupted runs resume from where they stopped when re-run with the same range.")
     finally:
         db.close()
 
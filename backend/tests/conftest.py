@@ -1,12 +1,27 @@
+import os
+import shutil
+import tempfile
+import threading
 import pytest
+from contextlib import contextmanager
 from datetime import date, datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.config import settings
 from app.db.base import Base
 from app.models import Race, Entry, Horse, Jockey, Prediction, History
 
+# テストでは作業ツリーの logs/ に書き込まない。
+# ログは app.main の import 時に設定されるので、テストモジュールを読み込む前に差し替える
+# （ジョブのワーカープロセスは環境変数から読む）
+settings.LOG_DIR = os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="keiba-test-logs-")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(settings.LOG_DIR, ignore_errors=True)
+
 
 @pytest.fixture(scope="function")
 def test_db():
@@ -27,6 +42,27 @@ def test_db():
         Base.metadata.drop_all(engine)
 
 
+@pytest.fixture
+def count_queries(test_db):
+    """Context manager that records SQL statements executed on the test engine"""
+    engine = test_db.get_bind()
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+
 @pytest.fixture
 def sample_race(test_db):
     """Create a sample race for testing"""
@@ -115,3 +151,60 @@ def sample_prediction(test_db, sample_race):
     test_db.add(prediction)
     test_db.commit()
     return prediction
+
+
+class FakePostgrest:
+    """Local stand-in for the Supabase (PostgREST) table API used by sync services.
+
+    Each upsert request is applied atomically: if any row violates a foreign key
+    or is rejected, the whole request fails, as a single PostgREST call does.
+    """
+
+    def __init__(self, foreign_keys=None, reject=None):
+        self.tables = {}
+        self.requests = []
+        self.foreign_keys = foreign_keys or {}
+        self.reject = reject or (lambda table, row: False)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return _FakeTableQuery(self, name)
+
+    def _upsert(self, table, rows, on_conflict):
+        with self._lock:
+            self.requests.append((table, len(rows)))
+            for row in rows:
+                if self.reject(table, row):
+                    raise Exception(f"rejected row in {table}: {row[on_conflict]}")
+                for column, parent in self.foreign_keys.get(table, {}).items():
+                    if row.get(column) is not None and row[column] not in self.tables.get(parent, {}):
+                        raise Exception(f"violates foreign key {table}.{column} -> {parent}")
+            stored = self.tables.setdefault(table, {})
+            for row in rows:
+                stored[row[on_conflict]] = dict(row)
+        return rows
+
+
+class _FakeTableQuery:
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+        self._rows = []
+        self._on_conflict = None
+
+    def upsert(self, json, on_conflict=None, **kwargs):
+        self._rows = json if isinstance(json, list) else [json]
+        self._on_conflict = on_conflict
+        return self
+
+    def execute(self):
+        data = self.server._upsert(self.name, self._rows, self._on_conflict)
+        return type("APIResponse", (), {"data": data})()
+
+
+@pytest.fixture
+def fake_supabase():
+    """In-memory PostgREST double with the entries foreign keys"""
+    return FakePostgrest(foreign_keys={
+        "entries": {"race_id": "races", "horse_id": "horses", "jockey_id": "jockeys"},
+    })
@@ -39,6 +39,14 @@ class TestRootEndpoints:
         assert response.status_code == 200
         assert response.json()["status"] == "healthy"
 
+    def test_db_pool_health(self, client):
+        """Test connection pool metrics endpoint"""
+        response = client.get("/health/db")
+        assert response.status_code == 200
+        pools = response.json()["pools"]
+        assert set(pools) >= {"api", "batch"}
+        assert "wait_max_ms" in pools["api"]
+
 
 class TestRacesAPI:
     """Tests for races API"""
@@ -85,6 +93,106 @@ class TestRacesAPI:
         assert response.status_code == 404
 
 
+class TestListPagination:
+    """Tests for keyset pagination on list endpoints"""
+
+    @staticmethod
+    def _walk(client, url):
+        """Follow next_cursor until the last page"""
+        seen, cursor = [], None
+        while True:
+            page = client.get(url + (f"&cursor={cursor}" if cursor else "")).json()
+            seen.append(page)
+            cursor = page["next_cursor"]
+            if not cursor:
+                return seen
+
+    def test_races_cursor_walks_all_pages(self, client, test_db):
+        """Cursor pages cover every race once in (date desc, race_number) order"""
+        from app.models import Race
+
+        for day in (20, 21, 22):
+            for number in (1, 2, 3):
+                test_db.add(Race(
+                    race_id=f"2024{day}{number:02d}", date=date(2024, 12, day), course="中山",
+                    race_number=number, distance=1600, track_type="芝",
+                ))
+        test_db.commit()
+
+        pages = self._walk(client, "/api/v1/races?limit=4")
+
+        assert [len(p["races"]) for p in pages] == [4, 4, 1]
+        assert all(p["total"] == 9 for p in pages)
+        keys = [(r["date"], r["race_number"]) for p in pages for r in p["races"]]
+        assert keys == sorted(keys, key=lambda k: (-date.fromisoformat(k[0]).toordinal(), k[1]))
+        assert len(set(keys)) == 9
+
+    def test_horses_and_jockeys_cursor(self, client, test_db):
+        """Horses and jockeys lists page by (name, id)"""
+        from app.models import Horse, Jockey
+
+        for i in range(5):
+            test_db.add(Horse(horse_id=f"h{i}", name="同名" if i < 3 else f"馬{i}", sex="牡", birth_year=2020))
+            test_db.add(Jockey(jockey_id=f"j{i}", name=f"騎手{i}"))
+        test_db.commit()
+
+        horses = [h["horse_id"] for p in self._walk(client, "/api/v1/horses?limit=2") for h in p["horses"]]
+        jockeys = [j["jockey_id"] for p in self._walk(client, "/api/v1/jockeys?limit=2") for j in p["jockeys"]]
+
+        assert sorted(horses) == [f"h{i}" for i in range(5)]
+        assert horses[:3] == ["h0", "h1", "h2"]
+        assert jockeys == [f"j{i}" for i in range(5)]
+
+    def test_invalid_cursor(self, client):
+        """Malformed cursors are rejected"""
+        assert client.get("/api/v1/races?cursor=not-a-cursor").status_code == 400
+        assert client.get("/api/v1/horses?cursor=WzFd").status_code == 400
+
+
+class TestQueryBudget:
+    """Detail and list endpoints run a fixed number of queries regardless of row count"""
+
+    @pytest.fixture
+    def busy_db(self, test_db):
+        from app.models import Race, Entry, Horse, Jockey
+
+        test_db.add_all([Jockey(jockey_id=f"j{i}", name=f"騎手{i}") for i in range(4)])
+        test_db.add_all([
+            Horse(horse_id=f"h{i}", name=f"馬{i}", sex="牡", birth_year=2020) for i in range(8)
+        ])
+        for r in range(6):
+            race_id = f"20240101{r:04d}"
+            test_db.add(Race(
+                race_id=race_id, date=date(2024, 1, r + 1), course="中山",
+                race_number=1, distance=1600, track_type="芝",
+            ))
+            for n in range(8):
+                test_db.add(Entry(
+                    race_id=race_id, horse_id=f"h{n}", jockey_id=f"j{n % 4}",
+                    horse_number=n + 1, result=n + 1,
+                ))
+        test_db.commit()
+        test_db.expire_all()
+        return test_db
+
+    @pytest.mark.parametrize("url, budget", [
+        ("/api/v1/races/202401010000", 2),
+        ("/api/v1/horses/h0", 2),
+        ("/api/v1/horses?limit=50", 2),
+        ("/api/v1/jockeys/j0", 3),
+    ])
+    def test_query_budget(self, client, busy_db, count_queries, url, budget):
+        with count_queries() as statements:
+            response = client.get(url)
+
+        assert response.status_code == 200
+        assert len(statements) <= budget, statements
+
+    def test_horse_list_entries_count(self, client, busy_db):
+        horses = client.get("/api/v1/horses?limit=50").json()["horses"]
+        assert {h["entries_count"] for h in horses} == {6}
+
+
 class TestPredictionsAPI:
     """Tests for predictions API"""
 
@@ -165,6 +273,46 @@ class TestStatsAPI:
         assert "accuracy" in data
         assert "period" in data
 
+    def test_accuracy_from_outcomes(self, client, test_db, count_queries):
+        """Accuracy is one GROUP BY over prediction outcomes, with per-model breakdowns"""
+        from app.models import Race, Entry, Horse, Prediction
+
+        test_db.add_all([
+            Horse(horse_id=f"h{i}", name=f"馬{i}", sex="牡", birth_year=2020) for i in range(6)
+        ])
+        # 予測1位の馬番と実際の着順
+        picks = [("v1", 1, "G1", "芝"), ("v1", 3, None, "芝"), ("v2", 6, None, "ダート"), ("v2", 2, "G1", "ダート")]
+        for r, (version, pick, grade, track) in enumerate(picks):
+            race_id = f"20240101{r:04d}"
+            test_db.add(Race(
+                race_id=race_id, date=date(2024, 1, r + 1), course="中山", race_number=1,
+                distance=1600, track_type=track, grade=grade,
+            ))
+            for n in range(6):
+                test_db.add(Entry(race_id=race_id, horse_id=f"h{n}", horse_number=n + 1, result=n + 1))
+            test_db.add(Prediction(
+                race_id=race_id, model_version=version,
+                results_json={"predictions": [{"horse_number": pick}]},
+            ))
+        # 結果未確定のレースは集計対象外
+        test_db.add(Race(race_id="202401019999", date=date(2024, 1, 9), course="中山",
+                         race_number=1, distance=1600, track_type="芝"))
+        test_db.add(Prediction(race_id="202401019999", model_version="v1",
+                               results_json={"predictions": [{"horse_number": 1}]}))
+        test_db.commit()
+
+        assert client.post("/api/v1/stats/accuracy/refresh").json()["evaluated"] == 4
+
+        with count_queries() as statements:
+            data = client.get("/api/v1/stats/accuracy?period=all").json()
+
+        assert len(statements) == 1
+        assert data["total_races"] == 4
+        assert data["accuracy"] == {"top1": 0.25, "top3": 0.75, "top5": 0.75}
+        assert data["by_grade"] == {"G1": {"top1": 0.5, "top3": 1.0}, "other": {"top1": 0.0, "top3": 0.5}}
+        assert data["by_track"]["ダート"] == {"top1": 0.0, "top3": 0.5}
+        assert data["by_model_version"]["v1"] == {"total_races": 2, "top1": 0.5, "top3": 1.0, "top5": 1.0}
+
     def test_get_scrape_status(self, client):
         """Test getting scrape status"""
         response = client.get("/api/v1/stats/scrape")
@@ -172,3 +320,169 @@ class TestStatsAPI:
         data = response.json()
         assert data["status"] == "ready"
         assert "counts" in data
+
+
+class TestNonBlockingHandlers:
+    """Route handlers must not block the event loop"""
+
+    def test_reads_not_blocked_by_scrape(self, client, sample_race):
+        """Race list latency stays low while a slow scrape is running"""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        started = threading.Event()
+
+        def slow_scrape(*args, **kwargs):
+            started.set()
+            time.sleep(1.0)
+            return []
+
+        latencies = []
+        with patch("app.api.routes.races.RaceListScraper") as scraper_cls:
+            scraper_cls.return_value.scrape.side_effect = slow_scrape
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                scrape = pool.submit(
+                    client.post, "/api/v1/races/scrape", params={"target_date": "2024-12-22"}
+                )
+                assert started.wait(5)
+                for _ in range(5):
+                    start = time.perf_counter()
+                    response = client.get("/api/v1/races", params={"target_date": "2024-12-22"})
+                    latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 200
+                scrape_running = not scrape.done()
+                assert scrape.result().status_code == 200
+
+        assert scrape_running
+        assert max(latencies) < 0.5
+
+
+class TestEventStream:
+    """Tests for SSE progress streams"""
+
+    def test_sync_stream_replays_from_last_event_id(self, client):
+        """Reconnecting with Last-Event-ID resumes after the last received event"""
+        import json
+        from app.services.event_broker import broker
+
+        broker.clear()
+        broker.publish("sync", {"type": "status", "progress": 10})
+        broker.publish("sync", {"type": "status", "progress": 20})
+        broker.publish("sync", {"type": "complete", "results": {}})
+        try:
+            response = client.get("/api/v1/sync/stream", headers={"Last-Event-ID": "1"})
+        finally:
+            broker.clear()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        blocks = [block for block in response.text.split("\n\n") if block]
+        events = [json.loads(block.split("data: ", 1)[1]) for block in blocks]
+        assert events[0]["type"] == "connected"
+        assert [e["type"] for e in events[1:]] == ["status", "complete"]
+        assert events[1]["progress"] == 20
+        assert blocks[1].startswith("id: 2\n")
+
+    def test_stream_closes_when_idle(self, client):
+        """A stream with nothing running sends idle and closes"""
+        import json
+
+        response = client.get("/api/v1/model/simulate/stream")
+        events = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+        assert [e["type"] for e in events] == ["connected", "idle"]
+
+
+class TestProfiling:
+    """Tests for request profiling and /metrics"""
+
+    def test_profile_header_reports_queries(self, client, sample_race, count_queries):
+        """X-Profile returns wall time, DB time and the query count of the request"""
+        with count_queries() as statements:
+            response = client.get("/api/v1/races", headers={"X-Profile": "1"})
+        assert response.status_code == 200
+
+        fields = dict(part.split("=", 1) for part in response.headers["X-Profile"].split("; "))
+        assert int(fields["queries"]) == len(statements) > 0
+        assert float(fields["total"].rstrip("ms")) >= float(fields["db"].rstrip("ms"))
+
+    def test_profile_header_is_opt_in(self, client):
+        response = client.get("/health")
+        assert "X-Profile" not in response.headers
+
+    def test_metrics_exposes_routes_and_spans(self, client, sample_race):
+        """Requests are aggregated by route template in Prometheus text format"""
+        from app.profiling import metrics, span
+
+        metrics.reset()
+        client.get(f"/api/v1/races/{sample_race.race_id}")
+        with span("predict"):
+            pass
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert (
+            'keiba_http_requests_total{method="GET",route="/api/v1/races/{race_id}",status="200"} 1'
+            in body
+        )
+        assert 'keiba_http_request_duration_seconds_count{method="GET",route="/api/v1/races/{race_id}"} 1' in body
+        assert 'keiba_span_seconds_count{span="predict"} 1' in body
+        assert "keiba_db_pool_checked_out" in body
+
+
+# app.main の import にかけてよい時間
+# FastAPI・SQLAlchemy だけで約0.7秒かかるため、余裕を見て1.5秒とする
+# （LightGBM・scikit-learn を読み込むとこれを大きく超える）
+IMPORT_BUDGET_SECONDS = 1.5
+
+# 起動時に読み込まない重いライブラリ（スクレイピング・ストレージ用の HTTP も含む）
+HEAVY_MODULES = (
+    "pandas", "lightgbm", "sklearn", "scipy", "supabase", "requests", "bs4", "httpx",
+)
+
+
+@pytest.fixture(scope="module")
+def cold_import():
+    """Import app.main in a fresh interpreter"""
+    import json
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestColdStart:
+    """Tests for API startup cost"""
+
+    def test_ml_libraries_are_not_imported_at_startup(self, cold_import):
+        assert cold_import["heavy"] == []
+
+    def test_import_time_budget(self, cold_import):
+        assert cold_import["elapsed"] < IMPORT_BUDGET_SECONDS
+
+    def test_warm_up_loads_every_race_type(self):
+        from app.services import prediction_service
+        from app.services.predictor.model_files import RACE_TYPES
+
+        prediction_service.warm_up()
+        for race_type in RACE_TYPES:
+            assert race_type in prediction_service._predictors
+        assert prediction_service.MODEL_VERSIONS is prediction_service.get_model_versions()
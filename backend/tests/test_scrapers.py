@@ -82,3 +82,115 @@ class TestScraperErrors:
         """Test ScraperError"""
         with pytest.raises(ScraperError):
             raise ScraperError("General error")
+
+
+class TestFastParser:
+    """Tests for the lxml fast parsing path"""
+
+    RACE_HTML = """
+    <html><body>
+    <div class="data_intro">
+        <h1>有馬記念(G1)</h1>
+        <p>芝右2500m / 天候 : 晴 / 芝 : 良 / 発走 : 15:40</p>
+        <p class="smalltxt">2024年12月22日 5回中山8日目 3歳以上オープン</p>
+    </div>
+    <table class="race_table_01">
+        <tr><th>着順</th><th>枠番</th><th>馬番</th></tr>
+        <tr>
+            <td>1</td><td>1</td><td>1</td>
+            <td><a href="/horse/2021105898/">レガレイラ</a></td>
+            <td>牝3</td><td>54</td>
+            <td><a href="/jockey/result/recent/05585/">戸崎圭太</a></td>
+            <td>2:31.8</td><td></td><td>**</td><td>11-11-12-9</td><td>35.9-36.1</td>
+            <td>11.3</td><td>5</td><td>490(+2)</td><td></td><td></td><td>35.4</td>
+            <td></td><td></td><td>50,000.0</td>
+        </tr>
+        <tr>
+            <td>2</td><td>3</td><td>5</td>
+            <td><a href="/horse/2020103175/">シャフリヤール</a></td>
+            <td>牡6</td><td>58</td>
+            <td><a href="/jockey/result/recent/05339/">C.デムーロ</a></td>
+            <td>2:31.8</td><td>ハナ</td><td>**</td><td>9-9-8-7</td><td>35.9-36.1</td>
+            <td>25.7</td><td>10</td><td>476(-4)</td><td></td><td></td><td>35.6</td>
+            <td></td><td></td><td>20,000.0</td>
+        </tr>
+    </table>
+    <!-- comment -->
+    <script>var x = 1;</script>
+    </body></html>
+    """
+
+    TRIFECTA_HTML = """
+    <html><body>
+    <table>
+        <tr><th>組み合わせ</th><th>オッズ</th></tr>
+        <tr><td>1-2-3</td><td>123.4</td></tr>
+        <tr><td>1 - 3 - 2</td><td>1,234.5</td></tr>
+    </table>
+    </body></html>
+    """
+
+    HORSE_RESULT_HTML = """
+    <html><body>
+    <table class="db_h_race_results nk_tb_common">
+        <thead><tr><th>日付</th></tr></thead>
+        <tbody>
+        <tr>
+            <td><a href="/race/list/20241222/">2024/12/22</a></td><td>5中山8</td><td>晴</td>
+            <td>11</td><td><a href="/race/202406050811/">有馬記念(G1)</a></td><td></td>
+            <td>16</td><td>1</td><td>1</td><td>11.3</td><td>5</td><td>1</td>
+            <td><a href="/jockey/result/recent/05585/">戸崎圭太</a></td><td>54</td>
+            <td>芝2500</td><td></td><td>良</td><td>**</td><td>2:31.8</td><td>-0.0</td>
+            <td>**</td><td>11-11-12-9</td><td>35.9-36.1</td><td>35.4</td><td>490(+2)</td>
+            <td></td><td></td><td><a href="/horse/2020103175/">シャフリヤール</a></td>
+            <td>50,000.0</td>
+        </tr>
+        </tbody>
+    </table>
+    </body></html>
+    """
+
+    def test_race_detail_matches_beautifulsoup(self):
+        """Fast path and BeautifulSoup produce identical race details"""
+        from app.services.scraper import fast_parser
+
+        scraper = RaceDetailScraper()
+        fast = scraper._parse_race_detail(fast_parser.parse(self.RACE_HTML), "202406050811")
+        slow = scraper._parse_race_detail(scraper.parse_html(self.RACE_HTML), "202406050811")
+
+        assert fast == slow
+        assert len(fast["entries"]) == 2
+        assert fast["entries"][0]["horse_id"] == "2021105898"
+        assert fast["distance"] == 2500
+
+    def test_past_results_match_beautifulsoup(self):
+        """Fast path and BeautifulSoup produce identical horse past results"""
+        from app.services.scraper import HorseScraper, fast_parser
+
+        scraper = HorseScraper()
+        fast = scraper._parse_past_results(fast_parser.parse(self.HORSE_RESULT_HTML))
+        slow = scraper._parse_past_results(scraper.parse_html(self.HORSE_RESULT_HTML))
+
+        assert fast == slow
+        assert fast[0]["race_id"] == "202406050811"
+        assert fast[0]["horse_weight"] == 490
+
+    def test_trifecta_matches_beautifulsoup(self):
+        """Fast path and BeautifulSoup produce identical combination odds"""
+        from app.services.scraper import OddsScraper, fast_parser
+
+        scraper = OddsScraper()
+        fast = scraper._parse_combination_odds(fast_parser.parse(self.TRIFECTA_HTML), 3)
+        slow = scraper._parse_combination_odds(scraper.parse_html(self.TRIFECTA_HTML), 3)
+
+        assert fast == slow
+        assert fast[1] == {"horses": [1, 3, 2], "odds": 1234.5}
+
+    def test_fallback_to_beautifulsoup(self):
+        """Unsupported selectors fall back to BeautifulSoup"""
+        scraper = RaceListScraper()
+        html = "<html><body><h1>Test</h1></body></html>"
+
+        text = scraper.parse_with_fallback(html, lambda soup: soup.select_one("h1").get_text())
+
+        assert text == "Test"
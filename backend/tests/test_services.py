@@ -1,9 +1,12 @@
 """Tests for service functions"""
+import logging.handlers
+
 import pytest
 from datetime import date
 
-from app.services import race_service, prediction_service
-from app.models import Race, Entry, Horse, Jockey
+from app.services import race_service, prediction_service, job_service
+from app.services.event_broker import EventBroker, broker
+from app.models import Race, Entry, Horse, Jockey, Job
 
 
 class TestRaceService:
@@ -198,6 +201,69 @@ class TestMLPredictor:
         assert predictor.model_version == "test_v1"
         assert predictor.model is None  # Model not trained yet
 
+    def test_predict_proba_grouped_matches_per_race(self):
+        """Grouped prediction gives the same probabilities as one race at a time"""
+        import numpy as np
+        import pandas as pd
+        from sklearn.isotonic import IsotonicRegression
+        from sklearn.preprocessing import StandardScaler
+
+        from app.services.predictor import HorseRacingPredictor
+
+        class LinearModel:
+            def __init__(self):
+                self.calls = 0
+
+            def predict(self, X):
+                self.calls += 1
+                return 1 / (1 + np.exp(-X.sum(axis=1).to_numpy()))
+
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(40, 3)), columns=["a", "b", "c"])
+        race_ids = np.array(["r2", "r1", "r3", "r1"] * 10)
+
+        predictor = HorseRacingPredictor(model_version="test_v1")
+        predictor.model = LinearModel()
+        predictor.feature_columns = ["a", "b", "c"]
+        predictor.scaler = StandardScaler().fit(X)
+        predictor.calibrator = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(
+            rng.random(200), rng.random(200) < 0.3
+        )
+
+        grouped = predictor.predict_proba_grouped(X, race_ids)
+        assert predictor.model.calls == 1
+
+        for race_id in ("r1", "r2", "r3"):
+            mask = race_ids == race_id
+            np.testing.assert_allclose(grouped[mask], predictor.predict_proba(X[mask]))
+            assert grouped[mask].sum() == pytest.approx(1.0)
+
+    def test_predict_races_skips_only_failed_race(self):
+        """A failing race falls back to per-race prediction instead of dropping every race"""
+        import numpy as np
+        import pandas as pd
+
+        from app.api.routes.model import _predict_races
+
+        class FlakyPredictor:
+            def predict_proba_grouped(self, X, race_ids):
+                raise RuntimeError("bad race in batch")
+
+            def predict_proba(self, X):
+                if X["a"].isna().any():
+                    raise RuntimeError("bad race")
+                return X["a"].to_numpy() / X["a"].sum()
+
+        frames = [
+            pd.DataFrame({"a": [1.0, 3.0]}),
+            pd.DataFrame({"a": [np.nan, 1.0]}),
+            pd.DataFrame({"a": [2.0, 2.0, 4.0]}),
+        ]
+        assert _predict_races(FlakyPredictor(), frames) == [True, False, True]
+        assert list(frames[0]["pred_rank"]) == [2, 1]
+        assert frames[2]["probability"].sum() == pytest.approx(1.0)
+        assert "probability" not in frames[1]
+
     def test_get_model(self):
         """Test get_model function"""
         from app.services.predictor import get_model
@@ -219,3 +285,1375 @@ class TestMLPredictor:
         assert "model_type" in results
         # Should use baseline when no trained model
         assert results["model_type"] == "baseline"
+
+
+class TestBackfillService:
+    """Tests for backfill_service"""
+
+    RACE_LIST = [
+        {"race_id": "202405050811", "date": "2024-12-22"},
+        {"race_id": "202405050812", "date": "2024-12-22"},
+    ]
+
+    @staticmethod
+    def _detail(race_id):
+        return {
+            "race_id": race_id,
+            "course": "中山",
+            "race_number": int(race_id[-2:]),
+            "distance": 1200,
+            "track_type": "芝",
+            "entries": [
+                {"horse_id": "h001", "horse_name": "テスト馬", "jockey_id": "j01",
+                 "jockey_name": "テスト騎手", "horse_number": 1, "result": 1},
+            ],
+        }
+
+    def _run(self, test_db, job_id, detail_side_effect):
+        from unittest.mock import patch
+        from sqlalchemy.orm import sessionmaker
+        from app.services import backfill_service
+        from app.services.scraper import (
+            RateLimiter, RaceListScraper, RaceDetailScraper, HorseScraper, JockeyScraper,
+        )
+
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+        with patch.object(RaceListScraper, "scrape", return_value=self.RACE_LIST) as list_mock, \
+                patch.object(RaceDetailScraper, "scrape", side_effect=detail_side_effect) as detail_mock, \
+                patch.object(HorseScraper, "scrape", side_effect=Exception("offline")), \
+                patch.object(JockeyScraper, "scrape", side_effect=Exception("offline")):
+            result = backfill_service.run_job(
+                job_id, session_factory=factory, rate_limiter=RateLimiter(interval=0)
+            )
+        return result, list_mock, detail_mock
+
+    def test_backfill_skips_known_races(self, test_db, sample_race):
+        """Races already in the DB are skipped via the bulk preload"""
+        from app.services import backfill_service
+
+        job = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        result, _, detail_mock = self._run(test_db, job.id, self._detail)
+
+        assert result.success_count == 1
+        assert result.skipped_count == 1
+        detail_mock.assert_called_once_with("202405050812")
+        assert race_service.get_race_by_id(test_db, "202405050812") is not None
+
+        test_db.expire_all()
+        summary = backfill_service.get_job_summary(test_db, job.id)
+        assert summary["status"] == "completed"
+        assert summary["races"] == {"skipped": 1, "completed": 1}
+
+    def test_backfill_resumes_failed_races(self, test_db):
+        """Re-running a job only retries races that did not complete"""
+        from app.services import backfill_service
+
+        def flaky(race_id):
+            if race_id == "202405050812":
+                raise Exception("timeout")
+            return self._detail(race_id)
+
+        job = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        result, _, _ = self._run(test_db, job.id, flaky)
+        assert result.success_count == 1
+        assert result.error_count == 1
+
+        test_db.expire_all()
+        resumed = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        assert resumed.id == job.id
+
+        result, list_mock, detail_mock = self._run(test_db, job.id, self._detail)
+        assert result.success_count == 1
+        list_mock.assert_not_called()
+        detail_mock.assert_called_once_with("202405050812")
+
+        test_db.expire_all()
+        assert backfill_service.get_job_summary(test_db, job.id)["status"] == "completed"
+
+    def test_backfill_skips_race_saved_by_other_writer(self, test_db):
+        """A race inserted by another writer after the job started is skipped, not failed"""
+        from sqlalchemy.orm import sessionmaker
+        from app.services import backfill_service
+
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+        def saved_elsewhere(race_id):
+            other = factory()
+            try:
+                other.add(Race(
+                    race_id=race_id, date=date(2024, 12, 22), course="中山",
+                    race_number=int(race_id[-2:]), distance=1200, track_type="芝",
+                ))
+                other.commit()
+            finally:
+                other.close()
+            return self._detail(race_id)
+
+        job = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        result, _, _ = self._run(test_db, job.id, saved_elsewhere)
+
+        assert result.error_count == 0
+        assert result.skipped_count == 2
+        test_db.expire_all()
+        summary = backfill_service.get_job_summary(test_db, job.id)
+        assert summary["status"] == "completed"
+        assert summary["races"] == {"skipped": 2}
+
+    def test_resumed_job_skips_race_saved_in_between(self, test_db, count_queries):
+        """A pending race saved before the rerun is skipped via the preload, not a lookup"""
+        from app.services import backfill_service
+
+        def flaky(race_id):
+            if race_id == "202405050812":
+                raise Exception("timeout")
+            return self._detail(race_id)
+
+        job = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        self._run(test_db, job.id, flaky)
+        test_db.add(Race(
+            race_id="202405050812", date=date(2024, 12, 22), course="中山",
+            race_number=12, distance=1200, track_type="芝",
+        ))
+        test_db.commit()
+
+        with count_queries() as statements:
+            result, _, detail_mock = self._run(test_db, job.id, self._detail)
+        assert result.skipped_count == 1
+        detail_mock.assert_not_called()
+        assert not any(
+            s.startswith("SELECT races.") and "WHERE races.race_id = ?" in s
+            for s in statements
+        )
+
+    def test_new_request_revives_failed_job(self, test_db):
+        """Races that hit MAX_RACE_ATTEMPTS are retried when the job is requested again"""
+        from app.services import backfill_service
+
+        def always_fails(race_id):
+            if race_id == "202405050812":
+                raise Exception("timeout")
+            return self._detail(race_id)
+
+        job = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        for _ in range(backfill_service.MAX_RACE_ATTEMPTS + 1):
+            self._run(test_db, job.id, always_fails)
+        test_db.expire_all()
+        assert backfill_service.get_job_summary(test_db, job.id)["status"] == "failed"
+
+        revived = backfill_service.get_or_create_job(
+            test_db, date(2024, 12, 22), date(2024, 12, 22), include_training=False
+        )
+        assert revived.id == job.id
+        result, _, detail_mock = self._run(test_db, job.id, self._detail)
+        detail_mock.assert_called_once_with("202405050812")
+        assert result.success_count == 1
+        test_db.expire_all()
+        assert backfill_service.get_job_summary(test_db, job.id)["status"] == "completed"
+
+
+class TestOddsService:
+    """Tests for odds_service"""
+
+    @staticmethod
+    def _odds(win_1, trifecta_123):
+        return {
+            "race_id": "202405050811",
+            "win": [
+                {"horse_number": 1, "odds": win_1},
+                {"horse_number": 2, "odds": 5.0},
+            ],
+            "place": [{"horse_number": 1, "odds_min": 1.1, "odds_max": 1.5}],
+            "trifecta": [{"horses": [1, 2, 3], "odds": trifecta_123}],
+        }
+
+    def test_save_snapshot_writes_only_changes(self, test_db, sample_race):
+        """Second snapshot stores only combinations whose odds changed"""
+        from datetime import datetime, timezone
+        from app.services import odds_service
+
+        t1 = datetime(2024, 12, 22, 15, 0, tzinfo=timezone.utc)
+        t2 = datetime(2024, 12, 22, 15, 10, tzinfo=timezone.utc)
+
+        assert odds_service.save_snapshot(test_db, sample_race.race_id, self._odds(3.5, 120.0), t1) == 4
+        assert odds_service.save_snapshot(test_db, sample_race.race_id, self._odds(3.2, 120.0), t2) == 1
+        assert odds_service.save_snapshot(test_db, sample_race.race_id, self._odds(3.2, 120.0), t2) == 0
+
+        latest = odds_service.get_latest_odds(test_db, sample_race.race_id)
+        assert latest[("win", "1")] == (3.2, None)
+        assert latest[("place", "1")] == (1.1, 1.5)
+        assert latest[("trifecta", "1-2-3")] == (120.0, None)
+
+        before = odds_service.get_latest_odds(
+            test_db, sample_race.race_id, bet_type="win", as_of=t1
+        )
+        assert before == {("win", "1"): (3.5, None), ("win", "2"): (5.0, None)}
+
+        history = odds_service.get_odds_history(
+            test_db, sample_race.race_id, bet_type="win", combination="1"
+        )
+        assert [h.odds for h in history] == [3.5, 3.2]
+
+    def test_save_snapshot_keeps_one_latest_row_per_combination(self, test_db):
+        """Latest odds live in odds_latest, even for races not scraped yet"""
+        from datetime import datetime, timezone
+        from app.models import OddsLatest, Race
+        from app.services import odds_service
+
+        race_id = "202405050899"
+        assert test_db.get(Race, race_id) is None
+
+        t1 = datetime(2024, 12, 22, 15, 0, tzinfo=timezone.utc)
+        t2 = datetime(2024, 12, 22, 15, 10, tzinfo=timezone.utc)
+        assert odds_service.save_snapshot(test_db, race_id, self._odds(3.5, 120.0), t1) == 4
+        assert odds_service.save_snapshot(test_db, race_id, self._odds(3.2, 110.0), t2) == 2
+
+        rows = test_db.query(OddsLatest).filter(OddsLatest.race_id == race_id).all()
+        assert len(rows) == 4
+        latest = {(row.bet_type, row.combination): row for row in rows}
+        assert latest[("win", "1")].odds == 3.2
+        assert latest[("trifecta", "1-2-3")].odds == 110.0
+        assert latest[("win", "2")].odds == 5.0
+        assert odds_service.get_latest_odds(test_db, race_id, bet_type="trifecta") == {
+            ("trifecta", "1-2-3"): (110.0, None)
+        }
+
+
+class TestRaceScheduler:
+    """Tests for the pre-race scheduler"""
+
+    def test_odds_poll_interval_tightens_near_post(self):
+        """Odds polling gets more frequent as post time approaches"""
+        from app.services.race_scheduler import odds_poll_interval
+
+        assert odds_poll_interval(150) == 30.0
+        assert odds_poll_interval(45) == 5.0
+        assert odds_poll_interval(5) == 1.0
+        assert odds_poll_interval(0) is None
+
+    def test_plan_and_run_jobs(self, test_db, sample_race, sample_entry):
+        """Planned races get card/odds jobs, and odds updates trigger re-prediction"""
+        from unittest.mock import patch
+        from sqlalchemy.orm import sessionmaker
+        from app.services.race_scheduler import (
+            RaceScheduler, parse_post_time, JOB_CARD, JOB_ODDS, JOB_PREDICT,
+        )
+        from app.services.scraper import OddsScraper, RateLimiter
+
+        race_day = date(2024, 12, 22)
+        post = parse_post_time(race_day, "15:40").timestamp()
+        now = post - 90 * 60
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+        scheduler = RaceScheduler(
+            session_factory=factory, rate_limiter=RateLimiter(interval=0), clock=lambda: now,
+        )
+
+        added = scheduler.plan_races(
+            [
+                {"race_id": sample_race.race_id, "post_time": "15:40"},
+                {"race_id": "202405050801", "post_time": "09:50"},  # already started
+            ],
+            race_day,
+        )
+        assert added == 1
+        status = scheduler.get_status()
+        assert status["queue_depth"] == 2
+        assert status["queue_depth_by_type"][JOB_CARD] == 1
+        assert status["queue_depth_by_type"][JOB_ODDS] == 1
+        assert status["overdue"] == 1  # odds window already open
+
+        due, kind, race_id = scheduler.pop_job()
+        assert (kind, race_id) == (JOB_ODDS, sample_race.race_id)
+
+        odds = {"race_id": sample_race.race_id, "win": [{"horse_number": 1, "odds": 2.4}]}
+        with patch.object(OddsScraper, "scrape", return_value=odds):
+            assert scheduler.run_job(JOB_ODDS, sample_race.race_id)
+        scheduler.after_job(JOB_ODDS, sample_race.race_id, True)
+
+        queued = {(kind, due) for due, _, kind, _ in scheduler._queue}
+        assert (JOB_PREDICT, now) in queued
+        assert (JOB_ODDS, now + 15 * 60) in queued
+
+        assert scheduler.run_job(JOB_PREDICT, sample_race.race_id)
+        test_db.expire_all()
+        assert test_db.get(Entry, sample_entry.id).odds == 2.4
+        assert prediction_service.get_prediction_by_race(test_db, sample_race.race_id)
+        assert scheduler.get_status()["jobs"][JOB_PREDICT]["completed"] == 1
+
+    def test_repeated_predict_keeps_one_prediction(self, test_db, sample_race, sample_entry):
+        """Every odds poll re-predicts the race, but only one scheduler prediction row is kept"""
+        from sqlalchemy import func, select
+        from sqlalchemy.orm import sessionmaker
+        from app.models import Prediction
+        from app.services.race_scheduler import RaceScheduler, JOB_PREDICT
+        from app.services.scraper import RateLimiter
+
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+        scheduler = RaceScheduler(session_factory=factory, rate_limiter=RateLimiter(interval=0))
+
+        # 利用者が作った予測は残す
+        prediction_service.create_prediction(test_db, sample_race.race_id)
+        assert scheduler.run_job(JOB_PREDICT, sample_race.race_id)
+        assert scheduler.run_job(JOB_PREDICT, sample_race.race_id)
+
+        count = test_db.execute(
+            select(func.count()).select_from(Prediction).where(Prediction.race_id == sample_race.race_id)
+        ).scalar()
+        assert count == 2
+        latest = prediction_service.get_prediction_by_race(test_db, sample_race.race_id)
+        assert latest.results_json["source"] == prediction_service.SCHEDULER_SOURCE
+
+
+class TestSyncService:
+    """Tests for sync_service batched upserts"""
+
+    @pytest.fixture
+    def synced_db(self, test_db):
+        for i in range(5):
+            race_id = f"20240505081{i}"
+            test_db.add(Race(
+                race_id=race_id, date=date(2024, 12, 22), course="中山",
+                race_number=i + 1, distance=2000, track_type="芝",
+            ))
+            test_db.add(Horse(horse_id=f"h{i}", name=f"Horse{i}", sex="牡", birth_year=2020))
+            test_db.add(Jockey(jockey_id=f"j{i}", name=f"Jockey{i}"))
+            test_db.add(Entry(race_id=race_id, horse_id=f"h{i}", jockey_id=f"j{i}", horse_number=1))
+        test_db.commit()
+        return test_db
+
+    def _run(self, db, client, **kwargs):
+        from unittest.mock import patch
+        from app.services import sync_service
+
+        with patch.object(sync_service, "get_supabase_client", return_value=client):
+            return sync_service.sync_to_supabase(db, **kwargs)
+
+    def test_change_log_records_flushes(self, test_db, sample_entry):
+        """Inserts, updates and deletes of tracked tables are written to change_log"""
+        from app.models import ChangeLog
+
+        sample_entry.odds = 4.0
+        test_db.commit()
+        test_db.delete(sample_entry)
+        test_db.commit()
+
+        log = [(c.table_name, c.operation) for c in test_db.query(ChangeLog).order_by(ChangeLog.id)]
+        assert ("races", "insert") in log
+        assert log[-2:] == [("entries", "update"), ("entries", "delete")]
+
+    def test_batches_and_fk_order(self, synced_db, fake_supabase):
+        """First sync is a full sync in chunks, parents before entries"""
+        from app.models import ChangeLog
+        from app.services import sync_service
+
+        results = self._run(synced_db, fake_supabase, batch_size=2)
+
+        assert all(results[t]["synced"] == 5 for t in ("horses", "jockeys", "races", "entries"))
+        assert len(fake_supabase.tables["entries"]) == 5
+        # 5行をbatch_size=2で送ると3リクエスト
+        assert [n for t, n in fake_supabase.requests if t == "horses"] == [2, 2, 1]
+        first_entry = next(i for i, (t, _) in enumerate(fake_supabase.requests) if t == "entries")
+        assert all(t != "races" for t, _ in fake_supabase.requests[first_entry:])
+        # 消費済みの変更ログは削除される
+        assert synced_db.query(ChangeLog).count() == 0
+        assert sync_service.get_sync_status(synced_db)["pending_changes"] == 0
+
+    def test_diff_sync_consumes_change_log(self, synced_db, fake_supabase):
+        """Later syncs upload only rows recorded in the change log"""
+        from app.models import Training
+
+        self._run(synced_db, fake_supabase)
+        fake_supabase.requests.clear()
+
+        synced_db.query(Horse).filter_by(horse_id="h1").one().name = "Renamed"
+        synced_db.add(Training(race_id="202405050810", horse_id="h0", training_rank="A"))
+        synced_db.commit()
+
+        results = self._run(synced_db, fake_supabase)
+
+        assert fake_supabase.requests == [("horses", 1), ("trainings", 1)]
+        assert results["horses"]["synced"] == 1
+        assert results["entries"]["synced"] == 0
+        assert fake_supabase.tables["horses"]["h1"]["name"] == "Renamed"
+
+    def test_failed_batch_is_bisected_and_retried(self, synced_db, fake_supabase):
+        """Only the rejected row is re-queued, and the next sync retries it"""
+        from app.services import sync_service
+
+        fake_supabase.reject = lambda table, row: table == "horses" and row["horse_id"] == "h3"
+
+        results = self._run(synced_db, fake_supabase, batch_size=5)
+
+        assert results["horses"] == {"synced": 4, "errors": 1, "skipped": 0}
+        # 親が無いentryだけがFK違反で失敗する
+        assert results["entries"]["errors"] == 1
+        assert "h3" not in fake_supabase.tables["horses"]
+        assert len(fake_supabase.tables["entries"]) == 4
+        assert sync_service.get_sync_status(synced_db)["pending_retries"] == 2
+
+        fake_supabase.reject = lambda table, row: False
+        fake_supabase.requests.clear()
+        results = self._run(synced_db, fake_supabase, batch_size=5)
+
+        assert fake_supabase.requests == [("horses", 1), ("entries", 1)]
+        assert "h3" in fake_supabase.tables["horses"]
+        assert len(fake_supabase.tables["entries"]) == 5
+        assert sync_service.get_sync_status(synced_db)["pending_retries"] == 0
+
+    def test_diff_sync_waits_for_uncommitted_ids(self, synced_db, fake_supabase):
+        """A change whose lower id commits late is not skipped by the cursor"""
+        from datetime import timedelta
+        from app.models import ChangeLog
+        from app.models.change_log import utcnow
+        from app.services import change_log_service
+
+        self._run(synced_db, fake_supabase)
+        fake_supabase.requests.clear()
+        cursor_id = change_log_service.get_cursor(synced_db, "supabase").last_change_id
+        late_id, early_id = cursor_id + 1, cursor_id + 2
+
+        # late_id を取ったトランザクションがまだコミットしていない状態
+        synced_db.add(ChangeLog(id=early_id, table_name="horses", record_id="h2", operation="update"))
+        synced_db.commit()
+        self._run(synced_db, fake_supabase)
+        assert fake_supabase.requests == []
+        assert change_log_service.get_cursor(synced_db, "supabase").last_change_id == cursor_id
+
+        synced_db.add(ChangeLog(id=late_id, table_name="horses", record_id="h1", operation="update"))
+        synced_db.commit()
+        self._run(synced_db, fake_supabase)
+        assert fake_supabase.requests == [("horses", 2)]
+        assert change_log_service.get_cursor(synced_db, "supabase").last_change_id == early_id
+
+        # 十分に古い欠番はロールバックされたものとみなして進む
+        old = utcnow() - timedelta(hours=1)
+        changes = [ChangeLog(id=early_id + 3, table_name="horses", record_id="h1", operation="update", changed_at=old)]
+        assert change_log_service.committed_prefix(changes, early_id, 300) == changes
+        assert change_log_service.committed_prefix(changes, early_id, 7200) == []
+
+    def test_full_sync_does_not_ack_past_uncommitted_ids(self, synced_db, fake_supabase):
+        """A full sync leaves the cursor before a lower id that commits later"""
+        from app.models import ChangeLog
+        from app.services import change_log_service
+
+        self._run(synced_db, fake_supabase)
+        cursor_id = change_log_service.get_cursor(synced_db, "supabase").last_change_id
+        late_id, early_id = cursor_id + 1, cursor_id + 2
+
+        synced_db.add(ChangeLog(
+            id=early_id, table_name="horses", record_id="h2", operation="update"
+        ))
+        synced_db.commit()
+        self._run(synced_db, fake_supabase, force_full=True)
+        cursor = change_log_service.get_cursor(synced_db, "supabase")
+        assert cursor.last_change_id == cursor_id
+
+        # 低い id が後からコミットされても差分同期で拾う
+        synced_db.add(ChangeLog(
+            id=late_id, table_name="horses", record_id="h1", operation="update"
+        ))
+        synced_db.commit()
+        fake_supabase.requests.clear()
+        self._run(synced_db, fake_supabase)
+        assert fake_supabase.requests == [("horses", 2)]
+        cursor = change_log_service.get_cursor(synced_db, "supabase")
+        assert cursor.last_change_id == early_id
+
+
+class TestFeatureSnapshot:
+    """Tests for the bulk feature snapshot builder"""
+
+    @pytest.fixture
+    def history_db(self, test_db):
+        import random
+        from datetime import timedelta
+
+        rng = random.Random(7)
+        today = date.today()
+        horses = [
+            Horse(horse_id=f"h{i}", name=f"Horse{i}", sex=["牡", "牝", "セ"][i % 3], birth_year=2018 + i % 4)
+            for i in range(6)
+        ]
+        jockeys = [Jockey(jockey_id=f"j{i}", name=f"Jockey{i}") for i in range(3)]
+        test_db.add_all(horses + jockeys)
+        for r in range(30):
+            race_id = f"2024{r:08d}"
+            test_db.add(Race(
+                race_id=race_id,
+                date=today - timedelta(days=7 * (r + 1)),
+                course="中山",
+                race_number=1,
+                distance=rng.choice([1200, 1600, 2000, 2400]),
+                track_type=rng.choice(["芝", "ダート"]),
+            ))
+            for n, horse in enumerate(rng.sample(horses, 4), 1):
+                first = rng.randint(1, 14)
+                test_db.add(Entry(
+                    race_id=race_id,
+                    horse_id=horse.horse_id,
+                    jockey_id=rng.choice(jockeys).jockey_id,
+                    horse_number=n,
+                    result=rng.choice([1, 2, 3, 5, 8, 0]) if r else None,
+                    popularity=rng.choice([None, 1, 3, 5, 9]),
+                    odds=rng.choice([None, 2.5, 12.0]),
+                    prize_money=rng.choice([None, 0, 500, 1200]),
+                    last_3f=rng.choice([None, 34.5, 36.1]),
+                    corner_position=rng.choice([None, f"{first}-{max(1, first - 2)}", "x"]),
+                    pace=rng.choice([None, "35.1-36.0", "bad"]),
+                ))
+        test_db.commit()
+        return test_db
+
+    def test_matches_per_horse_reference(self, history_db):
+        """Vectorized snapshot matches compute_horse_features / compute_jockey_features"""
+        from app.services import feature_sync_service as fs
+
+        snapshot = fs.build_feature_snapshot(history_db)
+        assert set(snapshot["timings"]) == {"load", "horse_features", "jockey_features"}
+
+        horses = {row["horse_id"]: row for row in snapshot["horse_features"]}
+        assert set(horses) == {f"h{i}" for i in range(6)}
+        for horse_id, row in horses.items():
+            expected = fs.compute_horse_features(history_db, horse_id)
+            assert set(row) == set(fs.HORSE_FEATURE_COLUMNS) | {"updated_at"}
+            for column in fs.HORSE_FEATURE_COLUMNS:
+                assert row[column] == pytest.approx(expected.get(column)), (horse_id, column)
+
+        for row in snapshot["jockey_features"]:
+            expected = fs.compute_jockey_features(history_db, row["jockey_id"])
+            for column in fs.JOCKEY_FEATURE_COLUMNS:
+                assert row[column] == pytest.approx(expected.get(column)), (row["jockey_id"], column)
+
+    def test_sync_all_features_uploads_in_batches(self, history_db, fake_supabase):
+        """sync_all_features writes both tables in chunked upserts"""
+        from unittest.mock import patch
+        from sqlalchemy.orm import sessionmaker
+        from app.services import feature_sync_service as fs
+
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=history_db.get_bind())
+        with patch.object(fs, "get_supabase_client", return_value=fake_supabase), \
+                patch.object(fs, "BatchSessionLocal", factory):
+            result = fs.sync_all_features(batch_size=4)
+
+        assert result["horse_features"]["synced"] == 6
+        assert result["jockey_features"]["synced"] == 3
+        assert "upload_horse_features" in result["timings"]
+        assert [n for t, n in fake_supabase.requests if t == "horse_features"] == [4, 2]
+        assert isinstance(fake_supabase.tables["horse_features"]["h0"]["total_runs"], int)
+
+
+class TestStatsSummary:
+    """Tests for stats_summary_service"""
+
+    @pytest.fixture
+    def results_db(self, test_db):
+        """騎手2人・3レースの着順と馬券履歴"""
+        from app.models import History, Prediction
+
+        test_db.add_all([Jockey(jockey_id="ja", name="A"), Jockey(jockey_id="jb", name="B")])
+        test_db.add_all([
+            Horse(horse_id=f"h{i}", name=f"馬{i}", sex="牡", birth_year=2020) for i in range(3)
+        ])
+        results = {"ja": [1, 2, 4, None], "jb": [3, 0, 1]}
+        for jockey_id, jockey_results in results.items():
+            for n, result in enumerate(jockey_results):
+                race_id = f"r{jockey_id}{n}"
+                test_db.add(Race(
+                    race_id=race_id, date=date(2024, 1, 1 + n), course="東京", race_number=1,
+                    distance=1600, track_type="芝", race_type="central" if n % 2 == 0 else "local",
+                ))
+                test_db.add(Entry(
+                    race_id=race_id, horse_id=f"h{n % 3}", jockey_id=jockey_id,
+                    horse_number=1, result=result,
+                ))
+        prediction = Prediction(race_id="rja0", model_version="v1", results_json={})
+        test_db.add(prediction)
+        test_db.flush()
+        for is_hit, amount, payout in [(True, 1000, 3500), (False, 500, 0), (None, 700, None)]:
+            test_db.add(History(
+                prediction_id=prediction.id, bet_type="単勝", bet_detail="1",
+                bet_amount=amount, is_hit=is_hit, payout=payout,
+            ))
+        test_db.commit()
+        return test_db
+
+    def test_jockey_stats_single_query(self, results_db, count_queries):
+        """騎手成績を1クエリで集計する"""
+        from app.services import stats_summary_service
+
+        with count_queries() as statements:
+            stats = stats_summary_service.compute_jockey_stats(results_db, ["ja", "jb", "jx"])
+
+        assert len(statements) == 1
+        assert stats["ja"] == {"total_entries": 4, "wins": 1, "places": 2, "shows": 2}
+        assert stats["jb"] == {"total_entries": 3, "wins": 1, "places": 1, "shows": 2}
+        assert stats["jx"] == {"total_entries": 0, "wins": 0, "places": 0, "shows": 0}
+
+        central = stats_summary_service.compute_jockey_stats(results_db, ["ja"], entries_race_type="central")
+        assert central["ja"]["total_entries"] == 2
+        assert central["ja"]["wins"] == 1
+
+    def test_history_summary(self, results_db):
+        """サマリーは結果確定分のみ、件数は全履歴"""
+        total, history_list, summary = prediction_service.get_history(results_db, limit=2)
+
+        assert total == 3
+        assert len(history_list) == 2
+        assert summary == {
+            "total_bets": 2,
+            "total_hits": 1,
+            "hit_rate": 50.0,
+            "total_bet_amount": 1500,
+            "total_payout": 3500,
+            "roi": 133.33,
+        }
+
+    def test_summary_tables(self, results_db):
+        """集計テーブル有効時は保存済みの集計を参照し、更新時に再計算する"""
+        from unittest.mock import patch
+        from app.config import settings
+        from app.models import JockeyStats
+        from app.services import stats_summary_service
+
+        live_total, live_summary = stats_summary_service.get_history_totals(results_db)
+
+        with patch.object(settings, "STATS_SUMMARY_TABLES", True):
+            assert stats_summary_service.refresh_jockey_stats(results_db) == 2
+            assert stats_summary_service.refresh_history_daily(results_db) == 1
+            assert results_db.get(JockeyStats, "ja").places == 2
+            assert stats_summary_service.get_history_totals(results_db) == (live_total, live_summary)
+
+            # 結果の更新で日別集計が再計算される
+            pending = next(h for h in prediction_service.get_history(results_db)[1] if h.is_hit is None)
+            prediction_service.update_history_result(results_db, pending.id, is_hit=True, payout=2100)
+            total, summary = stats_summary_service.get_history_totals(results_db)
+
+            # 着順の変更は該当日の騎手分だけ再計算される
+            results_db.query(Entry).filter(Entry.race_id == "rja3").update({"result": 1})
+            results_db.commit()
+            assert stats_summary_service.refresh_jockey_stats_for_date(results_db, date(2024, 1, 4)) == 1
+            stats = stats_summary_service.get_jockey_stats(results_db, "ja")
+
+        assert total == 3
+        assert summary["total_bets"] == 3
+        assert summary["total_payout"] == 5600
+        assert stats["wins"] == 2
+
+
+class TestEntryHistory:
+    """Tests for entry_history_service"""
+
+    @pytest.fixture
+    def races_db(self, test_db):
+        """馬4頭・騎手2人の5レース（最終レースは結果未確定）"""
+        from datetime import timedelta
+
+        test_db.add_all([Jockey(jockey_id=f"j{i}", name=f"騎手{i}") for i in range(2)])
+        test_db.add_all([
+            Horse(horse_id=f"h{i}", name=f"馬{i}", sex="牡", birth_year=2020) for i in range(4)
+        ])
+        for r in range(5):
+            race_id = f"20240101{r:04d}"
+            test_db.add(Race(
+                race_id=race_id, date=date(2024, 1, 6) + timedelta(days=7 * r),
+                course=["中山", "東京"][r % 2], race_number=1,
+                distance=[1600, 2000, 1200][r % 3], track_type=["芝", "ダート"][r % 2],
+                condition=["良", "重"][r % 2],
+            ))
+            for n in range(4):
+                finished = r < 4
+                test_db.add(Entry(
+                    race_id=race_id, horse_id=f"h{n}", jockey_id=f"j{n % 2}", horse_number=n + 1,
+                    result=((n + r) % 4) + 1 if finished else None,
+                    odds=2.0 + n, popularity=n + 1, last_3f=34.0 + n,
+                    prize_money=[500, 200, 100, 0][(n + r) % 4] if finished else None,
+                    corner_position=f"{n + 2}-{n + 1}" if finished else None,
+                    pace="35.4-36.1" if finished else None,
+                ))
+        test_db.commit()
+        return test_db
+
+    def test_refresh(self, races_db):
+        """確定済みの出走だけをレース条件・パース済みの値と一緒に複写する"""
+        from app.models import EntryHistory
+        from app.services import entry_history_service
+
+        assert entry_history_service.refresh_entry_history(races_db, batch_size=5) == 16
+
+        row = races_db.query(EntryHistory).filter_by(race_id="202401010001", horse_id="h2").one()
+        assert (row.date, row.course, row.track_type, row.condition) == (date(2024, 1, 13), "東京", "ダート", "重")
+        assert (row.first_corner, row.last_corner) == (4, 3)
+        assert (row.pace_first, row.pace_second) == (35.4, 36.1)
+
+        # 結果の取り込みでは該当レースだけ作り直す
+        races_db.query(Entry).filter(Entry.race_id == "202401010004").update({"result": 1})
+        races_db.commit()
+        assert entry_history_service.refresh_entry_history(races_db, ["202401010004"]) == 4
+        assert races_db.query(EntryHistory).count() == 20
+
+    def test_rebuild_runs_as_job(self, races_db):
+        """全件再作成はワーカーのジョブとして登録し、進捗をバッチごとに報告する"""
+        from types import SimpleNamespace
+        from unittest.mock import patch
+        from app.api.routes import data
+        from app.services import entry_history_service
+
+        progress = []
+        assert entry_history_service.refresh_entry_history(
+            races_db, batch_size=5, progress_callback=lambda *args: progress.append(args[:2])
+        ) == 16
+        assert progress == [(0, 16), (5, 16), (10, 16), (15, 16), (16, 16)]
+
+        with patch.object(data.job_service, "submit_job", return_value=SimpleNamespace(id=7)) as submit, \
+                patch.dict(data._entry_history_status, {"is_running": False}):
+            assert data.rebuild_entry_history(races_db)["job_id"] == 7
+            submit.assert_called_once_with(races_db, "entry_history_rebuild", data._run_entry_history_rebuild)
+            with pytest.raises(data.HTTPException) as exc:
+                data.rebuild_entry_history(races_db)
+            assert exc.value.status_code == 409
+
+    def test_feature_parity(self, races_db, count_queries):
+        """entry_history から読んでも特徴量は同じで、races との結合がなくなる"""
+        from unittest.mock import patch
+        from app.config import settings
+        from app.services import entry_history_service
+        from app.services.predictor import FeatureExtractor
+
+        race = races_db.get(Race, "202401010004")
+        expected = FeatureExtractor(races_db, use_cache=False).extract_race_features(race)
+
+        entry_history_service.refresh_entry_history(races_db)
+        with patch.object(settings, "FEATURE_HISTORY_TABLE", True), count_queries() as statements:
+            actual = FeatureExtractor(races_db, use_cache=False).extract_race_features(race)
+
+        assert not any("FROM entry_history JOIN races" in s for s in statements)
+        assert any("FROM entry_history" in s for s in statements)
+        assert expected["avg_rank_all"].gt(0).all()
+        assert actual.equals(expected)
+
+
+class TestEngineFactory:
+    """Tests for app.db.base engine factory"""
+
+    def test_engine_options_postgres(self):
+        """PostgreSQL gets pool sizing and statement_timeout"""
+        from app.db.base import TimedQueuePool, engine_options
+
+        options = engine_options(
+            "postgresql://u:p@localhost/keiba", statement_timeout_ms=5000,
+            pool_size=3, max_overflow=1, pool_timeout=2, pool_recycle=60, pool_pre_ping=True,
+        )
+        assert options["poolclass"] is TimedQueuePool
+        assert options["pool_size"] == 3
+        assert options["echo"] is False
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    def test_engine_options_sqlite_memory(self):
+        """In-memory SQLite keeps the default pool"""
+        from app.db.base import engine_options
+
+        assert engine_options("sqlite://", statement_timeout_ms=5000, pool_size=3) == {"echo": False}
+
+    def test_checkout_wait_recorded(self, tmp_path):
+        """Checkouts and pool timeouts are counted per pool"""
+        from unittest.mock import patch
+        from app.db import base
+
+        with patch.dict(base._engines, clear=True), patch.dict(base._pool_stats, clear=True):
+            self._check_checkout_wait(base, tmp_path)
+
+    def _check_checkout_wait(self, base, tmp_path):
+        from sqlalchemy import exc, text
+
+        engine = base.create_db_engine(
+            "batch", url=f"sqlite:///{tmp_path / 'pool.db'}",
+            pool_size=1, max_overflow=0, pool_timeout=0.05,
+        )
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                with pytest.raises(exc.TimeoutError):
+                    engine.connect()
+
+            stats = base.get_pool_stats()["batch"]
+            assert stats["checkouts"] == 1
+            assert stats["timeouts"] == 1
+            assert stats["wait_max_ms"] >= 50
+            assert stats["size"] == 1
+        finally:
+            engine.dispose()
+
+
+# ワーカープロセスから import して実行するジョブ（TestJobRunner）
+_sample_job_status = job_service.SharedStatus("sample_job", {"is_running": False, "progress": 0, "total": 0})
+
+
+def sample_job(steps: int, delay: float = 0.0) -> dict:
+    import os
+    import time
+
+    _sample_job_status.update(is_running=True, progress=0, total=steps)
+    try:
+        for i in range(steps):
+            time.sleep(delay)
+            _sample_job_status["progress"] = i + 1
+            job_service.emit_event({"type": "step", "step": i + 1})
+    finally:
+        _sample_job_status["is_running"] = False
+    return {"steps": steps, "pid": os.getpid()}
+
+
+class TestJobRunner:
+    """Tests for job_service worker processes"""
+
+    @pytest.fixture
+    def job_db(self, tmp_path, monkeypatch):
+        from unittest.mock import patch
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.config import settings
+        from app.db.base import Base
+
+        url = f"sqlite:///{tmp_path / 'jobs.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine)
+        # ワーカーは環境変数から同じDBに接続する
+        monkeypatch.setenv("DATABASE_URL", url)
+        monkeypatch.setenv("JOB_STATE_FLUSH_SECONDS", "0")
+
+        broker.clear()
+
+        def events():
+            return [event for _, event in broker.history("sample_job")]
+
+        db = factory()
+        with patch.object(job_service, "BatchSessionLocal", factory), \
+                patch.object(settings, "JOB_POLL_INTERVAL_SECONDS", 0.05), \
+                patch.object(settings, "JOB_CANCEL_GRACE_SECONDS", 30):
+            yield db, events
+        db.close()
+        broker.clear()
+        engine.dispose()
+
+    def _wait(self, db, job_id, condition, timeout=60.0):
+        import time
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            db.expire_all()
+            job = db.get(Job, job_id)
+            if condition(job):
+                return job
+            time.sleep(0.05)
+        raise AssertionError(f"Job {job_id} timed out: {job.status}")
+
+    def test_job_runs_in_worker_process(self, job_db):
+        """The job runs in another process; events and status reach the API process"""
+        import os
+
+        db, events = job_db
+        job = job_service.submit_job(db, "sample_job", sample_job, params={"steps": 3})
+        assert job is not None
+        assert job_service.submit_job(db, "sample_job", sample_job, params={"steps": 3}) is None
+
+        job = self._wait(db, job.id, lambda j: j.status == "completed" and j.id not in job_service._watched)
+        assert job.result["steps"] == 3
+        assert job.result["pid"] != os.getpid()
+        assert job.progress == 100.0
+        assert [e["step"] for e in events() if e["type"] == "step"] == [1, 2, 3]
+        assert events()[-1]["type"] == "complete"
+        assert events()[-1]["job_id"] == job.id
+        assert _sample_job_status["progress"] == 3
+        assert _sample_job_status["is_running"] is False
+
+    def test_cancel_stops_worker(self, job_db):
+        """A cancel request stops the worker at its next progress update"""
+        db, events = job_db
+        job = job_service.submit_job(db, "sample_job", sample_job, params={"steps": 2000, "delay": 0.01})
+        self._wait(db, job.id, lambda j: (j.progress or 0) > 0)
+
+        job_service.request_cancel(db, job.id)
+        job = self._wait(db, job.id, lambda j: j.status == "cancelled" and j.id not in job_service._watched)
+        assert job.progress < 100
+        assert events()[-1]["type"] == "cancelled"
+        assert _sample_job_status["is_running"] is False
+
+    def test_concurrent_submit_starts_one_job(self, test_db):
+        """Another API worker's job of the same kind wins even if the pre-check misses it"""
+        from unittest.mock import patch
+
+        with patch.object(job_service, "launch") as launch:
+            first = job_service.submit_job(test_db, "sample_job", sample_job)
+            # 別プロセスでの確認と登録の間に割り込まれた状態
+            with patch.object(job_service, "active_job", return_value=None):
+                assert job_service.submit_job(test_db, "sample_job", sample_job) is None
+            launch.assert_called_once()
+
+            first.status = "completed"
+            test_db.commit()
+            assert job_service.submit_job(test_db, "sample_job", sample_job) is not None
+
+
+class TestEventBroker:
+    """Tests for the SSE event broker"""
+
+    def test_slow_subscriber_coalesces_progress(self):
+        """Pending progress events collapse to the latest; terminal events are never dropped"""
+        import asyncio
+
+        async def scenario():
+            event_broker = EventBroker(history_size=10, buffer_size=3)
+            subscription = event_broker.subscribe("retrain")
+            for i in range(50):
+                event_broker.publish("retrain", {"type": "status", "progress": i})
+            event_broker.publish("retrain", {"type": "complete"})
+            for i in range(5):
+                event_broker.publish("retrain", {"type": "step", "step": i})
+
+            received = []
+            while subscription.pending():
+                received.append((await subscription.get())[1])
+            event_broker.unsubscribe(subscription)
+            return event_broker, received
+
+        event_broker, received = asyncio.run(scenario())
+        assert len(received) == 3
+        assert {"type": "complete"} in received
+        assert [e["progress"] for e in received if e["type"] == "status"] in ([], [49])
+        assert event_broker.subscriber_count() == 0
+
+    def test_replay_after_last_event_id(self):
+        """Reconnecting with Last-Event-ID replays only the missed events"""
+        import asyncio
+
+        async def scenario():
+            event_broker = EventBroker(history_size=3, buffer_size=10)
+            for i in range(5):
+                event_broker.publish("sync", {"type": "step", "step": i + 1})
+            subscription = event_broker.subscribe("sync", last_event_id=3)
+            items = [await subscription.get(timeout=1) for _ in range(subscription.pending())]
+            return items, await subscription.get(timeout=0.01)
+
+        items, timed_out = asyncio.run(scenario())
+        assert items == [(4, {"type": "step", "step": 4}), (5, {"type": "step", "step": 5})]
+        assert timed_out is None
+
+    def test_publish_from_thread(self):
+        """Events published from worker threads reach subscribers on the loop"""
+        import asyncio
+        import threading
+
+        async def scenario():
+            event_broker = EventBroker(history_size=10, buffer_size=10)
+            subscription = event_broker.subscribe("job:1")
+            thread = threading.Thread(
+                target=event_broker.publish, args=("job:1", {"type": "complete"})
+            )
+            thread.start()
+            item = await subscription.get(timeout=5)
+            thread.join()
+            return item
+
+        assert asyncio.run(scenario()) == (1, {"type": "complete"})
+
+
+class TestSyntheticData:
+    """Tests for the synthetic data generator"""
+
+    CONFIG = dict(years=1, courses_per_day=1, races_per_course=2, jockeys=30, trainers=20, sires=10)
+
+    def _generate(self, seed=42):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        from app.services.synthetic_data import SyntheticConfig, generate
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        summary = generate(db, SyntheticConfig(seed=seed, **self.CONFIG))
+        return db, summary
+
+    def test_same_seed_same_data(self):
+        from sqlalchemy import select
+
+        rows = []
+        for _ in range(2):
+            db, summary = self._generate()
+            rows.append(db.execute(
+                select(Entry.race_id, Entry.horse_id, Entry.result, Entry.odds)
+                .order_by(Entry.race_id, Entry.horse_number)
+            ).all())
+            db.close()
+        assert rows[0] == rows[1]
+        assert len(rows[0]) == summary.entries
+
+    def test_races_are_consistent(self):
+        """Each race has unique finishing positions, and horses run again in later races"""
+        from sqlalchemy import func, select
+
+        from datetime import date, timedelta
+
+        db, summary = self._generate()
+        race_days = sum(1 for d in range(365) if (date(2022, 1, 1) + timedelta(days=d)).weekday() >= 5)
+        assert db.execute(select(func.count()).select_from(Race)).scalar() == summary.races == race_days * 2
+        for race in db.execute(select(Race).limit(20)).scalars():
+            results = sorted(e.result for e in race.entries)
+            assert results == list(range(1, len(race.entries) + 1))
+            assert race.num_horses == len(race.entries)
+        max_starts = db.execute(
+            select(func.count()).select_from(Entry).group_by(Entry.horse_id)
+            .order_by(func.count().desc()).limit(1)
+        ).scalar()
+        assert max_starts > 1
+        db.close()
+
+
+class TestFeatureGroupProfiler:
+    """Tests for the per-feature-group profiler"""
+
+    def _db(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.db.base import Base
+        from app.services.synthetic_data import SyntheticConfig, generate
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        generate(db, SyntheticConfig(years=1, courses_per_day=1, races_per_course=1, jockeys=20, trainers=10, sires=5))
+        return db
+
+    def test_prepare_training_data_reports_groups(self):
+        from app.services.predictor import FeatureGroupProfiler, prepare_training_data
+
+        db = self._db()
+        profiler = FeatureGroupProfiler()
+        X, y = prepare_training_data(db, min_date=date(2022, 12, 1), profiler=profiler)
+        X_plain, _ = prepare_training_data(db, min_date=date(2022, 12, 1))
+        db.close()
+
+        assert len(X) > 0
+        assert X.equals(X_plain)
+        groups = {row["group"]: row for row in profiler.report()}
+        for name in ("id", "past_performance", "jockey_leading", "training", "preload", "result_lookup"):
+            assert name in groups
+        # 出走馬ごとのグループは出走数と同じ回数呼ばれる
+        assert groups["past_performance"]["calls"] == len(X)
+        # 結果の取得は出走馬ごとに1クエリ
+        assert groups["result_lookup"]["queries"] == len(X)
+        totals = [row["total_ms"] for row in profiler.report()]
+        assert totals == sorted(totals, reverse=True)
+        assert "past_performance" in profiler.format_report()
+
+    def test_counts_only_own_thread_queries(self):
+        import threading
+        from sqlalchemy import create_engine, text
+        from app.services.predictor import FeatureGroupProfiler
+
+        engine = create_engine("sqlite://")
+        profiler = FeatureGroupProfiler()
+
+        def other_thread():
+            with engine.connect() as conn:
+                for _ in range(5):
+                    conn.execute(text("SELECT 1"))
+
+        with profiler.measure("group"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+            worker = threading.Thread(target=other_thread)
+            worker.start()
+            worker.join()
+
+        assert profiler.groups["group"][0] == 1
+        assert profiler.groups["group"][2] == 2
+
+
+class TestModelRegistry:
+    """Tests for sharing the active model version between workers"""
+
+    def test_poll_detects_publish_from_other_worker(self, tmp_path):
+        from app.services.model_registry import ModelRegistry
+
+        path = tmp_path / "selected_models.json"
+        mine, other = ModelRegistry(path), ModelRegistry(path)
+        assert mine.read() == {}
+        assert mine.poll(0) is None
+
+        other.publish("local", "v2")
+        assert mine.poll(0) == {"local": "v2"}
+        assert mine.poll(0) is None
+
+        # 自分で公開した内容は変更として扱わない
+        mine.publish("banei", "v3")
+        assert mine.poll(0) is None
+        assert other.poll(0) == {"local": "v2", "banei": "v3"}
+
+    def test_poll_interval(self, tmp_path):
+        from app.services.model_registry import ModelRegistry
+
+        path = tmp_path / "selected_models.json"
+        mine, other = ModelRegistry(path), ModelRegistry(path)
+        assert mine.poll(60) is None
+        other.publish("central", "v2")
+        assert mine.poll(60) is None
+
+    @staticmethod
+    def _publish_many(path, prefix, count):
+        from app.services.model_registry import ModelRegistry
+
+        registry = ModelRegistry(path)
+        for i in range(count):
+            registry.publish(f"{prefix}{i}", f"v{i}")
+
+    def test_concurrent_publish_from_two_processes_keeps_both(self, tmp_path):
+        """Publishing from two processes at once does not lose either update"""
+        import multiprocessing
+        from app.services.model_registry import ModelRegistry
+
+        path = tmp_path / "selected_models.json"
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=self._publish_many, args=(path, prefix, 100))
+            for prefix in ("a", "b")
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+            assert worker.exitcode == 0
+
+        versions = ModelRegistry(path).read()
+        assert len(versions) == 200
+        assert versions["a99"] == versions["b99"] == "v99"
+
+    @pytest.fixture
+    def isolated_models(self, tmp_path, monkeypatch):
+        """Point prediction_service at a temporary registry with a loaded local model"""
+        from app.config import settings
+        from app.services.model_registry import ModelRegistry
+        from app.services.predictor import HorseRacingPredictor
+
+        path = tmp_path / "selected_models.json"
+        monkeypatch.setattr(settings, "MODEL_REGISTRY_POLL_SECONDS", 0)
+        monkeypatch.setattr(prediction_service, "registry", ModelRegistry(path))
+        monkeypatch.setattr(prediction_service, "_model_versions", {"central": "v1", "local": "v1", "banei": "v1"})
+        monkeypatch.setattr(prediction_service, "_predictors", {
+            "local": HorseRacingPredictor(model_version="v1", race_type="local"),
+        })
+        monkeypatch.setattr(prediction_service, "_wanted_versions", {})
+        monkeypatch.setattr(prediction_service, "_reloading", set())
+        # モデルファイルの代わりに、読み込んだバージョンを記録する
+        loaded = []
+        monkeypatch.setattr(HorseRacingPredictor, "load", lambda self, path=None: loaded.append(self.model_version))
+        return path, loaded
+
+    def test_workers_follow_published_version(self, isolated_models):
+        import time
+        from app.services.model_registry import ModelRegistry
+
+        path, loaded = isolated_models
+        ModelRegistry(path).publish("local", "v2")
+
+        prediction_service.get_predictor("local")
+        deadline = time.monotonic() + 5
+        while prediction_service._predictors["local"].model_version != "v2":
+            assert time.monotonic() < deadline, "model was not swapped"
+            time.sleep(0.01)
+
+        assert loaded == ["v2"]
+        assert prediction_service.get_model_versions()["local"] == "v2"
+        assert not prediction_service._reloading
+
+    def test_unloaded_race_type_uses_published_version_on_first_use(self, isolated_models):
+        from app.services.model_registry import ModelRegistry
+
+        path, loaded = isolated_models
+        ModelRegistry(path).publish("banei", "v5")
+
+        predictor = prediction_service.get_predictor("banei")
+        assert predictor.model_version == "v5"
+        assert prediction_service.get_model_versions()["banei"] == "v5"
+
+    def test_set_predictor_publishes(self, isolated_models):
+        import json
+        from app.services.predictor import HorseRacingPredictor
+
+        path, _ = isolated_models
+        prediction_service.set_predictor(HorseRacingPredictor(model_version="v3", race_type="local"), "local")
+
+        assert json.loads(path.read_text()) == {"local": "v3"}
+        assert prediction_service.get_predictor("local").model_version == "v3"
+        assert not prediction_service._reloading
+
+
+class TestModelArtifacts:
+    """Tests for compressed, checksummed model transfer"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        from app.services.model_artifacts import LocalArtifactStore
+
+        return LocalArtifactStore(tmp_path / "bucket")
+
+    def test_round_trip(self, store, tmp_path):
+        import pickle
+
+        from app.services import storage_service
+
+        model_data = {"model_version": "v2", "weights": list(range(10000))}
+        result = storage_service.upload_model(
+            model_data, "v2", {"note": "test"}, "local", store=store
+        )
+        assert result["compressed_size_bytes"] < result["size_bytes"]
+        assert (store.root / result["filename"]).exists()
+        assert (store.root / "model_local_v2.manifest.json").exists()
+        assert (store.root / "model_local_v2_meta.json").exists()
+
+        dest = tmp_path / "models" / "model_local_v2.pkl"
+        path = storage_service.download_model(
+            "v2", "local", dest=dest, store=store, cache_dir=tmp_path / "cache"
+        )
+        assert path == dest
+        with open(path, "rb") as f:
+            assert pickle.load(f) == model_data
+
+    def test_cached_artifact_is_not_downloaded_again(self, store, tmp_path):
+        from app.services import model_artifacts
+
+        model_artifacts.upload(store, {"weights": [1, 2, 3]}, "central", "v1")
+        cache_dir = tmp_path / "cache"
+        first = model_artifacts.download(store, "central", "v1", tmp_path / "a.pkl", cache_dir)
+
+        downloads = []
+        original = store.download
+        store.download = lambda name, dest: downloads.append(name) or original(name, dest)
+        second = model_artifacts.download(store, "central", "v1", tmp_path / "b.pkl", cache_dir)
+
+        assert downloads == []
+        assert second.sha256 == first.sha256
+        assert (tmp_path / "b.pkl").read_bytes() == (tmp_path / "a.pkl").read_bytes()
+
+    def test_checksum_mismatch_keeps_existing_model(self, store, tmp_path):
+        from app.services import model_artifacts
+
+        manifest = model_artifacts.upload(store, {"weights": [1, 2, 3]}, "central", "v1")
+        artifact = store.root / manifest.artifact
+        data = artifact.read_bytes()
+        artifact.write_bytes(data[:-1] + bytes([data[-1] ^ 0xFF]))
+
+        dest = tmp_path / "model_v1.pkl"
+        dest.write_bytes(b"current")
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            model_artifacts.download(store, "central", "v1", dest, tmp_path / "cache")
+        assert dest.read_bytes() == b"current"
+        assert list((tmp_path / "cache").iterdir()) == []
+
+    def test_legacy_pickle(self, store, tmp_path):
+        import pickle
+
+        from app.services import model_artifacts
+
+        store.root.mkdir(parents=True)
+        (store.root / "model_v1.pkl").write_bytes(pickle.dumps({"model_version": "v1"}))
+
+        dest = tmp_path / "model_v1.pkl"
+        assert model_artifacts.download(store, "central", "v1", dest, tmp_path / "cache") is None
+        assert pickle.loads(dest.read_bytes()) == {"model_version": "v1"}
+
+
+class TestLoggingPipeline:
+    """Tests for queued, batched JSON logging"""
+
+    def _record(self, created, lineno=10, level=logging.DEBUG, msg="race"):
+        record = logging.LogRecord("hot", level, "loop.py", lineno, msg, None, None)
+        record.created = created
+        return record
+
+    def test_hot_loop_filter_samples_debug(self):
+        from app.logging_config import HotLoopFilter
+
+        hot_filter = HotLoopFilter(rate=3, sample_every=5)
+        records = [self._record(100.0) for _ in range(15)]
+        passed = [hot_filter.filter(record) for record in records]
+        assert passed == (
+            [True] * 3 + [False] * 4 + [True] + [False] * 4 + [True] + [False] * 2
+        )
+        # 間引いた件数は次に通したレコードに付く
+        assert records[7].suppressed == 4 and records[12].suppressed == 4
+
+        # 1秒経つと上限が戻る
+        record = self._record(101.5)
+        assert hot_filter.filter(record)
+        assert record.suppressed == 2
+
+        # 他の呼び出し箇所・INFO 以上は間引かない
+        assert hot_filter.filter(self._record(100.0, lineno=20))
+        assert all(
+            hot_filter.filter(self._record(100.0, level=logging.INFO))
+            for _ in range(10)
+        )
+
+    def test_listener_writes_batches(self, tmp_path):
+        import json
+        import queue
+
+        from app.logging_config import (
+            BatchingQueueListener,
+            JSONFormatter,
+            LogQueueHandler,
+        )
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            tmp_path / "app.log", encoding="utf-8"
+        )
+        file_handler.setFormatter(JSONFormatter())
+        writes = []
+        original_write = file_handler.stream.write
+        file_handler.stream.write = (
+            lambda text: writes.append(text) or original_write(text)
+        )
+
+        queue_handler = LogQueueHandler(queue.SimpleQueue())
+        logger = logging.getLogger("test.logging_pipeline")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(queue_handler)
+        try:
+            for i in range(50):
+                logger.debug("race %d", i, extra={"extra_data": {"i": i}})
+            try:
+                raise ValueError("bad")
+            except ValueError:
+                logger.exception("failed")
+
+            listener = BatchingQueueListener(
+                queue_handler.queue, file_handler, batch_size=100
+            )
+            listener.start()
+            listener.stop()
+        finally:
+            logger.removeHandler(queue_handler)
+            file_handler.close()
+
+        log_text = (tmp_path / "app.log").read_text()
+        lines = [json.loads(line) for line in log_text.splitlines()]
+        assert len(writes) == 1
+        assert len(lines) == 51
+        assert lines[3]["message"] == "race 3" and lines[3]["data"] == {"i": 3}
+        assert lines[-1]["message"] == "failed"
+        assert "ValueError: bad" in lines[-1]["exception"]
@@ -271,6 +271,7 @@ export interface Horse {
 
 export interface HorseListResponse {
   total: number;
+  next_cursor?: string | null;
   horses: Horse[];
 }
 
@@ -314,6 +315,7 @@ export async function getHorses(params?: {
   race_type?: string;
   limit?: number;
   offset?: number;
+  cursor?: string;
 }): Promise<HorseListResponse> {
   if (useSupabase && isSupabaseConfigured) {
     return getHorsesFromSupabase(params);
@@ -324,6 +326,7 @@ export async function getHorses(params?: {
   if (params?.race_type) searchParams.set('race_type', params.race_type);
   if (params?.limit) searchParams.set('limit', params.limit.toString());
   if (params?.offset) searchParams.set('offset', params.offset.toString());
+  if (params?.cursor) searchParams.set('cursor', params.cursor);
   const query = searchParams.toString();
   return fetchApi<HorseListResponse>(`/api/v1/horses${query ? `?${query}` : ''}`);
 }
@@ -394,6 +397,7 @@ export interface Jockey {
 
 export interface JockeyListResponse {
   total: number;
+  next_cursor?: string | null;
   jockeys: Jockey[];
 }
 
@@ -427,6 +431,7 @@ export async function getJockeys(params?: {
   race_type?: string;
   limit?: number;
   offset?: number;
+  cursor?: string;
 }): Promise<JockeyListResponse> {
   if (useSupabase && isSupabaseConfigured) {
     return getJockeysFromSupabase(params);
@@ -436,6 +441,7 @@ export async function getJockeys(params?: {
   if (params?.race_type) searchParams.set('race_type', params.race_type);
   if (params?.limit) searchParams.set('limit', params.limit.toString());
   if (params?.offset) searchParams.set('offset', params.offset.toString());
+  if (params?.cursor) searchParams.set('cursor', params.cursor);
   const query = searchParams.toString();
   return fetchApi<JockeyListResponse>(`/api/v1/jockeys${query ? `?${query}` : ''}`);
 }
@@ -51,6 +51,7 @@ export interface Race {
 
 export interface RaceListResponse {
   total: number;
+  next_cursor?: string | null;
   races: Race[];
 }
 
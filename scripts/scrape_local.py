@@ -20,8 +20,10 @@ if env_path.exists():
                 os.environ[key.strip()] = value.strip()
 
 import requests
+import threading
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from bs4 import BeautifulSoup
 from typing import Optional, List, Dict
@@ -46,13 +48,26 @@ COURSE_NAMES = {
     "09": "阪神", "10": "小倉",
 }
 
+# 中断・再開用のチェックポイントファイル
+CHECKPOINT_FILE = Path(__file__).parent / ".scrape_local_state.json"
+
 # グローバル変数
-session = requests.Session()
-session.headers.update(HEADERS)
-last_request_time = 0
+_thread_local = threading.local()
+_rate_lock = threading.Lock()
+next_request_time = 0.0
 supabase = None
 
 
+def get_session() -> requests.Session:
+    """スレッドごとのHTTPセッションを取得"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _thread_local.session = session
+    return session
+
+
 def emit_progress(data: Dict):
     """進捗をJSON形式で出力（SSE用）"""
     if PROGRESS_MODE:
@@ -68,6 +83,86 @@ def race_exists(race_id: str) -> bool:
         return False
 
 
+def load_existing_race_ids(start_date: date, end_date: date) -> set:
+    """期間内で出走馬まで保存済みのrace_idをまとめて取得"""
+    race_ids = []
+    page_size = 1000
+    offset = 0
+    while True:
+        result = (
+            supabase.table("races").select("race_id")
+            .gte("date", start_date.isoformat())
+            .lte("date", end_date.isoformat())
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        race_ids.extend(row["race_id"] for row in result.data)
+        if len(result.data) < page_size:
+            break
+        offset += page_size
+
+    # race_existsと同じく、出走馬が保存されているレースのみを既存とみなす
+    existing = set()
+    chunk_size = 200
+    for i in range(0, len(race_ids), chunk_size):
+        chunk = race_ids[i:i + chunk_size]
+        offset = 0
+        while True:
+            result = (
+                supabase.table("entries").select("race_id")
+                .in_("race_id", chunk)
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            existing.update(row["race_id"] for row in result.data)
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+    return existing
+
+
+class Checkpoint:
+    """日付・レース単位の進捗をJSONファイルに記録（スレッドセーフ）"""
+
+    def __init__(self, path: Path, key: str, fresh: bool = False):
+        self.path = path
+        self.key = key
+        self._lock = threading.Lock()
+        self._all = {}
+        if path.exists():
+            try:
+                self._all = json.loads(path.read_text())
+            except (json.JSONDecodeError, OSError):
+                self._all = {}
+        if fresh or key not in self._all:
+            self._all[key] = {"dates": {}, "races": {}}
+        self._state = self._all[key]
+
+    def is_date_done(self, d: date) -> bool:
+        with self._lock:
+            return self._state["dates"].get(d.isoformat()) == "completed"
+
+    def is_race_done(self, race_id: str) -> bool:
+        with self._lock:
+            return race_id in self._state["races"]
+
+    def mark_race(self, race_id: str, status: str):
+        with self._lock:
+            self._state["races"][race_id] = status
+            self._save()
+
+    def mark_date(self, d: date, status: str):
+        with self._lock:
+            self._state["dates"][d.isoformat()] = status
+            self._save()
+
+    def _save(self):
+        # 途中で落ちてもファイルが壊れないよう一時ファイル経由で置き換える
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._all, ensure_ascii=False))
+        tmp.replace(self.path)
+
+
 def init_supabase():
     """Supabase接続を初期化"""
     global supabase
@@ -89,14 +184,16 @@ def init_supabase():
 
 
 def fetch_html(url: str) -> str:
-    """HTMLを取得（レート制限付き）"""
-    global last_request_time
-    elapsed = time.time() - last_request_time
-    if elapsed < SCRAPE_INTERVAL:
-        time.sleep(SCRAPE_INTERVAL - elapsed)
+    """HTMLを取得（全スレッド共通のレート制限付き）"""
+    global next_request_time
+    with _rate_lock:
+        now = time.monotonic()
+        slot = max(now, next_request_time)
+        next_request_time = slot + SCRAPE_INTERVAL
+    if slot > now:
+        time.sleep(slot - now)
 
-    response = session.get(url, timeout=30)
-    last_request_time = time.time()
+    response = get_session().get(url, timeout=30)
 
     if "EUC-JP" in response.text[:500] or "euc-jp" in response.text[:500].lower():
         response.encoding = "euc-jp"
@@ -367,13 +464,15 @@ def save_race(race_data: Dict) -> bool:
         return False
 
 
-def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, force: bool = False):
-    """日付範囲でスクレイピング"""
-    current = start_date
-    total_races = 0
-    total_success = 0
-    total_skipped = 0
-
+def scrape_date_range(
+    start_date: date,
+    end_date: date,
+    jra_only: bool = True,
+    force: bool = False,
+    workers: int = 1,
+    fresh: bool = False,
+):
+    """日付範囲でスクレイピング（中断しても再実行で続きから再開）"""
     # 全日付のリスト
     dates = []
     temp = start_date
@@ -382,7 +481,20 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
         temp += timedelta(days=1)
     total_dates = len(dates)
 
-    for date_index, current in enumerate(dates):
+    checkpoint_key = f"{start_date.isoformat()}_{end_date.isoformat()}_{'jra' if jra_only else 'all'}"
+    checkpoint = Checkpoint(CHECKPOINT_FILE, checkpoint_key, fresh=fresh or force)
+
+    # 既存チェックはレースごとではなく期間全体で1回
+    existing_ids = set() if force else load_existing_race_ids(start_date, end_date)
+
+    counts = {"races": 0, "success": 0, "skipped": 0}
+    counts_lock = threading.Lock()
+
+    def scrape_one_date(date_index: int, current: date):
+        if checkpoint.is_date_done(current):
+            print(f"\n=== {current} === (スキップ: 完了済み)")
+            return
+
         print(f"\n=== {current} ===")
 
         # 日付の進捗を出力
@@ -391,11 +503,16 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
             "currentDate": current.isoformat(),
             "currentDateIndex": date_index + 1,
             "totalDates": total_dates,
-            "scraped": total_success,
-            "skipped": total_skipped,
+            "scraped": counts["success"],
+            "skipped": counts["skipped"],
         })
 
-        races = scrape_race_list(current, jra_only=jra_only)
+        try:
+            races = scrape_race_list(current, jra_only=jra_only)
+        except Exception as e:
+            print(f"  ✗ {current} レース一覧の取得に失敗 - {e}")
+            checkpoint.mark_date(current, "failed")
+            return
         print(f"  {len(races)}件のレースが見つかりました")
 
         # レース一覧取得完了を出力
@@ -405,6 +522,7 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
             "racesCount": len(races),
         })
 
+        date_ok = True
         for i, race_info in enumerate(races):
             race_id = race_info["race_id"]
             race_name = race_info.get("race_name", race_id)
@@ -419,22 +537,23 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
                 "total": len(races),
                 "raceId": race_id,
                 "raceName": race_name,
-                "scraped": total_success,
-                "skipped": total_skipped,
+                "scraped": counts["success"],
+                "skipped": counts["skipped"],
             })
 
             try:
-                # 既存チェック
-                if not force and race_exists(race_id):
-                    total_skipped += 1
+                # 既存チェック（事前取得したIDとチェックポイント）
+                if race_id in existing_ids or checkpoint.is_race_done(race_id):
+                    with counts_lock:
+                        counts["skipped"] += 1
                     print(f"  → {race_id} (スキップ: 既存)")
                     emit_progress({
                         "type": "race_skipped",
                         "raceId": race_id,
                         "raceName": race_name,
                         "reason": "既存データ",
-                        "scraped": total_success,
-                        "skipped": total_skipped,
+                        "scraped": counts["success"],
+                        "skipped": counts["skipped"],
                     })
                     continue
 
@@ -442,7 +561,9 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
                 race_detail["date"] = race_info["date"]
 
                 if save_race(race_detail):
-                    total_success += 1
+                    checkpoint.mark_race(race_id, "completed")
+                    with counts_lock:
+                        counts["success"] += 1
                     entries_count = len(race_detail.get("entries", []))
                     print(f"  ✓ {race_id} ({entries_count}頭)")
                     emit_progress({
@@ -450,10 +571,11 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
                         "raceId": race_id,
                         "raceName": race_name,
                         "entriesCount": entries_count,
-                        "scraped": total_success,
-                        "skipped": total_skipped,
+                        "scraped": counts["success"],
+                        "skipped": counts["skipped"],
                     })
                 else:
+                    date_ok = False
                     print(f"  ✗ {race_id} (保存エラー)")
                     emit_progress({
                         "type": "race_error",
@@ -462,8 +584,10 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
                         "error": "保存エラー",
                     })
 
-                total_races += 1
+                with counts_lock:
+                    counts["races"] += 1
             except Exception as e:
+                date_ok = False
                 print(f"  ✗ {race_id} - {e}")
                 emit_progress({
                     "type": "race_error",
@@ -471,7 +595,21 @@ def scrape_date_range(start_date: date, end_date: date, jra_only: bool = True, f
                     "raceName": race_name,
                     "error": str(e),
                 })
-                total_races += 1
+                with counts_lock:
+                    counts["races"] += 1
+
+        checkpoint.mark_date(current, "completed" if date_ok else "failed")
+
+    if workers <= 1:
+        for date_index, current in enumerate(dates):
+            scrape_one_date(date_index, current)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(scrape_one_date, range(total_dates), dates))
+
+    total_races = counts["races"]
+    total_success = counts["success"]
+    total_skipped = counts["skipped"]
 
     # 完了を出力
     emit_progress({
@@ -508,6 +646,8 @@ def main():
     parser.add_argument("--include-local", action="store_true", help="地方競馬も含める（デフォルトはJRAのみ）")
     parser.add_argument("--progress", action="store_true", help="進捗をJSON形式で出力（SSE用）")
     parser.add_argument("--force", action="store_true", help="既存データを上書き（スキップしない）")
+    parser.add_argument("--workers", type=int, default=1, help="並列で処理する日付数（レート制限は共通）")
+    parser.add_argument("--fresh", action="store_true", help="チェックポイントを無視して最初から実行")
 
     args = parser.parse_args()
 
@@ -544,7 +684,13 @@ def main():
         else:
             print("モード: 新規のみ（既存データはスキップ）")
 
-    scrape_date_range(start, end, jra_only=jra_only, force=args.force)
+    scrape_date_range(
+        start, end,
+        jra_only=jra_only,
+        force=args.force,
+        workers=args.workers,
+        fresh=args.fresh,
+    )
 
     if not PROGRESS_MODE:
         show_stats()